@@ -0,0 +1,291 @@
+"""
+Final Stitching Benchmark (MoviePy vs FFmpeg)
+=============================================
+
+Compares the final_stitching() shared by the zoom stitch services
+(final_stitch.py: one FFmpeg encode, per-clip afade, concat and loudnorm in a
+single filter graph) with the former MoviePy implementation (clips decoded
+into Python, audio_fadeout applied in MoviePy, written through MoviePy's frame
+pipe, then re-encoded for loudnorm).
+
+Each run happens in a fresh worker process so its peak RSS is its own: the
+worker reports its own peak (Python, MoviePy's frame buffers) and the peak of
+its largest FFmpeg child. Clips are synthetic (testsrc2 + sine, 1080p25 AAC
+like the subtitled intermediates), so no cloud access is needed.
+
+Usage:
+    python benchmark_final_stitching.py
+    python benchmark_final_stitching.py --clips 8 --clip-seconds 20 --runs 3
+    python benchmark_final_stitching.py --implementations ffmpeg
+
+Needs ffmpeg/ffprobe, the service's Python dependencies and, for the MoviePy
+baseline, moviepy 1.x.
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from functools import partial
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+BENCHMARK_CONFIG = {
+    "work_dir": os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark", "final_stitching"),
+    "clips": 8,                # Segments of a typical job
+    "clip_seconds": 10.0,
+    "fadeout_duration": 1,
+    "module": "final_stitch",  # Module whose final_stitching() is measured
+}
+
+IMPLEMENTATIONS = ["moviepy", "ffmpeg"]
+
+logger = logging.getLogger("benchmark_final_stitching")
+
+
+# ==============================================================================
+# MOVIEPY BASELINE
+# ==============================================================================
+
+def moviepy_final_stitching(sub_intermediate_outputs, final_output_path, temp_output_path, fadeout_duration=1):
+    """The MoviePy final_stitching() the services used before the FFmpeg version (reference only)."""
+    from moviepy.editor import VideoFileClip, concatenate_videoclips
+    from moviepy.audio.fx.all import audio_fadeout
+
+    clips = []
+    for video_path in sub_intermediate_outputs:
+        clip = VideoFileClip(video_path)
+        if clip.audio:
+            clip = clip.set_audio(audio_fadeout(clip.audio, fadeout_duration))
+        clips.append(clip)
+
+    try:
+        final_clip = concatenate_videoclips(clips, method='compose')
+        final_clip.write_videofile(
+            temp_output_path,
+            codec='libx264',
+            audio_codec='aac',
+            audio_bitrate='128k',
+            logger=None
+        )
+        subprocess.run([
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-i", temp_output_path,
+            "-c:v", "libx264", "-crf", "21", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-b:a", "128k",
+            "-af", "loudnorm=I=-16:TP=-1.5:LRA=11",
+            "-y", final_output_path
+        ], check=True)
+    finally:
+        for clip in clips:
+            clip.close()
+        if 'final_clip' in locals():
+            final_clip.close()
+        if os.path.exists(temp_output_path):
+            os.remove(temp_output_path)
+
+
+# ==============================================================================
+# SYNTHETIC CLIPS
+# ==============================================================================
+
+def make_clip(path: str, duration: float, tone: int) -> None:
+    """Writes a 1080p25 testsrc2 + mono 16 kHz sine clip (the intermediates' format)."""
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=s=1920x1080:r=25:d={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency={tone}:sample_rate=16000:d={duration}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-ac", "1", "-shortest",
+        path
+    ], check=True)
+
+
+def generate_clips(clip_dir: str, count: int, duration: float) -> List[str]:
+    """Generates (or reuses) the synthetic intermediates."""
+    os.makedirs(clip_dir, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(clip_dir, f"clip_{i:02d}_{duration:g}s.mp4")
+        if not os.path.exists(path):
+            make_clip(path, duration, tone=220 + 110 * i)
+        paths.append(path)
+    return paths
+
+
+# ==============================================================================
+# MEASUREMENT
+# ==============================================================================
+
+def run_worker(implementation: str, module: str, clips: List[str], output_path: str, fadeout_duration: float) -> None:
+    """Runs one stitch in this (fresh) process and prints its wall time and peak RSS as JSON."""
+    if implementation == "moviepy":
+        stitch = partial(moviepy_final_stitching, temp_output_path=output_path.replace(".mp4", "_temp.mp4"))
+    else:
+        stitch = importlib.import_module(module).final_stitching
+
+    started = time.time()
+    stitch(clips, output_path, fadeout_duration=fadeout_duration)
+    wall = time.time() - started
+
+    # ru_maxrss is in KiB on Linux
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(json.dumps({
+        "wall_seconds": round(wall, 3),
+        "python_rss_mb": round(self_rss, 1),
+        "ffmpeg_rss_mb": round(child_rss, 1),
+        # Python and FFmpeg run concurrently (MoviePy pipes frames), so the sum bounds the job's peak
+        "peak_rss_mb": round(self_rss + child_rss, 1),
+    }))
+
+
+def measure_output(path: str) -> Dict[str, Any]:
+    """Duration, streams and integrated loudness of a stitched video (the output contract)."""
+    if not os.path.exists(path):
+        return {"exists": False}
+    probe = json.loads(subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries",
+         "format=duration:stream=codec_name,width,height,r_frame_rate,sample_rate,channels",
+         "-of", "json", path],
+        capture_output=True, text=True
+    ).stdout)
+    ebur128 = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostats", "-i", path, "-af", "ebur128", "-f", "null", "-"],
+        capture_output=True, text=True
+    ).stderr
+    loudness = re.findall(r"I:\s+(-?[\d.]+) LUFS", ebur128)
+    return {
+        "exists": True,
+        "duration": round(float(probe["format"]["duration"]), 3),
+        "streams": probe["streams"],
+        "integrated_lufs": float(loudness[-1]) if loudness else None,
+        "bytes": os.path.getsize(path),
+    }
+
+
+def run_once(implementation: str, args: argparse.Namespace, clips: List[str], run: int) -> Dict[str, Any]:
+    """Runs one stitch in a worker process and returns its measurements."""
+    output_path = os.path.join(args.work_dir, "outputs", f"{implementation}_{run}.mp4")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", implementation, "--module", args.module,
+         "--fadeout-duration", str(args.fadeout_duration), "--output-path", output_path] + clips,
+        capture_output=True, text=True
+    )
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        logger.error(f"{implementation} run {run} failed: {result.stderr.strip()[-500:]}")
+        return {"ok": False}
+    measured = json.loads(lines[-1])
+    measured["output"] = measure_output(output_path)
+    measured["ok"] = measured["output"]["exists"]
+    if not args.keep_outputs and os.path.exists(output_path):
+        os.remove(output_path)
+    return measured
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median wall time and max peak RSS over the successful runs."""
+    ok_runs = [run for run in runs if run["ok"]]
+    if not ok_runs:
+        return {"ok": False}
+    return {
+        "ok": True,
+        "wall_seconds": round(statistics.median(run["wall_seconds"] for run in ok_runs), 3),
+        "python_rss_mb": max(run["python_rss_mb"] for run in ok_runs),
+        "ffmpeg_rss_mb": max(run["ffmpeg_rss_mb"] for run in ok_runs),
+        "peak_rss_mb": max(run["peak_rss_mb"] for run in ok_runs),
+        "output": ok_runs[-1]["output"],
+    }
+
+
+def print_report(summary: Dict[str, Dict[str, Any]]) -> None:
+    print(f"\n{'implementation':<16} {'wall s':>8} {'python MB':>10} {'ffmpeg MB':>10} {'peak MB':>9} "
+          f"{'duration':>9} {'LUFS':>6}")
+    for name, data in summary.items():
+        if not data["ok"]:
+            print(f"{name:<16} FAILED")
+            continue
+        output = data["output"]
+        print(f"{name:<16} {data['wall_seconds']:8.2f} {data['python_rss_mb']:10.1f} {data['ffmpeg_rss_mb']:10.1f} "
+              f"{data['peak_rss_mb']:9.1f} {output['duration']:9.3f} {output['integrated_lufs'] or 0:6.1f}")
+    if all(data["ok"] for data in summary.values()) and {"moviepy", "ffmpeg"} <= set(summary):
+        before, after = summary["moviepy"], summary["ffmpeg"]
+        print(f"\nffmpeg vs moviepy: {before['wall_seconds'] / after['wall_seconds']:.1f}x faster, "
+              f"peak RSS {after['peak_rss_mb']:.0f} MB vs {before['peak_rss_mb']:.0f} MB")
+
+
+# ==============================================================================
+# MAIN
+# ==============================================================================
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="final_stitching benchmark: MoviePy vs FFmpeg")
+    parser.add_argument("--implementations", type=lambda v: v.split(","), default=IMPLEMENTATIONS,
+                        help="Comma-separated subset of: " + ",".join(IMPLEMENTATIONS))
+    parser.add_argument("--module", default=BENCHMARK_CONFIG["module"],
+                        help="Module providing the FFmpeg final_stitching()")
+    parser.add_argument("--clips", type=int, default=BENCHMARK_CONFIG["clips"])
+    parser.add_argument("--clip-seconds", type=float, default=BENCHMARK_CONFIG["clip_seconds"])
+    parser.add_argument("--fadeout-duration", type=float, default=BENCHMARK_CONFIG["fadeout_duration"])
+    parser.add_argument("--runs", type=int, default=1, help="Measured runs per implementation")
+    parser.add_argument("--work-dir", default=BENCHMARK_CONFIG["work_dir"])
+    parser.add_argument("--keep-outputs", action="store_true", help="Keep the stitched videos in <work-dir>/outputs")
+    parser.add_argument("--output", help="Result JSON (default: <work-dir>/final_stitching_<timestamp>.json)")
+    # Internal: one measured stitch per worker process
+    parser.add_argument("--worker", choices=IMPLEMENTATIONS, help=argparse.SUPPRESS)
+    parser.add_argument("--output-path", help=argparse.SUPPRESS)
+    parser.add_argument("inputs", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.module, args.inputs, args.output_path, args.fadeout_duration)
+        return 0
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    args.work_dir = os.path.abspath(args.work_dir)
+    unknown = set(args.implementations) - set(IMPLEMENTATIONS)
+    if unknown:
+        parser.error(f"Unknown implementations: {sorted(unknown)}")
+
+    clips = generate_clips(os.path.join(args.work_dir, "inputs"), args.clips, args.clip_seconds)
+    results = {}
+    for name in args.implementations:
+        runs = []
+        for run in range(1, args.runs + 1):
+            logger.info(f"{name} run {run}/{args.runs}...")
+            runs.append(run_once(name, args, clips, run))
+        results[name] = {"runs": runs, "summary": summarize(runs)}
+
+    summary = {name: data["summary"] for name, data in results.items()}
+    print_report(summary)
+
+    output = args.output or os.path.join(args.work_dir, f"final_stitching_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, "w") as f:
+        json.dump({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "parameters": {"module": args.module, "clips": args.clips, "clip_seconds": args.clip_seconds,
+                           "fadeout_duration": args.fadeout_duration, "runs": args.runs},
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults: {output}")
+    return 0 if all(data["ok"] for data in summary.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
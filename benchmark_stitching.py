@@ -0,0 +1,552 @@
+"""
+BluSanta Stitching Benchmark
+============================
+
+Offline end-to-end benchmark for blusanta_video_stitching().
+
+Generates a synthetic asset set with ffmpeg lavfi (testsrc2 videos, sine audio,
+a solid background, doctor clips of configurable length), runs the real
+pipeline through file:// paths with a deterministic stand-in transcriber (or
+against deepgram_standin.py with --deepgram-url), and
+records per-stage wall time, CPU and peak RSS as JSON. Results can be stored
+as a baseline and later runs compared against it.
+
+Needs ffmpeg/ffprobe and the service's Python dependencies - no network, no GCS.
+
+Usage:
+    python benchmark_stitching.py --save-baseline benchmark_baseline.json
+    python benchmark_stitching.py --baseline benchmark_baseline.json
+    python benchmark_stitching.py --mode stream --doctor-seconds 60 --runs 3
+    python benchmark_stitching.py --deepgram-url http://127.0.0.1:8090/v1/listen
+    python benchmark_stitching.py --runs 3 --calibrate cost_model.json
+
+--calibrate fits the per-operation CPU model behind dry-run plans
+(COST_MODEL in blusanta_zoom_stitch.py, or STITCH_COST_MODEL=cost_model.json)
+to the processes of the measured runs.
+
+Exit status is 1 when a run fails or a regression against the baseline is found.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import blusanta_zoom_stitch as stitch
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+BENCHMARK_CONFIG = {
+    "work_dir": os.path.join(stitch.BASE_DIR, "benchmark"),
+    "doctor_seconds": 20.0,     # Length of each synthetic doctor answer
+    "constant_seconds": 6.0,    # Length of constant/placeholder/nodding clips
+    "greeting_seconds": 3.5,
+    "thank_you_seconds": 2.0,
+    "word_seconds": 0.4,        # Stand-in transcriber: one word every 0.4s
+    "tolerance": 0.15,          # Relative slowdown that counts as a regression
+    # Absolute floors so that noise on tiny stages isn't flagged
+    "min_regression": {"wall_seconds": 1.0, "cpu_seconds": 1.0, "max_rss_mb": 32.0},
+}
+
+SYNTHETIC_WORDS = ["thank", "you", "for", "the", "question", "diabetes", "care", "starts", "with", "diet"]
+
+logger = logging.getLogger("benchmark")
+
+
+# ==============================================================================
+# SYNTHETIC ASSETS
+# ==============================================================================
+
+def _ffmpeg(args: List[str]) -> None:
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"] + args, check=True)
+
+
+def make_clip(path: str, duration: float, width: int, height: int, fps: int, tone: int, sample_rate: int) -> None:
+    """Writes a testsrc2 + sine H.264/AAC clip."""
+    _ffmpeg([
+        "-f", "lavfi", "-i", f"testsrc2=s={width}x{height}:r={fps}:d={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency={tone}:sample_rate={sample_rate}:d={duration}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "128k", "-shortest", "-movflags", "+faststart",
+        path
+    ])
+
+
+def make_audio(path: str, duration: float, tone: int) -> None:
+    """Writes a sine MP3 (stand-in for the ElevenLabs name audio)."""
+    _ffmpeg(["-f", "lavfi", "-i", f"sine=frequency={tone}:sample_rate=44100:d={duration}", "-c:a", "libmp3lame", path])
+
+
+def generate_assets(asset_dir: str, doctor_seconds: float, constant_seconds: float) -> Dict[str, str]:
+    """
+    Generates (or reuses) the synthetic asset set.
+
+    Constants, placeholders and the nodding clip use the production spec;
+    doctor clips are 720p30 / 48 kHz like phone recordings, so the pipeline
+    normalizes them the way it does real uploads.
+
+    Args:
+        asset_dir: Output directory (assets are reused when the parameters match)
+        doctor_seconds: Length of each doctor clip
+        constant_seconds: Length of the other clips
+
+    Returns:
+        Dict of asset name -> local path
+    """
+    config = stitch.VIDEO_CONFIG
+    width, height, fps = config["width"], config["height"], config["fps"]
+    params = {"doctor_seconds": doctor_seconds, "constant_seconds": constant_seconds,
+              "width": width, "height": height, "fps": fps}
+    params_path = os.path.join(asset_dir, "assets.json")
+
+    assets = {"background": os.path.join(asset_dir, "background.jpg"),
+              "greeting": os.path.join(asset_dir, "greeting.mp3"),
+              "thank_you": os.path.join(asset_dir, "thank_you.mp3")}
+    for i in range(4):
+        assets[f"const_{i}"] = os.path.join(asset_dir, f"const_{i}.mp4")
+    for i in range(2):
+        assets[f"placeholder_{i}"] = os.path.join(asset_dir, f"placeholder_{i}.mp4")
+        assets[f"doctor_{i}"] = os.path.join(asset_dir, f"doctor_{i}.mp4")
+    assets["nodding"] = os.path.join(asset_dir, "nodding.mp4")
+
+    if os.path.exists(params_path) and all(os.path.exists(path) for path in assets.values()):
+        with open(params_path) as f:
+            if json.load(f) == params:
+                logger.info(f"Reusing synthetic assets in {asset_dir}")
+                return assets
+
+    logger.info(f"Generating synthetic assets in {asset_dir}...")
+    shutil.rmtree(asset_dir, ignore_errors=True)
+    os.makedirs(asset_dir)
+    _ffmpeg(["-f", "lavfi", "-i", f"color=c=0x1d3557:s={width}x{height}", "-frames:v", "1", assets["background"]])
+    for i in range(4):
+        make_clip(assets[f"const_{i}"], constant_seconds, width, height, fps, 440 + 40 * i, 44100)
+    for i in range(2):
+        make_clip(assets[f"placeholder_{i}"], constant_seconds, width, height, fps, 330, 44100)
+        make_clip(assets[f"doctor_{i}"], doctor_seconds, 1280, 720, 30, 220 + 20 * i, 48000)
+    make_clip(assets["nodding"], constant_seconds, width, height, fps, 550, 44100)
+    make_audio(assets["greeting"], BENCHMARK_CONFIG["greeting_seconds"], 660)
+    make_audio(assets["thank_you"], BENCHMARK_CONFIG["thank_you_seconds"], 770)
+
+    with open(params_path, "w") as f:
+        json.dump(params, f)
+    return assets
+
+
+def build_payload(assets: Dict[str, str], mode: str, job_id: str) -> Dict[str, Any]:
+    """Returns the 8-segment payload convert_backend_payload() would produce, on file:// URLs."""
+    url = {name: "file://" + os.path.abspath(path) for name, path in assets.items()}
+    return {
+        "intro_path": None,
+        "outro_path": None,
+        "final_intro_path": None,
+        "final_outro_path": None,
+        "podcast_background": url["background"],
+        "font_path": None,
+        "assets_actor_paths": [
+            url["const_0"], url["placeholder_0"], url["const_1"], url["nodding"],
+            url["const_2"], url["nodding"], url["placeholder_1"], url["const_3"],
+        ],
+        "assets_doctor_paths": [None, None, None, url["doctor_0"], None, url["doctor_1"], None, None],
+        "audio_overlays": [
+            {"segment_index": 1, "audio_path": url["greeting"]},
+            {"segment_index": 6, "audio_path": url["thank_you"]},
+        ],
+        "final_upload_path": os.path.join(BENCHMARK_CONFIG["work_dir"], f"{job_id}.mp4"),
+        "webhook_url": None,
+        "additional_data": {"drFirstName": "Bench", "drLastName": "Mark"},
+        "streaming": mode == "stream",
+        "job_id": job_id,
+        # Master only: comparable with earlier baselines and the cost model
+        "renditions": [],
+        "previews": False,
+    }
+
+
+# ==============================================================================
+# STAND-IN TRANSCRIBER
+# ==============================================================================
+
+def synthetic_transcript(
+    media_path: str,
+    language: str = 'en',
+    work_dir: Optional[str] = None
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Deterministic replacement for transcribe_with_deepgram().
+
+    Returns one word every BENCHMARK_CONFIG["word_seconds"] across the media
+    duration, in Deepgram's word format, so subtitle generation and burn-in
+    run exactly as in production.
+    """
+    duration = stitch.get_media_duration(media_path)
+    step = BENCHMARK_CONFIG["word_seconds"]
+    words = []
+    t = 0.0
+    while t + step <= duration:
+        word = SYNTHETIC_WORDS[len(words) % len(SYNTHETIC_WORDS)]
+        words.append({"word": word, "punctuated_word": word, "start": round(t, 3),
+                      "end": round(t + 0.8 * step, 3), "confidence": 1.0})
+        t += step
+    return words or None
+
+
+# ==============================================================================
+# RUNNER
+# ==============================================================================
+
+def isolate_service_dirs(work_dir: str) -> None:
+    """Points the service's temp/output/cache/trace/history directories into work_dir."""
+    for name in ("ASSETS_DIR", "OUTPUT_DIR", "TEMP_DIR", "CACHE_DIR", "TRACE_DIR", "HISTORY_DIR"):
+        path = os.path.join(work_dir, name[:-4].lower())
+        os.makedirs(path, exist_ok=True)
+        setattr(stitch, name, path)
+
+
+def run_once(
+    assets: Dict[str, str],
+    mode: str,
+    job_id: str,
+    cold_cache: bool,
+    keep_output: bool = False
+) -> Dict[str, Any]:
+    """
+    Runs one job and returns its timings.
+
+    Args:
+        keep_output: Leave the final video in OUTPUT_DIR (returned as "output_path")
+
+    Returns:
+        {"job_id", "ok", "wall_seconds", "output_seconds", "output_bytes", "output_path",
+         "stages": {stage: {...}}, "total": {...}, "processes": [{"operation", ...}]}
+    """
+    if cold_cache:
+        shutil.rmtree(stitch.CACHE_DIR, ignore_errors=True)
+        os.makedirs(stitch.CACHE_DIR)
+
+    started = time.time()
+    ok = stitch.blusanta_video_stitching(build_payload(assets, mode, job_id))
+    wall = time.time() - started
+
+    summary = stitch.JOBS[job_id].summary()
+    output_path = os.path.join(stitch.OUTPUT_DIR, f"final_video_{job_id}.mp4")
+    produced = ok and os.path.exists(output_path)
+    output_seconds = stitch.get_media_duration(output_path) if produced else 0.0
+    output_bytes = os.path.getsize(output_path) if produced else 0
+    if os.path.exists(output_path) and not keep_output:
+        os.remove(output_path)
+
+    def entry(values: Dict[str, Any]) -> Dict[str, float]:
+        return {
+            "wall_seconds": values["wall_seconds"],
+            "cpu_seconds": round(values["user_seconds"] + values["sys_seconds"], 3),
+            "max_rss_mb": values["max_rss_mb"],
+            "processes": values["processes"],
+        }
+
+    total = entry(summary["totals"])
+    total["wall_seconds"] = round(wall, 3)
+    return {
+        "job_id": job_id,
+        "ok": ok,
+        "wall_seconds": round(wall, 3),
+        "output_seconds": round(output_seconds, 3),
+        "output_bytes": output_bytes,
+        "output_path": output_path if produced and keep_output else None,
+        "stages": {stage: entry(values) for stage, values in summary["stages"].items()},
+        "total": total,
+        "processes": [
+            {
+                "operation": sample["operation"],
+                "output_seconds": sample["output_seconds"],
+                "cpu_seconds": round(sample["user_seconds"] + sample["sys_seconds"], 3),
+                "returncode": sample["returncode"],
+            }
+            for sample in stitch.JOBS[job_id].samples
+        ],
+    }
+
+
+def summarize_runs(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median wall/CPU and max RSS per stage over the successful runs."""
+    ok_runs = [run for run in runs if run["ok"]]
+
+    def aggregate(entries: List[Dict[str, float]]) -> Dict[str, float]:
+        return {
+            "wall_seconds": round(statistics.median(e["wall_seconds"] for e in entries), 3),
+            "cpu_seconds": round(statistics.median(e["cpu_seconds"] for e in entries), 3),
+            "max_rss_mb": round(max(e["max_rss_mb"] for e in entries), 1),
+        }
+
+    if not ok_runs:
+        return {"total": None, "stages": {}}
+    stage_names = sorted({stage for run in ok_runs for stage in run["stages"]})
+    return {
+        "total": aggregate([run["total"] for run in ok_runs]),
+        "stages": {
+            stage: aggregate([run["stages"][stage] for run in ok_runs if stage in run["stages"]])
+            for stage in stage_names
+        },
+    }
+
+
+def ffmpeg_version() -> str:
+    try:
+        return subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True).stdout.splitlines()[0]
+    except Exception:
+        return "unknown"
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Generates assets and runs every requested mode."""
+    work_dir = BENCHMARK_CONFIG["work_dir"] = os.path.abspath(args.work_dir)
+    isolate_service_dirs(work_dir)
+    assets = generate_assets(os.path.join(work_dir, "inputs"), args.doctor_seconds, args.constant_seconds)
+
+    if args.deepgram_url:
+        stitch.DEEPGRAM_CONFIG["url"] = args.deepgram_url
+    else:
+        stitch.transcribe_with_deepgram = synthetic_transcript
+    if args.profile:
+        stitch.encoder_profile(args.profile)
+        stitch.VIDEO_CONFIG["profile"] = args.profile
+
+    modes = ["file", "stream"] if args.mode == "both" else [args.mode]
+    if "stream" in modes and not stitch.streaming_supported():
+        logger.warning("Streaming mode unavailable on this platform, skipping it")
+        modes.remove("stream")
+
+    results = {}
+    for mode in modes:
+        if args.cache == "warm":
+            logger.info(f"[{mode}] warm-up run (not measured)...")
+            run_once(assets, mode, f"bench_{mode}_warmup", cold_cache=True)
+        runs = []
+        for n in range(args.runs):
+            logger.info(f"[{mode}] run {n + 1}/{args.runs} ({args.cache} cache)...")
+            run = run_once(assets, mode, f"bench_{mode}_{n + 1}", cold_cache=args.cache == "cold")
+            logger.info(f"[{mode}] run {n + 1}: {'ok' if run['ok'] else 'FAILED'} in {run['wall_seconds']:.1f}s")
+            runs.append(run)
+        results[mode] = {"runs": runs, "summary": summarize_runs(runs)}
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "ffmpeg": ffmpeg_version(),
+        },
+        "parameters": {
+            "doctor_seconds": args.doctor_seconds,
+            "constant_seconds": args.constant_seconds,
+            "runs": args.runs,
+            "cache": args.cache,
+            "profile": stitch.VIDEO_CONFIG["profile"],
+            "encoder": stitch.encoder_profile(),
+            "transcriber": args.deepgram_url or "synthetic",
+        },
+        "modes": results,
+    }
+
+
+# ==============================================================================
+# BASELINE COMPARISON
+# ==============================================================================
+
+def compare_to_baseline(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Compares per-stage medians against a baseline.
+
+    A metric regresses when it exceeds the baseline by more than `tolerance`
+    (relative) and by more than BENCHMARK_CONFIG["min_regression"] (absolute).
+
+    Returns:
+        List of {"mode", "stage", "metric", "baseline", "current", "change", "regression"}
+    """
+    if result["parameters"] != baseline.get("parameters"):
+        logger.warning(f"Baseline parameters differ: {baseline.get('parameters')} vs {result['parameters']}")
+
+    rows = []
+    for mode, current_mode in result["modes"].items():
+        base_mode = baseline.get("modes", {}).get(mode)
+        if not base_mode or not current_mode["summary"]["total"]:
+            continue
+        current = dict(current_mode["summary"]["stages"], total=current_mode["summary"]["total"])
+        base = dict(base_mode["summary"]["stages"], total=base_mode["summary"]["total"])
+        for stage in sorted(set(current) & set(base)):
+            for metric, floor in BENCHMARK_CONFIG["min_regression"].items():
+                old, new = base[stage][metric], current[stage][metric]
+                change = (new - old) / old if old else 0.0
+                rows.append({
+                    "mode": mode, "stage": stage, "metric": metric,
+                    "baseline": old, "current": new, "change": round(change, 3),
+                    "regression": change > tolerance and new - old > floor,
+                })
+    return rows
+
+
+def print_report(result: Dict[str, Any], comparison: Optional[List[Dict[str, Any]]]) -> None:
+    for mode, data in result["modes"].items():
+        print(f"\n{mode} mode ({len(data['runs'])} runs, median):")
+        summary = data["summary"]
+        if not summary["total"]:
+            print("  all runs failed")
+            continue
+        for stage, entry in list(summary["stages"].items()) + [("TOTAL", summary["total"])]:
+            print(f"  {stage:<12} {entry['wall_seconds']:8.2f}s wall  {entry['cpu_seconds']:8.2f}s cpu  "
+                  f"{entry['max_rss_mb']:7.0f} MB")
+
+    if comparison is not None:
+        regressions = [row for row in comparison if row["regression"]]
+        print(f"\nBaseline comparison: {len(regressions)} regression(s)")
+        for row in comparison:
+            if row["regression"] or abs(row["change"]) > 0.05:
+                flag = "REGRESSION" if row["regression"] else ""
+                print(f"  {row['mode']:<6} {row['stage']:<12} {row['metric']:<13} "
+                      f"{row['baseline']:9.2f} -> {row['current']:9.2f} ({row['change']:+.0%}) {flag}")
+
+
+# ==============================================================================
+# COST MODEL CALIBRATION
+# ==============================================================================
+
+def fit_cost_model(result: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """
+    Fits CPU-seconds = fixed + per_second * output seconds per operation.
+
+    Least squares over every successful process of every successful run;
+    operations whose processes all write about the same amount of media get
+    a pure per-second rate (or a fixed cost when they write none, like ffprobe).
+
+    Returns:
+        {operation: {"fixed", "per_second", "samples"}}
+    """
+    points: Dict[str, List[Any]] = {}
+    for data in result["modes"].values():
+        for run in data["runs"]:
+            if not run["ok"]:
+                continue
+            for process in run["processes"]:
+                if process["returncode"] == 0:
+                    points.setdefault(process["operation"], []).append(
+                        (process["output_seconds"] or 0.0, process["cpu_seconds"])
+                    )
+
+    model = {}
+    for operation, samples in sorted(points.items()):
+        xs = [x for x, _ in samples]
+        ys = [y for _, y in samples]
+        mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+        if max(xs) - min(xs) > 0.5:
+            slope = (sum((x - mean_x) * (y - mean_y) for x, y in samples)
+                     / sum((x - mean_x) ** 2 for x in xs))
+            fixed = mean_y - slope * mean_x
+            if slope < 0:
+                slope, fixed = 0.0, mean_y
+            elif fixed < 0:
+                slope, fixed = sum(ys) / sum(xs), 0.0
+        elif mean_x > 0:
+            slope, fixed = sum(ys) / sum(xs), 0.0
+        else:
+            slope, fixed = 0.0, mean_y
+        model[operation] = {"fixed": round(fixed, 4), "per_second": round(slope, 4), "samples": len(samples)}
+    return model
+
+
+def write_cost_model(result: Dict[str, Any], path: str) -> Dict[str, Any]:
+    """Writes a STITCH_COST_MODEL file from a benchmark result."""
+    cfg = stitch.VIDEO_CONFIG
+    cost_model = {
+        "profile": cfg["profile"],
+        "resolution": f"{cfg['width']}x{cfg['height']}@{cfg['fps']}",
+        "operations": fit_cost_model(result),
+        "calibration": {
+            "created": result["created"],
+            "environment": result["environment"],
+            "parameters": result["parameters"],
+        },
+    }
+    with open(path, "w") as f:
+        json.dump(cost_model, f, indent=2)
+    return cost_model
+
+
+def print_cost_model(cost_model: Dict[str, Any]) -> None:
+    print(f"\nCost model ({cost_model['profile']} profile, {cost_model['resolution']}):")
+    for operation, entry in cost_model["operations"].items():
+        print(f"  {operation:<20} {entry['fixed']:8.3f}s + {entry['per_second']:7.4f}s/s  "
+              f"({entry['samples']} processes)")
+
+
+# ==============================================================================
+# MAIN
+# ==============================================================================
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline end-to-end stitching benchmark")
+    parser.add_argument("--mode", choices=["file", "stream", "both"], default="both")
+    parser.add_argument("--runs", type=int, default=1, help="Measured runs per mode")
+    parser.add_argument("--cache", choices=["cold", "warm"], default="cold",
+                        help="cold: empty asset cache per run; warm: one unmeasured warm-up run first")
+    parser.add_argument("--doctor-seconds", type=float, default=BENCHMARK_CONFIG["doctor_seconds"])
+    parser.add_argument("--constant-seconds", type=float, default=BENCHMARK_CONFIG["constant_seconds"])
+    parser.add_argument("--profile", choices=sorted(stitch.ENCODER_PROFILES),
+                        help="Encoder profile (default: VIDEO_CONFIG['profile'])")
+    parser.add_argument("--deepgram-url", help="Transcribe through this endpoint (e.g. deepgram_standin.py) "
+                                               "instead of the in-process synthetic transcriber")
+    parser.add_argument("--work-dir", default=BENCHMARK_CONFIG["work_dir"])
+    parser.add_argument("--output", help="Result JSON (default: <work-dir>/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", help="Also write the result here as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=BENCHMARK_CONFIG["tolerance"])
+    parser.add_argument("--calibrate", metavar="PATH",
+                        help="Fit the dry-run CPU cost model to the measured runs and write it here")
+    parser.add_argument("--verbose", action="store_true", help="Show the service's INFO logs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    stitch.logger.setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    result = run_benchmark(args)
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            comparison = compare_to_baseline(result, json.load(f), args.tolerance)
+        result["comparison"] = comparison
+
+    output = args.output or os.path.join(
+        BENCHMARK_CONFIG["work_dir"], "results", time.strftime("%Y%m%d_%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({key: value for key, value in result.items() if key != "comparison"}, f, indent=2)
+
+    print_report(result, comparison)
+    if args.calibrate:
+        print_cost_model(write_cost_model(result, args.calibrate))
+        print(f"Cost model: {args.calibrate}")
+    print(f"\nResults: {output}")
+
+    failed = any(not run["ok"] for data in result["modes"].values() for run in data["runs"])
+    regressed = any(row["regression"] for row in comparison or [])
+    return 1 if failed or regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
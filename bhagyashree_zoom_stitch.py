@@ -7,10 +7,9 @@ import tempfile
 import shutil
 import requests
 
-from moviepy.editor import VideoFileClip, concatenate_videoclips, AudioFileClip
-from moviepy.audio.fx.all import audio_fadeout
 from utils.subtitles_generator import generate_subtitles
 from utils.logging_config import logger, log_session_breaker
+from final_stitch import final_stitching
 
 warnings.filterwarnings('ignore')
 
@@ -270,9 +269,8 @@ def video_generator(assets_actor, assets_doctor, zoom_bg, output_dir, emp_name=N
 
         # Final stitch of all intermediate outputs
         final_output_path = os.path.join(output_dir, 'final_video.mp4')
-        temp_output_path = os.path.join(output_dir, 'temp_fin_video.mp4')
 
-        final_stitching(sub_intermediate_outputs, final_output_path, temp_output_path)
+        final_stitching(sub_intermediate_outputs, final_output_path)
 
         logger.info("Final video stitching complete!!! \nFinal video saved at {}".format(final_output_path))
 
@@ -283,78 +281,6 @@ def video_generator(assets_actor, assets_doctor, zoom_bg, output_dir, emp_name=N
         for video in intermediate_outputs:
             if os.path.exists(video):
                 os.remove(video)
-        os.remove(temp_output_path)
-
-def final_stitching(sub_intermediate_outputs, final_output_path, temp_output_path, fadeout_duration=1):
-    """
-    Stitch multiple video clips into a single video with audio fade-out at the end of each clip, 
-    then normalize audio with FFmpeg.
-
-    Parameters:
-    - sub_intermediate_outputs (list of str): Paths to the input video files.
-    - final_output_path (str): Path to save the final stitched video.
-    - temp_output_path (str): Temporary file path for the intermediate stitched video.
-    - fadeout_duration (float): Duration of the fade-out effect in seconds.
-    """
-    logger.info("Final stitching in progress...")
-    clips = []
-
-    # Load all video clips and apply fade-out to audio
-    for idx, video_path in enumerate(sub_intermediate_outputs):
-        try:
-            clip = VideoFileClip(video_path)
-            if clip.audio:
-                # Apply fade-out effect to the audio
-                clip = clip.set_audio(audio_fadeout(clip.audio, fadeout_duration))
-            clips.append(clip)
-        except Exception as e:
-            logger.info("Error loading or processing clip {}: {}".format(video_path, e))
-
-    if not clips:
-        logger.info("No valid clips found for stitching. Aborting.")
-        return
-
-    try:
-        # Concatenate video clips
-        final_clip = concatenate_videoclips(clips, method='compose')
-
-        # Write the intermediate video with processed audio
-        final_clip.write_videofile(
-            temp_output_path,
-            codec='libx264',
-            audio_codec='aac',
-            audio_bitrate='128k'
-        )
-
-        # Apply loudnorm filter using FFmpeg
-        ffmpeg_command = [
-            "ffmpeg",
-            "-hide_banner",
-            "-loglevel", "error", 
-            "-i", temp_output_path,
-            "-c:v", "libx264",
-            "-crf", "21",
-            "-pix_fmt", "yuv420p",
-            "-c:a", "aac",
-            "-b:a", "128k",
-            "-af", "loudnorm=I=-16:TP=-1.5:LRA=11",
-            final_output_path
-        ]
-
-        subprocess.run(ffmpeg_command, check=True)
-
-    except subprocess.CalledProcessError as e:
-        logger.info("FFmpeg error: {}".format(e))
-
-    except Exception as e:
-        logger.info("Error during video stitching: {}".format(e))
-
-    finally:
-        # Release resources
-        for clip in clips:
-            clip.close()
-        if 'final_clip' in locals():
-            final_clip.close()
 
 def remote_video_stitching(input_obj): 
     try:
@@ -28,16 +28,26 @@ Version: 2.0.0 (Production)
 
 import os
 import json
+import contextvars
+import functools
+import hashlib
 import logging
+import math
+import queue
+import re
 import subprocess
 import requests
 import shutil
+import socket
+import sqlite3
 import tempfile
 import threading
 import time
-from typing import Dict, List, Optional, Tuple, Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager, nullcontext
+from typing import Callable, Dict, List, Optional, Tuple, Any
 from google.cloud import storage
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file
 
 # ==============================================================================
 # LOGGING CONFIGURATION
@@ -48,38 +58,253 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# ==============================================================================
+# SERVICE METRICS (PROMETHEUS TEXT FORMAT)
+# ==============================================================================
+#
+# A deliberately small in-process registry: the VM only installs requests and
+# flask, and /metrics must stay cheap enough to scrape every few seconds.
+# Updates take a per-metric lock; rendering walks a handful of dicts.
+
+class _Metric:
+    """Base class: a named metric family with labelled children."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        if not labelnames and self.kind in ("counter", "gauge"):
+            self._values[()] = 0.0  # Unlabelled series are exported from the start
+        self._lock = threading.Lock()
+        METRICS_REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @staticmethod
+    def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+        if not names:
+            return ""
+        pairs = ",".join(
+            '{}="{}"'.format(n, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for n, v in zip(names, values)
+        )
+        return "{" + pairs + "}"
+
+    @staticmethod
+    def _format_value(value: float) -> str:
+        value = float(value)
+        return str(int(value)) if value.is_integer() else repr(value)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{self._format_labels(self.labelnames, key)} {self._format_value(value)}" for key, value in items]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(_Metric):
+    """Monotonically increasing value."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or is computed at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._callback = callback
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        if self._callback is not None:
+            with self._lock:
+                self._values = dict(self._callback())
+        return super().samples()
+
+
+class Histogram(_Metric):
+    """Bucketed observations (cumulative buckets, _sum and _count)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["buckets"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, dict(entry, buckets=list(entry["buckets"]))) for key, entry in self._values.items()]
+        lines = []
+        names = self.labelnames + ("le",)
+        for key, entry in items:
+            for bound, count in zip(self.buckets, entry["buckets"]):
+                lines.append(f"{self.name}_bucket{self._format_labels(names, key + (f'{bound:g}',))} {count}")
+            lines.append(f"{self.name}_bucket{self._format_labels(names, key + ('+Inf',))} {entry['count']}")
+            labels = self._format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {self._format_value(entry['sum'])}")
+            lines.append(f"{self.name}_count{labels} {entry['count']}")
+        return lines
+
+
+METRICS_REGISTRY: List[_Metric] = []
+
+JOBS_TOTAL = Counter("blusanta_jobs_total", "Stitching jobs finished, by outcome.", ("status",))
+JOB_DURATION = Histogram(
+    "blusanta_job_duration_seconds", "End-to-end stitching job duration.", ("status",),
+    buckets=(30, 60, 120, 180, 240, 300, 420, 600, 900, 1200, 1800)
+)
+JOBS_IN_PROGRESS = Gauge("blusanta_jobs_in_progress", "Stitching jobs currently running.")
+STAGE_DURATION = Histogram(
+    "blusanta_stage_duration_seconds",
+    "Duration of pipeline operations (download, fit, composite, transcribe, subtitle_burn, concat, upload, ...).",
+    ("stage",)
+)
+CACHE_REQUESTS = Counter("blusanta_cache_requests_total", "Asset cache lookups, by artifact kind and result.", ("kind", "result"))
+BYTES_DOWNLOADED = Counter("blusanta_downloaded_bytes_total", "Bytes downloaded from asset sources.")
+BYTES_UPLOADED = Counter("blusanta_uploaded_bytes_total", "Bytes uploaded or stored.")
+DEEPGRAM_LATENCY = Histogram(
+    "blusanta_deepgram_request_seconds", "Deepgram transcription request latency.", ("outcome",),
+    buckets=(0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60)
+)
+ACTIVE_PROCESSES = Gauge("blusanta_ffmpeg_processes_active", "ffmpeg/ffprobe processes currently running.", ("tool",))
+STALLED_ENCODES = Counter("blusanta_stalled_encodes_total", "ffmpeg processes whose out_time stopped advancing.")
+PROCESS_CPU_SECONDS = Counter(
+    "blusanta_ffmpeg_cpu_seconds_total", "CPU time (user+sys) of finished ffmpeg/ffprobe processes.", ("stage",)
+)
+STAGE_REGRESSIONS = Counter(
+    "blusanta_stage_regressions_total", "Job stages flagged as slower than their history baseline.", ("stage",)
+)
+
+
+def _cache_hit_ratios() -> Dict[Tuple[str, ...], float]:
+    """Computes hit ratio per cache kind from the lookup counters."""
+    with CACHE_REQUESTS._lock:
+        counts = dict(CACHE_REQUESTS._values)
+    ratios = {}
+    for kind in {key[0] for key in counts}:
+        hits = counts.get((kind, "hit"), 0.0)
+        total = hits + counts.get((kind, "miss"), 0.0)
+        ratios[(kind,)] = hits / total if total else 0.0
+    return ratios
+
+
+CACHE_HIT_RATIO = Gauge("blusanta_cache_hit_ratio", "Asset cache hit ratio since start, by artifact kind.",
+                        ("kind",), callback=_cache_hit_ratios)
+QUEUE_DEPTH = Gauge("blusanta_prefetch_queue_depth", "Prefetch/ingest tasks waiting for the background worker.",
+                    callback=lambda: {(): float(PREFETCH_QUEUE.qsize())})
+
+
+def timed_stage(stage: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorator that observes the wrapped call's duration in STAGE_DURATION and
+    records it as a span on the current job's trace.
+    """
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                end = time.time()
+                STAGE_DURATION.observe(end - start, stage=stage)
+                metrics = _current_job.get()
+                if metrics is not None:
+                    target = os.path.basename(args[0]) if args and isinstance(args[0], str) else ""
+                    metrics.add_span(f"{stage} {target}".strip(), "operation", start, end, {"function": func.__name__})
+        return wrapper
+    return decorator
+
+
+def render_metrics() -> str:
+    """Renders all registered metrics in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in METRICS_REGISTRY) + "\n"
+
+
 # ==============================================================================
 # SUBTITLE GENERATION FUNCTIONS
 # ==============================================================================
 
-def generate_subtitles_with_deepgram(video_path: str, language: str = 'en') -> str:
+def transcription_audio_cmd(media_path: str, audio_path: str) -> List[str]:
+    """Builds the FFmpeg command that extracts the audio sent to Deepgram."""
+    return [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-i", media_path,
+        "-vn", "-acodec", "mp3",
+        "-y", audio_path
+    ]
+
+
+@timed_stage("transcribe")
+def transcribe_with_deepgram(
+    media_path: str,
+    language: str = 'en',
+    work_dir: Optional[str] = None
+) -> Optional[List[Dict[str, Any]]]:
     """
-    Generates subtitles from a video file using Deepgram Nova-3 API.
-    
-    Uses Deepgram Nova-3 for high-quality transcription with word-level timestamps.
+    Transcribes the audio of a media file using Deepgram Nova-3 API.
     
     Args:
-        video_path: Path to the input video file
+        media_path: Path to the input video/audio file
         language: Language code ('en' for English, 'hi' for Hindi)
+        work_dir: Directory for the extracted audio (defaults to the media's directory)
     
     Returns:
-        str: Path to the generated .ass subtitle file
+        List of Deepgram word entries (word, punctuated_word, start, end),
+        or None if nothing was transcribed
     """
+    audio_path = None
     try:
-        DEEPGRAM_API_KEY = "e73a2b27da0a3752d423b2174d5b6b398cdd8969"
+        DEEPGRAM_API_KEY = DEEPGRAM_CONFIG["api_key"]
         if not DEEPGRAM_API_KEY:
             logger.warning("DEEPGRAM_API_KEY not found, skipping subtitle generation")
             return None
         
-        # Extract audio from video
-        audio_path = video_path.replace(".mp4", "_audio.mp3")
-        audio_cmd = [
-            "ffmpeg", "-hide_banner", "-loglevel", "error",
-            "-i", video_path,
-            "-vn", "-acodec", "mp3",
-            "-y", audio_path
-        ]
-        subprocess.run(audio_cmd, check=True)
+        # Extract audio from video (splitext so audio-only inputs never overwrite themselves)
+        stem = os.path.splitext(os.path.basename(media_path))[0]
+        audio_path = os.path.join(work_dir or os.path.dirname(media_path), f"{stem}_audio.mp3")
+        run_measured(
+            transcription_audio_cmd(media_path, audio_path), check=True,
+            description="Extracting audio for transcription"
+        )
         
         # Transcribe with Deepgram Nova-3 API
         logger.info(f"Transcribing audio with Deepgram Nova-3 API: {audio_path}")
@@ -96,7 +321,7 @@ def generate_subtitles_with_deepgram(video_path: str, language: str = 'en') -> s
         with open(audio_path, "rb") as audio_file:
             # Build params with keyterms
             params = {
-                "model": "nova-3",
+                "model": DEEPGRAM_CONFIG["model"],
                 "language": language,
                 "punctuate": "true",
                 "smart_format": "true",
@@ -109,14 +334,25 @@ def generate_subtitles_with_deepgram(video_path: str, language: str = 'en') -> s
             for term in keyterms:
                 params.setdefault("keyterms", []).append(term) if isinstance(params.get("keyterms"), list) else None
             
-            response = requests.post(
-                "https://api.deepgram.com/v1/listen",
-                headers={
-                    "Authorization": f"Token {DEEPGRAM_API_KEY}",
-                    "Content-Type": "audio/mp3"
-                },
-                params=params,
-                data=audio_file
+            request_start = time.time()
+            try:
+                with trace_span("deepgram request", "http", model=params["model"], language=language):
+                    response = requests.post(
+                        DEEPGRAM_CONFIG["url"],
+                        headers={
+                            "Authorization": f"Token {DEEPGRAM_API_KEY}",
+                            "Content-Type": "audio/mp3"
+                        },
+                        params=params,
+                        data=audio_file,
+                        timeout=DEEPGRAM_CONFIG["timeout"]
+                    )
+            except Exception:
+                DEEPGRAM_LATENCY.observe(time.time() - request_start, outcome="error")
+                raise
+            DEEPGRAM_LATENCY.observe(
+                time.time() - request_start,
+                outcome="ok" if response.status_code == 200 else "error"
             )
         
         if response.status_code != 200:
@@ -132,98 +368,136 @@ def generate_subtitles_with_deepgram(video_path: str, language: str = 'en') -> s
             logger.warning("No words with timestamps returned from Deepgram")
             return None
         
-        # Generate ASS subtitle file
-        subtitles_dir = os.path.join(os.path.dirname(video_path), 'subtitles')
-        os.makedirs(subtitles_dir, exist_ok=True)
+        return words
+    finally:
+        # Cleanup audio file
+        if audio_path and os.path.exists(audio_path):
+            os.remove(audio_path)
+
+
+def write_word_subtitles(words: List[Dict[str, Any]], subtitle_path: str) -> str:
+    """
+    Writes an ASS subtitle file from Deepgram word timestamps.
+    
+    Args:
+        words: Deepgram word entries
+        subtitle_path: Path for the .ass file
+    
+    Returns:
+        str: Path to the written .ass subtitle file
+    """
+    os.makedirs(os.path.dirname(subtitle_path), exist_ok=True)
+    
+    # ASS file content with proper newlines
+    script_info = (
+        "[Script Info]\n"
+        "Title: Generated Subtitles\n"
+        "Original Script: Deepgram Nova-3 API\n"
+        "ScriptType: v4.00\n"
+        "PlayResX: 1920\n"
+        "PlayResY: 1080\n\n"
+    )
+    
+    # Original whisper-style subtitle formatting
+    # BorderStyle=3 (opaque box), Outline=1, Shadow=1
+    # Alignment=2 (bottom center), MarginV=110 (distance from bottom)
+    styles_info = (
+        "[V4+ Styles]\n"
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding\n"
+        "Style: Default, Arial, 40, &H00FFFFFF, &H000000FF, &H00000000, &H00000000, 0, 0, 0, 0, 100, 100, "
+        "0, 0, 3, 1, 1, 2, 30, 30, 110, 1\n\n"
+    )
+    
+    events_header = (
+        "[Events]\n"
+        "Format: Marked, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+    )
+    
+    content = [script_info, styles_info, events_header]
+    
+    # Build subtitle cues from word timestamps
+    # Use punctuated_word for proper punctuation and capitalization
+    # Rules: max 50 chars per line, min 1s duration, max 5s duration
+    MAX_CHARS = 50
+    MIN_DURATION = 1.0
+    MAX_DURATION = 5.0
+    
+    i = 0
+    while i < len(words):
+        start = words[i]["start"]
+        # Use punctuated_word if available (has punctuation), fallback to word
+        text = words[i].get("punctuated_word", words[i]["word"])
+        end = words[i]["end"]
+        j = i + 1
         
-        video_name = os.path.splitext(os.path.basename(video_path))[0]
-        subtitle_path = os.path.join(subtitles_dir, f"{video_name}.ass")
+        # Accumulate words until char limit or duration limit
+        while j < len(words):
+            next_word = words[j].get("punctuated_word", words[j]["word"])
+            candidate = text + " " + next_word
+            duration = words[j]["end"] - start
+            
+            # Stop if exceeds char limit or duration limit
+            if len(candidate) > MAX_CHARS or duration > MAX_DURATION:
+                break
+            
+            text = candidate
+            end = words[j]["end"]
+            j += 1
         
-        # ASS file content with proper newlines
-        script_info = (
-            "[Script Info]\n"
-            "Title: Generated Subtitles\n"
-            "Original Script: Deepgram Nova-3 API\n"
-            "ScriptType: v4.00\n"
-            "PlayResX: 1920\n"
-            "PlayResY: 1080\n\n"
-        )
+        # Ensure minimum duration
+        if (end - start) < MIN_DURATION:
+            end = start + MIN_DURATION
         
-        # Original whisper-style subtitle formatting
-        # BorderStyle=3 (opaque box), Outline=1, Shadow=1
-        # Alignment=2 (bottom center), MarginV=110 (distance from bottom)
-        styles_info = (
-            "[V4+ Styles]\n"
-            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
-            "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
-            "Alignment, MarginL, MarginR, MarginV, Encoding\n"
-            "Style: Default, Arial, 40, &H00FFFFFF, &H000000FF, &H00000000, &H00000000, 0, 0, 0, 0, 100, 100, "
-            "0, 0, 3, 1, 1, 2, 30, 30, 110, 1\n\n"
-        )
+        # Add slight padding to end
+        end += 0.05
         
-        events_header = (
-            "[Events]\n"
-            "Format: Marked, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
-        )
+        start_time = format_ass_timestamp(start)
+        end_time = format_ass_timestamp(end)
         
-        content = [script_info, styles_info, events_header]
+        # Escape special characters for ASS format
+        safe_text = text.strip().replace('\\', '\\\\').replace('{', '{{').replace('}', '}}')
         
-        # Build subtitle cues from word timestamps
-        # Use punctuated_word for proper punctuation and capitalization
-        # Rules: max 50 chars per line, min 1s duration, max 5s duration
-        MAX_CHARS = 50
-        MIN_DURATION = 1.0
-        MAX_DURATION = 5.0
+        dialogue = f"Dialogue: Marked=0,{start_time},{end_time},Default,,0,0,0,,{safe_text}\n"
+        content.append(dialogue)
         
-        i = 0
-        while i < len(words):
-            start = words[i]["start"]
-            # Use punctuated_word if available (has punctuation), fallback to word
-            text = words[i].get("punctuated_word", words[i]["word"])
-            end = words[i]["end"]
-            j = i + 1
-            
-            # Accumulate words until char limit or duration limit
-            while j < len(words):
-                next_word = words[j].get("punctuated_word", words[j]["word"])
-                candidate = text + " " + next_word
-                duration = words[j]["end"] - start
-                
-                # Stop if exceeds char limit or duration limit
-                if len(candidate) > MAX_CHARS or duration > MAX_DURATION:
-                    break
-                
-                text = candidate
-                end = words[j]["end"]
-                j += 1
-            
-            # Ensure minimum duration
-            if (end - start) < MIN_DURATION:
-                end = start + MIN_DURATION
-            
-            # Add slight padding to end
-            end += 0.05
-            
-            start_time = format_ass_timestamp(start)
-            end_time = format_ass_timestamp(end)
-            
-            # Escape special characters for ASS format
-            safe_text = text.strip().replace('\\', '\\\\').replace('{', '{{').replace('}', '}}')
-            
-            dialogue = f"Dialogue: Marked=0,{start_time},{end_time},Default,,0,0,0,,{safe_text}\n"
-            content.append(dialogue)
-            
-            i = j
+        i = j
+    
+    with open(subtitle_path, 'w', encoding='utf-8') as f:
+        f.write(''.join(content))
+    
+    return subtitle_path
+
+
+def subtitle_path_for(media_path: str) -> str:
+    """Returns where subtitles generated for a media file are written (subtitles/<name>.ass)."""
+    video_name = os.path.splitext(os.path.basename(media_path))[0]
+    return os.path.join(os.path.dirname(media_path), 'subtitles', f"{video_name}.ass")
+
+
+def generate_subtitles_with_deepgram(video_path: str, language: str = 'en') -> str:
+    """
+    Generates subtitles from a video file using Deepgram Nova-3 API.
+    
+    Uses Deepgram Nova-3 for high-quality transcription with word-level timestamps.
+    
+    Args:
+        video_path: Path to the input video file
+        language: Language code ('en' for English, 'hi' for Hindi)
+    
+    Returns:
+        str: Path to the generated .ass subtitle file
+    """
+    try:
+        words = transcribe_with_deepgram(video_path, language)
+        if not words:
+            return None
         
-        with open(subtitle_path, 'w', encoding='utf-8') as f:
-            f.write(''.join(content))
+        # Generate ASS subtitle file
+        subtitle_path = write_word_subtitles(words, subtitle_path_for(video_path))
         
         logger.info(f"Subtitles generated: {subtitle_path}")
-        
-        # Cleanup audio file
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
-        
         return subtitle_path
         
     except Exception as e:
@@ -231,7 +505,12 @@ def generate_subtitles_with_deepgram(video_path: str, language: str = 'en') -> s
         return None
 
 
-def generate_template_subtitles(video_path: str, template_type: str, doctor_first_name: str) -> str:
+def generate_template_subtitles(
+    video_path: str,
+    template_type: str,
+    doctor_first_name: str,
+    duration: Optional[float] = None
+) -> str:
     """
     Generates template-based subtitles for greeting/thank-you segments.
     
@@ -242,18 +521,23 @@ def generate_template_subtitles(video_path: str, template_type: str, doctor_firs
         video_path: Path to the video file (used for output path)
         template_type: Either 'greeting' (plc_000) or 'thankyou' (plc_001)
         doctor_first_name: The doctor's first name to insert
+        duration: Known segment duration. When given, the video is not probed
+                  (streaming mode has no segment file to probe yet).
     
     Returns:
         str: Path to the generated .ass subtitle file
     """
     try:
-        # Get video duration using ffprobe
-        probe_cmd = [
-            "ffprobe", "-v", "error", "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1", video_path
-        ]
-        result = subprocess.run(probe_cmd, capture_output=True, text=True)
-        video_duration = float(result.stdout.strip()) if result.stdout.strip() else 4.0
+        if duration:
+            video_duration = duration
+        else:
+            # Get video duration using ffprobe
+            probe_cmd = [
+                "ffprobe", "-v", "error", "-show_entries", "format=duration",
+                "-of", "default=noprint_wrappers=1:nokey=1", video_path
+            ]
+            result = run_measured(probe_cmd)
+            video_duration = float(result.stdout.strip()) if result.stdout.strip() else 4.0
         
         # Define templates with timing
         if template_type == 'greeting':
@@ -276,11 +560,8 @@ def generate_template_subtitles(video_path: str, template_type: str, doctor_firs
             return None
         
         # Generate ASS subtitle file
-        subtitles_dir = os.path.join(os.path.dirname(video_path), 'subtitles')
-        os.makedirs(subtitles_dir, exist_ok=True)
-        
-        video_name = os.path.splitext(os.path.basename(video_path))[0]
-        subtitle_path = os.path.join(subtitles_dir, f"{video_name}.ass")
+        subtitle_path = subtitle_path_for(video_path)
+        os.makedirs(os.path.dirname(subtitle_path), exist_ok=True)
         
         # ASS file header
         script_info = (
@@ -343,46 +624,58 @@ def format_ass_timestamp(seconds: float) -> str:
     return f"{hours:01}:{minutes:02}:{int(secs):02}.{centiseconds:02}"
 
 
-def apply_subtitles_to_video(video_path: str, subtitle_path: str, output_path: str) -> str:
+def ass_filter(subtitle_path: str) -> str:
     """
-    Apply ASS subtitles to a video using FFmpeg.
+    Builds the FFmpeg ass= filter for a subtitle file, escaping the path.
     
     Args:
-        video_path: Path to input video
         subtitle_path: Path to .ass subtitle file
-        output_path: Path for output video with subtitles
     
     Returns:
-        str: Path to output video
+        str: Filter string, e.g. "ass=/tmp/job/subtitles/p4.ass"
     """
-    if not subtitle_path or not os.path.exists(subtitle_path):
-        logger.info("No subtitles to apply, copying video as-is")
-        shutil.copy(video_path, output_path)
-        return output_path
-    
-    # Escape subtitle path for FFmpeg
     safe_sub_path = subtitle_path.replace('\\', '/').replace(':', '\\:')
-    
-    cfg = VIDEO_CONFIG
-    
+    return f"ass={safe_sub_path}"
+
+
+def subtitle_burn_cmd(video_path: str, subtitle_path: str, output_path: str) -> List[str]:
+    """Builds the FFmpeg command that burns an .ass file into a video."""
     # Use stream copy for audio, only re-encode video with subtitles
     # This preserves exact timing from input video
-    cmd = [
+    return [
         "ffmpeg", "-hide_banner", "-loglevel", "error",
         "-i", video_path,
-        "-vf", f"ass={safe_sub_path}",
+        "-vf", ass_filter(subtitle_path),
         # Re-encode video (required for subtitle burn-in)
-        "-c:v", cfg['codec'],
-        "-preset", cfg['preset'],
-        "-crf", str(cfg['crf']),
-        "-pix_fmt", cfg['pix_fmt'],
+    ] + video_encode_args() + [
         # Copy audio stream exactly (preserves timing)
         "-c:a", "copy",
         "-y", output_path
     ]
+
+
+@timed_stage("subtitle_burn")
+def apply_subtitles_to_video(video_path: str, subtitle_path: str, output_path: str) -> str:
+    """
+    Apply ASS subtitles to a video using FFmpeg.
+    
+    Args:
+        video_path: Path to input video
+        subtitle_path: Path to .ass subtitle file
+        output_path: Path for output video with subtitles
+    
+    Returns:
+        str: Path to output video
+    """
+    if not subtitle_path or not os.path.exists(subtitle_path):
+        logger.info("No subtitles to apply, copying video as-is")
+        shutil.copy(video_path, output_path)
+        return output_path
+    
+    cmd = subtitle_burn_cmd(video_path, subtitle_path, output_path)
     
     try:
-        subprocess.run(cmd, check=True, timeout=600)
+        run_measured(cmd, check=True, timeout=600, description="Burning subtitles")
         logger.info(f"Subtitles applied: {output_path}")
         return output_path
     except subprocess.TimeoutExpired:
@@ -394,6 +687,101 @@ def apply_subtitles_to_video(video_path: str, subtitle_path: str, output_path: s
         shutil.copy(video_path, output_path)
         return output_path
 
+
+# ==============================================================================
+# SOFT SUBTITLES (ONE TEXT TRACK INSTEAD OF BURN-IN)
+# ==============================================================================
+
+def job_soft_subtitles(payload: Dict[str, Any]) -> bool:
+    """Whether a job ships soft subtitles (payload "subtitles": "soft" / "burn", else SOFT_SUBTITLE_CONFIG)."""
+    mode = payload.get("subtitles")
+    return SOFT_SUBTITLE_CONFIG["enabled"] if mode is None else mode == "soft"
+
+
+def subtitle_track_path(path: str) -> str:
+    """Returns where the soft subtitle track of an MP4 goes (local file or upload URL)."""
+    return os.path.splitext(path)[0] + SOFT_SUBTITLE_CONFIG["suffix"]
+
+
+def soft_subtitle_args(input_index: int) -> List[str]:
+    """Output arguments that mux the WebVTT track read as input `input_index` as mov_text."""
+    return ["-map", f"{input_index}:s", "-c:s", "mov_text",
+            "-metadata:s:s:0", f"language={SOFT_SUBTITLE_CONFIG['language']}"]
+
+
+def parse_ass_timestamp(value: str) -> float:
+    """Parses an ASS timestamp (H:MM:SS.CC) into seconds."""
+    hours, minutes, seconds = value.strip().split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def format_vtt_timestamp(seconds: float) -> str:
+    """Formats seconds as a WebVTT timestamp (HH:MM:SS.mmm)."""
+    millis = int(round(seconds * 1000))
+    return f"{millis // 3600000:02d}:{millis // 60000 % 60:02d}:{millis // 1000 % 60:02d}.{millis % 1000:03d}"
+
+
+def read_ass_cues(subtitle_path: str) -> List[Tuple[float, float, str]]:
+    """
+    Returns the Dialogue cues of an .ass file as plain text.
+
+    Undoes the escaping of write_word_subtitles()/generate_template_subtitles()
+    and drops override tags, which text tracks cannot carry.
+
+    Returns:
+        List of (start seconds, end seconds, text)
+    """
+    cues = []
+    with open(subtitle_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.startswith("Dialogue:"):
+                continue
+            fields = line[len("Dialogue:"):].strip().split(",", 9)
+            if len(fields) < 10:
+                continue
+            text = re.sub(r"(?<!\{)\{\\[^}]*\}", "", fields[9])
+            text = text.replace("{{", "{").replace("}}", "}").replace("\\N", "\n").replace("\\\\", "\\").strip()
+            if text:
+                cues.append((parse_ass_timestamp(fields[1]), parse_ass_timestamp(fields[2]), text))
+    return cues
+
+
+def merge_segment_subtitles(segments: List[Tuple[Optional[str], float]], vtt_path: str) -> Optional[str]:
+    """
+    Writes the subtitles of all segments as one WebVTT track on the final timeline.
+
+    Each segment's cues are shifted by the duration of everything before it
+    and clipped to the segment, so a late cue never spills into the next one.
+
+    Args:
+        segments: (.ass path or None, segment seconds) per segment, in order
+                  (wrappers included, as (None, seconds))
+        vtt_path: Where to write the track
+
+    Returns:
+        str: vtt_path, or None if no segment has cues
+    """
+    cues = []
+    offset = 0.0
+    for subtitle_path, seconds in segments:
+        if subtitle_path and os.path.exists(subtitle_path):
+            for start, end, text in read_ass_cues(subtitle_path):
+                if start < seconds:
+                    cues.append((offset + start, offset + min(end, seconds), text))
+        offset += seconds
+    if not cues:
+        return None
+
+    os.makedirs(os.path.dirname(vtt_path) or ".", exist_ok=True)
+    with open(vtt_path, "w", encoding="utf-8") as f:
+        f.write("WEBVTT\n")
+        for start, end, text in cues:
+            safe_text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+            f.write(f"\n{format_vtt_timestamp(start)} --> {format_vtt_timestamp(end)}\n{safe_text}\n")
+    logger.info(f"Soft subtitle track: {len(cues)} cues from "
+                f"{sum(1 for path, _ in segments if path)} segments -> {vtt_path}")
+    return vtt_path
+
 # ==============================================================================
 # FLASK APPLICATION SETUP
 # ==============================================================================
@@ -402,6 +790,7 @@ app = Flask(__name__)
 # Machine status tracking for concurrent request handling
 # Note: In production, consider using Redis or a proper state management solution
 os.environ["machine_status"] = "free"
+_machine_lock = threading.Lock()  # Makes /stitching's busy check-and-set atomic
 
 # Authentication token for API security
 AUTH_TOKEN = os.getenv(
@@ -417,9 +806,12 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 TEMP_DIR = os.path.join(BASE_DIR, "temp")
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+TRACE_DIR = os.path.join(BASE_DIR, "traces")
+HISTORY_DIR = os.path.join(BASE_DIR, "history")
 
 # Ensure directories exist
-for directory in [ASSETS_DIR, OUTPUT_DIR, TEMP_DIR]:
+for directory in [ASSETS_DIR, OUTPUT_DIR, TEMP_DIR, CACHE_DIR, TRACE_DIR, HISTORY_DIR]:
     os.makedirs(directory, exist_ok=True)
 
 # ==============================================================================
@@ -431,8 +823,7 @@ VIDEO_CONFIG = {
     "height": 1080,
     "fps": 25,
     "codec": "libx264",
-    "preset": "fast",
-    "crf": 23,
+    "profile": os.getenv("STITCH_ENCODER_PROFILE", "default"),  # Key of ENCODER_PROFILES
     "pix_fmt": "yuv420p",
     "audio_codec": "aac",
     "audio_rate": 44100,
@@ -440,51 +831,343 @@ VIDEO_CONFIG = {
     "audio_bitrate": "128k"
 }
 
-# Podcast layout constants for side-by-side zoom effect
-PODCAST_LAYOUT = {
-    "full_width": 1920,
-    "full_height": 1080,
-    "small_width": 900,       # Width of each participant in podcast mode
-    "small_height": 540,      # Height of each participant in podcast mode
-    "left_x": 30,             # X position for left (BluSanta) video
-    "left_y": 266,            # Y position for both videos in podcast mode
-    "right_x": 980,           # X position for right (Doctor) video
-    "transition_duration": 1.0,  # Zoom animation duration in seconds
-    "border_width": 10,       # White border around each video
+# libx264 settings by name. VIDEO_CONFIG["profile"] selects the one used by
+# every final-quality encode; encoder_tuning.py measures candidates (time,
+# CPU, size, PSNR/SSIM) and prints the Pareto frontier to choose from.
+ENCODER_PROFILES = {
+    "default": {"preset": "fast", "crf": 23, "tune": None, "threads": 0},  # threads 0 = x264 auto
+    "fast": {"preset": "veryfast", "crf": 23, "tune": None, "threads": 0},
+    "quality": {"preset": "medium", "crf": 21, "tune": "film", "threads": 0},
+    "draft": {"preset": "ultrafast", "crf": 28, "tune": None, "threads": 0},
+    "proxy": {"preset": "ultrafast", "crf": 30, "tune": None, "threads": 0},  # QC proxies (PROXY_CONFIG)
 }
 
+if VIDEO_CONFIG["profile"] not in ENCODER_PROFILES:
+    logger.warning(f"Unknown encoder profile {VIDEO_CONFIG['profile']!r}, using 'default'")
+    VIDEO_CONFIG["profile"] = "default"
+
+# Streaming mode: chain stages through pipes/FIFOs so that only the final output
+# touches disk. Intermediates are raw frames + PCM in NUT, which costs pipe
+# bandwidth instead of an encode and a decode per stage.
+STREAMING_CONFIG = {
+    "enabled": os.getenv("STITCH_STREAMING", "false").lower() == "true",
+    "container": "nut",          # Low-overhead container for piped intermediates
+    "video_codec": "rawvideo",   # Uncompressed frames between stages
+    "audio_codec": "pcm_s16le",  # Uncompressed audio between stages
+}
 
-# ==============================================================================
-# FILE DOWNLOAD/UPLOAD UTILITIES
-# ==============================================================================
+# Deepgram transcription. DEEPGRAM_URL can point at a local stand-in
+# (deepgram_standin.py) for offline tests and benchmarks.
+DEEPGRAM_CONFIG = {
+    "url": os.getenv("DEEPGRAM_URL", "https://api.deepgram.com/v1/listen"),
+    "api_key": os.getenv("DEEPGRAM_API_KEY", "e73a2b27da0a3752d423b2174d5b6b398cdd8969"),
+    "model": "nova-3",
+    "timeout": 120,  # Seconds per request
+}
 
-def download_file(url: str, destination: str) -> bool:
-    """
-    Downloads a file from various sources (GCS, HTTP, or local filesystem).
+# Asset cache: downloads and precomputed artifacts (standardized constants,
+# nodding master, normalized doctor videos, transcripts) shared across jobs
+ASSET_CACHE_CONFIG = {
+    "max_bytes": int(float(os.getenv("STITCH_CACHE_MAX_GB", "20")) * 1024 ** 3),
+    "min_age_seconds": 3600,        # Never evict files a running job may still open
+    "fingerprint_ttl_seconds": 60,  # Reuse source metadata lookups within a job
+}
 
-    Supports:
-    - gs://bucket/path   : Google Cloud Storage
-    - http(s)://...      : Web URLs
-    - file:///path       : Local filesystem (explicit)
-    - /path/to/file      : Local filesystem (implicit)
+# Prefetch worker: runs ahead of /stitching at lower CPU priority
+PREFETCH_CONFIG = {
+    "niceness": 10,
+}
 
-    Args:
-        url: Source URL/path of the file to download
-        destination: Local path where the file should be saved
+# Doctor mezzanine: phone recordings normalized once at ingest to what the
+# podcast compositor consumes (CFR, tile-sized, AAC). Stored next to the
+# original as <name>_mezzanine.mp4 plus a <name>_mezzanine.json sidecar.
+DOCTOR_MEZZANINE_CONFIG = {
+    "width": 880,            # Podcast tile size before the border is added
+    "height": 496,           # 495 rounded up to even for 4:2:0; the compositor crops 1 line
+    "fps": 25,
+    "crf": 18,               # Intermediate quality - the tile is encoded again
+    "suffix": "_mezzanine",
+    "silence_noise": "-35dB",
+    "silence_min_duration": 0.3,
+}
 
-    Returns:
-        bool: True if download successful, False otherwise
+# Preflight: every downloaded input is probed (in parallel) before any encoding
+# so that broken inputs fail the job in seconds instead of minutes into it
+PREFLIGHT_CONFIG = {
+    "max_workers": 8,
+    "decode_seconds": 0.5,    # Decode this much of each input to prove it is decodable
+    "timeout": 30,
+    "min_duration": 0.5,
+    # Required streams and duration bounds per input role
+    "roles": {
+        "constant":    {"video": True,  "audio": True,  "max_duration": 900},
+        "placeholder": {"video": True,  "audio": False, "max_duration": 900},
+        "nodding":     {"video": True,  "audio": False, "max_duration": 900},
+        "doctor":      {"video": True,  "audio": True,  "max_duration": 600},
+        "audio":       {"video": False, "audio": True,  "max_duration": 300},
+        "image":       {"video": True,  "audio": False, "max_duration": None},
+    },
+}
 
-    Raises:
-        Exception: If download fails critically
-    """
-    try:
-        # Ensure destination directory exists
-        dest_dir = os.path.dirname(destination)
-        if dest_dir:
-            os.makedirs(dest_dir, exist_ok=True)
+# Live job progress from ffmpeg -progress (see /jobs/<id>)
+PROGRESS_CONFIG = {
+    "poll_seconds": 2,          # Stall checks / webhook scheduling
+    "stall_seconds": 120,       # out_time not advancing for this long = stalled encode
+    "webhook_interval": 10,     # Seconds between progress webhook posts
+    "keep_jobs": 50,            # Finished jobs kept for /jobs/<id>
+}
 
-        if url.startswith("gs://"):
+# Per-job Chrome trace (trace-event JSON) written to TRACE_DIR
+TRACE_CONFIG = {
+    "enabled": os.getenv("STITCH_TRACE", "true").lower() == "true",
+    "keep": 200,  # Most recent traces kept on disk
+}
+
+# CPU-seconds model behind dry-run plans (see plan_stitching_job()): each process
+# costs fixed + per_second * seconds of media it writes. Calibrated with
+# `python benchmark_stitching.py --calibrate cost_model.json` for the encoder
+# profile and resolution below; STITCH_COST_MODEL loads such a file instead.
+COST_MODEL = {
+    "profile": "default",
+    "resolution": "1920x1080@25",
+    # Synthetic 1080p25 job, 1 vCPU (benchmark_stitching.py defaults, both modes)
+    "operations": {
+        "audio_transcode": {"fixed": 0.0, "per_second": 0.0383},
+        "burn": {"fixed": 2.2814, "per_second": 1.3472},
+        "composite": {"fixed": 0.0, "per_second": 2.1555},
+        "concat": {"fixed": 0.0, "per_second": 1.6284},
+        "fit": {"fixed": 0.0, "per_second": 2.1621},
+        "loudness": {"fixed": 0.06, "per_second": 0.0193},
+        "mezzanine": {"fixed": 0.0, "per_second": 0.6466},
+        "mux_audio": {"fixed": 0.0909, "per_second": 0.0296},
+        "pad": {"fixed": 2.8424, "per_second": 1.4578},
+        "probe": {"fixed": 0.0126, "per_second": 0.0},
+        "remux": {"fixed": 0.0, "per_second": 0.0064},
+        "stream_burn": {"fixed": 0.0, "per_second": 0.202},
+        "stream_composite": {"fixed": 0.0, "per_second": 0.7573},
+        "stream_constant": {"fixed": 0.0, "per_second": 0.2554},
+        "stream_encode": {"fixed": 0.0, "per_second": 1.6005},
+        "stream_fit": {"fixed": 0.2121, "per_second": 0.2039},
+        "stream_overlay_mux": {"fixed": 0.1248, "per_second": 0.1441},
+        "test_decode": {"fixed": 0.0, "per_second": 0.1421},
+    },
+    # Planning durations for inputs that are not downloaded yet
+    "assumed_seconds": {"constant": 10.0, "placeholder": 5.0, "nodding": 10.0, "doctor": 30.0, "audio": 4.0},
+}
+
+if os.getenv("STITCH_COST_MODEL"):
+    try:
+        with open(os.getenv("STITCH_COST_MODEL"), encoding="utf-8") as f:
+            COST_MODEL.update(json.load(f))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not load cost model {os.getenv('STITCH_COST_MODEL')}: {e}")
+
+# Job history: one SQLite row per finished job (see /history). Drives duration
+# predictions (202 ETA, 503 Retry-After) and per-stage regression flags.
+HISTORY_CONFIG = {
+    "enabled": os.getenv("STITCH_HISTORY", "true").lower() == "true",
+    "file": "jobs.db",              # In HISTORY_DIR
+    "keep_days": 90,
+    "prediction_jobs": 50,          # Most recent completed jobs (same mode/profile) used for predictions
+    "min_jobs": 3,                  # Fewer than this: no prediction
+    "similar_doctor_ratio": 0.25,   # Regression baseline: jobs with doctor seconds within +/-25%
+    "regression_jobs": 20,          # Baseline size (most recent similar jobs)
+    "regression_factor": 1.5,       # Stage slower than factor x baseline median = regression
+    "regression_min_seconds": 5.0,  # ...and by at least this many seconds
+    "default_retry_seconds": 60,    # Retry-After when nothing better is known
+}
+
+# Load-adaptive encoder profile: with jobs waiting (or a deadline the job would
+# miss) a job steps down the ladder towards the floor; with the queue drained it
+# gets the base profile (VIDEO_CONFIG["profile"]) again. Only the job's own
+# encodes change - cached artifacts are always built with the base profile.
+ADAPTIVE_PROFILE_CONFIG = {
+    "enabled": os.getenv("STITCH_ADAPTIVE_PROFILE", "true").lower() == "true",
+    "ladder": ["quality", "default", "fast", "draft"],    # Best quality first
+    "floor": os.getenv("STITCH_PROFILE_FLOOR", "fast"),   # Quality floor: never faster than this
+    "jobs_per_step": 2,            # One rung faster per this many waiting jobs
+    "waiting_ttl_seconds": 180,    # A 503'd job counts as waiting until it has not retried for this long
+    # Job duration relative to "default", for profiles without job history (rough;
+    # encoder_tuning.py measures the encode cost per profile)
+    "relative_seconds": {"quality": 1.5, "default": 1.0, "fast": 0.75, "draft": 0.5, "proxy": 0.4},
+}
+
+# Output renditions: the final encode splits its decoded frames and encodes the
+# 1080p master plus these smaller copies (WhatsApp / mobile web) in the same
+# process, so each one costs an x264 encode but no extra decode or job. They
+# are written and uploaded next to the master as <name>_<rendition>.mp4.
+RENDITION_CONFIG = {
+    # Ladder used when the payload has no "renditions" list; "" = master only
+    "default": [name for name in os.getenv("STITCH_RENDITIONS", "720p,480p").split(",") if name],
+    "ladder": {
+        "720p": {"height": 720, "maxrate_kbps": 2500, "audio_bitrate": "128k"},
+        "480p": {"height": 480, "maxrate_kbps": 1000, "audio_bitrate": "96k"},
+    },
+    "scale_flags": "bicubic",
+}
+
+# Local outputs: once a job's uploads have succeeded, the master and everything
+# written next to it in OUTPUT_DIR are deleted - the bucket has the copies.
+# Failed jobs keep theirs for inspection, and so do jobs whose destination is
+# not gs:// (upload_file() leaves those where they are).
+OUTPUT_CONFIG = {
+    "keep": os.getenv("STITCH_KEEP_OUTPUTS", "false").lower() == "true",
+}
+
+# HLS packaging: the final encode also muxes each variant as fMP4 segments (tee
+# muxer - one encode, two containers), so no separate packaging pass. Written
+# to <output>_hls/ (master.m3u8 + <variant>/index.m3u8) and uploaded under the
+# same prefix next to the MP4.
+HLS_CONFIG = {
+    "enabled": os.getenv("STITCH_HLS", "false").lower() == "true",       # Payload "hls" overrides
+    "renditions": os.getenv("STITCH_HLS_RENDITIONS", "true").lower() == "true",  # Package the ladder too
+    "segment_seconds": 4,        # Also the forced keyframe interval, aligned across variants
+    "start_variant": "720p",     # Listed first in master.m3u8 (players start there), if encoded
+    "upload_workers": 8,
+}
+
+# Poster frame, thumbnail sprite sheet (+ WebVTT index) and a short low-res
+# preview clip for QC and WhatsApp share, cut from the final encode's decoded
+# frames as extra outputs. Uploaded next to the MP4 as <name>_poster.jpg,
+# <name>_sprite.jpg / <name>_sprite.vtt and <name>_preview.mp4.
+PREVIEW_CONFIG = {
+    "enabled": os.getenv("STITCH_PREVIEWS", "true").lower() == "true",  # Payload "previews" overrides
+    "poster_offset": 2.5,       # Seconds into the first podcast segment (after the zoom-in)
+    "poster_width": 1280,
+    "sprite_interval": 10.0,    # Seconds between thumbnails (stretched so one sheet covers the video)
+    "sprite_columns": 5,
+    "sprite_rows": 5,
+    "sprite_width": 240,
+    "preview_seconds": 15.0,    # Clip starting with the first podcast segment
+    "preview_height": 360,
+    "preview_crf": 30,
+    "preview_audio_bitrate": "64k",
+}
+
+# Preview outputs: file suffix appended to the MP4's base name
+PREVIEW_OUTPUTS = {
+    "poster": "_poster.jpg",
+    "sprite": "_sprite.jpg",
+    "sprite_vtt": "_sprite.vtt",
+    "preview": "_preview.mp4",
+}
+
+# Soft subtitles: instead of burning each subtitled segment's ASS into its
+# frames (one extra encode per segment in file mode), the segment cues are
+# shifted onto the final timeline and shipped as one text track - mov_text in
+# the MP4s, a WebVTT sidecar (<name>_subtitles.vtt) and an HLS subtitle
+# rendition. Constant videos keep their pre-burned subtitles.
+SOFT_SUBTITLE_CONFIG = {
+    "enabled": os.getenv("STITCH_SOFT_SUBTITLES", "false").lower() == "true",  # Payload "subtitles" overrides
+    "language": "eng",       # ISO 639-2, MP4 track
+    "hls_language": "en",    # BCP 47, HLS rendition
+    "name": "English",
+    "suffix": "_subtitles.vtt",
+}
+
+# Proxy renders for QC: same payload, timeline, layout maths and transcripts,
+# but every encode uses the "proxy" profile, the final encode scales to 640x360
+# and there are no renditions, HLS or previews. Uploaded as <name>_proxy.mp4.
+# An approved proxy is promoted by sending the payload again without "proxy";
+# that render finds the transcripts, mezzanines and standardized constants in
+# the asset cache.
+PROXY_CONFIG = {
+    "width": 640,
+    "height": 360,
+    "profile": "proxy",
+    "suffix": "_proxy",
+}
+
+# Chunked parallel encoding: one libx264 encode stops scaling past a few cores,
+# so when the machine has cores to spare, long encodes are split into time
+# ranges at segment (concat) or keyframe (standardize) boundaries, encoded by
+# parallel processes with the same settings and joined by stream copy. Audio
+# is encoded once over the whole timeline by the join (no AAC priming gaps).
+CHUNKED_ENCODE_CONFIG = {
+    "enabled": os.getenv("STITCH_CHUNKED_ENCODE", "true").lower() == "true",
+    "cores": int(os.getenv("STITCH_ENCODE_CORES", "0")),  # 0 = CPUs this process may run on
+    "cores_per_encode": 4,       # Roughly where one 1080p libx264 encode stops scaling
+    "min_chunk_seconds": 20.0,   # Shorter chunks cost more in start-up and keyframes than they save
+    "max_chunks": 8,
+}
+
+# Constant mezzanine: constants, wrappers, the nodding clip and placeholders
+# arrive as delivery-grade long-GOP H.264 and are decoded in full by every job.
+# Their cached artifacts are encoded once in a cheap-to-decode format instead
+# (x264 fastdecode: no CABAC/deblocking; no B-frames; an IDR every gop_frames)
+# with a keyframe index next to them, so any cut of one that starts on a
+# keyframe (and any loop) is a frame-exact stream copy. A placeholder longer
+# than its replacement audio is cut to the audio that way instead of being
+# sped up and re-encoded.
+CONSTANT_MEZZANINE_CONFIG = {
+    "enabled": os.getenv("STITCH_CONSTANT_MEZZANINE", "true").lower() == "true",
+    "gop_frames": 5,         # 0.2s at 25 fps: cheap seeks, still far smaller than intra-only
+    "crf": 18,               # Intermediate quality - the final encode encodes it again
+    "tune": "fastdecode",
+    "cut_shorter": os.getenv("STITCH_CUT_PLACEHOLDERS", "true").lower() == "true",  # Else speed up (re-encode)
+}
+
+# Loudness: studio constants, ElevenLabs overlays and phone-recorded doctor
+# answers differ a lot in level. Every source is measured once (EBU R128, the
+# analysis pass of loudnorm; cached like any artifact, doctor videos at
+# /ingest) and each segment's audio gets a gain - plus a peak limiter where the
+# gain would clip - as its input to the concat encode, which encodes the audio
+# anyway. No normalization pass over the whole video.
+LOUDNESS_CONFIG = {
+    "enabled": os.getenv("STITCH_LOUDNESS", "true").lower() == "true",
+    "target_i": -16.0,      # Integrated loudness, LUFS (the target of zoom_stitch.py's loudnorm pass)
+    "target_tp": -1.5,      # Peak ceiling, dBFS
+    "target_lra": 11.0,     # Only passed to the measurement
+    "max_gain_db": 12.0,    # Near-silent sources are not boosted further than this
+    "min_gain_db": 0.5,     # Smaller corrections are inaudible: no filter
+}
+
+# Podcast layout constants for side-by-side zoom effect
+PODCAST_LAYOUT = {
+    "full_width": 1920,
+    "full_height": 1080,
+    "small_width": 900,       # Width of each participant in podcast mode
+    "small_height": 540,      # Height of each participant in podcast mode
+    "left_x": 30,             # X position for left (BluSanta) video
+    "left_y": 266,            # Y position for both videos in podcast mode
+    "right_x": 980,           # X position for right (Doctor) video
+    "transition_duration": 1.0,  # Zoom animation duration in seconds
+    "border_width": 10,       # White border around each video
+}
+
+
+# ==============================================================================
+# FILE DOWNLOAD/UPLOAD UTILITIES
+# ==============================================================================
+
+@timed_stage("download")
+def download_file(url: str, destination: str) -> bool:
+    """
+    Downloads a file from various sources (GCS, HTTP, or local filesystem).
+
+    Supports:
+    - gs://bucket/path   : Google Cloud Storage
+    - http(s)://...      : Web URLs
+    - file:///path       : Local filesystem (explicit)
+    - /path/to/file      : Local filesystem (implicit)
+
+    Args:
+        url: Source URL/path of the file to download
+        destination: Local path where the file should be saved
+
+    Returns:
+        bool: True if download successful, False otherwise
+
+    Raises:
+        Exception: If download fails critically
+    """
+    try:
+        # Ensure destination directory exists
+        dest_dir = os.path.dirname(destination)
+        if dest_dir:
+            os.makedirs(dest_dir, exist_ok=True)
+
+        if url.startswith("gs://"):
             # Google Cloud Storage download
             bucket_name = url.split("/")[2]
             blob_name = "/".join(url.split("/")[3:])
@@ -515,6 +1198,7 @@ def download_file(url: str, destination: str) -> bool:
             else:
                 raise FileNotFoundError(f"Local file not found: {url}")
 
+        BYTES_DOWNLOADED.inc(os.path.getsize(destination))
         logger.info(f"Downloaded: {url} -> {destination}")
         return True
 
@@ -523,6 +1207,7 @@ def download_file(url: str, destination: str) -> bool:
         raise
 
 
+@timed_stage("upload")
 def upload_file(local_path: str, destination_url: str) -> str:
     """
     Uploads a file to Google Cloud Storage.
@@ -551,6 +1236,7 @@ def upload_file(local_path: str, destination_url: str) -> str:
 
         # Upload with progress logging
         blob.upload_from_filename(local_path)
+        BYTES_UPLOADED.inc(os.path.getsize(local_path))
 
         public_url = f"https://storage.googleapis.com/{bucket_name}/{blob_name}"
         logger.info(f"Uploaded: {local_path} -> {public_url}")
@@ -562,277 +1248,3567 @@ def upload_file(local_path: str, destination_url: str) -> str:
         raise
 
 
+def store_file(local_path: str, destination_url: str) -> str:
+    """
+    Stores a file at a gs://, file:// or local destination.
+
+    Unlike upload_file(), local destinations are written rather than ignored,
+    so sidecar artifacts can live next to local sources too.
+
+    Args:
+        local_path: Path to the local file
+        destination_url: gs://, file:// or local path
+
+    Returns:
+        str: Where the file was stored
+
+    Raises:
+        ValueError: If the destination is not writable (e.g. http(s)://)
+    """
+    if destination_url.startswith("gs://"):
+        return upload_file(local_path, destination_url)
+    if destination_url.startswith("http://") or destination_url.startswith("https://"):
+        raise ValueError(f"Cannot store files at {destination_url}")
+
+    destination = destination_url.replace("file://", "", 1) if destination_url.startswith("file://") else destination_url
+    dest_dir = os.path.dirname(destination)
+    if dest_dir:
+        os.makedirs(dest_dir, exist_ok=True)
+    shutil.copy(local_path, destination + ".partial")
+    os.replace(destination + ".partial", destination)
+    BYTES_UPLOADED.inc(os.path.getsize(destination))
+    logger.info(f"Stored: {local_path} -> {destination_url}")
+    return destination_url
+
+
+def remove_job_outputs(paths: List[str]) -> None:
+    """Deletes a finished job's local outputs (files or directories) after their upload."""
+    for path in paths:
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove output {path}: {e}")
+
+
 # ==============================================================================
-# FFMPEG UTILITY FUNCTIONS
+# JOB CONTEXT AND RESOURCE ACCOUNTING
 # ==============================================================================
+#
+# Every ffmpeg/ffprobe process is started through run_measured() or the
+# pipeline helpers, which reap it with os.wait4() to get that process's own
+# CPU time and peak RSS. Samples are tagged with the job, stage and segment of
+# the current context and aggregated per job for the logs and the webhook.
+
+class JobMetrics:
+    """Collects process samples, stage wall times and trace spans for one job."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.started_at = time.time()
+        self.samples: List[Dict[str, Any]] = []
+        self.stage_wall: Dict[Tuple[str, Optional[int]], float] = {}
+        self.events: List[Dict[str, Any]] = []
+        self.progress = JobProgress()
+        self.status = "running"
+        self.stage: Optional[str] = None
+        # Job history record (see record_job_history())
+        self.mode: Optional[str] = None
+        self.profile: Optional[str] = None
+        self.profile_choice: Optional[Dict[str, Any]] = None
+        self.inputs: List[Dict[str, Any]] = []
+        self.cache: Dict[str, Dict[str, int]] = {}
+        self.output_bytes: Optional[int] = None
+        self.predicted_seconds: Optional[float] = None
+        self.regressions: List[Dict[str, Any]] = []
+        self._tracks: Dict[Any, Tuple[int, str]] = {}
+        self._open_stage: Optional[Tuple[Tuple[str, Optional[int]], float]] = None
+        self._lock = threading.Lock()
+
+    def add_span(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        end: float,
+        args: Optional[Dict[str, Any]] = None,
+        track: Optional[Tuple[Any, str]] = None
+    ) -> None:
+        """
+        Adds a complete ("X") trace event.
+
+        Args:
+            name: Span name
+            category: Trace category (stage, operation, ffmpeg, ffprobe, http, cache)
+            start: time.time() at span start
+            end: time.time() at span end
+            args: Extra fields shown in the viewer
+            track: (key, name) of a dedicated track; default is the calling thread
+        """
+        if track is None:
+            thread = threading.current_thread()
+            track = (thread.ident, thread.name)
+        with self._lock:
+            tid = self._tracks.setdefault(track[0], (len(self._tracks) + 1, track[1]))[0]
+            self.events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round((start - self.started_at) * 1e6),
+                "dur": max(0, round((end - start) * 1e6)),
+                "pid": 1,
+                "tid": tid,
+                "args": args or {},
+            })
 
-def get_media_duration(file_path: str) -> float:
+    def trace(self) -> Dict[str, Any]:
+        """Returns the job timeline in Chrome trace-event format (chrome://tracing, Perfetto)."""
+        with self._lock:
+            events = list(self.events)
+            tracks = list(self._tracks.values())
+        metadata = [{"name": "process_name", "ph": "M", "pid": 1, "tid": 0,
+                     "args": {"name": f"stitching job {self.job_id}"}}]
+        for tid, name in tracks:
+            metadata.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}})
+            metadata.append({"name": "thread_sort_index", "ph": "M", "pid": 1, "tid": tid, "args": {"sort_index": tid}})
+        return {
+            "traceEvents": metadata + sorted(events, key=lambda e: (e["tid"], e["ts"], -e["dur"])),
+            "displayTimeUnit": "ms",
+            "otherData": {"job_id": self.job_id, "started_at": self.started_at},
+        }
+
+    def add_sample(self, sample: Dict[str, Any]) -> None:
+        with self._lock:
+            self.samples.append(sample)
+
+    def add_input(self, role: str, label: str, info: Dict[str, Any]) -> None:
+        """Records a probed input (duration, resolution, codec) for the job history."""
+        video = next((st for st in info.get("streams", []) if st.get("codec_type") == "video"), {})
+        try:
+            duration = round(float(info.get("format", {}).get("duration")), 3)
+        except (TypeError, ValueError):
+            duration = None
+        with self._lock:
+            self.inputs.append({
+                "role": role,
+                "label": label,
+                "seconds": duration,
+                "width": video.get("width"),
+                "height": video.get("height"),
+                "codec": video.get("codec_name"),
+            })
+
+    def count_cache(self, kind: str, result: str) -> None:
+        """Counts a cache lookup ("hit"/"miss") made by this job."""
+        with self._lock:
+            entry = self.cache.setdefault(kind, {"hit": 0, "miss": 0})
+            entry[result] += 1
+
+    def start_stage(self, stage: Optional[str], segment: Optional[int] = None) -> None:
+        """Closes the running stage timer and starts one for stage (None: just close)."""
+        now = time.time()
+        closed = None
+        with self._lock:
+            if self._open_stage is not None:
+                closed = self._open_stage
+                key, started = closed
+                self.stage_wall[key] = self.stage_wall.get(key, 0.0) + now - started
+            self._open_stage = ((stage, segment), now) if stage else None
+        if closed is not None:
+            (name, number), started = closed
+            self.add_span(stage_key(name, number), "stage", started, now)
+            self.progress.complete_step(stage_key(name, number))
+        self.stage = stage_key(stage, segment) if stage else None
+        if stage:
+            self.progress.step_started(self.stage)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Aggregates samples per stage.
+
+        Returns:
+            {"job_id", "elapsed_seconds", "stages": {stage: {...}},
+             "segments": {"<stage>_<n>": {...}}, "totals": {...}}
+        """
+        def empty() -> Dict[str, Any]:
+            return {"wall_seconds": 0.0, "processes": 0, "process_wall_seconds": 0.0,
+                    "user_seconds": 0.0, "sys_seconds": 0.0, "max_rss_mb": 0.0}
+
+        with self._lock:
+            samples = list(self.samples)
+            stage_wall = dict(self.stage_wall)
+            if self._open_stage is not None:
+                key, started = self._open_stage
+                stage_wall[key] = stage_wall.get(key, 0.0) + time.time() - started
+
+        stages: Dict[str, Dict[str, Any]] = {}
+        segments: Dict[str, Dict[str, Any]] = {}
+        for (stage, segment), wall in stage_wall.items():
+            stages.setdefault(stage, empty())["wall_seconds"] += wall
+            if segment is not None:
+                segments.setdefault(f"{stage}_{segment}", empty())["wall_seconds"] = wall
+        totals = empty()
+        totals["wall_seconds"] = time.time() - self.started_at
+        for sample in samples:
+            entries = [stages.setdefault(sample["stage"], empty()), totals]
+            if sample["segment"] is not None:
+                entries.append(segments.setdefault(f"{sample['stage']}_{sample['segment']}", empty()))
+            for entry in entries:
+                entry["processes"] += 1
+                entry["process_wall_seconds"] += sample["wall_seconds"]
+                entry["user_seconds"] += sample["user_seconds"]
+                entry["sys_seconds"] += sample["sys_seconds"]
+                entry["max_rss_mb"] = max(entry["max_rss_mb"], sample["max_rss_mb"])
+
+        for entry in list(stages.values()) + list(segments.values()) + [totals]:
+            for key, value in entry.items():
+                if isinstance(value, float):
+                    entry[key] = round(value, 3)
+
+        return {
+            "job_id": self.job_id,
+            "elapsed_seconds": totals["wall_seconds"],
+            "stages": stages,
+            "segments": segments,
+            "totals": totals,
+        }
+
+    def log_summary(self) -> None:
+        """Logs the per-stage breakdown."""
+        summary = self.summary()
+        logger.info(f"Resource usage for job {self.job_id} (wall / cpu user+sys / peak RSS):")
+        for stage, entry in summary["stages"].items():
+            logger.info(
+                f"  {stage:<12} {entry['wall_seconds']:8.2f}s  "
+                f"{entry['user_seconds'] + entry['sys_seconds']:8.2f}s cpu  "
+                f"{entry['max_rss_mb']:7.0f} MB  ({entry['processes']} processes)"
+            )
+        totals = summary["totals"]
+        logger.info(
+            f"  {'TOTAL':<12} {totals['wall_seconds']:8.2f}s  "
+            f"{totals['user_seconds'] + totals['sys_seconds']:8.2f}s cpu  "
+            f"{totals['max_rss_mb']:7.0f} MB  ({totals['processes']} processes)"
+        )
+
+
+_current_job: "contextvars.ContextVar[Optional[JobMetrics]]" = contextvars.ContextVar("current_job", default=None)
+JOBS: Dict[str, JobMetrics] = {}  # Running and recently finished jobs, oldest first
+_jobs_lock = threading.Lock()
+_current_stage: "contextvars.ContextVar[Tuple[str, Optional[int]]]" = contextvars.ContextVar(
+    "current_stage", default=("other", None)
+)
+# Encoder profile chosen for the running job (None: VIDEO_CONFIG["profile"])
+_job_profile: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar("job_profile", default=None)
+# x264 thread cap for encodes that run side by side (chunked encoding; None: the profile's)
+_encode_threads: "contextvars.ContextVar[Optional[int]]" = contextvars.ContextVar("encode_threads", default=None)
+# Encodes of constant artifacts in the fast-decode mezzanine format (CONSTANT_MEZZANINE_CONFIG)
+_constant_mezzanine: "contextvars.ContextVar[bool]" = contextvars.ContextVar("constant_mezzanine", default=False)
+
+
+def stage_key(stage: str, segment: Optional[int] = None) -> str:
+    """Returns the display/progress key of a stage, e.g. "segment p4"."""
+    return stage if segment is None else f"{stage} p{segment}"
+
+
+def register_job(metrics: "JobMetrics") -> None:
+    """Makes a job visible on /jobs/<id>, forgetting the oldest finished ones."""
+    with _jobs_lock:
+        JOBS[metrics.job_id] = metrics
+        finished = [job_id for job_id, job in JOBS.items() if job.status != "running"]
+        for job_id in finished[:max(0, len(finished) - PROGRESS_CONFIG["keep_jobs"])]:
+            del JOBS[job_id]
+
+
+def enter_stage(stage: str, segment: Optional[int] = None) -> None:
     """
-    Gets the duration of a media file in seconds using ffprobe.
+    Starts a job stage: processes started from here on are tagged with it, and
+    the wall time until the next enter_stage() (or finish) is added to it.
 
     Args:
-        file_path: Path to the video/audio file
-
-    Returns:
-        float: Duration in seconds, or 0.0 if detection fails
+        stage: Stage name, e.g. "preflight" or "segment"
+        segment: 1-based segment number for per-segment stages
     """
+    _current_stage.set((stage, segment))
+    metrics = _current_job.get()
+    if metrics is not None:
+        metrics.start_stage(stage, segment)
+
+
+@contextmanager
+def using_encoder_profile(name: Optional[str]):
+    """Encodes started in the enclosed block use profile `name` (None: VIDEO_CONFIG["profile"])."""
+    token = _job_profile.set(name)
     try:
-        cmd = [
-            "ffprobe",
-            "-v", "error",
-            "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            file_path
-        ]
-        result = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=30
-        )
-        duration = float(result.stdout.strip())
-        logger.debug(f"Duration of {os.path.basename(file_path)}: {duration:.2f}s")
-        return duration
+        yield
+    finally:
+        _job_profile.reset(token)
 
-    except (ValueError, subprocess.TimeoutExpired) as e:
-        logger.warning(f"Could not get duration for {file_path}: {e}")
-        return 0.0
+
+@contextmanager
+def using_encode_threads(threads: Optional[int]):
+    """Encodes built in the enclosed block use at most `threads` x264 threads (unless the profile sets them)."""
+    token = _encode_threads.set(threads)
+    try:
+        yield
+    finally:
+        _encode_threads.reset(token)
 
 
-def run_ffmpeg(cmd: List[str], description: str = "FFmpeg operation") -> bool:
+@contextmanager
+def using_constant_mezzanine():
+    """Encodes built in the enclosed block write the constant mezzanine format (and take no shortcuts)."""
+    token = _constant_mezzanine.set(True)
+    try:
+        yield
+    finally:
+        _constant_mezzanine.reset(token)
+
+
+@contextmanager
+def trace_span(name: str, category: str, **args: Any):
+    """Records the enclosed block as a span on the current job's trace (if any)."""
+    start = time.time()
+    try:
+        yield
+    finally:
+        metrics = _current_job.get()
+        if metrics is not None:
+            metrics.add_span(name, category, start, time.time(), args)
+
+
+def write_job_trace(metrics: "JobMetrics") -> Optional[str]:
     """
-    Executes an FFmpeg command with proper error handling and logging.
+    Writes a job's trace to TRACE_DIR and prunes old traces.
 
     Args:
-        cmd: List of command arguments for FFmpeg
-        description: Human-readable description for logging
+        metrics: The finished job's metrics
 
     Returns:
-        bool: True if successful, False otherwise
-
-    Raises:
-        subprocess.CalledProcessError: If FFmpeg fails
+        str: Path to the trace file, or None if tracing is disabled
     """
-    logger.info(f"Executing: {description}")
-    logger.debug(f"Command: {' '.join(cmd)}")
+    if not TRACE_CONFIG["enabled"]:
+        return None
+    path = os.path.join(TRACE_DIR, f"{metrics.job_id}.json")
+    with open(path + ".partial", "w", encoding="utf-8") as f:
+        json.dump(metrics.trace(), f)
+    os.replace(path + ".partial", path)
+
+    traces = sorted(
+        (os.path.join(TRACE_DIR, name) for name in os.listdir(TRACE_DIR) if name.endswith(".json")),
+        key=os.path.getmtime
+    )
+    for old in traces[:-TRACE_CONFIG["keep"]]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+    return path
+
+
+def map_with_context(pool: ThreadPoolExecutor, fn: Callable[[Any], Any], items: List[Any]) -> List[Any]:
+    """pool.map() that runs each call in a copy of the caller's job context."""
+    contexts = [contextvars.copy_context() for _ in items]
+    return list(pool.map(lambda pair: pair[0].run(fn, pair[1]), zip(contexts, items)))
+
+
+# Operation of a process, from its description (first match wins). The
+# dry-run planner uses the same names for its cost model.
+OPERATION_PATTERNS = [
+    (r"^Probing", "probe"),
+    (r"^Test decode", "test_decode"),
+    (r"\(copy\)", "remux"),
+    (r"\(audio\)|^Transcoding doctor audio", "audio_transcode"),
+    (r"^Standardizing video", "standardize"),
+    (r"^Creating nodding master", "nodding_master"),
+    (r"^Building doctor mezzanine", "mezzanine"),
+    (r"^Measuring silence", "silence_detect"),
+    (r"^Measuring loudness", "loudness"),
+    (r"^Extracting audio for transcription", "transcription_audio"),
+    (r"^Creating podcast zoom segment", "composite"),
+    (r"^Burning subtitles", "burn"),
+    (r"^Fitting video to audio|^Replacing audio", "fit"),
+    (r"^Combining fitted video", "mux_audio"),
+    (r"^Padding", "pad"),
+    (r"^Concatenating", "concat"),
+]
+
+
+def operation_for(description: str) -> str:
+    """Returns the operation name of a process description ("other" if unknown)."""
+    for pattern, operation in OPERATION_PATTERNS:
+        if re.search(pattern, description):
+            return operation
+    return "other"
+
+
+def record_process(
+    cmd: List[str],
+    description: str,
+    started_at: float,
+    rusage: Any,
+    returncode: int,
+    stage_tag: Optional[Tuple[str, Optional[int]]] = None,
+    track: Optional[Tuple[Any, str]] = None,
+    operation: Optional[str] = None,
+    output_seconds: Optional[float] = None
+) -> None:
+    """
+    Records one reaped process against the current job and stage.
 
-    try:
-        result = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=1200  # 20 minute timeout for long operations
+    Args:
+        cmd: Command that ran
+        description: Human-readable description
+        started_at: time.time() when the process was started
+        rusage: resource usage from os.wait4()
+        returncode: Exit code
+        stage_tag: (stage, segment) captured at start (default: current stage)
+        track: Trace track for processes not reaped by the thread that started them
+        operation: Operation name (default: derived from the description)
+        output_seconds: Media seconds the process wrote (ffmpeg -progress out_time)
+    """
+    stage, segment = stage_tag or _current_stage.get()
+    metrics = _current_job.get()
+    sample = {
+        "tool": os.path.basename(cmd[0]),
+        "description": description,
+        "operation": operation or operation_for(description),
+        "output_seconds": output_seconds,
+        "stage": stage,
+        "segment": segment,
+        "wall_seconds": time.time() - started_at,
+        "user_seconds": rusage.ru_utime,
+        "sys_seconds": rusage.ru_stime,
+        # KB on Linux; floored at the service's own RSS at fork time (pre-exec pages)
+        "max_rss_mb": rusage.ru_maxrss / 1024.0,
+        "returncode": returncode,
+    }
+    logger.debug(
+        f"[job {metrics.job_id if metrics else '-'}] {stage}"
+        f"{'' if segment is None else f' p{segment}'} {sample['tool']} ({description}): "
+        f"wall {sample['wall_seconds']:.2f}s user {sample['user_seconds']:.2f}s "
+        f"sys {sample['sys_seconds']:.2f}s rss {sample['max_rss_mb']:.0f} MB"
+    )
+    PROCESS_CPU_SECONDS.inc(sample["user_seconds"] + sample["sys_seconds"], stage=stage)
+    if metrics is not None:
+        metrics.add_sample(sample)
+        metrics.add_span(
+            f"{sample['tool']}: {description}", sample["tool"], started_at, started_at + sample["wall_seconds"],
+            {
+                "stage": stage, "segment": segment, "returncode": returncode,
+                "user_seconds": round(sample["user_seconds"], 3), "sys_seconds": round(sample["sys_seconds"], 3),
+                "max_rss_mb": round(sample["max_rss_mb"], 1), "command": " ".join(cmd),
+            },
+            track
         )
 
-        if result.returncode != 0:
-            logger.error(f"FFmpeg error: {result.stderr}")
-            raise subprocess.CalledProcessError(result.returncode, cmd, result.stderr)
 
-        return True
+def reap_process(proc: subprocess.Popen, block: bool = True) -> Optional[int]:
+    """
+    Reaps a child with os.wait4() and records its resource usage.
 
-    except subprocess.TimeoutExpired:
-        logger.error(f"FFmpeg timeout for: {description}")
-        raise
+    Popen objects are given started_at/description (and optionally stage_tag
+    and trace_track) attributes when they are created.
 
+    Args:
+        proc: The process
+        block: Wait for it to exit (False: return None if still running)
 
-def standardize_video(input_path: str, output_path: str) -> str:
+    Returns:
+        Exit code, or None if the process is still running
     """
-    Standardizes a video to consistent encoding parameters for seamless concatenation.
+    if proc.returncode is not None:
+        return proc.returncode
+    pid, status, rusage = os.wait4(proc.pid, 0 if block else os.WNOHANG)
+    if pid == 0:
+        return None
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    ACTIVE_PROCESSES.dec(tool=os.path.basename(proc.args[0]))
+    progress = getattr(proc, "progress_state", None)
+    if progress is not None:
+        progress.closed.wait(1)  # The final out_time is written just before exit
+    record_process(
+        proc.args, getattr(proc, "description", os.path.basename(proc.args[0])),
+        getattr(proc, "started_at", time.time()), rusage, proc.returncode,
+        getattr(proc, "stage_tag", None), getattr(proc, "trace_track", None),
+        getattr(proc, "operation", None), progress.out_time if progress is not None else None
+    )
+    return proc.returncode
 
-    This is CRITICAL for proper video concatenation. All videos must have:
-    - Same resolution: 1920x1080
-    - Same frame rate: 25 fps
-    - Same pixel format: yuv420p
-    - Same audio sample rate: 44100 Hz
-    - Same audio channels: 2 (stereo)
+
+def run_measured(
+    cmd: List[str],
+    timeout: Optional[float] = None,
+    check: bool = False,
+    description: Optional[str] = None
+) -> subprocess.CompletedProcess:
+    """
+    Runs a command like subprocess.run(capture_output=True, text=True) and
+    records its wall time, CPU time and peak RSS.
 
     Args:
-        input_path: Path to the source video
-        output_path: Path for the standardized output
+        cmd: Command to run
+        timeout: Kill the process after this many seconds
+        check: Raise CalledProcessError on a non-zero exit
+        description: Label for the resource record
 
     Returns:
-        str: Path to the standardized video
+        subprocess.CompletedProcess with decoded stdout/stderr
+
+    Raises:
+        subprocess.TimeoutExpired: If the timeout was hit
+        subprocess.CalledProcessError: If check is set and the command failed
     """
-    cfg = VIDEO_CONFIG
+    timed_out = threading.Event()
+    description = description or os.path.basename(cmd[0])
+    popen_cmd, progress_kwargs, progress_hook = attach_progress(cmd, description)
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        try:
+            proc = subprocess.Popen(
+                popen_cmd, stdin=subprocess.DEVNULL, stdout=out, stderr=err,
+                **progress_kwargs, **_background_priority_kwargs()
+            )
+        except Exception:
+            discard_progress_hook(progress_hook)
+            raise
+        reader = start_progress_reader(progress_hook)
+        proc.started_at = time.time()
+        proc.description = description
+        proc.progress_state = progress_hook[2] if progress_hook else None
+        ACTIVE_PROCESSES.inc(tool=os.path.basename(cmd[0]))
+
+        def on_timeout() -> None:
+            timed_out.set()
+            proc.kill()
+
+        timer = threading.Timer(timeout, on_timeout) if timeout else None
+        if timer:
+            timer.start()
+        try:
+            returncode = reap_process(proc)
+        finally:
+            if timer:
+                timer.cancel()
+        if reader is not None:
+            reader.join(timeout=1)
 
-    cmd = [
-        "ffmpeg", "-y",
-        "-hide_banner", "-loglevel", "warning",
-        "-i", input_path,
-        # Video filter: scale with padding to maintain aspect ratio
-        "-vf", (
-            f"scale={cfg['width']}:{cfg['height']}:"
-            "force_original_aspect_ratio=decrease,"
-            f"pad={cfg['width']}:{cfg['height']}:(ow-iw)/2:(oh-ih)/2,"
-            "setsar=1"
-        ),
-        # Video encoding
-        "-r", str(cfg['fps']),
-        "-c:v", cfg['codec'],
-        "-preset", cfg['preset'],
-        "-crf", str(cfg['crf']),
-        "-pix_fmt", cfg['pix_fmt'],
-        # Audio encoding
-        "-c:a", cfg['audio_codec'],
-        "-ar", str(cfg['audio_rate']),
-        "-ac", str(cfg['audio_channels']),
-        "-b:a", cfg['audio_bitrate'],
-        output_path
-    ]
+        out.seek(0)
+        err.seek(0)
+        stdout = out.read().decode("utf-8", errors="replace")
+        stderr = err.read().decode("utf-8", errors="replace")
 
-    run_ffmpeg(cmd, f"Standardizing video: {os.path.basename(input_path)}")
-    return output_path
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout, output=stdout, stderr=stderr)
+    if check and returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, output=stdout, stderr=stderr)
+    return subprocess.CompletedProcess(cmd, returncode, stdout, stderr)
 
 
-def fit_video_to_audio_duration(video_path: str, audio_path: str, output_path: str) -> str:
+# ==============================================================================
+# JOB PROGRESS (FFMPEG -progress)
+# ==============================================================================
+#
+# Every ffmpeg started inside a job gets "-progress pipe:<fd>" on a dedicated
+# pipe, parsed by a reader thread. After the artifacts stage the job plans its
+# encode steps (segment pN / concat / wrap / stream) with their expected output
+# seconds; percent complete is encoded out_time against that plan.
+
+class ProcessProgress:
+    """Live progress of one ffmpeg process."""
+
+    def __init__(self, step: str, description: str, counted: bool):
+        self.step = step
+        self.description = description
+        self.counted = counted  # False for processes whose output is re-encoded downstream
+        self.started_at = time.time()
+        self.last_advance = self.started_at
+        self.out_time = 0.0
+        self.speed: Optional[float] = None
+        self.finished = False
+        self.closed = threading.Event()  # Set once the -progress pipe hits EOF
+        self.stall_reported = False
+
+    def update(self, out_time: Optional[float] = None, speed: Optional[float] = None) -> None:
+        if out_time is not None and out_time > self.out_time:
+            self.out_time = out_time
+            self.last_advance = time.time()
+        if speed is not None:
+            self.speed = speed
+
+    def stalled_for(self) -> float:
+        """Seconds since out_time last advanced (0 when finished)."""
+        return 0.0 if self.finished else time.time() - self.last_advance
+
+
+class JobProgress:
+    """Percent complete / ETA of a job from planned encode steps."""
+
+    def __init__(self):
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.processes: List[ProcessProgress] = []
+        self.encode_started_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def plan(self, steps: List[Tuple[str, float]]) -> None:
+        """Declares the encode steps (stage key, expected output seconds) still to run."""
+        with self._lock:
+            for key, expected in steps:
+                if expected > 0:
+                    self.steps[key] = {"expected": expected, "done": False}
+
+    def register(self, step: str, description: str, counted: bool = True) -> ProcessProgress:
+        state = ProcessProgress(step, description, counted)
+        with self._lock:
+            self.processes.append(state)
+        return state
+
+    def step_started(self, key: str) -> None:
+        with self._lock:
+            if key in self.steps and self.encode_started_at is None:
+                self.encode_started_at = time.time()
+
+    def complete_step(self, key: str) -> None:
+        with self._lock:
+            if key in self.steps:
+                self.steps[key]["done"] = True
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns percent complete, ETA, running encodes and stalled encodes.
+
+        Returns:
+            {"percent", "eta_seconds", "encoded_seconds", "planned_seconds", "running", "stalled"}
+        """
+        with self._lock:
+            steps = {key: dict(step) for key, step in self.steps.items()}
+            processes = list(self.processes)
+            encode_started_at = self.encode_started_at
+
+        planned = sum(step["expected"] for step in steps.values())
+        encoded = 0.0
+        for key, step in steps.items():
+            if step["done"]:
+                encoded += step["expected"]
+            else:
+                produced = sum(p.out_time for p in processes if p.step == key and p.counted)
+                encoded += min(step["expected"], produced)
+
+        fraction = encoded / planned if planned else 0.0
+        eta = None
+        if encode_started_at and 0.01 < fraction < 1.0:
+            eta = round((time.time() - encode_started_at) * (1 - fraction) / fraction, 1)
+
+        running = [p for p in processes if not p.finished]
+        return {
+            "percent": round(100 * fraction, 1),
+            "eta_seconds": eta,
+            "encoded_seconds": round(encoded, 2),
+            "planned_seconds": round(planned, 2),
+            "running": [
+                {"step": p.step, "description": p.description, "out_time": round(p.out_time, 2),
+                 "speed": p.speed, "stalled_seconds": round(p.stalled_for(), 1)}
+                for p in running
+            ],
+            "stalled": [
+                {"step": p.step, "description": p.description, "out_time": round(p.out_time, 2),
+                 "stalled_seconds": round(p.stalled_for(), 1)}
+                for p in running if p.stalled_for() > PROGRESS_CONFIG["stall_seconds"]
+            ],
+        }
+
+
+def plan_progress(steps: List[Tuple[str, float]]) -> None:
+    """Declares encode steps on the current job (no-op outside a job)."""
+    metrics = _current_job.get()
+    if metrics is not None:
+        metrics.progress.plan(steps)
+        if metrics.stage:
+            metrics.progress.step_started(metrics.stage)  # Planned from inside its first step
+
+
+def attach_progress(
+    cmd: List[str],
+    description: str,
+    counted: bool = True
+) -> Tuple[List[str], Dict[str, Any], Optional[Tuple[int, int, ProcessProgress]]]:
     """
-    Intelligently fits video duration to match audio duration using frame sampling.
-    
-    Uses a combination of techniques to avoid visible jumps:
-    1. If audio is longer than video: Speed down video slightly (up to 0.85x), then duplicate frames
-    2. If audio is shorter than video: Speed up video slightly (up to 1.15x), then drop frames
-    
-    The approach prioritizes smooth playback over exact frame matching.
-    
+    Adds "-progress pipe:<fd>" to an ffmpeg command started inside a job.
+
     Args:
-        video_path: Path to the source video
-        audio_path: Path to the audio file to match duration
-        output_path: Path for the output video
-    
+        cmd: Command to start
+        description: Label for /jobs/<id>
+        counted: Whether the process's out_time counts towards percent complete
+
     Returns:
-        str: Path to the fitted video (without audio - audio added separately)
+        (command, extra Popen kwargs, hook for start_progress_reader)
     """
-    cfg = VIDEO_CONFIG
-    
-    video_duration = get_media_duration(video_path)
-    audio_duration = get_media_duration(audio_path)
-    
-    if video_duration <= 0 or audio_duration <= 0:
-        logger.warning(f"Invalid durations (video: {video_duration}, audio: {audio_duration}), using simple loop")
+    metrics = _current_job.get()
+    if metrics is None or os.path.basename(cmd[0]) != "ffmpeg":
+        return cmd, {}, None
+    read_fd, write_fd = os.pipe()
+    stage, segment = _current_stage.get()
+    state = metrics.progress.register(stage_key(stage, segment), description, counted)
+    progress_cmd = [cmd[0], "-progress", f"pipe:{write_fd}", "-nostats"] + cmd[1:]
+    return progress_cmd, {"pass_fds": (write_fd,)}, (read_fd, write_fd, state)
+
+
+def _read_progress(read_fd: int, state: ProcessProgress) -> None:
+    """Parses ffmpeg -progress key=value blocks until the process closes the pipe."""
+    try:
+        with os.fdopen(read_fd, "r", errors="replace") as stream:
+            for line in stream:
+                key, _, value = line.strip().partition("=")
+                try:
+                    if key == "out_time_us":
+                        state.update(out_time=int(value) / 1e6)
+                    elif key == "speed" and value.endswith("x"):
+                        state.update(speed=float(value[:-1]))
+                except ValueError:
+                    pass  # "N/A" before the first frame
+    finally:
+        state.finished = True
+        state.closed.set()
+
+
+def start_progress_reader(hook: Optional[Tuple[int, int, ProcessProgress]]) -> Optional[threading.Thread]:
+    """Closes the parent's write end and starts parsing (call right after Popen)."""
+    if hook is None:
         return None
-    
-    ratio = audio_duration / video_duration
-    logger.info(f"Video-Audio fit: video={video_duration:.2f}s, audio={audio_duration:.2f}s, ratio={ratio:.3f}")
-    
-    # Determine the best fitting strategy
-    if 0.85 <= ratio <= 1.15:
+    read_fd, write_fd, state = hook
+    os.close(write_fd)
+    reader = threading.Thread(target=_read_progress, args=(read_fd, state), name="progress", daemon=True)
+    reader.start()
+    return reader
+
+
+def discard_progress_hook(hook: Optional[Tuple[int, int, ProcessProgress]]) -> None:
+    """Releases a hook whose process failed to start."""
+    if hook is None:
+        return
+    read_fd, write_fd, state = hook
+    for fd in (read_fd, write_fd):
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    state.finished = True
+    state.closed.set()
+
+
+def job_snapshot(metrics: "JobMetrics") -> Dict[str, Any]:
+    """Returns the /jobs/<id> view of a job."""
+    snapshot = {
+        "job_id": metrics.job_id,
+        "status": metrics.status,
+        "stage": metrics.stage,
+        "elapsed_seconds": round(time.time() - metrics.started_at, 1),
+        "encoder_profile": metrics.profile,
+        "profile_choice": metrics.profile_choice,
+    }
+    snapshot.update(metrics.progress.snapshot())
+    if metrics.status == "completed":
+        snapshot["percent"] = 100.0
+        snapshot["eta_seconds"] = 0
+    return snapshot
+
+
+def monitor_job_progress(
+    metrics: "JobMetrics",
+    stop: threading.Event,
+    webhook_url: Optional[str] = None,
+    additional_data: Optional[Dict[str, Any]] = None
+) -> None:
+    """
+    Watches a running job: logs stalled encodes and pushes progress webhooks.
+
+    Args:
+        metrics: The job
+        stop: Set when the job finishes
+        webhook_url: Optional progress webhook
+        additional_data: Passthrough data included in webhook posts
+    """
+    last_post = 0.0
+    while not stop.wait(PROGRESS_CONFIG["poll_seconds"]):
+        for state in list(metrics.progress.processes):
+            if not state.stall_reported and state.stalled_for() > PROGRESS_CONFIG["stall_seconds"]:
+                state.stall_reported = True
+                STALLED_ENCODES.inc()
+                logger.warning(
+                    f"⚠️ Job {metrics.job_id}: {state.description} ({state.step}) stalled - "
+                    f"out_time {state.out_time:.1f}s unchanged for {state.stalled_for():.0f}s"
+                )
+
+        if webhook_url and time.time() - last_post >= PROGRESS_CONFIG["webhook_interval"]:
+            last_post = time.time()
+            try:
+                data = job_snapshot(metrics)
+                data["additional_data"] = additional_data or {}
+                requests.post(webhook_url, json=data, timeout=5)
+            except Exception as e:
+                logger.debug(f"Progress webhook failed: {e}")
+
+
+# ==============================================================================
+# JOB HISTORY (SQLITE)
+# ==============================================================================
+#
+# Every finished job writes one row to HISTORY_DIR/jobs.db: input durations,
+# doctor video resolution/codec, per-stage wall and CPU time, cache hits,
+# output size and host. The history predicts how long a job will take (ETA in
+# the 202 response, Retry-After on 503) and flags stages that are much slower
+# than on earlier, similar jobs. /history serves aggregates.
+
+_history_lock = threading.Lock()
+_history_ready: Dict[str, bool] = {}
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    host TEXT,
+    mode TEXT,
+    profile TEXT,
+    profile_reason TEXT,
+    elapsed_seconds REAL,
+    cpu_seconds REAL,
+    output_bytes INTEGER,
+    input_seconds REAL,
+    doctor_seconds REAL,
+    doctor_width INTEGER,
+    doctor_height INTEGER,
+    doctor_codec TEXT,
+    cache_hits INTEGER,
+    cache_misses INTEGER,
+    predicted_seconds REAL,
+    inputs TEXT,
+    cache TEXT,
+    regressions TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at);
+CREATE TABLE IF NOT EXISTS job_stages (
+    job_row INTEGER NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    wall_seconds REAL,
+    cpu_seconds REAL,
+    processes INTEGER
+);
+CREATE INDEX IF NOT EXISTS job_stages_job_row ON job_stages (job_row);
+"""
+
+
+def history_db() -> sqlite3.Connection:
+    """Opens the job history database (creating it on first use)."""
+    path = os.path.join(HISTORY_DIR, HISTORY_CONFIG["file"])
+    connection = sqlite3.connect(path, timeout=10)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA foreign_keys = ON")
+    if not _history_ready.get(path):
+        with _history_lock:
+            connection.executescript(HISTORY_SCHEMA)
+            _history_ready[path] = True
+    return connection
+
+
+def _nearest_rank(ordered: List[float], percentile: int) -> float:
+    """Returns the nearest-rank percentile of an ascending, non-empty list."""
+    rank = -(-len(ordered) * percentile // 100)  # ceil(n * p / 100)
+    return ordered[min(len(ordered), max(1, rank)) - 1]
+
+
+def _stats(values: List[float]) -> Dict[str, Optional[float]]:
+    """Returns p50/p95/mean/max of values (nearest rank; None when empty)."""
+    if not values:
+        return {"p50": None, "p95": None, "mean": None, "max": None}
+    ordered = sorted(values)
+    return {
+        "p50": round(_nearest_rank(ordered, 50), 2),
+        "p95": round(_nearest_rank(ordered, 95), 2),
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "max": round(ordered[-1], 2),
+    }
+
+
+def job_history_record(metrics: "JobMetrics") -> Dict[str, Any]:
+    """
+    Builds the history record of a finished job.
+
+    Returns:
+        Dict with the jobs table columns plus "stages" ({stage: {...}})
+    """
+    summary = metrics.summary()
+    doctors = [entry for entry in metrics.inputs if entry["role"] == "doctor"]
+    largest = max(doctors, key=lambda entry: (entry["height"] or 0) * (entry["width"] or 0), default={})
+    seconds = lambda entries: round(sum(entry["seconds"] or 0.0 for entry in entries), 3) if entries else None
+    return {
+        "job_id": metrics.job_id,
+        "finished_at": time.time(),
+        "status": metrics.status,
+        "host": socket.gethostname(),
+        "mode": metrics.mode,
+        "profile": metrics.profile or VIDEO_CONFIG["profile"],
+        "profile_reason": (metrics.profile_choice or {}).get("reason"),
+        "elapsed_seconds": summary["elapsed_seconds"],
+        "cpu_seconds": round(summary["totals"]["user_seconds"] + summary["totals"]["sys_seconds"], 3),
+        "output_bytes": metrics.output_bytes,
+        "input_seconds": seconds([entry for entry in metrics.inputs if entry["role"] != "image"]),
+        "doctor_seconds": seconds(doctors),
+        "doctor_width": largest.get("width"),
+        "doctor_height": largest.get("height"),
+        "doctor_codec": largest.get("codec"),
+        "cache_hits": sum(entry["hit"] for entry in metrics.cache.values()),
+        "cache_misses": sum(entry["miss"] for entry in metrics.cache.values()),
+        "predicted_seconds": metrics.predicted_seconds,
+        "inputs": metrics.inputs,
+        "cache": metrics.cache,
+        "regressions": [],
+        "stages": {
+            stage: {
+                "wall_seconds": entry["wall_seconds"],
+                "cpu_seconds": round(entry["user_seconds"] + entry["sys_seconds"], 3),
+                "processes": entry["processes"],
+            }
+            for stage, entry in summary["stages"].items()
+        },
+    }
+
+
+def _similar_jobs_clause(
+    mode: Optional[str],
+    doctor_seconds: Optional[float],
+    profile: Optional[str] = None
+) -> Tuple[str, List[Any]]:
+    """WHERE clause for completed jobs with the same mode/profile (and similar doctor input length)."""
+    clause = "status = 'completed' AND mode IS ? AND profile = ?"
+    params: List[Any] = [mode, profile or VIDEO_CONFIG["profile"]]
+    if doctor_seconds:
+        ratio = HISTORY_CONFIG["similar_doctor_ratio"]
+        clause += " AND doctor_seconds BETWEEN ? AND ?"
+        params += [doctor_seconds * (1 - ratio), doctor_seconds * (1 + ratio)]
+    return clause, params
+
+
+def find_stage_regressions(connection: sqlite3.Connection, record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Compares a job's stage wall times with the median of recent similar jobs.
+
+    Similar = completed, same mode and encoder profile, doctor input length
+    within HISTORY_CONFIG["similar_doctor_ratio"].
+
+    Returns:
+        [{"stage", "wall_seconds", "baseline_seconds", "baseline_jobs"}] for regressed stages
+    """
+    clause, params = _similar_jobs_clause(record["mode"], record["doctor_seconds"], record["profile"])
+    rows = connection.execute(
+        f"SELECT id FROM jobs WHERE {clause} ORDER BY finished_at DESC LIMIT ?",
+        params + [HISTORY_CONFIG["regression_jobs"]]
+    ).fetchall()
+    if len(rows) < HISTORY_CONFIG["min_jobs"]:
+        return []
+
+    baseline: Dict[str, List[float]] = {}
+    marks = ",".join("?" for _ in rows)
+    for row in connection.execute(
+        f"SELECT stage, wall_seconds FROM job_stages WHERE job_row IN ({marks})", [row["id"] for row in rows]
+    ):
+        baseline.setdefault(row["stage"], []).append(row["wall_seconds"])
+
+    regressions = []
+    for stage, entry in record["stages"].items():
+        values = baseline.get(stage, [])
+        if len(values) < HISTORY_CONFIG["min_jobs"]:
+            continue
+        median = _stats(values)["p50"]
+        if (entry["wall_seconds"] > HISTORY_CONFIG["regression_factor"] * median
+                and entry["wall_seconds"] - median >= HISTORY_CONFIG["regression_min_seconds"]):
+            regressions.append({
+                "stage": stage,
+                "wall_seconds": entry["wall_seconds"],
+                "baseline_seconds": median,
+                "baseline_jobs": len(values),
+            })
+    return regressions
+
+
+def record_job_history(metrics: "JobMetrics") -> Optional[Dict[str, Any]]:
+    """
+    Writes a finished job to the history (and flags regressed stages on it).
+
+    Args:
+        metrics: The finished job's metrics
+
+    Returns:
+        The record, or None if the history is disabled
+    """
+    if not HISTORY_CONFIG["enabled"]:
+        return None
+    record = job_history_record(metrics)
+    columns = [key for key in record if key != "stages"]
+
+    with closing(history_db()) as connection, _history_lock, connection:
+        if record["status"] == "completed":
+            record["regressions"] = find_stage_regressions(connection, record)
+        values = [json.dumps(record[key]) if key in ("inputs", "cache", "regressions") else record[key]
+                  for key in columns]
+        cursor = connection.execute(
+            f"INSERT INTO jobs ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})", values
+        )
+        connection.executemany(
+            "INSERT INTO job_stages (job_row, stage, wall_seconds, cpu_seconds, processes) VALUES (?, ?, ?, ?, ?)",
+            [(cursor.lastrowid, stage, entry["wall_seconds"], entry["cpu_seconds"], entry["processes"])
+             for stage, entry in record["stages"].items()]
+        )
+        connection.execute(
+            "DELETE FROM jobs WHERE finished_at < ?", (time.time() - HISTORY_CONFIG["keep_days"] * 86400,)
+        )
+
+    metrics.regressions = record["regressions"]
+    for regression in record["regressions"]:
+        STAGE_REGRESSIONS.inc(stage=regression["stage"])
+        logger.warning(
+            f"⚠️ Job {metrics.job_id}: stage {regression['stage']} took {regression['wall_seconds']:.1f}s, "
+            f"baseline {regression['baseline_seconds']:.1f}s ({regression['baseline_jobs']} similar jobs)"
+        )
+    return record
+
+
+def predict_job_seconds(
+    mode: Optional[str],
+    doctor_seconds: Optional[float] = None,
+    profile: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Predicts a job's end-to-end duration from recent completed jobs.
+
+    With doctor_seconds, fits elapsed = fixed + per_second * doctor_seconds
+    over the recent jobs; otherwise (or if the fit is degenerate) returns
+    their median.
+
+    Args:
+        mode: "file" or "stream"
+        doctor_seconds: Total length of the doctor videos, if known
+        profile: Encoder profile (default: VIDEO_CONFIG["profile"])
+
+    Returns:
+        {"seconds", "basis": "doctor_seconds"|"median", "jobs"}, or None
+        without enough history
+    """
+    if not HISTORY_CONFIG["enabled"]:
+        return None
+    clause, params = _similar_jobs_clause(mode, None, profile)
+    try:
+        with closing(history_db()) as connection:
+            rows = connection.execute(
+                f"SELECT elapsed_seconds, doctor_seconds FROM jobs WHERE {clause} ORDER BY finished_at DESC LIMIT ?",
+                params + [HISTORY_CONFIG["prediction_jobs"]]
+            ).fetchall()
+    except sqlite3.Error as e:
+        logger.warning(f"Job history unavailable: {e}")
+        return None
+    if len(rows) < HISTORY_CONFIG["min_jobs"]:
+        return None
+
+    points = [(row["doctor_seconds"], row["elapsed_seconds"]) for row in rows if row["doctor_seconds"]]
+    if doctor_seconds and len(points) >= HISTORY_CONFIG["min_jobs"]:
+        mean_x = sum(x for x, _ in points) / len(points)
+        mean_y = sum(y for _, y in points) / len(points)
+        spread = sum((x - mean_x) ** 2 for x, _ in points)
+        if spread > 0:
+            per_second = sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+            if per_second >= 0:
+                fixed = mean_y - per_second * mean_x
+                return {"seconds": round(max(0.0, fixed + per_second * doctor_seconds), 1),
+                        "basis": "doctor_seconds", "jobs": len(points)}
+    return {"seconds": _stats([row["elapsed_seconds"] for row in rows])["p50"], "basis": "median", "jobs": len(rows)}
+
+
+def local_media_path(url: str) -> Optional[str]:
+    """Returns where a source can be read without downloading it (local file or cached download), if anywhere."""
+    if url.startswith("file://") or "://" not in url:
+        path = url.replace("file://", "", 1)
+        return path if os.path.exists(path) else None
+    cached = _fingerprints.get(url)
+    if cached:
+        path = cache_path("downloads", [url, cached[1]], os.path.splitext(url.split("?")[0])[1] or ".bin")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def payload_mode(payload: Dict[str, Any]) -> str:
+    """Returns the mode ("file" or "stream") a job will run in."""
+    return "stream" if payload.get("streaming", STREAMING_CONFIG["enabled"]) and streaming_supported() else "file"
+
+
+def payload_doctor_seconds(payload: Dict[str, Any]) -> Optional[float]:
+    """
+    Returns the total length of a new job's doctor videos, before it starts.
+
+    Only doctor videos readable locally are probed (no downloads).
+
+    Args:
+        payload: Internal stitching payload
+
+    Returns:
+        float: Seconds, or None if any doctor video is not available locally
+    """
+    doctor_seconds = 0.0
+    for url in payload.get("assets_doctor_paths", []):
+        if not url:
+            continue
+        path = local_media_path(url)
+        if path is None:
+            return None
+        try:
+            doctor_seconds += float(probe_media(path)["format"]["duration"])
+        except Exception:
+            return None
+    return doctor_seconds or None
+
+
+def remaining_job_seconds(metrics: "JobMetrics") -> Optional[float]:
+    """
+    Returns the expected seconds until a running job finishes.
+
+    Uses the ffmpeg -progress ETA once encoding has started, else the
+    history prediction made after preflight.
+    """
+    eta = metrics.progress.snapshot()["eta_seconds"]
+    if eta is not None:
+        return eta
+    if metrics.predicted_seconds is not None:
+        return round(max(0.0, metrics.predicted_seconds - (time.time() - metrics.started_at)), 1)
+    return None
+
+
+def history_summary(
+    hours: float,
+    mode: Optional[str] = None,
+    profile: Optional[str] = None,
+    host: Optional[str] = None,
+    recent: int = 0
+) -> Dict[str, Any]:
+    """
+    Aggregates the job history for /history.
+
+    Args:
+        hours: Window (jobs finished in the last `hours`)
+        mode, profile, host: Optional filters
+        recent: Also return the most recent N job records
+
+    Returns:
+        Counts, success rate, elapsed/CPU percentiles, cache hit ratio,
+        prediction error, per-stage and per-mode/profile breakdowns and
+        the regressions flagged in the window
+    """
+    clause = "finished_at >= ?"
+    params: List[Any] = [time.time() - hours * 3600]
+    for column, value in (("mode", mode), ("profile", profile), ("host", host)):
+        if value:
+            clause += f" AND {column} = ?"
+            params.append(value)
+
+    with closing(history_db()) as connection:
+        jobs = [dict(row) for row in connection.execute(
+            f"SELECT * FROM jobs WHERE {clause} ORDER BY finished_at DESC", params
+        )]
+        stage_rows = connection.execute(
+            f"SELECT job_stages.* FROM job_stages JOIN jobs ON jobs.id = job_stages.job_row "
+            f"WHERE {clause.replace('finished_at', 'jobs.finished_at')} AND jobs.status = 'completed'", params
+        ).fetchall()
+
+    completed = [job for job in jobs if job["status"] == "completed"]
+    hits = sum(job["cache_hits"] or 0 for job in jobs)
+    lookups = hits + sum(job["cache_misses"] or 0 for job in jobs)
+    predicted = [job for job in completed if job["predicted_seconds"]]
+    errors = [abs(job["elapsed_seconds"] - job["predicted_seconds"]) for job in predicted]
+
+    stages: Dict[str, Dict[str, List[float]]] = {}
+    for row in stage_rows:
+        entry = stages.setdefault(row["stage"], {"wall": [], "cpu": []})
+        entry["wall"].append(row["wall_seconds"])
+        entry["cpu"].append(row["cpu_seconds"])
+
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for job in jobs:
+        groups.setdefault(f"{job['mode']}/{job['profile']}", []).append(job)
+
+    regressions = []
+    for job in jobs:
+        for regression in json.loads(job["regressions"] or "[]"):
+            regressions.append(dict(regression, job_id=job["job_id"], finished_at=job["finished_at"]))
+
+    summary = {
+        "window_hours": hours,
+        "filters": {"mode": mode, "profile": profile, "host": host},
+        "jobs": len(jobs),
+        "completed": len(completed),
+        "failed": len(jobs) - len(completed),
+        "success_rate": round(len(completed) / len(jobs), 3) if jobs else None,
+        "elapsed_seconds": _stats([job["elapsed_seconds"] for job in completed]),
+        "cpu_seconds": _stats([job["cpu_seconds"] for job in completed]),
+        "doctor_seconds": _stats([job["doctor_seconds"] for job in completed if job["doctor_seconds"]]),
+        "output_mb": _stats([job["output_bytes"] / 1e6 for job in completed if job["output_bytes"]]),
+        "cache_hit_ratio": round(hits / lookups, 3) if lookups else None,
+        "prediction": {
+            "jobs": len(predicted),
+            "mean_abs_error_seconds": round(sum(errors) / len(errors), 1) if errors else None,
+            "mean_abs_error_pct": round(100 * sum(
+                error / job["elapsed_seconds"] for error, job in zip(errors, predicted)
+            ) / len(errors), 1) if errors else None,
+        },
+        "stages": {
+            stage: {"jobs": len(entry["wall"]), "wall_seconds": _stats(entry["wall"]),
+                    "cpu_seconds": _stats(entry["cpu"])}
+            for stage, entry in stages.items()
+        },
+        "groups": {
+            key: {"jobs": len(members),
+                  "completed": sum(1 for job in members if job["status"] == "completed"),
+                  "elapsed_seconds": _stats([job["elapsed_seconds"] for job in members
+                                             if job["status"] == "completed"])}
+            for key, members in groups.items()
+        },
+        "regressions": regressions,
+    }
+    if recent:
+        for job in jobs[:recent]:
+            for key in ("inputs", "cache", "regressions"):
+                job[key] = json.loads(job[key] or "null")
+        summary["recent"] = jobs[:recent]
+    return summary
+
+
+# ==============================================================================
+# LOAD-ADAPTIVE ENCODER PROFILE
+# ==============================================================================
+#
+# The backend keeps the job queue; the service sees it as 503'd jobs retrying
+# (tracked by job_id below) or as an explicit "queue_depth" in the payload.
+# choose_job_profile() picks each job's encoder profile from that depth and the
+# job's "deadline", never going below ADAPTIVE_PROFILE_CONFIG["floor"].
+
+WAITING_JOBS: Dict[str, float] = {}  # job_id -> last 503 for that job
+_waiting_lock = threading.Lock()
+
+
+def note_waiting_job(job_id: Optional[Any]) -> None:
+    """Records a job that was turned away because the machine is busy."""
+    if job_id:
+        with _waiting_lock:
+            WAITING_JOBS[make_job_id(job_id)] = time.time()
+
+
+def forget_waiting_job(job_id: str) -> None:
+    """Stops counting a job as waiting (it has been accepted)."""
+    with _waiting_lock:
+        WAITING_JOBS.pop(job_id, None)
+
+
+def waiting_job_count(exclude: Optional[str] = None) -> int:
+    """Returns how many turned-away jobs are still retrying (forgetting the ones that stopped)."""
+    cutoff = time.time() - ADAPTIVE_PROFILE_CONFIG["waiting_ttl_seconds"]
+    with _waiting_lock:
+        for job_id in [job_id for job_id, seen in WAITING_JOBS.items() if seen < cutoff]:
+            del WAITING_JOBS[job_id]
+        return sum(1 for job_id in WAITING_JOBS if job_id != exclude)
+
+
+def estimate_profile_seconds(mode: str, doctor_seconds: Optional[float], profile: str) -> Optional[float]:
+    """
+    Returns a job's expected duration with an encoder profile.
+
+    Uses the history of jobs with that profile; without any, scales the base
+    profile's prediction by ADAPTIVE_PROFILE_CONFIG["relative_seconds"].
+    """
+    prediction = predict_job_seconds(mode, doctor_seconds, profile)
+    if prediction:
+        return prediction["seconds"]
+    base = VIDEO_CONFIG["profile"]
+    relative = ADAPTIVE_PROFILE_CONFIG["relative_seconds"]
+    if profile == base or profile not in relative or base not in relative:
+        return None
+    prediction = predict_job_seconds(mode, doctor_seconds, base)
+    return round(prediction["seconds"] * relative[profile] / relative[base], 1) if prediction else None
+
+
+def choose_job_profile(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Chooses the encoder profile for a new job.
+
+    Starting from the base profile, the job moves one rung down
+    ADAPTIVE_PROFILE_CONFIG["ladder"] per "jobs_per_step" waiting jobs, and
+    further if the profile's predicted duration would miss the job's
+    deadline - but never past the floor. A profile named in the payload
+    is used as-is; proxy renders use PROXY_CONFIG["profile"].
+
+    Args:
+        payload: Internal stitching payload ("encoder_profile", "deadline"
+            and "queue_depth" are optional)
+
+    Returns:
+        {"profile", "base", "floor", "reason": "requested"|"proxy"|"disabled"|"idle"|"queue"|"deadline",
+         "waiting_jobs", "deadline", "budget_seconds", "estimated_seconds"}
+    """
+    config = ADAPTIVE_PROFILE_CONFIG
+    base = VIDEO_CONFIG["profile"]
+    ladder = config["ladder"]
+    mode = payload_mode(payload)
+    doctor_seconds = payload_doctor_seconds(payload)
+    waiting = max(waiting_job_count(exclude=payload.get("job_id")), int(payload.get("queue_depth") or 0))
+    deadline = payload.get("deadline")
+    choice = {
+        "profile": base, "base": base, "floor": config["floor"], "reason": "idle",
+        "waiting_jobs": waiting, "deadline": deadline, "budget_seconds": None, "estimated_seconds": None,
+    }
+
+    if payload.get("encoder_profile"):
+        choice.update(profile=payload["encoder_profile"], reason="requested")
+    elif job_proxy(payload):
+        choice.update(profile=PROXY_CONFIG["profile"], reason="proxy")
+    elif not config["enabled"] or base not in ladder or config["floor"] not in ladder:
+        choice["reason"] = "disabled"
+    else:
+        first = ladder.index(base)
+        last = max(first, ladder.index(config["floor"]))
+        rung = min(last, first + waiting // config["jobs_per_step"])
+        if rung > first:
+            choice["reason"] = "queue"
+
+        if deadline:
+            budget = choice["budget_seconds"] = round(deadline - time.time(), 1)
+            for candidate in range(rung, last + 1):
+                seconds = estimate_profile_seconds(mode, doctor_seconds, ladder[candidate])
+                if seconds is None:
+                    break
+                if seconds <= budget or candidate == last:
+                    if candidate > rung:
+                        choice["reason"] = "deadline"
+                    rung = candidate
+                    break
+        choice["profile"] = ladder[rung]
+
+    choice["estimated_seconds"] = estimate_profile_seconds(mode, doctor_seconds, choice["profile"])
+    return choice
+
+
+# ==============================================================================
+# ASSET CACHE
+# ==============================================================================
+# Every input is fetched through the cache, keyed by URL + source fingerprint
+# (GCS generation, HTTP ETag, local size/mtime). Precomputed artifacts are keyed
+# by the source key plus the encoding config that produced them, so changing
+# VIDEO_CONFIG invalidates them. Writers build into a .partial file and rename,
+# and a per-entry lock makes concurrent users (prefetch vs. stitching) wait for
+# one build instead of duplicating it.
+
+CACHE_STATS = {"hits": 0, "misses": 0}
+_cache_locks: Dict[str, threading.Lock] = {}
+_cache_locks_guard = threading.Lock()
+_fingerprints: Dict[str, Tuple[float, str]] = {}
+_worker_state = threading.local()
+
+
+def _background_priority_kwargs() -> Dict[str, Any]:
+    """
+    Returns subprocess kwargs that lower child priority on background workers.
+
+    The prefetch worker marks its thread so that the FFmpeg processes it starts
+    yield CPU to a running stitching job.
+    """
+    niceness = getattr(_worker_state, "niceness", 0)
+    if niceness and hasattr(os, "nice"):
+        return {"preexec_fn": lambda: os.nice(niceness)}
+    return {}
+
+
+def cache_key(*parts: Any) -> str:
+    """Returns a stable short hash for the given key parts."""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:24]
+
+
+def source_exists(url: str) -> bool:
+    """
+    Checks whether a source exists (gs://, http(s)://, file:// or local path).
+
+    Args:
+        url: Source URL/path
+
+    Returns:
+        bool: True if the source can be fetched
+    """
+    try:
+        source_fingerprint(url)
+        return True
+    except Exception:
+        return False
+
+
+def source_fingerprint(url: str) -> str:
+    """
+    Returns a cheap version identifier for a source without downloading it.
+
+    Args:
+        url: gs://, http(s)://, file:// or local path
+
+    Returns:
+        str: Fingerprint that changes when the source content changes
+
+    Raises:
+        FileNotFoundError: If the source does not exist
+    """
+    now = time.time()
+    cached = _fingerprints.get(url)
+    if cached and now - cached[0] < ASSET_CACHE_CONFIG["fingerprint_ttl_seconds"]:
+        return cached[1]
+
+    if url.startswith("gs://"):
+        bucket_name = url.split("/")[2]
+        blob_name = "/".join(url.split("/")[3:])
+        blob = storage.Client().bucket(bucket_name).get_blob(blob_name)
+        if blob is None:
+            raise FileNotFoundError(f"GCS object not found: {url}")
+        fingerprint = f"gen-{blob.generation}"
+    elif url.startswith("http://") or url.startswith("https://"):
+        response = requests.head(url, allow_redirects=True, timeout=30)
+        response.raise_for_status()
+        fingerprint = "http-" + (
+            response.headers.get("ETag")
+            or response.headers.get("Last-Modified", "") + response.headers.get("Content-Length", "")
+        )
+    else:
+        local_path = url.replace("file://", "", 1) if url.startswith("file://") else url
+        stat = os.stat(local_path)
+        fingerprint = f"local-{stat.st_size}-{int(stat.st_mtime)}"
+
+    _fingerprints[url] = (now, fingerprint)
+    return fingerprint
+
+
+def _cache_lock(path: str) -> threading.Lock:
+    """Returns the lock guarding one cache entry."""
+    with _cache_locks_guard:
+        return _cache_locks.setdefault(path, threading.Lock())
+
+
+def _config_fingerprint() -> Dict[str, Any]:
+    """Returns the encoding parameters that artifacts depend on (always the base profile)."""
+    return dict(VIDEO_CONFIG, profile=encoder_profile(VIDEO_CONFIG["profile"]))
+
+
+def cache_path(kind: str, key_parts: List[Any], suffix: str) -> str:
+    """Returns where cached_artifact() keeps an artifact (whether or not it exists yet)."""
+    return os.path.join(CACHE_DIR, kind, cache_key(kind, *key_parts) + suffix)
+
+
+def cache_partial_path(path: str) -> str:
+    """Returns the temporary path a cache entry is built at before it is published."""
+    root, suffix = os.path.splitext(path)
+    return f"{root}.partial{suffix}"
+
+
+def cached_artifact(kind: str, key_parts: List[Any], suffix: str, builder: Callable[[str], Any]) -> str:
+    """
+    Returns a cached file, building it first if it is not cached yet.
+
+    Args:
+        kind: Cache namespace (subdirectory), e.g. "downloads"
+        key_parts: Values that identify the artifact's content
+        suffix: File extension including the dot (keeps FFmpeg muxer detection)
+        builder: Callable that writes the artifact to the path it is given
+
+    Returns:
+        str: Path to the cached file (treat as read-only)
+    """
+    directory = os.path.join(CACHE_DIR, kind)
+    os.makedirs(directory, exist_ok=True)
+    key = cache_key(kind, *key_parts)
+    path = cache_path(kind, key_parts, suffix)
+    metrics = _current_job.get()
+
+    with _cache_lock(path):
+        if os.path.exists(path):
+            os.utime(path)  # Refresh LRU position
+            CACHE_STATS["hits"] += 1
+            CACHE_REQUESTS.inc(kind=kind, result="hit")
+            if metrics is not None:
+                metrics.count_cache(kind, "hit")
+            logger.info(f"Cache hit ({kind}): {os.path.basename(path)}")
+            return path
+
+        CACHE_STATS["misses"] += 1
+        CACHE_REQUESTS.inc(kind=kind, result="miss")
+        if metrics is not None:
+            metrics.count_cache(kind, "miss")
+        partial_path = cache_partial_path(path)
+        try:
+            # Artifacts outlive the job, so they never inherit a load-adaptive profile
+            with trace_span(f"cache build: {kind}", "cache", key=key), using_encoder_profile(None):
+                builder(partial_path)
+            os.replace(partial_path, path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        return path
+
+
+def fetch_asset(url: str) -> str:
+    """
+    Downloads a source through the asset cache.
+
+    Args:
+        url: Source URL/path (see download_file)
+
+    Returns:
+        str: Local cached path
+    """
+    suffix = os.path.splitext(url.split("?")[0])[1] or ".bin"
+    return cached_artifact(
+        "downloads", [url, source_fingerprint(url)], suffix,
+        lambda partial_path: download_file(url, partial_path)
+    )
+
+
+def link_or_copy(source: str, destination: str) -> str:
+    """
+    Places a cached file into a job directory without duplicating data.
+
+    Hard links are safe because jobs replace segment files (os.replace) rather
+    than writing into them, so the cached inode is never modified.
+    """
+    if os.path.exists(destination):
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy(source, destination)
+    return destination
+
+
+def evict_cache() -> None:
+    """Evicts least recently used cache files until the cache fits its budget."""
+    entries = []
+    total = 0
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+    budget = ASSET_CACHE_CONFIG["max_bytes"]
+    if total <= budget:
+        return
+
+    cutoff = time.time() - ASSET_CACHE_CONFIG["min_age_seconds"]
+    for mtime, size, path in sorted(entries):
+        if total <= budget:
+            break
+        if mtime > cutoff:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            logger.info(f"Evicted from cache: {os.path.basename(path)}")
+        except OSError:
+            pass
+
+
+# ==============================================================================
+# PRECOMPUTED ARTIFACTS
+# ==============================================================================
+# Everything here depends only on a single input, so it can be computed as soon
+# as the input exists (by /prefetch) and reused by every later job.
+
+def constant_artifact_key(url: str, fingerprint: str) -> List[Any]:
+    """Returns the cache key parts of a constant's artifacts (standardized constant, video-only master)."""
+    key = [url, fingerprint, _config_fingerprint()]
+    if CONSTANT_MEZZANINE_CONFIG["enabled"]:
+        key.append(CONSTANT_MEZZANINE_CONFIG)
+    return key
+
+
+def get_standardized_constant(url: str) -> str:
+    """
+    Returns a constant video standardized to VIDEO_CONFIG (cached).
+
+    With CONSTANT_MEZZANINE_CONFIG enabled it is always encoded to the
+    fast-decode mezzanine format (a remux would keep the delivery GOP) and
+    its keyframe index is built along with it.
+
+    Args:
+        url: Source URL of the constant video
+
+    Returns:
+        str: Path to the cached standardized video
+    """
+    mezzanine = CONSTANT_MEZZANINE_CONFIG["enabled"]
+
+    def build(partial_path: str) -> None:
+        with using_constant_mezzanine() if mezzanine else nullcontext():
+            standardize_video(fetch_asset(url), partial_path, name=url)
+
+    path = cached_artifact("standardized", constant_artifact_key(url, source_fingerprint(url)), ".mp4", build)
+    if mezzanine:
+        get_keyframe_index(path)
+    return path
+
+
+def nodding_master_cmd(source: str, output_path: str) -> List[str]:
+    """Builds the FFmpeg command that encodes the nodding master (video only)."""
+    cfg = VIDEO_CONFIG
+    return [
+        "ffmpeg", "-y",
+        "-hide_banner", "-loglevel", "warning",
+        "-i", source,
+        "-vf", standard_scale_filter(),
+        "-r", str(cfg['fps']),
+    ] + video_encode_args() + [
+        "-an",
+        output_path
+    ]
+
+
+def get_nodding_master(url: str) -> str:
+    """
+    Returns the nodding master: the nodding clip standardized to VIDEO_CONFIG
+    with audio dropped (cached).
+
+    The compositor loops the master with -stream_loop instead of re-encoding a
+    looped copy for every podcast segment. Placeholders, whose audio is
+    replaced, are read through the same video-only master when
+    CONSTANT_MEZZANINE_CONFIG is enabled (then it is always a mezzanine
+    encode, with its keyframe index).
+
+    Args:
+        url: Source URL of the nodding video
+
+    Returns:
+        str: Path to the cached nodding master
+    """
+    mezzanine = CONSTANT_MEZZANINE_CONFIG["enabled"]
+
+    def build(partial_path: str) -> None:
+        source = fetch_asset(url)
+        if mezzanine:
+            with using_constant_mezzanine():
+                run_ffmpeg(nodding_master_cmd(source, partial_path), "Creating nodding master")
+            return
+        decision, reasons = classify_transcode(source, standard_target(), audio=False)
+        log_transcode_decision(url, decision, reasons, "VIDEO_CONFIG")
+        if decision == "copy":
+            run_ffmpeg(transcode_shortcut_cmd(decision, source, partial_path, audio=False), "Creating nodding master (copy)")
+            return
+        run_ffmpeg(nodding_master_cmd(source, partial_path), "Creating nodding master")
+
+    path = cached_artifact("nodding", constant_artifact_key(url, source_fingerprint(url)), ".mp4", build)
+    if mezzanine:
+        get_keyframe_index(path)
+    return path
+
+
+def keyframe_index_cmd(path: str) -> List[str]:
+    """Builds the ffprobe command behind get_keyframe_index() (packet flags only, nothing is decoded)."""
+    return [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=width,height,r_frame_rate,has_b_frames:packet=pts_time,flags",
+        "-of", "json", path
+    ]
+
+
+def get_keyframe_index(path: str) -> Dict[str, Any]:
+    """
+    Returns the keyframe index of a cached video artifact (cached next to it).
+
+    Args:
+        path: Path to a cached artifact (cache paths identify their content)
+
+    Returns:
+        {"width", "height", "fps", "has_b_frames", "frames", "keyframes":
+        [seconds, ...]} - every video packet's time is known, so a cut at any
+        frame is exact
+    """
+    def build(partial_path: str) -> None:
+        result = run_measured(keyframe_index_cmd(path), timeout=60, description="Probing keyframes")
+        data = json.loads(result.stdout)
+        stream = data["streams"][0]
+        packets = [(float(p["pts_time"]), "K" in p.get("flags", "")) for p in data.get("packets", [])
+                   if p.get("pts_time") not in (None, "N/A")]
+        index = {
+            "width": stream.get("width"),
+            "height": stream.get("height"),
+            "fps": _parse_rate(stream.get("r_frame_rate")),
+            "has_b_frames": int(stream.get("has_b_frames") or 0),
+            "frames": len(packets),
+            "keyframes": sorted(t for t, key in packets if key),
+            "starts_with_keyframe": bool(packets) and min(packets)[1],
+        }
+        with open(partial_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+
+    with open(cached_artifact("keyframes", [path], ".json", build), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def copy_trim_args(
+    video_path: str,
+    seconds: float,
+    start: float = 0.0,
+    index: Optional[Dict[str, Any]] = None
+) -> Optional[List[str]]:
+    """
+    Returns output arguments that cut (or, after -stream_loop, loop) a
+    constant mezzanine's video to `seconds` by stream copy.
+
+    Without B-frames, a cut that starts on a keyframe decodes on its own and
+    may end on any frame, and so does every loop repetition (the mezzanine
+    starts with an IDR), so the cut is frame exact.
+
+    Args:
+        video_path: Cached constant artifact (see get_keyframe_index)
+        seconds: Wanted duration
+        start: Where the cut starts (seconds into video_path, seeked with -ss)
+        index: Keyframe index of video_path (default: get_keyframe_index)
+
+    Returns:
+        ["-c:v", "copy", "-frames:v", N], or None if the video is not a
+        mezzanine in VIDEO_CONFIG's format or start is not on a keyframe
+        (it has to be re-encoded)
+    """
+    cfg = VIDEO_CONFIG
+    if not CONSTANT_MEZZANINE_CONFIG["enabled"]:
+        return None
+    if index is None:
+        index = get_keyframe_index(video_path)
+    if (index["has_b_frames"] or not index["starts_with_keyframe"]
+            or (index["width"], index["height"], index["fps"]) != (cfg['width'], cfg['height'], cfg['fps'])):
+        return None
+    if not any(abs(keyframe - start) < 0.5 / cfg['fps'] for keyframe in index["keyframes"]):
+        return None
+    return ["-c:v", "copy", "-frames:v", str(round(seconds * cfg['fps']))]
+
+
+def trim_video_cmd(
+    video_path: str,
+    seconds: float,
+    output_path: str,
+    start: float = 0.0,
+    index: Optional[Dict[str, Any]] = None
+) -> Tuple[List[str], bool]:
+    """
+    Builds the command that cuts `seconds` of video (no audio) from `start`.
+
+    A stream copy when copy_trim_args() allows it, else a re-encode of the
+    same frames to VIDEO_CONFIG.
+
+    Args:
+        video_path: Video to cut (a constant mezzanine for the copy)
+        seconds: Wanted duration
+        output_path: Where the cut is written
+        start: Where the cut starts
+        index: Keyframe index of video_path (default: get_keyframe_index)
+
+    Returns:
+        Tuple[List[str], bool]: (FFmpeg command, whether it is a stream copy)
+    """
+    cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "warning"]
+    if start:
+        cmd += ["-ss", f"{start:.3f}"]
+    cmd += ["-i", video_path, "-map", "0:v:0", "-an"]
+    copy_args = copy_trim_args(video_path, seconds, start, index)
+    if copy_args:
+        return cmd + copy_args + [output_path], True
+    cfg = VIDEO_CONFIG
+    return cmd + ["-vf", standard_scale_filter(), "-r", str(cfg['fps'])] + video_encode_args() + [
+        "-frames:v", str(round(seconds * cfg['fps'])), output_path
+    ], False
+
+
+def get_normalized_doctor_video(url: str) -> str:
+    """
+    Returns the doctor video as a compositor-ready mezzanine (cached).
+
+    Uses the mezzanine stored next to the original by /ingest when it exists;
+    otherwise builds one locally (not uploaded - that stays off the job's
+    critical path).
+
+    Args:
+        url: Source URL of the doctor video
+
+    Returns:
+        str: Path to the cached mezzanine
+    """
+    mezzanine_url, _ = mezzanine_paths(url)
+    if source_exists(mezzanine_url):
+        logger.info(f"Using ingested mezzanine: {mezzanine_url}")
+        return fetch_asset(mezzanine_url)
+
+    def build(partial_path: str) -> None:
+        build_doctor_mezzanine(fetch_asset(url), partial_path, name=url)
+
+    return cached_artifact(
+        "mezzanine", [url, source_fingerprint(url), DOCTOR_MEZZANINE_CONFIG], ".mp4", build
+    )
+
+
+def get_doctor_transcript(url: str, language: str = 'en') -> Optional[List[Dict[str, Any]]]:
+    """
+    Returns Deepgram word timestamps for a doctor video (cached).
+
+    A podcast segment's audio is the doctor audio starting at t=0, so these
+    timestamps apply to the segment unchanged. Failed transcriptions are not
+    cached and are retried by the next caller.
+
+    Args:
+        url: Source URL of the doctor video
+        language: Language code
+
+    Returns:
+        List of word entries, or None if transcription failed
+    """
+    def build(partial_path: str) -> None:
+        with tempfile.TemporaryDirectory(dir=TEMP_DIR) as work_dir:
+            words = transcribe_with_deepgram(get_normalized_doctor_video(url), language, work_dir)
+        if not words:
+            raise RuntimeError("No words returned from Deepgram")
+        with open(partial_path, "w", encoding="utf-8") as f:
+            json.dump(words, f)
+
+    try:
+        path = cached_artifact(
+            "transcripts", [url, source_fingerprint(url), DEEPGRAM_CONFIG["model"], language], ".json", build
+        )
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Transcription failed for {url}: {e}")
+        return None
+
+
+def doctor_segment_subtitles(doctor_url: str, subtitle_path: str) -> Optional[str]:
+    """
+    Writes the subtitle file for a podcast segment from the cached transcript.
+
+    Args:
+        doctor_url: Source URL of the doctor video
+        subtitle_path: Where to write the .ass file (job directory)
+
+    Returns:
+        str: Path to the subtitle file, or None if there is no transcript
+    """
+    words = get_doctor_transcript(doctor_url)
+    if not words:
+        return None
+    return write_word_subtitles(words, subtitle_path)
+
+
+# ==============================================================================
+# LOUDNESS NORMALIZATION
+# ==============================================================================
+
+def measure_loudness_cmd(media_path: str) -> List[str]:
+    """Builds the loudnorm analysis command behind measure_loudness()."""
+    cfg = LOUDNESS_CONFIG
+    return [
+        "ffmpeg", "-hide_banner", "-nostats",
+        "-i", media_path,
+        "-vn",
+        "-af", f"loudnorm=I={cfg['target_i']}:TP={cfg['target_tp']}:LRA={cfg['target_lra']}:print_format=json",
+        "-f", "null", "-"
+    ]
+
+
+def measure_loudness(media_path: str) -> Optional[Dict[str, float]]:
+    """
+    Measures EBU R128 loudness with the analysis pass of FFmpeg's loudnorm.
+
+    Args:
+        media_path: Path to a file with an audio stream
+
+    Returns:
+        Dict with "input_i" (LUFS), "input_tp" (dBTP), "input_lra" (LU) and
+        "input_thresh", or None if the file has no measurable audio
+    """
+    result = run_measured(measure_loudness_cmd(media_path), timeout=300, description="Measuring loudness")
+
+    # loudnorm prints its statistics as a JSON object after the filter name
+    match = re.search(r"\{[^{}]*\"input_i\"[^{}]*\}", result.stderr)
+    if not match:
+        return None
+    stats = json.loads(match.group(0))
+    return {key: float(stats[key]) for key in ("input_i", "input_tp", "input_lra", "input_thresh")}
+
+
+def get_loudness(url: str) -> Optional[Dict[str, float]]:
+    """
+    Returns measure_loudness() of a source (cached per source version).
+
+    Args:
+        url: Source URL
+
+    Returns:
+        Loudness statistics, or None if the source has no measurable audio
+    """
+    def build(partial_path: str) -> None:
+        with open(partial_path, "w", encoding="utf-8") as f:
+            json.dump(measure_loudness(fetch_asset(url)), f)
+
+    path = cached_artifact("loudness", [url, source_fingerprint(url)], ".json", build)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_doctor_loudness(url: str) -> Optional[Dict[str, float]]:
+    """Returns the loudness of a doctor video: measured at /ingest if it was ingested, else get_loudness()."""
+    _, metadata_url = mezzanine_paths(url)
+    if source_exists(metadata_url):
+        with open(fetch_asset(metadata_url), encoding="utf-8") as f:
+            metadata = json.load(f)
+        if "loudness" in metadata:
+            return metadata["loudness"]
+    return get_loudness(url)
+
+
+def loudness_filter(stats: Optional[Dict[str, float]]) -> Optional[str]:
+    """
+    Returns the audio filter chain that brings a source to LOUDNESS_CONFIG's target.
+
+    A plain gain keeps the source's dynamics (like loudnorm's linear mode);
+    when the gain would push peaks over the ceiling, a limiter (delay
+    compensated, so segment timing is kept) holds them there.
+
+    Args:
+        stats: measure_loudness() result (None: unknown or silent)
+
+    Returns:
+        Filter chain, or None if the source needs no correction
+    """
+    cfg = LOUDNESS_CONFIG
+    if not stats or not math.isfinite(stats["input_i"]):
+        return None
+    gain = min(cfg["target_i"] - stats["input_i"], cfg["max_gain_db"])
+    if abs(gain) < cfg["min_gain_db"]:
+        return None
+    chain = f"volume={gain:.2f}dB"
+    if stats["input_tp"] + gain > cfg["target_tp"]:
+        chain += f",alimiter=limit={10 ** (cfg['target_tp'] / 20):.4f}:level=false:latency=true"
+    return chain
+
+
+def apply_audio_filters(labels: List[str], filters: Optional[List[Optional[str]]]) -> Tuple[str, List[str]]:
+    """
+    Inserts per-input audio filter chains in front of a concat filter.
+
+    Args:
+        labels: Audio pad per input, e.g. ["[0:a]", "[1:a]"]
+        filters: Chain per input (None: unchanged), or None for none at all
+
+    Returns:
+        (filter chains ending in ";" or "", audio pad per input to use instead)
+    """
+    chains = ""
+    filtered = list(labels)
+    for i, chain in enumerate(filters or []):
+        if chain:
+            chains += f"{labels[i]}{chain}[ln{i}];"
+            filtered[i] = f"[ln{i}]"
+    return chains, filtered
+
+
+def job_loudness_filters(payload: Dict[str, Any]) -> Tuple[List[Optional[str]], List[Optional[str]]]:
+    """
+    Returns the loudness filter of every segment and of the intro/outro wrappers.
+
+    A segment's audio comes from its doctor video (podcast), its audio
+    overlay, or the constant itself. Sources are measured in parallel (once,
+    see get_loudness); a failed measurement leaves that segment unchanged.
+
+    Args:
+        payload: Stitching payload
+
+    Returns:
+        (filter per segment, [intro filter, outro filter] or [] without wrappers)
+    """
+    actor_urls, doctor_urls, _ = job_segment_urls(payload)
+    overlay_urls = {item["segment_index"]: item["audio_path"] for item in payload.get("audio_overlays", [])}
+    sources = []
+    for i, url in enumerate(actor_urls):
+        if doctor_urls[i]:
+            sources.append((doctor_urls[i], get_doctor_loudness))
+        else:
+            sources.append((overlay_urls.get(i, url), get_loudness))
+    wrappers = [payload[key] for key in ("final_intro_path", "final_outro_path") if payload.get(key)]
+    if len(wrappers) == 2:
+        sources += [(url, get_loudness) for url in wrappers]
+    if not LOUDNESS_CONFIG["enabled"]:
+        filters = [None] * len(sources)
+    else:
+        def measure(source: Tuple[str, Callable[[str], Optional[Dict[str, float]]]]) -> Optional[str]:
+            url, getter = source
+            try:
+                return loudness_filter(getter(url))
+            except Exception as e:
+                logger.warning(f"⚠️ Loudness measurement failed for {url}, level left as is: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=PREFLIGHT_CONFIG["max_workers"], thread_name_prefix="loudness") as pool:
+            filters = map_with_context(pool, measure, sources)
+        gains = [chain.split(",")[0].replace("volume=", "") if chain else "0dB" for chain in filters]
+        logger.info(f"Loudness: segment gains {', '.join(gains)} (target {LOUDNESS_CONFIG['target_i']:g} LUFS)")
+    return filters[:len(actor_urls)], filters[len(actor_urls):]
+
+
+# ==============================================================================
+# INPUT PREFLIGHT
+# ==============================================================================
+
+class PreflightError(Exception):
+    """Raised when one or more inputs cannot be used. Carries structured issues."""
+
+    def __init__(self, issues: List[Dict[str, Any]]):
+        self.issues = issues
+        summary = "; ".join(f"{i['input']}: {i['reason']}" for i in issues)
+        super().__init__(f"Preflight failed: {summary}")
+
+
+def probe_media_cmd(file_path: str) -> List[str]:
+    """Builds the ffprobe command behind probe_media()."""
+    return [
+        "ffprobe", "-v", "error",
+        "-show_entries",
+        "format=duration:stream=codec_type,codec_name,width,height,pix_fmt,r_frame_rate,avg_frame_rate,"
+        "sample_aspect_ratio,channels,channel_layout,sample_rate,duration",
+        "-of", "json",
+        file_path
+    ]
+
+
+def test_decode_cmd(file_path: str, role: str) -> List[str]:
+    """Builds the preflight test decode of the streams a role uses."""
+    rules = PREFLIGHT_CONFIG["roles"][role]
+    cmd = ["ffmpeg", "-v", "error", "-xerror", "-i", file_path]
+    if rules["video"]:
+        cmd += ["-map", "0:v:0"]
+    if rules["audio"]:
+        cmd += ["-map", "0:a:0"]
+    return cmd + ["-t", str(PREFLIGHT_CONFIG["decode_seconds"]), "-f", "null", "-"]
+
+
+def probe_media(file_path: str) -> Dict[str, Any]:
+    """
+    Returns ffprobe's format and stream information for a file.
+
+    Args:
+        file_path: Path to the media file
+
+    Returns:
+        Parsed ffprobe JSON ({"format": {...}, "streams": [...]})
+
+    Raises:
+        subprocess.CalledProcessError: If ffprobe cannot read the file
+    """
+    cmd = probe_media_cmd(file_path)
+    result = run_measured(cmd, timeout=PREFLIGHT_CONFIG["timeout"], description="Probing input")
+    if result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, cmd, output=result.stdout, stderr=result.stderr)
+    return json.loads(result.stdout or "{}")
+
+
+def preflight_input(role: str, label: str, file_path: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    Checks one input against the rules for its role.
+
+    Args:
+        role: Key of PREFLIGHT_CONFIG["roles"]
+        label: Human-readable input name for the failure report
+        file_path: Local path of the downloaded input (None if the download failed)
+
+    Returns:
+        List of issues ({"input", "code", "reason"}); empty if the input is usable
+    """
+    rules = PREFLIGHT_CONFIG["roles"][role]
+
+    def issue(code: str, reason: str) -> List[Dict[str, Any]]:
+        # FFmpeg prefixes messages with the (cache) path, which means nothing to the backend
+        reason = reason.replace(f"{file_path}: ", "") if file_path else reason
+        return [{"input": label, "role": role, "code": code, "reason": reason}]
+
+    if file_path is None:
+        return issue("download_failed", "could not be downloaded")
+    if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+        return issue("empty_file", "file is missing or zero-length")
+
+    try:
+        info = probe_media(file_path)
+    except subprocess.TimeoutExpired:
+        return issue("probe_timeout", "ffprobe timed out")
+    except subprocess.CalledProcessError as e:
+        return issue("unreadable", (e.stderr or "ffprobe failed").strip().splitlines()[-1])
+
+    metrics = _current_job.get()
+    if metrics is not None:
+        metrics.add_input(role, label, info)
+
+    streams = info.get("streams", [])
+    video = next((st for st in streams if st.get("codec_type") == "video"), None)
+    audio = next((st for st in streams if st.get("codec_type") == "audio"), None)
+
+    issues = []
+    if rules["video"] and video is None:
+        issues += issue("no_video_stream", "no video stream")
+    if rules["audio"]:
+        if audio is None:
+            issues += issue("no_audio_stream", "no audio stream")
+        elif not int(audio.get("channels") or 0) or not int(audio.get("sample_rate") or 0):
+            issues += issue(
+                "bad_audio_layout",
+                f"audio has {audio.get('channels')} channels at {audio.get('sample_rate')} Hz"
+            )
+
+    if rules["max_duration"] is not None:
+        try:
+            duration = float(info.get("format", {}).get("duration"))
+        except (TypeError, ValueError):
+            duration = 0.0
+        if duration < PREFLIGHT_CONFIG["min_duration"]:
+            issues += issue("too_short", f"duration {duration:.2f}s is below {PREFLIGHT_CONFIG['min_duration']}s")
+        elif duration > rules["max_duration"]:
+            issues += issue("too_long", f"duration {duration:.0f}s exceeds {rules['max_duration']}s")
+
+    if issues:
+        return issues
+
+    # Decode the start of every stream we will use - catches files whose
+    # headers parse but whose payload is garbage (or uses an unsupported codec)
+    cmd = test_decode_cmd(file_path, role)
+    try:
+        result = run_measured(cmd, timeout=PREFLIGHT_CONFIG["timeout"], description="Test decode")
+    except subprocess.TimeoutExpired:
+        return issue("decode_timeout", "test decode timed out")
+    if result.returncode != 0:
+        return issue("undecodable", (result.stderr or "decode failed").strip().splitlines()[-1])
+
+    return []
+
+
+@timed_stage("preflight")
+def preflight_inputs(inputs: List[Tuple[str, str, Optional[str]]]) -> None:
+    """
+    Probes all inputs concurrently and fails fast if any of them is unusable.
+
+    Args:
+        inputs: (role, label, local path) per input
+
+    Raises:
+        PreflightError: With every issue found, not just the first
+    """
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=PREFLIGHT_CONFIG["max_workers"], thread_name_prefix="preflight") as pool:
+        results = map_with_context(pool, lambda item: preflight_input(*item), inputs)
+
+    issues = [i for result in results for i in result]
+    logger.info(f"Preflight checked {len(inputs)} inputs in {time.time() - start:.2f}s")
+    if issues:
+        for i in issues:
+            logger.error(f"❌ Preflight: {i['input']} ({i['code']}): {i['reason']}")
+        raise PreflightError(issues)
+
+
+# ==============================================================================
+# FFMPEG UTILITY FUNCTIONS
+# ==============================================================================
+
+def get_media_duration(file_path: str) -> float:
+    """
+    Gets the duration of a media file in seconds using ffprobe.
+
+    Args:
+        file_path: Path to the video/audio file
+
+    Returns:
+        float: Duration in seconds, or 0.0 if detection fails
+    """
+    try:
+        cmd = [
+            "ffprobe",
+            "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            file_path
+        ]
+        result = run_measured(cmd, timeout=30, description="Probing duration")
+        duration = float(result.stdout.strip())
+        logger.debug(f"Duration of {os.path.basename(file_path)}: {duration:.2f}s")
+        return duration
+
+    except (ValueError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"Could not get duration for {file_path}: {e}")
+        return 0.0
+
+
+def run_ffmpeg(cmd: List[str], description: str = "FFmpeg operation") -> bool:
+    """
+    Executes an FFmpeg command with proper error handling and logging.
+
+    Args:
+        cmd: List of command arguments for FFmpeg
+        description: Human-readable description for logging
+
+    Returns:
+        bool: True if successful, False otherwise
+
+    Raises:
+        subprocess.CalledProcessError: If FFmpeg fails
+    """
+    logger.info(f"Executing: {description}")
+    logger.debug(f"Command: {' '.join(cmd)}")
+
+    try:
+        result = run_measured(
+            cmd,
+            timeout=1200,  # 20 minute timeout for long operations
+            description=description
+        )
+
+        if result.returncode != 0:
+            logger.error(f"FFmpeg error: {result.stderr}")
+            raise subprocess.CalledProcessError(result.returncode, cmd, result.stderr)
+
+        return True
+
+    except subprocess.TimeoutExpired:
+        logger.error(f"FFmpeg timeout for: {description}")
+        raise
+
+
+def standard_scale_filter() -> str:
+    """
+    Returns the scale+pad filter that fits any input into the standard frame.
+
+    Returns:
+        str: Filter chain (scale, pad, setsar) for VIDEO_CONFIG dimensions
+    """
+    cfg = VIDEO_CONFIG
+    return (
+        f"scale={cfg['width']}:{cfg['height']}:"
+        "force_original_aspect_ratio=decrease,"
+        f"pad={cfg['width']}:{cfg['height']}:(ow-iw)/2:(oh-ih)/2,"
+        "setsar=1"
+    )
+
+
+def encoder_profile(name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Returns an encoder profile from ENCODER_PROFILES.
+
+    Args:
+        name: Profile name (default: the current job's profile, else VIDEO_CONFIG["profile"])
+
+    Raises:
+        ValueError: If the profile does not exist
+    """
+    name = name or _job_profile.get() or VIDEO_CONFIG['profile']
+    if name not in ENCODER_PROFILES:
+        raise ValueError(f"Unknown encoder profile: {name} (known: {', '.join(ENCODER_PROFILES)})")
+    return ENCODER_PROFILES[name]
+
+
+def video_encode_args(crf: Optional[int] = None) -> List[str]:
+    """
+    Returns the standard video encoder arguments (VIDEO_CONFIG + encoder profile).
+
+    Inside using_constant_mezzanine() the output is the constant mezzanine
+    format (CONSTANT_MEZZANINE_CONFIG) with the profile's preset.
+
+    Args:
+        crf: Overrides the profile's CRF (e.g. for intermediates encoded again later)
+    """
+    cfg = VIDEO_CONFIG
+    profile = encoder_profile()
+    mezzanine = CONSTANT_MEZZANINE_CONFIG if _constant_mezzanine.get() else None
+    if mezzanine:
+        crf = mezzanine['crf'] if crf is None else crf
+        profile = dict(profile, tune=mezzanine['tune'])
+    args = [
+        "-c:v", cfg['codec'],
+        "-preset", profile['preset'],
+        "-crf", str(profile['crf'] if crf is None else crf),
+    ]
+    if profile.get('tune'):
+        args += ["-tune", profile['tune']]
+    if mezzanine:
+        # Fixed GOP: an IDR exactly every gop_frames, no reordering
+        gop = str(mezzanine['gop_frames'])
+        args += ["-bf", "0", "-g", gop, "-keyint_min", gop, "-sc_threshold", "0"]
+    threads = profile.get('threads') or _encode_threads.get()
+    if threads:
+        args += ["-threads", str(threads)]
+    return args + ["-pix_fmt", cfg['pix_fmt']]
+
+
+def audio_encode_args(bitrate: Optional[str] = None) -> List[str]:
+    """
+    Returns the standard audio encoder arguments from VIDEO_CONFIG.
+
+    Args:
+        bitrate: Overrides VIDEO_CONFIG["audio_bitrate"] (e.g. for mobile renditions)
+    """
+    cfg = VIDEO_CONFIG
+    return [
+        "-c:a", cfg['audio_codec'],
+        "-ar", str(cfg['audio_rate']),
+        "-ac", str(cfg['audio_channels']),
+        "-b:a", bitrate or cfg['audio_bitrate'],
+    ]
+
+
+# ==============================================================================
+# OUTPUT RENDITIONS
+# ==============================================================================
+
+def job_renditions(payload: Dict[str, Any]) -> List[str]:
+    """Returns the rendition names a job encodes next to its master (see RENDITION_CONFIG)."""
+    if job_proxy(payload):
+        return []
+    renditions = payload.get("renditions")
+    return list(RENDITION_CONFIG["default"] if renditions is None else renditions)
+
+
+def validate_renditions(renditions: Any) -> None:
+    """
+    Checks a payload "renditions" value.
+
+    Raises:
+        ValueError: If it is not a list of RENDITION_CONFIG["ladder"] names
+    """
+    if not isinstance(renditions, list):
+        raise ValueError("renditions must be a list")
+    unknown = [name for name in renditions if name not in RENDITION_CONFIG["ladder"]]
+    if unknown:
+        raise ValueError(f"Unknown renditions {unknown} (known: {', '.join(RENDITION_CONFIG['ladder'])})")
+
+
+def rendition_size(name: str) -> Tuple[int, int]:
+    """Returns (width, height) of a rendition: the ladder height at the master's aspect, even width."""
+    return scaled_size(height=RENDITION_CONFIG["ladder"][name]["height"])
+
+
+def rendition_path(path: str, name: str) -> str:
+    """Returns where a rendition of path goes (local file or upload URL): <base>_<name><ext>."""
+    base, ext = os.path.splitext(path)
+    return f"{base}_{name}{ext or '.mp4'}"
+
+
+def rendition_pixel_ratio(renditions: List[str]) -> float:
+    """Pixels the renditions encode relative to the master (extra encode cost, roughly)."""
+    master = VIDEO_CONFIG["width"] * VIDEO_CONFIG["height"]
+    return sum(width * height for width, height in map(rendition_size, renditions)) / master
+
+
+def job_proxy(payload: Dict[str, Any]) -> bool:
+    """Whether a job is a low-resolution QC proxy render (payload "proxy", see PROXY_CONFIG)."""
+    return bool(payload.get("proxy"))
+
+
+def proxy_path(path: str) -> str:
+    """Returns where the proxy render of path goes (local file or upload URL): <base>_proxy<ext>."""
+    base, ext = os.path.splitext(path)
+    return f"{base}{PROXY_CONFIG['suffix']}{ext or '.mp4'}"
+
+
+def proxy_size() -> Tuple[int, int]:
+    return PROXY_CONFIG["width"], PROXY_CONFIG["height"]
+
+
+# ==============================================================================
+# HLS PACKAGING
+# ==============================================================================
+
+def job_hls(payload: Dict[str, Any]) -> bool:
+    """Whether a job packages its final encode as HLS (payload "hls", else HLS_CONFIG)."""
+    if job_proxy(payload):
+        return False
+    hls = payload.get("hls")
+    return HLS_CONFIG["enabled"] if hls is None else bool(hls)
+
+
+def hls_dir_for(path: str) -> str:
+    """Returns the HLS package directory (or upload prefix) of an MP4 path: <base>_hls."""
+    return os.path.splitext(path)[0] + "_hls"
+
+
+def hls_variants(renditions: List[str]) -> List[str]:
+    """Returns the variants packaged as HLS: "master" plus, per HLS_CONFIG, the renditions."""
+    return ["master"] + (list(renditions) if HLS_CONFIG["renditions"] else [])
+
+
+def tee_escape(value: str, option: bool = False) -> str:
+    """Escapes a tee muxer slave filename, or (twice, it is parsed twice) a slave option value."""
+    escaped = re.sub(r"([\\:|\[\]'])", r"\\\1", value)
+    return tee_escape(escaped) if option else escaped
+
+
+def output_target_args(path: str, variant: str, hls_dir: Optional[str], faststart: bool) -> List[str]:
+    """
+    Returns the output arguments of one final-encode variant.
+
+    Without HLS this is just the MP4 path. With HLS the encoded streams go
+    through the tee muxer into the MP4 and into fMP4 segments plus a media
+    playlist at <hls_dir>/<variant>/index.m3u8, without encoding twice.
+    """
+    mp4_options = "f=mp4:movflags=+faststart" if faststart else "f=mp4"
+    if not hls_dir:
+        return (["-movflags", "+faststart"] if faststart else []) + [path]
+
+    variant_dir = os.path.join(hls_dir, variant)
+    hls_options = ":".join([
+        "f=hls",
+        "select=v,a",  # Text tracks go to the MP4 only (HLS gets a WebVTT rendition)
+        f"hls_time={HLS_CONFIG['segment_seconds']}",
+        "hls_playlist_type=vod",
+        "hls_segment_type=fmp4",
+        "hls_flags=independent_segments",
+        "hls_fmp4_init_filename=init.mp4",
+        f"hls_segment_filename={tee_escape(os.path.join(variant_dir, 'seg_%05d.m4s'), option=True)}",
+        "onfail=abort",
+    ])
+    return [
+        "-flags", "+global_header",  # The tee muxer cannot ask its slaves for it
+        "-f", "tee",
+        f"[{mp4_options}]{tee_escape(path)}|[{hls_options}]{tee_escape(os.path.join(variant_dir, 'index.m3u8'))}",
+    ]
+
+
+def hls_keyframe_expr(offset: float = 0.0) -> str:
+    """Returns the -force_key_frames expression for HLS segment starts (offset: where the encode starts)."""
+    seconds = HLS_CONFIG["segment_seconds"]
+    if not offset:
+        return f"expr:gte(t,n_forced*{seconds})"
+    first = math.ceil(round(offset / seconds, 6))
+    return f"expr:gte(t+{offset:.3f},({first}+n_forced)*{seconds})"
+
+
+def prepare_hls_dir(hls_dir: str, variants: List[str]) -> None:
+    """Creates an empty HLS package directory (the hls muxer does not create it)."""
+    shutil.rmtree(hls_dir, ignore_errors=True)
+    for variant in variants:
+        os.makedirs(os.path.join(hls_dir, variant))
+
+
+def h264_codecs(path: str) -> Optional[str]:
+    """Returns the RFC 6381 CODECS string (avc1 + AAC-LC) of an MP4, or None if unknown."""
+    result = run_measured([
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=profile,level", "-of", "json", path
+    ], timeout=30, description="Probing codec")
+    try:
+        stream = json.loads(result.stdout)["streams"][0]
+    except (ValueError, KeyError, IndexError):
+        return None
+    profile_idc = {"Baseline": 0x42, "Constrained Baseline": 0x42, "Main": 0x4D, "High": 0x64}.get(stream.get("profile"))
+    if not profile_idc or not stream.get("level"):
+        return None
+    return f"avc1.{profile_idc:02x}00{int(stream['level']):02x},mp4a.40.2"
+
+
+def write_hls_master_playlist(hls_dir: str, variants: Dict[str, str], subtitle_track: Optional[str] = None) -> str:
+    """
+    Writes master.m3u8 for the packaged variants.
+
+    BANDWIDTH is the peak segment bitrate and AVERAGE-BANDWIDTH the mean
+    over the whole media playlist, both from the segments on disk. A soft
+    subtitle track is added as a WebVTT rendition (subtitles/index.m3u8,
+    one segment covering the whole video) referenced by every variant.
+
+    Args:
+        hls_dir: HLS package directory
+        variants: Variant name -> its MP4 (for resolution and codecs)
+        subtitle_track: WebVTT file (see merge_segment_subtitles), None for none
+
+    Returns:
+        str: Path to master.m3u8
+    """
+    entries = []
+    total_seconds = 0.0
+    for variant, mp4_path in variants.items():
+        variant_dir = os.path.join(hls_dir, variant)
+        segments = []  # (seconds, bytes)
+        with open(os.path.join(variant_dir, "index.m3u8"), encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+        for line, uri in zip(lines, lines[1:]):
+            if line.startswith("#EXTINF:"):
+                segments.append((float(line[8:].split(",")[0]), os.path.getsize(os.path.join(variant_dir, uri))))
+        seconds = sum(duration for duration, _ in segments) or 1.0
+        total_seconds = max(total_seconds, seconds)
+        peak = max((8 * size / duration for duration, size in segments if duration > 0), default=0.0)
+        width, height = (VIDEO_CONFIG["width"], VIDEO_CONFIG["height"]) if variant == "master" else rendition_size(variant)
+        attributes = [
+            f"BANDWIDTH={int(peak)}",
+            f"AVERAGE-BANDWIDTH={int(8 * sum(size for _, size in segments) / seconds)}",
+            f"RESOLUTION={width}x{height}",
+            f"FRAME-RATE={VIDEO_CONFIG['fps']:.3f}",
+        ]
+        codecs = h264_codecs(mp4_path)
+        if codecs:
+            attributes.append(f'CODECS="{codecs}"')
+        if subtitle_track:
+            attributes.append('SUBTITLES="subs"')
+        entries.append((variant, attributes))
+
+    if subtitle_track:
+        subtitle_dir = os.path.join(hls_dir, "subtitles")
+        os.makedirs(subtitle_dir, exist_ok=True)
+        shutil.copy(subtitle_track, os.path.join(subtitle_dir, "subtitles.vtt"))
+        with open(os.path.join(subtitle_dir, "index.m3u8"), "w", encoding="utf-8") as f:
+            f.write(f"#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:{math.ceil(total_seconds)}\n"
+                    f"#EXT-X-PLAYLIST-TYPE:VOD\n#EXTINF:{total_seconds:.3f},\nsubtitles.vtt\n#EXT-X-ENDLIST\n")
+
+    # Players start with the first variant listed
+    entries.sort(key=lambda entry: entry[0] != HLS_CONFIG["start_variant"])
+    master_path = os.path.join(hls_dir, "master.m3u8")
+    with open(master_path, "w", encoding="utf-8") as f:
+        f.write("#EXTM3U\n#EXT-X-VERSION:7\n#EXT-X-INDEPENDENT-SEGMENTS\n")
+        if subtitle_track:
+            cfg = SOFT_SUBTITLE_CONFIG
+            f.write(f'#EXT-X-MEDIA:TYPE=SUBTITLES,GROUP-ID="subs",NAME="{cfg["name"]}",'
+                    f'LANGUAGE="{cfg["hls_language"]}",DEFAULT=YES,AUTOSELECT=YES,URI="subtitles/index.m3u8"\n')
+        for variant, attributes in entries:
+            f.write(f"#EXT-X-STREAM-INF:{','.join(attributes)}\n{variant}/index.m3u8\n")
+    return master_path
+
+
+def upload_directory(local_dir: str, destination_prefix: str) -> List[str]:
+    """
+    Uploads every file under local_dir to destination_prefix/<relative path>.
+
+    Args:
+        local_dir: Directory to upload
+        destination_prefix: GCS prefix (gs://bucket/path); other destinations
+                            are returned as-is, like upload_file()
+
+    Returns:
+        List[str]: Public URLs (or destinations) in the order of the relative paths
+    """
+    files = sorted(
+        os.path.relpath(os.path.join(root, name), local_dir)
+        for root, _, names in os.walk(local_dir) for name in names
+    )
+    destinations = [f"{destination_prefix}/{rel_path.replace(os.sep, '/')}" for rel_path in files]
+    if not destination_prefix.startswith("gs://"):
+        logger.warning(f"Non-GCS destination, returning as-is: {destination_prefix}")
+        return destinations
+    with ThreadPoolExecutor(max_workers=HLS_CONFIG["upload_workers"], thread_name_prefix="upload") as pool:
+        return map_with_context(
+            pool, lambda pair: upload_file(os.path.join(local_dir, pair[0]), pair[1]), list(zip(files, destinations))
+        )
+
+
+# ==============================================================================
+# PREVIEWS (POSTER, SPRITE SHEET, PREVIEW CLIP)
+# ==============================================================================
+
+def job_previews(payload: Dict[str, Any]) -> bool:
+    """Whether a job emits poster/sprite/preview (payload "previews", else PREVIEW_CONFIG)."""
+    if job_proxy(payload):
+        return False
+    previews = payload.get("previews")
+    return PREVIEW_CONFIG["enabled"] if previews is None else bool(previews)
+
+
+def preview_path(path: str, kind: str) -> str:
+    """Returns where a preview output of path goes (local file or upload URL), see PREVIEW_OUTPUTS."""
+    return os.path.splitext(path)[0] + PREVIEW_OUTPUTS[kind]
+
+
+def scaled_size(width: Optional[int] = None, height: Optional[int] = None) -> Tuple[int, int]:
+    """Returns the master's aspect at the given width or height (the other side rounded to even)."""
+    cfg = VIDEO_CONFIG
+    if width:
+        return width, int(round(cfg["height"] * width / cfg["width"] / 2)) * 2
+    return int(round(cfg["width"] * height / cfg["height"] / 2)) * 2, height
+
+
+def preview_times(
+    segment_seconds: List[float],
+    first_podcast: Optional[int],
+    intro_seconds: float = 0.0,
+    outro_seconds: float = 0.0
+) -> Dict[str, float]:
+    """
+    Places the previews on the final video's timeline.
+
+    Args:
+        segment_seconds: Duration of each segment, in order
+        first_podcast: Index of the first podcast segment (None: the poster is taken near the start)
+        intro_seconds: Final intro wrapper duration (0 without wrappers)
+        outro_seconds: Final outro wrapper duration
+
+    Returns:
+        {"total_seconds", "poster_seconds", "preview_start", "preview_seconds", "sprite_interval"}
+    """
+    cfg = PREVIEW_CONFIG
+    total = intro_seconds + sum(segment_seconds) + outro_seconds
+    start = intro_seconds + sum(segment_seconds[:first_podcast or 0])
+    segment = segment_seconds[first_podcast] if first_podcast is not None else total
+    preview_seconds = min(cfg["preview_seconds"], total)
+    return {
+        "total_seconds": total,
+        "poster_seconds": start + min(cfg["poster_offset"], segment / 2),
+        "preview_start": max(0.0, min(start, total - preview_seconds)),
+        "preview_seconds": preview_seconds,
+        "sprite_interval": max(cfg["sprite_interval"], total / (cfg["sprite_columns"] * cfg["sprite_rows"])),
+    }
+
+
+def preview_outputs(
+    output_path: str,
+    previews: Dict[str, float],
+    video_labels: List[str],
+    audio_label: str
+) -> Tuple[str, List[str]]:
+    """
+    Returns the filter chains and output arguments of the preview outputs.
+
+    Args:
+        output_path: Final MP4 (previews are written next to it)
+        previews: preview_times() result
+        video_labels: Three split video pads (poster, sprite, preview)
+        audio_label: Split audio pad for the preview clip
+
+    Returns:
+        Tuple: (filter chains to append to the filtergraph, output arguments)
+    """
+    cfg = PREVIEW_CONFIG
+    poster_in, sprite_in, clip_in = video_labels
+    poster_width, poster_height = scaled_size(width=cfg["poster_width"])
+    thumb_width, thumb_height = scaled_size(width=cfg["sprite_width"])
+    clip_width, clip_height = scaled_size(height=cfg["preview_height"])
+    start, seconds = previews["preview_start"], previews["preview_seconds"]
+    chains = [
+        f"{poster_in}trim=start={previews['poster_seconds']:.3f}:duration={1 / VIDEO_CONFIG['fps']:.3f},"
+        "setpts=PTS-STARTPTS,"
+        f"scale={poster_width}:{poster_height}[poster]",
+        f"{sprite_in}fps=1/{previews['sprite_interval']:.3f},scale={thumb_width}:{thumb_height},"
+        f"tile={cfg['sprite_columns']}x{cfg['sprite_rows']}[sprite]",
+        f"{clip_in}trim=start={start:.3f}:duration={seconds:.3f},setpts=PTS-STARTPTS,"
+        f"scale={clip_width}:{clip_height}[clip_v]",
+        f"{audio_label}atrim=start={start:.3f}:duration={seconds:.3f},asetpts=PTS-STARTPTS[clip_a]",
+    ]
+    args = [
+        "-map", "[poster]", "-frames:v", "1", "-q:v", "2", "-update", "1", preview_path(output_path, "poster"),
+        # One sheet: the last, partial one is flushed at the end of the video
+        "-map", "[sprite]", "-frames:v", "1", "-q:v", "4", "-update", "1", preview_path(output_path, "sprite"),
+        "-map", "[clip_v]", "-map", "[clip_a]",
+    ] + video_encode_args(crf=cfg["preview_crf"]) + [
+        "-r", str(VIDEO_CONFIG['fps']),
+    ] + audio_encode_args(cfg["preview_audio_bitrate"]) + [
+        "-movflags", "+faststart",
+        preview_path(output_path, "preview"),
+    ]
+    return ";".join(chains), args
+
+
+def preview_cost_ratio(previews: Optional[Dict[str, float]]) -> float:
+    """Preview clip encode cost relative to the master encode (poster and sprite are negligible)."""
+    if not previews or not previews["total_seconds"]:
+        return 0.0
+    width, height = scaled_size(height=PREVIEW_CONFIG["preview_height"])
+    pixels = width * height / (VIDEO_CONFIG["width"] * VIDEO_CONFIG["height"])
+    return pixels * previews["preview_seconds"] / previews["total_seconds"]
+
+
+def write_sprite_vtt(vtt_path: str, sprite_name: str, previews: Dict[str, float]) -> str:
+    """
+    Writes the WebVTT thumbnail index of the sprite sheet (player scrubbing previews).
+
+    Args:
+        vtt_path: Where to write the .vtt
+        sprite_name: Sprite URL as referenced from the .vtt (relative: uploaded side by side)
+        previews: preview_times() result
+
+    Returns:
+        str: vtt_path
+    """
+    cfg = PREVIEW_CONFIG
+    width, height = scaled_size(width=cfg["sprite_width"])
+    interval = previews["sprite_interval"]
+    count = min(cfg["sprite_columns"] * cfg["sprite_rows"], math.ceil(previews["total_seconds"] / interval))
+
+    with open(vtt_path, "w", encoding="utf-8") as f:
+        f.write("WEBVTT\n")
+        for n in range(count):
+            x, y = n % cfg["sprite_columns"] * width, n // cfg["sprite_columns"] * height
+            end = min((n + 1) * interval, previews["total_seconds"])
+            f.write(f"\n{format_vtt_timestamp(n * interval)} --> {format_vtt_timestamp(end)}\n{sprite_name}#xywh={x},{y},{width},{height}\n")
+    return vtt_path
+
+
+# ==============================================================================
+# CHUNKED PARALLEL ENCODING
+# ==============================================================================
+
+def parallel_encodes() -> int:
+    """Returns how many encodes the machine can run side by side at full speed (1 = no chunking)."""
+    cfg = CHUNKED_ENCODE_CONFIG
+    if not cfg["enabled"]:
+        return 1
+    cores = cfg["cores"]
+    if not cores:
+        try:
+            cores = len(os.sched_getaffinity(0))
+        except AttributeError:
+            cores = os.cpu_count() or 1
+    return max(1, min(cfg["max_chunks"], cores // cfg["cores_per_encode"]))
+
+
+def encode_chunk_count(seconds: float) -> int:
+    """Returns how many chunks an encode of `seconds` is split into (1 = one encode)."""
+    return max(1, min(parallel_encodes(), int(seconds // CHUNKED_ENCODE_CONFIG["min_chunk_seconds"])))
+
+
+def chunk_ranges(durations: List[float], chunks: int) -> List[Tuple[int, int]]:
+    """
+    Groups consecutive inputs into at most `chunks` ranges of similar duration.
+
+    Args:
+        durations: Seconds per input, in order
+        chunks: Wanted number of ranges
+
+    Returns:
+        List of (first index, end index) covering every input once, in order
+    """
+    total = sum(durations)
+    ranges = []
+    start = 0
+    elapsed = 0.0
+    for i, seconds in enumerate(durations[:-1]):
+        elapsed += seconds
+        # Close the range once it holds its share of the timeline
+        if len(ranges) < chunks - 1 and elapsed >= total * (len(ranges) + 1) / chunks:
+            ranges.append((start, i + 1))
+            start = i + 1
+    ranges.append((start, len(durations)))
+    return ranges
+
+
+def chunk_path(path: str, chunk: Any) -> str:
+    """Returns the file of one chunk of an encode of path: <base>_chunk<n><ext>."""
+    root, ext = os.path.splitext(path)
+    return f"{root}_chunk{chunk}{ext}"
+
+
+def write_concat_list(list_path: str, entries: List[Tuple[str, Optional[float]]]) -> str:
+    """
+    Writes a concat demuxer list.
+
+    Args:
+        list_path: Where to write the list
+        entries: (file, duration) per chunk; a duration makes the demuxer
+                 place the next file there instead of after the longest stream
+
+    Returns:
+        str: list_path
+    """
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path, duration in entries:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+            if duration:
+                f.write(f"duration {duration:.6f}\n")
+    return list_path
+
+
+def run_ffmpeg_parallel(jobs: List[Tuple[List[str], str]]) -> None:
+    """Runs FFmpeg commands side by side in the caller's job context; raises the first failure."""
+    with ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="chunk") as pool:
+        map_with_context(pool, lambda job: run_ffmpeg(*job), jobs)
+
+
+def remove_files(paths: List[str]) -> None:
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def keyframe_times(path: str) -> List[float]:
+    """Returns the times of the video keyframes of a file (packet flags only, nothing is decoded)."""
+    result = run_measured([
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", path
+    ], timeout=60, description="Probing keyframes")
+    times = []
+    for line in result.stdout.splitlines():
+        pts, _, flags = line.partition(",")
+        if "K" in flags and pts not in ("", "N/A"):
+            times.append(float(pts))
+    return sorted(times)
+
+
+def standardize_chunk_ranges(keyframes: List[float], seconds: float, chunks: int) -> List[Tuple[float, Optional[float]]]:
+    """
+    Splits a standardize encode into time ranges starting at source keyframes.
+
+    Seeking to a keyframe decodes nothing twice. Boundaries are rounded to
+    the output frame grid so every range has a whole number of frames.
+
+    Args:
+        keyframes: keyframe_times() of the source (empty: even split)
+        seconds: Source duration
+        chunks: Wanted number of ranges
+
+    Returns:
+        List of (start seconds, duration or None for the rest), in order
+    """
+    fps = VIDEO_CONFIG["fps"]
+    boundaries = [0.0]
+    for k in range(1, chunks):
+        target = seconds * k / chunks
+        point = round(min(keyframes, key=lambda t: abs(t - target), default=target) * fps) / fps
+        if boundaries[-1] < point < seconds:
+            boundaries.append(point)
+    ends = boundaries[1:] + [None]
+    return [(start, None if end is None else end - start) for start, end in zip(boundaries, ends)]
+
+
+def standardize_chunk_cmd(input_path: str, output_path: str, start: float, seconds: Optional[float]) -> List[str]:
+    """
+    Builds the video-only standardize encode of one time range (the join encodes the audio).
+
+    The frame rate is converted by the fps filter, which picks the source
+    frame nearest to every output frame: the same frames whichever chunk
+    they fall in, where -r alone would depend on the frames before.
+    """
+    cfg = VIDEO_CONFIG
+    cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "warning"]
+    if start:
+        cmd += ["-ss", f"{start:.3f}"]
+    cmd += ["-i", input_path, "-vf", f"{standard_scale_filter()},fps={cfg['fps']}",
+            "-r", str(cfg['fps'])] + video_encode_args()
+    if seconds is not None:
+        # Whole frames per range, so the joined video keeps the source timeline
+        cmd += ["-frames:v", str(round(seconds * cfg['fps']))]
+    return cmd + ["-an", output_path]
+
+
+def standardize_join_cmd(list_path: str, input_path: str, output_path: str) -> List[str]:
+    """Builds the join of standardized chunks: video by stream copy, audio encoded from the source."""
+    cfg = VIDEO_CONFIG
+    return [
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "warning",
+        "-f", "concat", "-safe", "0", "-i", list_path,
+        "-i", input_path,
+        "-map", "0:v", "-map", "1:a?",
+        "-c:v", "copy",
+        "-c:a", cfg['audio_codec'],
+        "-ar", str(cfg['audio_rate']),
+        "-ac", str(cfg['audio_channels']),
+        "-b:a", cfg['audio_bitrate'],
+        output_path
+    ]
+
+
+def build_standardize_chunked_cmds(
+    input_path: str,
+    output_path: str,
+    seconds: float,
+    ranges: List[Tuple[float, Optional[float]]]
+) -> Tuple[List[Tuple[List[str], str, float]], List[str], str]:
+    """
+    Builds the parallel chunk encodes and the join of a chunked standardize.
+
+    Args:
+        input_path: Path to the source video
+        output_path: Path for the standardized output
+        seconds: Source duration
+        ranges: standardize_chunk_ranges() result
+
+    Returns:
+        (chunk encodes as (command, description, seconds), chunk files in
+        order, list file the join reads)
+    """
+    paths = [chunk_path(output_path, k) for k in range(1, len(ranges) + 1)]
+    list_path = os.path.splitext(chunk_path(output_path, "s"))[0] + ".txt"
+    name = os.path.basename(input_path)
+    with using_encode_threads(CHUNKED_ENCODE_CONFIG["cores_per_encode"]):
+        jobs = [
+            (standardize_chunk_cmd(input_path, path, start, length),
+             f"Standardizing video (chunk {k}/{len(ranges)}): {name}",
+             length if length is not None else seconds - start)
+            for k, (path, (start, length)) in enumerate(zip(paths, ranges), 1)
+        ]
+    return jobs, paths, list_path
+
+
+def standardize_chunked(input_path: str, output_path: str, seconds: float, chunks: int) -> str:
+    """
+    standardize_video() full re-encode as parallel chunk encodes plus a stream-copy join.
+
+    Args:
+        input_path: Path to the source video
+        output_path: Path for the standardized output
+        seconds: Source duration
+        chunks: Number of chunks (see encode_chunk_count)
+
+    Returns:
+        str: output_path
+    """
+    ranges = standardize_chunk_ranges(keyframe_times(input_path), seconds, chunks)
+    jobs, paths, list_path = build_standardize_chunked_cmds(input_path, output_path, seconds, ranges)
+    name = os.path.basename(input_path)
+    logger.info(f"Standardizing {name} in {len(ranges)} parallel chunks ({seconds:.1f}s)")
+    try:
+        run_ffmpeg_parallel([(cmd, description) for cmd, description, _ in jobs])
+        write_concat_list(list_path, [(path, None) for path in paths])
+        run_ffmpeg(standardize_join_cmd(list_path, input_path, output_path),
+                   f"Joining {len(paths)} standardized chunks (copy): {name}")
+    finally:
+        remove_files(paths + [list_path])
+    return output_path
+
+
+# ==============================================================================
+# STREAMING (PIPE/FIFO) EXECUTION
+# ==============================================================================
+
+def stream_input_args(source: str) -> List[str]:
+    """
+    Returns FFmpeg input arguments for reading a streamed intermediate.
+
+    Args:
+        source: "pipe:0" or a FIFO path written by another FFmpeg process
+
+    Returns:
+        List[str]: Input arguments (format + -i)
+    """
+    return ["-f", STREAMING_CONFIG["container"], "-i", source]
+
+
+def stream_output_args(target: str, include_audio: bool = True) -> List[str]:
+    """
+    Returns FFmpeg output arguments for writing a streamed intermediate.
+
+    Frames are written uncompressed so the next stage pays no decode cost and
+    no generation loss is introduced between stages.
+
+    Args:
+        target: "pipe:1" or a FIFO path read by another FFmpeg process
+        include_audio: Whether to carry an audio stream (PCM)
+
+    Returns:
+        List[str]: Output arguments (codecs, format and target)
+    """
+    cfg = VIDEO_CONFIG
+    scfg = STREAMING_CONFIG
+    args = ["-c:v", scfg["video_codec"], "-pix_fmt", cfg['pix_fmt']]
+    if include_audio:
+        args += [
+            "-c:a", scfg["audio_codec"],
+            "-ar", str(cfg['audio_rate']),
+            "-ac", str(cfg['audio_channels']),
+        ]
+    else:
+        args += ["-an"]
+    return args + ["-f", scfg["container"], "-y", target]
+
+
+def stream_fifo_path(directory: str, name: str) -> str:
+    """Returns the path create_stream_fifo() uses."""
+    return os.path.join(directory, f"{name}.{STREAMING_CONFIG['container']}")
+
+
+def create_stream_fifo(directory: str, name: str) -> str:
+    """
+    Creates a named pipe used to stream one segment into the final encode.
+
+    Args:
+        directory: Directory for the FIFO (the job temp dir)
+        name: Base name of the FIFO
+
+    Returns:
+        str: Path to the FIFO
+    """
+    fifo_path = stream_fifo_path(directory, name)
+    if os.path.exists(fifo_path):
+        os.remove(fifo_path)
+    os.mkfifo(fifo_path)
+    return fifo_path
+
+
+def streaming_supported() -> bool:
+    """Returns True if this platform can run the FIFO-based streaming mode."""
+    return hasattr(os, "mkfifo")
+
+
+def _start_pipeline(
+    stages: List[List[str]],
+    description: str = "FFmpeg pipeline",
+    segment: Optional[int] = None,
+    count_progress: bool = True,
+    operations: Optional[List[str]] = None
+) -> List[Tuple[subprocess.Popen, Any, List[str]]]:
+    """
+    Starts a chain of processes where each stage's stdout feeds the next stdin.
+
+    Args:
+        stages: Commands in pipeline order
+        description: Label for the resource records
+        segment: Segment number for the resource records (default: current)
+        count_progress: Count the last stage's out_time towards job progress
+            (earlier stages never count - their output is re-encoded downstream)
+        operations: Operation name per stage for the resource records
+            (default: derived from the description)
+
+    Returns:
+        List of (process, stderr file, command) tuples
+    """
+    processes = []
+    upstream = None
+    for idx, cmd in enumerate(stages):
+        is_last = idx == len(stages) - 1
+        stderr_file = tempfile.TemporaryFile()
+        popen_cmd, progress_kwargs, progress_hook = attach_progress(
+            cmd, description, counted=count_progress and is_last
+        )
+        try:
+            proc = subprocess.Popen(
+                popen_cmd,
+                stdin=upstream if upstream is not None else subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL if is_last else subprocess.PIPE,
+                stderr=stderr_file,
+                **progress_kwargs, **_background_priority_kwargs()
+            )
+        except Exception:
+            discard_progress_hook(progress_hook)
+            stderr_file.close()
+            raise
+        start_progress_reader(progress_hook)
+        proc.started_at = time.time()
+        proc.description = description
+        proc.operation = operations[idx] if operations else None
+        proc.progress_state = progress_hook[2] if progress_hook else None
+        ACTIVE_PROCESSES.inc(tool=os.path.basename(cmd[0]))
+        stage, current_segment = _current_stage.get()
+        proc.stage_tag = (stage, current_segment if segment is None else segment)
+        # Pipeline stages run concurrently, so each gets its own trace track
+        proc.trace_track = (("process", proc.pid), f"{os.path.basename(cmd[0])} {proc.pid}")
+        if upstream is not None:
+            # Close our copy so the upstream stage gets SIGPIPE if this one dies
+            upstream.close()
+        upstream = proc.stdout
+        processes.append((proc, stderr_file, cmd))
+    return processes
+
+
+def _read_stderr(stderr_file) -> str:
+    """Reads back a process stderr capture file."""
+    try:
+        stderr_file.seek(0)
+        return stderr_file.read().decode("utf-8", errors="replace")
+    except Exception:
+        return ""
+    finally:
+        stderr_file.close()
+
+
+def _wait_processes(
+    processes: List[Tuple[subprocess.Popen, Any, List[str]]],
+    description: str,
+    timeout: float = 1200
+) -> None:
+    """
+    Waits for a group of connected processes, failing fast if any of them fails.
+
+    A failed producer would otherwise leave its reader blocked on a FIFO open
+    (or produce a silently truncated output), so the first non-zero exit kills
+    the whole group.
+
+    Raises:
+        subprocess.CalledProcessError: If any process exits non-zero
+        subprocess.TimeoutExpired: If the group exceeds the timeout
+    """
+    deadline = time.time() + timeout
+    failed = None
+    try:
+        while True:
+            running = False
+            for proc, _, cmd in processes:
+                code = reap_process(proc, block=False)
+                if code is None:
+                    running = True
+                elif code != 0 and failed is None:
+                    failed = (proc, cmd)
+            if failed or not running:
+                break
+            if time.time() > deadline:
+                logger.error(f"FFmpeg timeout for: {description}")
+                raise subprocess.TimeoutExpired(processes[-1][2], timeout)
+            time.sleep(0.1)
+    finally:
+        for proc, _, _ in processes:
+            if reap_process(proc, block=False) is None:
+                proc.kill()
+                reap_process(proc)
+
+    stderr_by_proc = {id(proc): _read_stderr(err) for proc, err, _ in processes}
+    if failed:
+        for proc, _, cmd in processes:
+            if proc.returncode not in (0, None) and stderr_by_proc[id(proc)]:
+                logger.error(f"FFmpeg error ({cmd[-1]}): {stderr_by_proc[id(proc)]}")
+        proc, cmd = failed
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stderr_by_proc[id(proc)])
+
+
+def run_ffmpeg_pipeline(stages: List[List[str]], description: str = "FFmpeg pipeline") -> bool:
+    """
+    Executes FFmpeg commands chained stdout -> stdin, without intermediate files.
+
+    Every stage except the last must write to "pipe:1" and every stage except
+    the first must read from "pipe:0" (see stream_output_args/stream_input_args).
+
+    Args:
+        stages: List of FFmpeg commands in pipeline order
+        description: Human-readable description for logging
+
+    Returns:
+        bool: True if successful
+
+    Raises:
+        subprocess.CalledProcessError: If any stage fails
+    """
+    logger.info(f"Executing: {description} ({len(stages)} piped stages)")
+    for cmd in stages:
+        logger.debug(f"Command: {' '.join(cmd)}")
+
+    _wait_processes(_start_pipeline(stages, description), description)
+    return True
+
+
+def stream_stage_operation(cmd: List[str]) -> str:
+    """Returns the operation name of a streaming producer stage (for cost accounting)."""
+    if "-filter_complex_script" in cmd:
+        return "stream_composite"
+    reads_pipe = "pipe:0" in cmd
+    if reads_pipe and "1:a" in cmd:
+        return "stream_overlay_mux"
+    if reads_pipe:
+        return "stream_burn"
+    if any("setpts=" in arg for arg in cmd) or "-an" in cmd:
+        return "stream_fit"
+    return "stream_constant"
+
+
+def run_ffmpeg_fanin(
+    producers: List[List[List[str]]],
+    consumer: List[str],
+    description: str = "FFmpeg fan-in"
+) -> bool:
+    """
+    Runs several producer pipelines that write into FIFOs read by one consumer.
+
+    Used to stream every segment straight into the final concat encode. The
+    producers block on their FIFO until the consumer opens it, so memory use is
+    bounded by pipe buffers rather than segment length.
+
+    Args:
+        producers: One pipeline (list of commands) per FIFO, in consumer input order
+        consumer: FFmpeg command reading all FIFOs
+        description: Human-readable description for logging
+
+    Returns:
+        bool: True if successful
+
+    Raises:
+        subprocess.CalledProcessError: If any producer or the consumer fails
+    """
+    logger.info(f"Executing: {description} ({len(producers)} streamed inputs)")
+    processes = []
+    try:
+        for index, stages in enumerate(producers):
+            for cmd in stages:
+                logger.debug(f"Producer: {' '.join(cmd)}")
+            # Producers are accounted per consumer input (1-based); only the
+            # consumer's out_time counts towards progress
+            processes.extend(_start_pipeline(
+                stages, description, segment=index + 1, count_progress=False,
+                operations=[stream_stage_operation(cmd) for cmd in stages]
+            ))
+        logger.debug(f"Consumer: {' '.join(consumer)}")
+        processes.extend(_start_pipeline([consumer], description, operations=["stream_encode"]))
+    except Exception:
+        for proc, err, _ in processes:
+            proc.kill()
+            reap_process(proc)
+            err.close()
+        raise
+
+    _wait_processes(processes, description)
+    return True
+
+
+# FFmpeg encoder -> codec name reported by ffprobe
+ENCODER_CODEC_NAMES = {
+    "libx264": "h264",
+    "libx265": "hevc",
+    "aac": "aac",
+}
+
+
+def standard_target() -> Dict[str, Any]:
+    """Returns the stream spec that standardize_video() produces (from VIDEO_CONFIG)."""
+    cfg = VIDEO_CONFIG
+    return {
+        "codec": ENCODER_CODEC_NAMES.get(cfg['codec'], cfg['codec']),
+        "width": cfg['width'],
+        "height": cfg['height'],
+        "fps": cfg['fps'],
+        "pix_fmt": cfg['pix_fmt'],
+        "audio_codec": ENCODER_CODEC_NAMES.get(cfg['audio_codec'], cfg['audio_codec']),
+        "audio_rate": cfg['audio_rate'],
+        "audio_channels": cfg['audio_channels'],
+    }
+
+
+def _parse_rate(rate: Optional[str]) -> float:
+    """Parses an ffprobe frame rate like '25/1' (0.0 if unknown)."""
+    try:
+        num, _, den = (rate or "0/1").partition("/")
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def classify_transcode(file_path: str, target: Dict[str, Any], audio: bool = True) -> Tuple[str, List[str]]:
+    """
+    Decides how much of an input has to be re-encoded to match a target spec.
+
+    Args:
+        file_path: Path to the input
+        target: Stream spec (see standard_target())
+        audio: Whether the output carries audio (False: audio is dropped)
+
+    Returns:
+        Tuple[str, List[str]]: ("copy" | "audio" | "full", reasons for re-encoding)
+    """
+    try:
+        info = probe_media(file_path)
+    except Exception as e:
+        return "full", [f"probe failed: {e}"]
+    return transcode_decision(info, target, audio)
+
+
+def transcode_decision(info: Dict[str, Any], target: Dict[str, Any], audio: bool = True) -> Tuple[str, List[str]]:
+    """
+    classify_transcode() for already probed media.
+
+    Args:
+        info: probe_media() output
+        target: Stream spec (see standard_target())
+        audio: Whether the output carries audio (False: audio is dropped)
+
+    Returns:
+        Tuple[str, List[str]]: ("copy" | "audio" | "full", reasons for re-encoding)
+    """
+    streams = info.get("streams", [])
+    video = next((st for st in streams if st.get("codec_type") == "video"), None)
+    audio_stream = next((st for st in streams if st.get("codec_type") == "audio"), None)
+    if video is None:
+        return "full", ["no video stream"]
+
+    video_reasons = []
+    if video.get("codec_name") != target["codec"]:
+        video_reasons.append(f"codec {video.get('codec_name')} != {target['codec']}")
+    if (video.get("width"), video.get("height")) != (target["width"], target["height"]):
+        video_reasons.append(f"size {video.get('width')}x{video.get('height')} != {target['width']}x{target['height']}")
+    if video.get("pix_fmt") != target["pix_fmt"]:
+        video_reasons.append(f"pix_fmt {video.get('pix_fmt')} != {target['pix_fmt']}")
+    if video.get("sample_aspect_ratio") not in (None, "1:1", "0:1", "N/A"):
+        video_reasons.append(f"SAR {video.get('sample_aspect_ratio')}")
+    r_rate = _parse_rate(video.get("r_frame_rate"))
+    avg_rate = _parse_rate(video.get("avg_frame_rate"))
+    if abs(r_rate - target["fps"]) > 0.01 or abs(avg_rate - target["fps"]) > 0.01:
+        video_reasons.append(f"frame rate {r_rate:g}/{avg_rate:g} (r/avg) != {target['fps']} CFR")
+    if video_reasons:
+        return "full", video_reasons
+
+    if not audio:
+        return "copy", []
+
+    if audio_stream is None:
+        return "full", ["no audio stream"]
+    audio_reasons = []
+    if audio_stream.get("codec_name") != target["audio_codec"]:
+        audio_reasons.append(f"audio codec {audio_stream.get('codec_name')} != {target['audio_codec']}")
+    if int(audio_stream.get("sample_rate") or 0) != target["audio_rate"]:
+        audio_reasons.append(f"sample rate {audio_stream.get('sample_rate')} != {target['audio_rate']}")
+    if int(audio_stream.get("channels") or 0) != target["audio_channels"]:
+        audio_reasons.append(f"channels {audio_stream.get('channels')} != {target['audio_channels']}")
+    if audio_reasons:
+        return "audio", audio_reasons
+
+    return "copy", []
+
+
+def transcode_shortcut_cmd(decision: str, input_path: str, output_path: str, audio: bool = True) -> List[str]:
+    """
+    Builds the remux ("copy") or audio-only ("audio") command for a classified input.
+
+    Only the first video and audio streams are kept, matching what the
+    full re-encode produces.
+
+    Args:
+        decision: "copy" or "audio" from classify_transcode()
+        input_path: Path to the input
+        output_path: Path for the output
+        audio: Whether to keep audio
+
+    Returns:
+        List[str]: FFmpeg command
+    """
+    cmd = [
+        "ffmpeg", "-y",
+        "-hide_banner", "-loglevel", "warning",
+        "-i", input_path,
+        "-map", "0:v:0",
+        "-c:v", "copy",
+    ]
+    if not audio:
+        cmd += ["-an"]
+    elif decision == "audio":
+        cmd += ["-map", "0:a:0"] + audio_encode_args()
+    else:
+        cmd += ["-map", "0:a:0", "-c:a", "copy"]
+    return cmd + ["-movflags", "+faststart", output_path]
+
+
+def log_transcode_decision(name: str, decision: str, reasons: List[str], spec_name: str) -> None:
+    """Logs which transcode path an input takes and why."""
+    why = "; ".join(reasons) if reasons else f"already matches {spec_name}"
+    logger.info(f"Transcode decision for {os.path.basename(name)}: {decision} ({why})")
+
+
+def standardize_cmd(input_path: str, output_path: str) -> List[str]:
+    """Builds the full re-encode to VIDEO_CONFIG used by standardize_video()."""
+    cfg = VIDEO_CONFIG
+    return [
+        "ffmpeg", "-y",
+        "-hide_banner", "-loglevel", "warning",
+        "-i", input_path,
+        # Video filter: scale with padding to maintain aspect ratio
+        "-vf", (
+            f"scale={cfg['width']}:{cfg['height']}:"
+            "force_original_aspect_ratio=decrease,"
+            f"pad={cfg['width']}:{cfg['height']}:(ow-iw)/2:(oh-ih)/2,"
+            "setsar=1"
+        ),
+        # Video encoding
+        "-r", str(cfg['fps']),
+    ] + video_encode_args() + [
+        # Audio encoding
+        "-c:a", cfg['audio_codec'],
+        "-ar", str(cfg['audio_rate']),
+        "-ac", str(cfg['audio_channels']),
+        "-b:a", cfg['audio_bitrate'],
+        output_path
+    ]
+
+
+@timed_stage("standardize")
+def standardize_video(input_path: str, output_path: str, name: Optional[str] = None) -> str:
+    """
+    Standardizes a video to consistent encoding parameters for seamless concatenation.
+
+    This is CRITICAL for proper video concatenation. All videos must have:
+    - Same resolution: 1920x1080
+    - Same frame rate: 25 fps
+    - Same pixel format: yuv420p
+    - Same audio sample rate: 44100 Hz
+    - Same audio channels: 2 (stereo)
+
+    Inputs that already match are remuxed, inputs whose video matches only get
+    their audio re-encoded (see classify_transcode()). Long full re-encodes
+    are split into parallel chunks when the machine has cores to spare
+    (see CHUNKED_ENCODE_CONFIG).
+
+    Args:
+        input_path: Path to the source video
+        output_path: Path for the standardized output
+        name: Source name for logging (defaults to input_path)
+
+    Returns:
+        str: Path to the standardized video
+    """
+    if _constant_mezzanine.get():
+        # A remux would keep the source's GOP: constant mezzanines are always encoded
+        decision, reasons = "full", ["constant mezzanine format"]
+    else:
+        decision, reasons = classify_transcode(input_path, standard_target())
+    log_transcode_decision(name or input_path, decision, reasons, "VIDEO_CONFIG")
+    if decision != "full":
+        try:
+            run_ffmpeg(
+                transcode_shortcut_cmd(decision, input_path, output_path),
+                f"Standardizing video ({decision}): {os.path.basename(input_path)}"
+            )
+            return output_path
+        except subprocess.CalledProcessError:
+            logger.warning("Standardize shortcut failed, re-encoding")
+
+    if parallel_encodes() > 1:
+        seconds = get_media_duration(input_path)
+        chunks = encode_chunk_count(seconds)
+        if chunks > 1:
+            return standardize_chunked(input_path, output_path, seconds, chunks)
+    run_ffmpeg(standardize_cmd(input_path, output_path), f"Standardizing video: {os.path.basename(input_path)}")
+    return output_path
+
+
+def fit_cuts(video_duration: float, audio_duration: float) -> bool:
+    """
+    Whether a placeholder is fitted to shorter audio by cutting it (a stream
+    copy of a constant mezzanine, see copy_trim_args) rather than speeding it up.
+    """
+    cfg = CONSTANT_MEZZANINE_CONFIG
+    return cfg["enabled"] and cfg["cut_shorter"] and 0 < audio_duration <= video_duration
+
+
+def plan_video_fit(video_duration: float, audio_duration: float) -> Tuple[float, int]:
+    """
+    Chooses how to stretch/compress a video so it fits an audio duration.
+
+    Args:
+        video_duration: Source video duration in seconds
+        audio_duration: Target audio duration in seconds
+
+    Returns:
+        Tuple[float, int]: (setpts factor, number of extra input loops)
+    """
+    ratio = audio_duration / video_duration
+    logger.info(f"Video-Audio fit: video={video_duration:.2f}s, audio={audio_duration:.2f}s, ratio={ratio:.3f}")
+
+    if fit_cuts(video_duration, audio_duration):
+        logger.info("Audio shorter: cutting video to the audio")
+        return 1.0, 0
+
+    if 0.85 <= ratio <= 1.15:
         # Within 15% - just adjust playback speed (PTS manipulation)
         # setpts=PTS/speed_factor where speed_factor > 1 slows down, < 1 speeds up
-        speed_factor = ratio
-        logger.info(f"Using speed adjustment only: {speed_factor:.3f}x")
-        
-        cmd = [
-            "ffmpeg", "-y",
-            "-hide_banner", "-loglevel", "warning",
-            "-i", video_path,
-            "-vf", (
-                f"setpts={speed_factor}*PTS,"
-                f"scale={cfg['width']}:{cfg['height']}:"
-                "force_original_aspect_ratio=decrease,"
-                f"pad={cfg['width']}:{cfg['height']}:(ow-iw)/2:(oh-ih)/2,"
-                "setsar=1"
-            ),
-            "-r", str(cfg['fps']),
-            "-c:v", cfg['codec'],
-            "-preset", cfg['preset'],
-            "-crf", str(cfg['crf']),
-            "-pix_fmt", cfg['pix_fmt'],
-            "-an",  # No audio in intermediate file
-            "-t", str(audio_duration),
-            output_path
-        ]
-        run_ffmpeg(cmd, f"Speed adjusting video: {os.path.basename(output_path)}")
-        
-    elif ratio > 1.15:
+        logger.info(f"Using speed adjustment only: {ratio:.3f}x")
+        return ratio, 0
+
+    if ratio > 1.15:
         # Audio is significantly longer - slow down video + loop smoothly
-        # First slow down to 0.85x, then calculate remaining needed duration
         slow_factor = min(ratio, 1.25)  # Max 1.25x slowdown (80% speed)
         remaining_ratio = ratio / slow_factor
-        
         logger.info(f"Audio longer: slow to {slow_factor:.3f}x, then loop if needed (remaining ratio: {remaining_ratio:.3f})")
-        
         if remaining_ratio > 1.05:
-            # Need to loop - use concat with crossfade for smoothness
-            # Calculate how many loops needed
+            # Need to loop - calculate how many loops needed
             loops_needed = int(remaining_ratio) + 1
-            
-            cmd = [
-                "ffmpeg", "-y",
-                "-hide_banner", "-loglevel", "warning",
-                "-stream_loop", str(loops_needed - 1),
-                "-i", video_path,
-                "-vf", (
-                    f"setpts={slow_factor}*PTS,"
-                    f"scale={cfg['width']}:{cfg['height']}:"
-                    "force_original_aspect_ratio=decrease,"
-                    f"pad={cfg['width']}:{cfg['height']}:(ow-iw)/2:(oh-ih)/2,"
-                    "setsar=1"
-                ),
-                "-r", str(cfg['fps']),
-                "-c:v", cfg['codec'],
-                "-preset", cfg['preset'],
-                "-crf", str(cfg['crf']),
-                "-pix_fmt", cfg['pix_fmt'],
-                "-an",
-                "-t", str(audio_duration),
-                output_path
-            ]
-        else:
-            cmd = [
-                "ffmpeg", "-y",
-                "-hide_banner", "-loglevel", "warning",
-                "-i", video_path,
-                "-vf", (
-                    f"setpts={slow_factor}*PTS,"
-                    f"scale={cfg['width']}:{cfg['height']}:"
-                    "force_original_aspect_ratio=decrease,"
-                    f"pad={cfg['width']}:{cfg['height']}:(ow-iw)/2:(oh-ih)/2,"
-                    "setsar=1"
-                ),
-                "-r", str(cfg['fps']),
-                "-c:v", cfg['codec'],
-                "-preset", cfg['preset'],
-                "-crf", str(cfg['crf']),
-                "-pix_fmt", cfg['pix_fmt'],
-                "-an",
-                "-t", str(audio_duration),
-                output_path
-            ]
-        run_ffmpeg(cmd, f"Extending video with slowdown: {os.path.basename(output_path)}")
-        
-    else:
-        # ratio < 0.85 - Audio is significantly shorter, speed up video + drop frames
-        speed_factor = max(ratio, 0.75)  # Max 1.33x speedup (75% of original duration)
-        
-        logger.info(f"Audio shorter: speed up to {speed_factor:.3f}x (speedup: {1/speed_factor:.2f}x)")
-        
-        cmd = [
-            "ffmpeg", "-y",
-            "-hide_banner", "-loglevel", "warning",
-            "-i", video_path,
-            "-vf", (
-                f"setpts={speed_factor}*PTS,"
-                f"scale={cfg['width']}:{cfg['height']}:"
-                "force_original_aspect_ratio=decrease,"
-                f"pad={cfg['width']}:{cfg['height']}:(ow-iw)/2:(oh-ih)/2,"
-                "setsar=1"
-            ),
-            "-r", str(cfg['fps']),
-            "-c:v", cfg['codec'],
-            "-preset", cfg['preset'],
-            "-crf", str(cfg['crf']),
-            "-pix_fmt", cfg['pix_fmt'],
-            "-an",
-            "-t", str(audio_duration),
-            output_path
-        ]
-        run_ffmpeg(cmd, f"Shortening video with speedup: {os.path.basename(output_path)}")
+            return slow_factor, loops_needed - 1
+        return slow_factor, 0
+
+    # ratio < 0.85 - Audio is significantly shorter, speed up video + drop frames
+    speed_factor = max(ratio, 0.75)  # Max 1.33x speedup (75% of original duration)
+    logger.info(f"Audio shorter: speed up to {speed_factor:.3f}x (speedup: {1/speed_factor:.2f}x)")
+    return speed_factor, 0
+
+
+def build_fit_video_cmd(
+    video_path: str,
+    video_duration: float,
+    audio_duration: float,
+    output_args: List[str]
+) -> List[str]:
+    """
+    Builds the FFmpeg command that fits a video (no audio) to an audio duration.
+
+    Args:
+        video_path: Path to the source video
+        video_duration: Source video duration in seconds
+        audio_duration: Target duration in seconds
+        output_args: Encoder/format arguments ending with the output target
+
+    Returns:
+        List[str]: FFmpeg command
+    """
+    cfg = VIDEO_CONFIG
+    speed_factor, extra_loops = plan_video_fit(video_duration, audio_duration)
+
+    cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "warning"]
+    if extra_loops > 0:
+        cmd += ["-stream_loop", str(extra_loops)]
+    cmd += [
+        "-i", video_path,
+        "-vf", f"setpts={speed_factor}*PTS,{standard_scale_filter()}",
+        "-r", str(cfg['fps']),
+        "-an",  # No audio in intermediate output
+        "-t", str(audio_duration),
+    ]
+    return cmd + output_args
+
+
+def fit_video_to_audio_duration(video_path: str, audio_path: str, output_path: str) -> str:
+    """
+    Intelligently fits video duration to match audio duration using frame sampling.
+    
+    Uses a combination of techniques to avoid visible jumps:
+    1. If audio is longer than video: Speed down video slightly (up to 0.85x), then duplicate frames
+    2. If audio is shorter than video: Speed up video slightly (up to 1.15x), then drop frames
+    
+    The approach prioritizes smooth playback over exact frame matching.
+    
+    Args:
+        video_path: Path to the source video
+        audio_path: Path to the audio file to match duration
+        output_path: Path for the output video
+    
+    Returns:
+        str: Path to the fitted video (without audio - audio added separately)
+    """
+    video_duration = get_media_duration(video_path)
+    audio_duration = get_media_duration(audio_path)
+    
+    if video_duration <= 0 or audio_duration <= 0:
+        logger.warning(f"Invalid durations (video: {video_duration}, audio: {audio_duration}), using simple loop")
+        return None
+    
+    if fit_cuts(video_duration, audio_duration):
+        cmd, copy = trim_video_cmd(video_path, audio_duration, output_path)
+        run_ffmpeg(cmd, f"Fitting video to audio ({'copy' if copy else 'cut'}): {os.path.basename(output_path)}")
+        return output_path
+
+    cmd = build_fit_video_cmd(video_path, video_duration, audio_duration, video_encode_args() + [output_path])
+    run_ffmpeg(cmd, f"Fitting video to audio: {os.path.basename(output_path)}")
     
     return output_path
 
 
+def mux_fitted_audio_cmd(fitted_video: str, audio_path: str, output_path: str) -> List[str]:
+    """Builds the FFmpeg command that muxes a fitted video with the replacement audio."""
+    cfg = VIDEO_CONFIG
+    return [
+        "ffmpeg", "-y",
+        "-hide_banner", "-loglevel", "warning",
+        "-i", fitted_video,
+        "-i", audio_path,
+        "-map", "0:v",
+        "-map", "1:a",
+        "-c:v", "copy",  # Video already encoded
+        "-c:a", cfg['audio_codec'],
+        "-ar", str(cfg['audio_rate']),
+        "-ac", str(cfg['audio_channels']),
+        "-b:a", cfg['audio_bitrate'],
+        "-shortest",
+        output_path
+    ]
+
+
+@timed_stage("fit")
 def replace_audio_and_trim(video_path: str, audio_path: str, output_path: str, use_smart_fit: bool = True) -> str:
     """
     Replaces the audio track of a video and fits video to match audio duration.
@@ -860,7 +4836,7 @@ def replace_audio_and_trim(video_path: str, audio_path: str, output_path: str, u
     # Get audio duration for fitting
     audio_duration = get_media_duration(audio_path)
     if audio_duration <= 0:
-        logger.warning(f"Invalid audio duration, using 5 seconds default")
+        logger.warning("Invalid audio duration, using 5 seconds default")
         audio_duration = 5.0
 
     logger.info(f"Replacing audio, target duration: {audio_duration:.2f}s")
@@ -872,21 +4848,7 @@ def replace_audio_and_trim(video_path: str, audio_path: str, output_path: str, u
         
         if fitted_video and os.path.exists(fitted_video):
             # Combine fitted video with audio
-            cmd = [
-                "ffmpeg", "-y",
-                "-hide_banner", "-loglevel", "warning",
-                "-i", fitted_video,
-                "-i", audio_path,
-                "-map", "0:v",
-                "-map", "1:a",
-                "-c:v", "copy",  # Video already encoded
-                "-c:a", cfg['audio_codec'],
-                "-ar", str(cfg['audio_rate']),
-                "-ac", str(cfg['audio_channels']),
-                "-b:a", cfg['audio_bitrate'],
-                "-shortest",
-                output_path
-            ]
+            cmd = mux_fitted_audio_cmd(fitted_video, audio_path, output_path)
             run_ffmpeg(cmd, f"Combining fitted video with audio: {os.path.basename(output_path)}")
             
             # Clean up temp file
@@ -895,7 +4857,24 @@ def replace_audio_and_trim(video_path: str, audio_path: str, output_path: str, u
             
             return output_path
     
-    # Fallback: Simple loop/trim approach
+    # Fallback: Simple loop/trim approach (a stream copy for constant mezzanines)
+    copy_args = copy_trim_args(video_path, audio_duration)
+    if copy_args:
+        cmd = [
+            "ffmpeg", "-y",
+            "-hide_banner", "-loglevel", "warning",
+            "-stream_loop", "-1",
+            "-i", video_path,
+            "-i", audio_path,
+            "-map", "0:v",
+            "-map", "1:a",
+        ] + copy_args + audio_encode_args() + [
+            "-t", str(audio_duration),
+            output_path
+        ]
+        run_ffmpeg(cmd, f"Replacing audio (copy): {os.path.basename(output_path)}")
+        return output_path
+
     cmd = [
         "ffmpeg", "-y",
         "-hide_banner", "-loglevel", "warning",
@@ -911,10 +4890,7 @@ def replace_audio_and_trim(video_path: str, audio_path: str, output_path: str, u
             "setsar=1"
         ),
         "-r", str(cfg['fps']),
-        "-c:v", cfg['codec'],
-        "-preset", cfg['preset'],
-        "-crf", str(cfg['crf']),
-        "-pix_fmt", cfg['pix_fmt'],
+    ] + video_encode_args() + [
         "-c:a", cfg['audio_codec'],
         "-ar", str(cfg['audio_rate']),
         "-ac", str(cfg['audio_channels']),
@@ -928,104 +4904,196 @@ def replace_audio_and_trim(video_path: str, audio_path: str, output_path: str, u
     return output_path
 
 
-def loop_video_to_duration(video_path: str, target_duration: float, output_path: str) -> str:
+# ==============================================================================
+# DOCTOR VIDEO INGEST (MEZZANINE)
+# ==============================================================================
+#
+# Doctor answers arrive from phones in arbitrary codecs, resolutions and
+# variable frame rates. /ingest turns each upload into a mezzanine that already
+# matches the podcast tile (880x495, stored as 880x496 because 4:2:0 needs even
+# dimensions; 25 fps CFR, AAC 44.1 kHz stereo), so the compositor's scale/crop
+# become (near) no-ops and it decodes a small CFR stream
+# instead of the full-resolution phone recording.
+
+def mezzanine_paths(url: str) -> Tuple[str, str]:
     """
-    Loops or trims a video to match a target duration.
-
-    Used for nodding videos that need to match the duration of doctor response videos.
+    Returns where the mezzanine and its metadata sidecar live for a source.
 
     Args:
-        video_path: Path to the source video to loop/trim
-        target_duration: Desired output duration in seconds
-        output_path: Path for the output video
+        url: Source URL of the doctor video
 
     Returns:
-        str: Path to the looped/trimmed video
+        Tuple[str, str]: (mezzanine URL, metadata JSON URL)
     """
-    cfg = VIDEO_CONFIG
+    stem = os.path.splitext(url.split("?")[0])[0] + DOCTOR_MEZZANINE_CONFIG["suffix"]
+    return stem + ".mp4", stem + ".json"
+
 
+def measure_silence(media_path: str) -> Dict[str, float]:
+    """
+    Measures leading and trailing silence with FFmpeg's silencedetect.
+
+    Args:
+        media_path: Path to a file with an audio stream
+
+    Returns:
+        Dict with "duration", "leading_silence" and "trailing_silence" (seconds)
+    """
+    cfg = DOCTOR_MEZZANINE_CONFIG
+    duration = get_media_duration(media_path)
     cmd = [
+        "ffmpeg", "-hide_banner", "-nostats",
+        "-i", media_path,
+        "-vn",
+        "-af", f"silencedetect=noise={cfg['silence_noise']}:d={cfg['silence_min_duration']}",
+        "-f", "null", "-"
+    ]
+    result = run_measured(cmd, timeout=300, description="Measuring silence")
+
+    # silencedetect logs "silence_start: X" and "silence_end: Y | silence_duration: Z"
+    silences = []
+    for line in result.stderr.splitlines():
+        start_match = re.search(r"silence_start: (-?[\d.]+)", line)
+        end_match = re.search(r"silence_end: (-?[\d.]+)", line)
+        if start_match:
+            silences.append([max(0.0, float(start_match.group(1))), duration])
+        elif end_match and silences:
+            silences[-1][1] = float(end_match.group(1))
+
+    leading = silences[0][1] if silences and silences[0][0] <= 0.05 else 0.0
+    trailing = duration - silences[-1][0] if silences and silences[-1][1] >= duration - 0.05 else 0.0
+
+    return {
+        "duration": round(duration, 3),
+        "leading_silence": round(min(leading, duration), 3),
+        "trailing_silence": round(max(trailing, 0.0), 3),
+    }
+
+
+def mezzanine_cmd(input_path: str, output_path: str) -> List[str]:
+    """Builds the full encode of a doctor video to the mezzanine spec."""
+    cfg = DOCTOR_MEZZANINE_CONFIG
+    return [
         "ffmpeg", "-y",
         "-hide_banner", "-loglevel", "warning",
-        # Loop video infinitely
-        "-stream_loop", "-1",
-        "-i", video_path,
-        # Standardization filter
+        "-i", input_path,
+        "-map", "0:v:0", "-map", "0:a:0?",
         "-vf", (
-            f"scale={cfg['width']}:{cfg['height']}:"
-            "force_original_aspect_ratio=decrease,"
-            f"pad={cfg['width']}:{cfg['height']}:(ow-iw)/2:(oh-ih)/2,"
-            "setsar=1"
+            f"scale={cfg['width']}:{cfg['height']}:force_original_aspect_ratio=increase,"
+            f"crop={cfg['width']}:{cfg['height']},setsar=1,fps={cfg['fps']}"
         ),
-        # Video encoding
-        "-r", str(cfg['fps']),
-        "-c:v", cfg['codec'],
-        "-preset", cfg['preset'],
-        "-crf", str(cfg['crf']),
-        "-pix_fmt", cfg['pix_fmt'],
-        # Audio encoding
-        "-c:a", cfg['audio_codec'],
-        "-ar", str(cfg['audio_rate']),
-        "-ac", str(cfg['audio_channels']),
-        "-b:a", cfg['audio_bitrate'],
-        # Trim to target duration
-        "-t", str(target_duration),
+    ] + video_encode_args(crf=cfg['crf']) + audio_encode_args() + [
+        "-movflags", "+faststart",
         output_path
     ]
 
-    run_ffmpeg(cmd, f"Looping video to {target_duration:.2f}s")
+
+@timed_stage("mezzanine")
+def build_doctor_mezzanine(input_path: str, output_path: str, name: Optional[str] = None) -> str:
+    """
+    Encodes a doctor video to the podcast tile mezzanine.
+
+    Falls back to normalize_doctor_video() (audio-only transcode) when the
+    video stream cannot be re-encoded, so a job never fails because of it.
+
+    Args:
+        input_path: Path to the downloaded doctor video
+        output_path: Path for the mezzanine
+        name: Source name for logging (defaults to input_path)
+
+    Returns:
+        str: output_path
+    """
+    cfg = DOCTOR_MEZZANINE_CONFIG
+
+    target = dict(standard_target(), width=cfg['width'], height=cfg['height'], fps=cfg['fps'])
+    decision, reasons = classify_transcode(input_path, target)
+    log_transcode_decision(name or input_path, decision, reasons, "the mezzanine spec")
+    if decision != "full":
+        try:
+            run_ffmpeg(transcode_shortcut_cmd(decision, input_path, output_path), f"Building doctor mezzanine ({decision})")
+            return output_path
+        except subprocess.CalledProcessError:
+            logger.warning("Mezzanine shortcut failed, re-encoding")
+
+    try:
+        run_ffmpeg(mezzanine_cmd(input_path, output_path), "Building doctor mezzanine")
+    except subprocess.CalledProcessError:
+        logger.warning("Mezzanine encode failed, falling back to audio-only normalization")
+        normalize_doctor_video(input_path, output_path)
     return output_path
 
 
+def ingest_doctor_video(url: str, force: bool = False) -> Dict[str, Any]:
+    """
+    Builds and stores the mezzanine for an uploaded doctor video.
+
+    Args:
+        url: Source URL of the doctor video
+        force: Rebuild even if a mezzanine is already stored
+
+    Returns:
+        Metadata dict (also stored as the JSON sidecar)
+    """
+    mezzanine_url, metadata_url = mezzanine_paths(url)
+
+    if not force and source_exists(mezzanine_url) and source_exists(metadata_url):
+        with open(fetch_asset(metadata_url), encoding="utf-8") as f:
+            metadata = json.load(f)
+        metadata["status"] = "exists"
+        return metadata
+
+    with tempfile.TemporaryDirectory(dir=TEMP_DIR) as work_dir:
+        mezzanine_path = os.path.join(work_dir, "mezzanine.mp4")
+        build_doctor_mezzanine(fetch_asset(url), mezzanine_path, name=url)
+
+        metadata = {
+            "source": url,
+            "source_fingerprint": source_fingerprint(url),
+            "mezzanine": mezzanine_url,
+            "width": DOCTOR_MEZZANINE_CONFIG["width"],
+            "height": DOCTOR_MEZZANINE_CONFIG["height"],
+            "fps": DOCTOR_MEZZANINE_CONFIG["fps"],
+            "created_at": time.time(),
+        }
+        metadata.update(measure_silence(mezzanine_path))
+        # Read by get_doctor_loudness(): jobs never measure an ingested answer again
+        metadata["loudness"] = measure_loudness(mezzanine_path)
+
+        metadata_path = os.path.join(work_dir, "mezzanine.json")
+        with open(metadata_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2)
+
+        # Mezzanine first: stitching only looks for the video, the sidecar is informational
+        store_file(mezzanine_path, mezzanine_url)
+        store_file(metadata_path, metadata_url)
+
+    logger.info(
+        f"✅ Ingested {url}: {metadata['duration']:.2f}s, "
+        f"silence {metadata['leading_silence']:.2f}s / {metadata['trailing_silence']:.2f}s"
+    )
+    metadata["status"] = "created"
+    return metadata
+
+
 # ==============================================================================
 # PODCAST ZOOM SEGMENT CREATION
 # ==============================================================================
 
-def create_podcast_zoom_segment(
-    bg_image: str,
-    blusanta_video: str,
-    doctor_video: str,
-    output_path: str,
-    doctor_name: str,
-    font_path: Optional[str] = None
-) -> str:
+def normalize_doctor_video(doctor_video: str, output_path: str) -> str:
     """
-    Creates a podcast-style zoom segment with side-by-side layout and smooth animations.
-
-    This function creates the signature BluSanta podcast Q/A format where:
-    - BluSanta (interviewer) appears on the left with zoom animation
-    - Doctor (interviewee) appears on the right
-    - Both have white borders and name labels
-    - Background image is visible behind participants
-
-    Animation Sequence:
-    1. [0 - transition_duration]: BluSanta zooms from full screen to podcast position
-    2. [transition_duration - doctor_end]: Both participants visible in podcast layout
-    3. [doctor_end - end]: BluSanta zooms back to full screen
+    Transcodes a doctor video's audio to AAC so the compositor can decode it.
 
-    The zoom uses cosine interpolation for smooth, professional-looking animations:
-    Formula: 0.5 * (1 - cos(PI * t / duration))
+    Some phone recordings carry unsupported audio codecs like 'apac' that
+    cause FFmpeg failures. Video is stream-copied.
 
     Args:
-        bg_image: Path to podcast background image (Podcast_BG.jpg)
-        blusanta_video: Path to BluSanta nodding video
-        doctor_video: Path to doctor response video (drives the timing)
-        output_path: Path for the output video
-        doctor_name: Doctor's name for the label (e.g., "DR. JOHN SMITH")
-        font_path: Path to font file for labels (optional)
+        doctor_video: Path to the downloaded doctor video
+        output_path: Path for the normalized copy
 
     Returns:
-        str: Path to the created podcast segment
+        str: output_path (a plain copy of the original if transcoding failed)
     """
-    layout = PODCAST_LAYOUT
-    cfg = VIDEO_CONFIG
-
-    # Doctor video duration drives the entire segment timing
-    # First, transcode doctor video to ensure compatible audio codec
-    # Some videos have unsupported audio codecs like 'apac' that cause FFmpeg failures
-    job_temp_dir = os.path.dirname(output_path)
-    doctor_video_transcoded = os.path.join(job_temp_dir, 'doctor_transcoded.mp4')
-    
     logger.info(f"Transcoding doctor video to ensure audio compatibility...")
     transcode_cmd = [
         'ffmpeg', '-y', '-i', doctor_video,
@@ -1034,22 +5102,40 @@ def create_podcast_zoom_segment(
         '-ar', '44100',  # Standard sample rate
         '-ac', '2',      # Stereo
         '-b:a', '128k',  # Standard bitrate
-        doctor_video_transcoded
+        output_path
     ]
     
     try:
-        subprocess.run(transcode_cmd, check=True, capture_output=True, text=True)
-        doctor_video = doctor_video_transcoded  # Use transcoded version
+        run_measured(transcode_cmd, check=True, description="Transcoding doctor audio")
         logger.info(f"✓ Doctor video transcoded successfully")
     except subprocess.CalledProcessError as e:
         logger.warning(f"Audio transcoding failed: {e.stderr}, continuing with original video")
         # If transcoding fails, try to continue with original
-    
-    duration = get_media_duration(doctor_video)
-    if duration <= 0:
-        raise ValueError(f"Invalid doctor video duration: {duration}")
+        shutil.copy(doctor_video, output_path)
+    return output_path
 
-    logger.info(f"Creating podcast segment, duration: {duration:.2f}s")
+
+def build_podcast_filter_complex(
+    duration: float,
+    doctor_name: str,
+    font_path: Optional[str] = None
+) -> Tuple[str, float]:
+    """
+    Builds the zoom-animation filter graph for a podcast segment.
+
+    Inputs are expected as [0:v] background, [1:v] BluSanta, [2:v] doctor;
+    the graph output is labelled [v].
+
+    Args:
+        duration: Doctor video duration in seconds (drives the timing)
+        doctor_name: Doctor's name for the label
+        font_path: Path to font file for labels (optional)
+
+    Returns:
+        Tuple[str, float]: (filter_complex, total segment duration)
+    """
+    layout = PODCAST_LAYOUT
+    cfg = VIDEO_CONFIG
 
     # Animation timing constants
     trans = layout['transition_duration']
@@ -1059,10 +5145,6 @@ def create_podcast_zoom_segment(
     # Total segment duration: includes entry animation, content, and exit animation
     total_duration = duration_plus_trans + trans
 
-    # First, loop the BluSanta video to match the total segment duration
-    looped_blusanta = blusanta_video.replace(".mp4", "_looped.mp4")
-    loop_video_to_duration(blusanta_video, total_duration, looped_blusanta)
-
     # Get border width from layout
     border = layout['border_width']
 
@@ -1235,86 +5317,164 @@ def create_podcast_zoom_segment(
             f"enable='between(t,{trans},{duration_plus_trans})'[v_text1]"
         )
 
-        # Label for Doctor (right side) - shown during podcast zoom
-        filter_parts.append(
-            f"[v_text1]drawtext=text='{doctor_label}':"
-            f"x=1000:y=760:fontsize=32:fontcolor=white:"
-            f"box=1:boxcolor=black@0.7:boxborderw=15:"
-            f"fontfile='{safe_font_path}':"
-            f"enable='between(t,{trans},{duration_plus_trans})'[v]"
-        )
-    else:
-        # No font - add labels without font (using default)
-        filter_parts.append(
-            f"[vbase]drawtext=text='BLU SANTA':"
-            f"x=50:y=760:fontsize=32:fontcolor=white:"
-            f"box=1:boxcolor=black@0.7:boxborderw=15:"
-            f"enable='between(t,{trans},{duration_plus_trans})'[v_text1]"
-        )
-        filter_parts.append(
-            f"[v_text1]drawtext=text='{doctor_label}':"
-            f"x=1000:y=760:fontsize=32:fontcolor=white:"
-            f"box=1:boxcolor=black@0.7:boxborderw=15:"
-            f"enable='between(t,{trans},{duration_plus_trans})'[v]"
-        )
+        # Label for Doctor (right side) - shown during podcast zoom
+        filter_parts.append(
+            f"[v_text1]drawtext=text='{doctor_label}':"
+            f"x=1000:y=760:fontsize=32:fontcolor=white:"
+            f"box=1:boxcolor=black@0.7:boxborderw=15:"
+            f"fontfile='{safe_font_path}':"
+            f"enable='between(t,{trans},{duration_plus_trans})'[v]"
+        )
+    else:
+        # No font - add labels without font (using default)
+        filter_parts.append(
+            f"[vbase]drawtext=text='BLU SANTA':"
+            f"x=50:y=760:fontsize=32:fontcolor=white:"
+            f"box=1:boxcolor=black@0.7:boxborderw=15:"
+            f"enable='between(t,{trans},{duration_plus_trans})'[v_text1]"
+        )
+        filter_parts.append(
+            f"[v_text1]drawtext=text='{doctor_label}':"
+            f"x=1000:y=760:fontsize=32:fontcolor=white:"
+            f"box=1:boxcolor=black@0.7:boxborderw=15:"
+            f"enable='between(t,{trans},{duration_plus_trans})'[v]"
+        )
+
+    filter_complex = ";".join(filter_parts)
+
+    return filter_complex, total_duration
+
+
+def build_podcast_zoom_cmd(
+    bg_image: str,
+    blusanta_input_args: List[str],
+    doctor_video: str,
+    filter_script_path: str,
+    total_duration: float,
+    output_args: List[str]
+) -> List[str]:
+    """
+    Builds the FFmpeg command that composites a podcast segment.
+
+    Args:
+        bg_image: Path to podcast background image
+        blusanta_input_args: Input arguments for the BluSanta video (input 1)
+        doctor_video: Path to the (transcoded) doctor video (input 2)
+        filter_script_path: File containing the filter graph
+        total_duration: Segment duration including both zoom transitions
+        output_args: Encoder/format arguments ending with the output target
+
+    Returns:
+        List[str]: FFmpeg command
+    """
+    return [
+        "ffmpeg", "-y",
+        "-hide_banner", "-loglevel", "warning",
+        # Input 0: Background image (looped)
+        "-loop", "1", "-i", bg_image,
+    ] + blusanta_input_args + [
+        # Input 2: Doctor video
+        "-i", doctor_video,
+        # Apply filter complex from script file (avoids command-line length issues)
+        "-filter_complex_script", filter_script_path,
+        # Map video from filter output
+        "-map", "[v]",
+        # Map audio from doctor video (input 2)
+        # Audio plays from start, pad with silence at the end for exit animation
+        "-map", "2:a",
+        # Pad audio at END only to match total duration (for exit animation)
+        "-af", f"apad=whole_dur={total_duration}",
+        # Duration includes entry animation, doctor speaking, and exit animation  
+        "-t", str(total_duration),
+        "-r", str(VIDEO_CONFIG['fps']),
+    ] + output_args
+
+
+def filter_script_path_for(output_path: str) -> str:
+    """Returns the filter script path write_filter_script() uses for an output."""
+    return os.path.splitext(output_path)[0] + '_filter.txt'
+
+
+def write_filter_script(filter_complex: str, output_path: str) -> str:
+    """
+    Writes a filter graph next to an output to avoid command-line length issues.
+
+    FFmpeg can fail with "Invalid argument" if filter_complex is too long.
+    The script name is derived from the output so parallel segments never clash.
+
+    Returns:
+        str: Path to the filter script
+    """
+    filter_script_path = filter_script_path_for(output_path)
+    with open(filter_script_path, 'w', encoding='utf-8') as f:
+        f.write(filter_complex)
+    return filter_script_path
+
+
+@timed_stage("composite")
+def create_podcast_zoom_segment(
+    bg_image: str,
+    blusanta_video: str,
+    doctor_video: str,
+    output_path: str,
+    doctor_name: str,
+    font_path: Optional[str] = None
+) -> str:
+    """
+    Creates a podcast-style zoom segment with side-by-side layout and smooth animations.
+
+    This function creates the signature BluSanta podcast Q/A format where:
+    - BluSanta (interviewer) appears on the left with zoom animation
+    - Doctor (interviewee) appears on the right
+    - Both have white borders and name labels
+    - Background image is visible behind participants
+
+    Animation Sequence:
+    1. [0 - transition_duration]: BluSanta zooms from full screen to podcast position
+    2. [transition_duration - doctor_end]: Both participants visible in podcast layout
+    3. [doctor_end - end]: BluSanta zooms back to full screen
+
+    The zoom uses cosine interpolation for smooth, professional-looking animations:
+    Formula: 0.5 * (1 - cos(PI * t / duration))
+
+    Args:
+        bg_image: Path to podcast background image (Podcast_BG.jpg)
+        blusanta_video: Path to BluSanta nodding master (see get_nodding_master)
+        doctor_video: Path to normalized doctor video (drives the timing,
+                      see normalize_doctor_video)
+        output_path: Path for the output video
+        doctor_name: Doctor's name for the label (e.g., "DR. JOHN SMITH")
+        font_path: Path to font file for labels (optional)
+
+    Returns:
+        str: Path to the created podcast segment
+    """
+    # Doctor video duration drives the entire segment timing
+    duration = get_media_duration(doctor_video)
+    if duration <= 0:
+        raise ValueError(f"Invalid doctor video duration: {duration}")
+
+    logger.info(f"Creating podcast segment, duration: {duration:.2f}s")
 
-    filter_complex = ";".join(filter_parts)
+    filter_complex, total_duration = build_podcast_filter_complex(duration, doctor_name, font_path)
 
     # -------------------------------------------------------------------------
     # BUILD AND RUN FFMPEG COMMAND
     # -------------------------------------------------------------------------
-    
-    # Write filter_complex to a file to avoid command-line length issues
-    # FFmpeg can fail with "Invalid argument" if filter_complex is too long
-    # Get temp directory from output_path (it's in the same directory)
-    job_temp_dir = os.path.dirname(output_path)
-    filter_script_path = os.path.join(job_temp_dir, 'filter_script.txt')
-    with open(filter_script_path, 'w', encoding='utf-8') as f:
-        f.write(filter_complex)
-
-    cmd = [
-        "ffmpeg", "-y",
-        "-hide_banner", "-loglevel", "warning",
-        # Input 0: Background image (looped)
-        "-loop", "1", "-i", bg_image,
-        # Input 1: BluSanta nodding video (looped to duration)
-        "-i", looped_blusanta,
-        # Input 2: Doctor video
-        "-i", doctor_video,
-        # Apply filter complex from script file (avoids command-line length issues)
-        "-filter_complex_script", filter_script_path,
-        # Map video from filter output
-        "-map", "[v]",
-        # Map audio from doctor video (input 2)
-        # Audio plays from start, pad with silence at the end for exit animation
-        "-map", "2:a",
-        # Pad audio at END only to match total duration (for exit animation)
-        "-af", f"apad=whole_dur={total_duration}",
-        # Duration includes entry animation, doctor speaking, and exit animation  
-        "-t", str(total_duration),
-        # Video encoding
-        "-c:v", cfg['codec'],
-        "-preset", cfg['preset'],
-        "-crf", str(cfg['crf']),
-        "-pix_fmt", cfg['pix_fmt'],
-        "-r", str(cfg['fps']),
-        # Audio encoding
-        "-c:a", cfg['audio_codec'],
-        "-ar", str(cfg['audio_rate']),
-        "-ac", str(cfg['audio_channels']),
-        "-b:a", cfg['audio_bitrate'],
-        output_path
-    ]
+    filter_script_path = write_filter_script(filter_complex, output_path)
+
+    cmd = build_podcast_zoom_cmd(
+        bg_image,
+        # Input 1: BluSanta nodding master, looped by the demuxer to cover the segment
+        ["-stream_loop", "-1", "-i", blusanta_video],
+        doctor_video,
+        filter_script_path,
+        total_duration,
+        video_encode_args() + audio_encode_args() + [output_path]
+    )
 
     run_ffmpeg(cmd, f"Creating podcast zoom segment: {os.path.basename(output_path)}")
 
-    # Cleanup temporary looped video
-    if os.path.exists(looped_blusanta):
-        try:
-            os.remove(looped_blusanta)
-        except:
-            pass
-
     return output_path
 
 
@@ -1336,12 +5496,37 @@ def get_stream_duration(file_path: str, stream_type: str) -> float:
         '-of', 'csv=p=0', file_path
     ]
     try:
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        result = run_measured(cmd, description=f"Probing {stream_type} duration")
         return float(result.stdout.strip())
     except:
         return 0.0
 
 
+def pad_audio_cmd(video_path: str, pad_duration: float, output_path: str) -> List[str]:
+    """Builds the FFmpeg command that pads audio with silence (video copied)."""
+    return [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+        '-i', video_path,
+        '-af', f'apad=pad_dur={pad_duration}',
+        '-c:v', 'copy',
+        '-c:a', 'aac',
+        '-y', output_path
+    ]
+
+
+def pad_video_cmd(video_path: str, pad_duration: float, output_path: str) -> List[str]:
+    """Builds the FFmpeg command that extends video by holding the last frame (audio copied)."""
+    # Use tpad filter to extend video by holding the last frame
+    return [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+        '-i', video_path,
+        '-vf', f'tpad=stop_mode=clone:stop_duration={pad_duration}',
+    ] + video_encode_args() + [
+        '-c:a', 'copy',
+        '-y', output_path
+    ]
+
+
 def pad_audio_to_video_duration(video_path: str) -> str:
     """
     Ensures audio and video stream durations match by padding the shorter one.
@@ -1369,17 +5554,10 @@ def pad_audio_to_video_duration(video_path: str) -> str:
         
         temp_path = video_path.replace('.mp4', '_apad.mp4')
         
-        cmd = [
-            'ffmpeg', '-hide_banner', '-loglevel', 'error',
-            '-i', video_path,
-            '-af', f'apad=pad_dur={diff_time}',
-            '-c:v', 'copy',
-            '-c:a', 'aac',
-            '-y', temp_path
-        ]
+        cmd = pad_audio_cmd(video_path, diff_time, temp_path)
         
         try:
-            subprocess.run(cmd, check=True)
+            run_measured(cmd, check=True, description="Padding audio")
             os.replace(temp_path, video_path)
             logger.info(f"Audio padded successfully: {os.path.basename(video_path)}")
         except Exception as e:
@@ -1393,18 +5571,10 @@ def pad_audio_to_video_duration(video_path: str) -> str:
         
         temp_path = video_path.replace('.mp4', '_vpad.mp4')
         
-        # Use tpad filter to extend video by holding the last frame
-        cmd = [
-            'ffmpeg', '-hide_banner', '-loglevel', 'error',
-            '-i', video_path,
-            '-vf', f'tpad=stop_mode=clone:stop_duration={pad_duration}',
-            '-c:v', 'libx264', '-preset', 'fast', '-crf', '23',
-            '-c:a', 'copy',
-            '-y', temp_path
-        ]
+        cmd = pad_video_cmd(video_path, pad_duration, temp_path)
         
         try:
-            subprocess.run(cmd, check=True)
+            run_measured(cmd, check=True, description="Padding video")
             os.replace(temp_path, video_path)
             logger.info(f"Video padded successfully: {os.path.basename(video_path)}")
         except Exception as e:
@@ -1415,17 +5585,286 @@ def pad_audio_to_video_duration(video_path: str) -> str:
     return video_path
 
 
-def concatenate_videos(input_videos: List[str], output_path: str) -> str:
+def build_concat_cmd(
+    input_args: List[str],
+    n: int,
+    output_path: str,
+    renditions: Optional[List[str]] = None,
+    hls_dir: Optional[str] = None,
+    previews: Optional[Dict[str, float]] = None,
+    subtitle_track: Optional[str] = None,
+    scale: Optional[Tuple[int, int]] = None,
+    keyframe_offset: Optional[float] = None,
+    audio: bool = True,
+    audio_filters: Optional[List[Optional[str]]] = None
+) -> List[str]:
+    """
+    Builds the concat-filter FFmpeg command for n inputs with audio and video.
+
+    With renditions, the concatenated frames and audio are split once and
+    every rendition is scaled and encoded as an extra output of the same
+    process (written to rendition_path(output_path, name)). With hls_dir,
+    the packaged variants (hls_variants()) are also muxed as HLS by the same
+    encode (see output_target_args), with keyframes aligned to the segments.
+    With previews, the poster, sprite sheet and preview clip are further
+    outputs of the same split (see preview_outputs). With subtitle_track, the
+    WebVTT track is read as input n and muxed as a mov_text stream into the
+    master and every rendition (HLS gets it as a separate rendition, see
+    write_hls_master_playlist). With scale (proxy renders), the concatenated
+    frames are scaled down before anything is encoded. keyframe_offset is for
+    chunk encodes (see build_chunked_concat_cmds): their HLS segment keyframes
+    are placed on the final timeline, the chunk starting at that offset.
+    Without audio (chunk encodes again), the inputs' audio still sets the
+    segment boundaries but only video is encoded. audio_filters (loudness,
+    see job_loudness_filters) are applied to each input's audio before the
+    concat.
+
+    Args:
+        input_args: Input arguments for all n inputs, in order
+        n: Number of inputs
+        output_path: Path for the concatenated output video
+        renditions: RENDITION_CONFIG["ladder"] names to encode next to the master
+        hls_dir: HLS package directory (see prepare_hls_dir), None for MP4 only
+        previews: preview_times() result, None for no previews
+        subtitle_track: WebVTT file (see merge_segment_subtitles), None for no text track
+        scale: (width, height) of the master, None for VIDEO_CONFIG size
+        keyframe_offset: Start of this chunk on the final timeline (HLS keyframes)
+        audio: Encode the audio (False: video-only outputs)
+        audio_filters: Audio filter chain per input (None entries: unchanged)
+
+    Returns:
+        List[str]: FFmpeg command
+    """
+    # Build filter for concat
+    # Format: [0:v][0:a][1:v][1:a]...[n:v][n:a]concat=n=N:v=1:a=1[v][a]
+    gain_chains, audio_inputs = apply_audio_filters([f"[{i}:a]" for i in range(n)], audio_filters if audio else None)
+    filter_inputs = "".join([f"[{i}:v]{audio_inputs[i]}" for i in range(n)])
+    filter_complex = f"{gain_chains}{filter_inputs}concat=n={n}:v=1:a=1[v][a]"
+    if scale:
+        # Segments are composed at full size (same layout), only the encode is small
+        filter_complex = (f"{gain_chains}{filter_inputs}concat=n={n}:v=1:a=1[vc][a];"
+                          f"[vc]scale={scale[0]}:{scale[1]}:flags={RENDITION_CONFIG['scale_flags']}[v]")
+    if not audio:
+        filter_complex += ";[a]anullsink"
+
+    renditions = list(renditions or [])
+    labels = [("[v]", "[a]")]
+    if renditions or previews:
+        # [v]split=K[v0][v1]...;[a]asplit=K[a0][a1]...;[v1]scale=W:H[r1];...
+        # (previews take the last three video and the last audio pads)
+        count = len(renditions) + 1
+        video_count = count + (3 if previews else 0)
+        audio_count = count + (1 if previews else 0)
+        filter_complex += f";[v]split={video_count}" + "".join(f"[v{i}]" for i in range(video_count))
+        if audio:
+            filter_complex += f";[a]asplit={audio_count}" + "".join(f"[a{i}]" for i in range(audio_count))
+        labels = [("[v0]", "[a0]")]
+        for i, name in enumerate(renditions, 1):
+            width, height = rendition_size(name)
+            filter_complex += f";[v{i}]scale={width}:{height}:flags={RENDITION_CONFIG['scale_flags']}[r{i}]"
+            labels.append((f"[r{i}]", f"[a{i}]"))
+    packaged = hls_variants(renditions) if hls_dir else []
+    preview_args = []
+    if previews:
+        chains, preview_args = preview_outputs(
+            output_path, previews, [f"[v{i}]" for i in range(count, count + 3)], f"[a{count}]"
+        )
+        filter_complex += ";" + chains
+
+    cmd = [
+        "ffmpeg", "-y",
+        "-hide_banner", "-loglevel", "warning",
+    ] + input_args + (["-i", subtitle_track] if subtitle_track else []) + [
+        "-filter_complex", filter_complex,
+    ]
+    for variant, (video_label, audio_label) in zip(["master"] + renditions, labels):
+        spec = RENDITION_CONFIG["ladder"].get(variant, {})
+        # Re-encode to ensure consistent output
+        cmd += ["-map", video_label] + (["-map", audio_label] if audio else []) + video_encode_args()
+        if spec:
+            # Capped bitrate for mobile networks
+            cmd += ["-maxrate", f"{spec['maxrate_kbps']}k", "-bufsize", f"{2 * spec['maxrate_kbps']}k"]
+        if packaged or keyframe_offset is not None:
+            # Every segment starts with a keyframe at the same time in every variant
+            cmd += ["-force_key_frames", hls_keyframe_expr(keyframe_offset or 0.0)]
+        cmd += ["-r", str(VIDEO_CONFIG['fps'])]
+        cmd += audio_encode_args(spec.get("audio_bitrate")) if audio else ["-an"]
+        if subtitle_track:
+            cmd += soft_subtitle_args(n)
+        # Renditions get moov up front for progressive playback
+        path = output_path if variant == "master" else rendition_path(output_path, variant)
+        cmd += output_target_args(path, variant, hls_dir if variant in packaged else None, faststart=bool(spec))
+    return cmd + preview_args
+
+
+def build_chunked_concat_cmds(
+    input_videos: List[str],
+    durations: List[float],
+    output_path: str,
+    renditions: Optional[List[str]] = None,
+    hls_dir: Optional[str] = None,
+    previews: Optional[Dict[str, float]] = None,
+    subtitle_track: Optional[str] = None,
+    scale: Optional[Tuple[int, int]] = None,
+    audio_filters: Optional[List[Optional[str]]] = None
+) -> Optional[Tuple[List[Tuple[List[str], str, float]], Dict[str, List[str]], List[str]]]:
+    """
+    Splits the concat encode into parallel chunk encodes at input boundaries
+    plus a join (see CHUNKED_ENCODE_CONFIG).
+
+    Each chunk concatenates a run of consecutive inputs into video-only
+    master and rendition chunk files (same settings, capped threads). The
+    join stream-copies the chunk video per variant and encodes the audio,
+    previews, subtitles and HLS muxing of build_concat_cmd() once. Chunks
+    start where the single encode would show their first input (the input
+    durations, on the frame grid), so video and the joined audio stay in
+    sync and HLS keyframes fall on the same times.
+
+    Args:
+        input_videos: Videos to concatenate, in order
+        durations: Their durations in seconds
+        output_path, renditions, hls_dir, previews, subtitle_track, scale,
+        audio_filters: As for build_concat_cmd()
+
+    Returns:
+        None if the encode is not worth splitting, else (chunk encodes as
+        (command, description, seconds), {variant: chunk files in order},
+        join command reading the lists written by write_chunk_lists())
+    """
+    ranges = chunk_ranges(durations, encode_chunk_count(sum(durations)))
+    if len(ranges) < 2:
+        return None
+    renditions = list(renditions or [])
+    chunk_files = {variant: [] for variant in ["master"] + renditions}
+    # The single encode's -r output shows an input from the first frame
+    # after its start (audio makes it off-grid), and so do the chunks
+    fps = VIDEO_CONFIG["fps"]
+    starts = [(math.floor(sum(durations[:first]) * fps) + 1) / fps if first else 0.0 for first, _ in ranges]
+    starts.append(max(starts[-1], sum(durations)))
+    chunks = []
+    with using_encode_threads(CHUNKED_ENCODE_CONFIG["cores_per_encode"]):
+        for k, (first, end) in enumerate(ranges, 1):
+            path = chunk_path(output_path, k)
+            input_args = [arg for video in input_videos[first:end] for arg in ("-i", video)]
+            offset = starts[k - 1]
+            cmd = build_concat_cmd(input_args, end - first, path, renditions, scale=scale,
+                                   keyframe_offset=offset if hls_dir else None, audio=False)
+            seconds = starts[k] - offset
+            chunks.append((cmd, f"Concatenating chunk {k}/{len(ranges)} ({end - first} inputs)", seconds))
+            for variant, files in chunk_files.items():
+                files.append(path if variant == "master" else rendition_path(path, variant))
+    join = build_chunk_join_cmd(
+        [chunk_list_path(output_path, variant) for variant in chunk_files], input_videos,
+        output_path, renditions, hls_dir, previews, subtitle_track, audio_filters
+    )
+    return chunks, chunk_files, join
+
+
+def chunk_list_path(output_path: str, variant: str) -> str:
+    """Returns the concat list of a variant's chunk files."""
+    return os.path.splitext(chunk_path(output_path, f"s_{variant}"))[0] + ".txt"
+
+
+def write_chunk_lists(output_path: str, chunk_files: Dict[str, List[str]], durations: List[float]) -> List[str]:
+    """
+    Writes the concat list of every variant once its chunks are encoded.
+
+    Every file is listed with its chunk's planned duration (see
+    build_chunked_concat_cmds), which places the next chunk where the
+    single encode would start its first input.
+
+    Returns:
+        List[str]: The list files
+    """
+    return [
+        write_concat_list(chunk_list_path(output_path, variant), list(zip(files, durations)))
+        for variant, files in chunk_files.items()
+    ]
+
+
+def build_chunk_join_cmd(
+    list_paths: List[str],
+    input_videos: List[str],
+    output_path: str,
+    renditions: List[str],
+    hls_dir: Optional[str] = None,
+    previews: Optional[Dict[str, float]] = None,
+    subtitle_track: Optional[str] = None,
+    audio_filters: Optional[List[Optional[str]]] = None
+) -> List[str]:
+    """
+    Builds the join of a chunked concat encode.
+
+    Inputs are the chunk list per variant (master first), then the original
+    inputs for their audio (with audio_filters applied), then the subtitle
+    track. Video is stream-copied; previews decode the joined master.
+
+    Returns:
+        List[str]: FFmpeg command
+    """
+    variants = ["master"] + renditions
+    n = len(input_videos)
+    first_audio = len(variants)
+    cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "warning"]
+    for list_path in list_paths:
+        cmd += ["-f", "concat", "-safe", "0", "-i", list_path]
+    for video in input_videos:
+        cmd += ["-i", video]
+    if subtitle_track:
+        cmd += ["-i", subtitle_track]
+
+    audio_count = len(variants) + (1 if previews else 0)
+    gain_chains, audio_inputs = apply_audio_filters([f"[{first_audio + i}:a]" for i in range(n)], audio_filters)
+    filter_complex = gain_chains + "".join(audio_inputs) + f"concat=n={n}:v=0:a=1[a]"
+    filter_complex += f";[a]asplit={audio_count}" + "".join(f"[a{i}]" for i in range(audio_count))
+    preview_args = []
+    if previews:
+        filter_complex += ";[0:v]split=3[pv0][pv1][pv2]"
+        chains, preview_args = preview_outputs(output_path, previews, ["[pv0]", "[pv1]", "[pv2]"],
+                                               f"[a{len(variants)}]")
+        filter_complex += ";" + chains
+    cmd += ["-filter_complex", filter_complex]
+
+    packaged = hls_variants(renditions) if hls_dir else []
+    for i, variant in enumerate(variants):
+        spec = RENDITION_CONFIG["ladder"].get(variant, {})
+        cmd += ["-map", f"{i}:v", "-c:v", "copy", "-map", f"[a{i}]"] + audio_encode_args(spec.get("audio_bitrate"))
+        if subtitle_track:
+            cmd += soft_subtitle_args(first_audio + n)
+        path = output_path if variant == "master" else rendition_path(output_path, variant)
+        cmd += output_target_args(path, variant, hls_dir if variant in packaged else None, faststart=bool(spec))
+    return cmd + preview_args
+
+
+@timed_stage("concat")
+def concatenate_videos(
+    input_videos: List[str],
+    output_path: str,
+    renditions: Optional[List[str]] = None,
+    hls_dir: Optional[str] = None,
+    previews: Optional[Dict[str, float]] = None,
+    subtitle_track: Optional[str] = None,
+    scale: Optional[Tuple[int, int]] = None,
+    audio_filters: Optional[List[Optional[str]]] = None
+) -> str:
     """
     Concatenates multiple videos into a single output using FFmpeg concat filter.
 
     IMPORTANT: All input videos MUST be standardized to the same parameters
     before concatenation. This function uses the concat filter (not demuxer)
-    which allows for re-encoding to ensure consistent output.
+    which allows for re-encoding to ensure consistent output. When the
+    machine has cores to spare, the encode runs as parallel chunks (see
+    build_chunked_concat_cmds).
 
     Args:
         input_videos: List of paths to videos to concatenate (in order)
         output_path: Path for the concatenated output video
+        renditions: Renditions encoded in the same pass (see build_concat_cmd)
+        hls_dir: HLS package written by the same pass (see build_concat_cmd)
+        previews: Poster/sprite/preview clip cut in the same pass (see build_concat_cmd)
+        subtitle_track: Soft subtitle track muxed by the same pass (see build_concat_cmd)
+        scale: Output size for proxy renders (see build_concat_cmd)
+        audio_filters: Loudness filter per input (see job_loudness_filters)
 
     Returns:
         str: Path to the concatenated video
@@ -1433,7 +5872,8 @@ def concatenate_videos(input_videos: List[str], output_path: str) -> str:
     if not input_videos:
         raise ValueError("No videos to concatenate")
 
-    if len(input_videos) == 1:
+    if len(input_videos) == 1 and not (renditions or hls_dir or previews or subtitle_track or scale
+                                       or any(audio_filters or [])):
         shutil.copy(input_videos[0], output_path)
         return output_path
 
@@ -1444,53 +5884,537 @@ def concatenate_videos(input_videos: List[str], output_path: str) -> str:
     for video in input_videos:
         pad_audio_to_video_duration(video)
 
-    cfg = VIDEO_CONFIG
+    if hls_dir:
+        prepare_hls_dir(hls_dir, hls_variants(renditions or []))
+
+    if parallel_encodes() > 1:
+        chunked = build_chunked_concat_cmds(
+            input_videos, [get_media_duration(video) for video in input_videos], output_path,
+            renditions, hls_dir, previews, subtitle_track, scale, audio_filters
+        )
+        if chunked:
+            chunks, chunk_files, join = chunked
+            logger.info(f"Encoding in {len(chunks)} parallel chunks")
+            list_paths = []
+            try:
+                run_ffmpeg_parallel([(cmd, description) for cmd, description, _ in chunks])
+                list_paths = write_chunk_lists(output_path, chunk_files, [seconds for _, _, seconds in chunks])
+                run_ffmpeg(join, f"Joining {len(chunks)} chunks (copy)")
+            finally:
+                remove_files([path for files in chunk_files.values() for path in files] + list_paths)
+            return output_path
 
     # Build input arguments
     input_args = []
     for video in input_videos:
         input_args.extend(["-i", video])
 
-    # Build filter for concat
-    # Format: [0:v][0:a][1:v][1:a]...[n:v][n:a]concat=n=N:v=1:a=1[v][a]
-    n = len(input_videos)
-    filter_inputs = "".join([f"[{i}:v][{i}:a]" for i in range(n)])
-    filter_complex = f"{filter_inputs}concat=n={n}:v=1:a=1[v][a]"
+    cmd = build_concat_cmd(
+        input_args, len(input_videos), output_path, renditions, hls_dir, previews, subtitle_track, scale,
+        audio_filters=audio_filters
+    )
+
+    run_ffmpeg(cmd, "Concatenating videos")
+    return output_path
+
+
+# ==============================================================================
+# STREAMING SEGMENT PRODUCERS
+# ==============================================================================
+# In streaming mode every segment is produced as raw NUT into a FIFO and the
+# concat encode is the only process that encodes or writes video to disk.
+# Producers enforce their own durations (tpad/apad + -t), which replaces the
+# file-based pad_audio_to_video_duration pass.
+
+# Hold the last frame / pad silence forever; the output -t cuts both streams
+STREAM_VIDEO_GUARD = "tpad=stop_mode=clone:stop=-1"
+STREAM_AUDIO_GUARD = "apad"
+
+
+def find_audio_overlay(audio_overlays: List[Dict[str, Any]], segment_index: int) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Looks up the audio overlay for a segment.
+
+    Args:
+        audio_overlays: Downloaded overlay entries ({"segment_index", "audio_path"})
+        segment_index: Zero-based segment index
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: (audio path, template type) or (None, None)
+    """
+    for overlay in audio_overlays:
+        if overlay["segment_index"] == segment_index:
+            # Determine template type based on segment index
+            # Segment 1 = plc_000 (greeting), Segment 6 = plc_001 (thankyou)
+            template_type = None
+            if segment_index == 1:
+                template_type = "greeting"
+            elif segment_index == 6:
+                template_type = "thankyou"
+            return overlay["audio_path"], template_type
+    return None, None
+
+
+def build_constant_stream(
+    video_path: str,
+    target: str,
+    duration: Optional[float] = None
+) -> Tuple[List[List[str]], float]:
+    """
+    Builds the producer for a constant (full screen, unmodified) segment.
+
+    Args:
+        video_path: Path to the constant video
+        target: FIFO path to write to
+        duration: Known segment duration (default: probed from video_path)
+
+    Returns:
+        Tuple: (pipeline stages, segment duration)
+    """
+    cfg = VIDEO_CONFIG
+    if duration is None:
+        # Longest stream wins, exactly as pad_audio_to_video_duration would do
+        duration = max(get_stream_duration(video_path, "v:0"), get_stream_duration(video_path, "a:0"))
+        if duration <= 0:
+            duration = get_media_duration(video_path)
 
     cmd = [
         "ffmpeg", "-y",
         "-hide_banner", "-loglevel", "warning",
-    ] + input_args + [
-        "-filter_complex", filter_complex,
-        "-map", "[v]",
-        "-map", "[a]",
-        # Re-encode to ensure consistent output
-        "-c:v", cfg['codec'],
-        "-preset", cfg['preset'],
-        "-crf", str(cfg['crf']),
-        "-pix_fmt", cfg['pix_fmt'],
+        "-i", video_path,
+        "-vf", f"{standard_scale_filter()},{STREAM_VIDEO_GUARD}",
+        "-af", STREAM_AUDIO_GUARD,
         "-r", str(cfg['fps']),
-        "-c:a", cfg['audio_codec'],
-        "-ar", str(cfg['audio_rate']),
-        "-ac", str(cfg['audio_channels']),
-        "-b:a", cfg['audio_bitrate'],
-        output_path
-    ]
+        "-t", str(duration),
+    ] + stream_output_args(target)
+    return [cmd], duration
+
+
+def build_overlay_stream(
+    video_path: str,
+    audio_path: str,
+    audio_duration: float,
+    subtitle_path: Optional[str],
+    target: str,
+    video_duration: Optional[float] = None,
+    burn_subtitles: Optional[bool] = None
+) -> Tuple[List[List[str]], float]:
+    """
+    Builds the producer for an audio overlay (placeholder) segment.
 
-    run_ffmpeg(cmd, "Concatenating videos")
+    Stage 1 fits the placeholder video to the audio duration, stage 2 muxes the
+    ElevenLabs audio and burns subtitles; the two are connected by a pipe.
+
+    Args:
+        video_path: Path to the placeholder video
+        audio_path: Path to the replacement audio
+        audio_duration: Duration of the replacement audio in seconds
+        subtitle_path: Optional .ass file to burn in
+        target: FIFO path to write to
+        video_duration: Known placeholder duration (default: probed)
+        burn_subtitles: Burn subtitle_path (default: if the file exists)
+
+    Returns:
+        Tuple: (pipeline stages, segment duration)
+    """
+    cfg = VIDEO_CONFIG
+    if video_duration is None:
+        video_duration = get_media_duration(video_path)
+    if burn_subtitles is None:
+        burn_subtitles = bool(subtitle_path and os.path.exists(subtitle_path))
+
+    if video_duration > 0:
+        fit = build_fit_video_cmd(
+            video_path, video_duration, audio_duration,
+            stream_output_args("pipe:1", include_audio=False)
+        )
+    else:
+        # Fallback: Simple loop/trim approach
+        logger.warning(f"Invalid video duration for {video_path}, using simple loop")
+        fit = [
+            "ffmpeg", "-y",
+            "-hide_banner", "-loglevel", "warning",
+            "-stream_loop", "-1",
+            "-i", video_path,
+            "-vf", standard_scale_filter(),
+            "-r", str(cfg['fps']),
+            "-an",
+            "-t", str(audio_duration),
+        ] + stream_output_args("pipe:1", include_audio=False)
+
+    video_filter = STREAM_VIDEO_GUARD
+    if burn_subtitles:
+        video_filter = f"{ass_filter(subtitle_path)},{video_filter}"
+
+    mux = [
+        "ffmpeg", "-y",
+        "-hide_banner", "-loglevel", "warning",
+    ] + stream_input_args("pipe:0") + [
+        "-i", audio_path,
+        "-map", "0:v",
+        "-map", "1:a",
+        "-vf", video_filter,
+        "-af", STREAM_AUDIO_GUARD,
+        "-t", str(audio_duration),
+    ] + stream_output_args(target)
+    return [fit, mux], audio_duration
+
+
+def build_podcast_stream(
+    bg_image: str,
+    blusanta_video: str,
+    doctor_video: str,
+    doctor_name: str,
+    font_path: Optional[str],
+    subtitle_path: Optional[str],
+    target: str,
+    doctor_duration: Optional[float] = None,
+    burn_subtitles: Optional[bool] = None,
+    write_script: bool = True
+) -> Tuple[List[List[str]], float]:
+    """
+    Builds the producer for a podcast zoom segment.
+
+    The nodding video is looped by the demuxer (-stream_loop) instead of being
+    re-encoded to length, and the composite is piped into the subtitle burn.
+
+    Args:
+        bg_image: Path to podcast background image
+        blusanta_video: Path to BluSanta nodding master
+        doctor_video: Path to the normalized doctor video
+        doctor_name: Doctor's name for the label
+        font_path: Path to font file for labels (optional)
+        subtitle_path: Optional .ass file to burn in
+        target: FIFO path to write to
+        doctor_duration: Known doctor video duration (default: probed)
+        burn_subtitles: Burn subtitle_path (default: if the file exists)
+        write_script: Write the filter script (False when only planning)
+
+    Returns:
+        Tuple: (pipeline stages, segment duration)
+    """
+    duration = get_media_duration(doctor_video) if doctor_duration is None else doctor_duration
+    if duration <= 0:
+        raise ValueError(f"Invalid doctor video duration: {duration}")
+
+    filter_complex, total_duration = build_podcast_filter_complex(duration, doctor_name, font_path)
+    if write_script:
+        filter_script_path = write_filter_script(filter_complex, target)
+    else:
+        filter_script_path = filter_script_path_for(target)
+
+    if burn_subtitles is None:
+        burn_subtitles = bool(subtitle_path and os.path.exists(subtitle_path))
+    composite = build_podcast_zoom_cmd(
+        bg_image,
+        ["-stream_loop", "-1", "-i", blusanta_video],
+        doctor_video,
+        filter_script_path,
+        total_duration,
+        stream_output_args("pipe:1" if burn_subtitles else target)
+    )
+    if not burn_subtitles:
+        return [composite], total_duration
+
+    burn = [
+        "ffmpeg", "-y",
+        "-hide_banner", "-loglevel", "warning",
+    ] + stream_input_args("pipe:0") + [
+        "-vf", ass_filter(subtitle_path),
+    ] + stream_output_args(target)
+    return [composite, burn], total_duration
+
+
+@timed_stage("stream")
+def stream_podcast_video(
+    job_temp_dir: str,
+    actor_videos: List[str],
+    doctor_videos: List[Optional[str]],
+    doctor_urls: List[Optional[str]],
+    audio_overlays: List[Dict[str, Any]],
+    bg_path: str,
+    font_path: Optional[str],
+    doctor_name: str,
+    dr_first_name: str,
+    output_path: str,
+    final_intro_path: Optional[str] = None,
+    final_outro_path: Optional[str] = None,
+    renditions: Optional[List[str]] = None,
+    hls_dir: Optional[str] = None,
+    previews: Optional[Dict[str, float]] = None,
+    subtitle_track: Optional[str] = None,
+    scale: Optional[Tuple[int, int]] = None,
+    audio_filters: Optional[List[Optional[str]]] = None,
+    wrapper_audio_filters: Optional[List[Optional[str]]] = None
+) -> str:
+    """
+    Renders the complete video with every segment streamed into one concat encode.
+
+    Equivalent to STEP 2-4 of the file-based pipeline (segments, concat,
+    optional intro/outro wrappers), but only output_path is written to disk.
+    With subtitle_track, no producer burns subtitles: the segment subtitles
+    are merged into that WebVTT file and muxed as a text track instead.
+
+    Args:
+        job_temp_dir: Job temp directory (FIFOs, subtitles, filter scripts)
+        actor_videos: Actor video per segment (standardized constant, nodding
+                      master or raw placeholder)
+        doctor_videos: Normalized doctor video per segment (or None)
+        doctor_urls: Doctor video source URL per segment (transcript cache key)
+        audio_overlays: Downloaded audio overlays
+        bg_path: Podcast background image
+        font_path: Font for labels (optional)
+        doctor_name: Doctor's full name for labels
+        dr_first_name: Doctor's first name for template subtitles
+        output_path: Final video path
+        final_intro_path: Optional legacy intro wrapper
+        final_outro_path: Optional legacy outro wrapper
+        renditions: Renditions the concat encode writes next to output_path
+        hls_dir: HLS package the concat encode writes (see build_concat_cmd)
+        previews: Poster/sprite/preview clip the concat encode cuts (see build_concat_cmd)
+        subtitle_track: Where to write the soft subtitle track, None to burn subtitles
+        scale: Output size for proxy renders (see build_concat_cmd)
+        audio_filters: Loudness filter per segment (see job_loudness_filters)
+        wrapper_audio_filters: Loudness filters of the intro and outro wrappers
+
+    Returns:
+        str: Path to the final video
+    """
+    producers = []
+    fifos = []
+    segment_subtitles = []
+    burn = not subtitle_track
+    wrappers = bool(final_intro_path and final_outro_path)
+
+    if wrappers:
+        fifo = create_stream_fifo(job_temp_dir, "f_intro")
+        producers.append(build_constant_stream(final_intro_path, fifo)[0])
+        fifos.append(fifo)
+
+    for i, actor_vid in enumerate(actor_videos):
+        part_num = i + 1
+        doctor_vid = doctor_videos[i] if i < len(doctor_videos) else None
+        fifo = create_stream_fifo(job_temp_dir, f"p{part_num}")
+
+        if doctor_vid:
+            # PODCAST ZOOM SEGMENT - the composite audio is the doctor audio from t=0,
+            # so the cached doctor transcript applies to the segment as-is
+            subtitle_path = None
+            try:
+                logger.info(f"Generating subtitles for podcast segment {part_num}...")
+                subtitle_path = doctor_segment_subtitles(
+                    doctor_urls[i], os.path.join(job_temp_dir, "subtitles", f"p{part_num}.ass")
+                )
+            except Exception as subtitle_error:
+                logger.error(f"❌ Subtitle error for segment {part_num}: {subtitle_error}")
+            if not subtitle_path:
+                logger.warning(f"⚠️ Subtitle generation failed for segment {part_num}, using without subtitles")
+            stages, _ = build_podcast_stream(
+                bg_path, actor_vid, doctor_vid, doctor_name, font_path, subtitle_path, fifo,
+                burn_subtitles=None if burn else False
+            )
+            segment_subtitles.append(subtitle_path)
+            logger.info(f"Part {part_num} (Podcast Zoom): Streaming")
+        else:
+            audio_file, template_type = find_audio_overlay(audio_overlays, i)
+            if audio_file:
+                # AUDIO OVERLAY SEGMENT
+                audio_duration = get_media_duration(audio_file)
+                if audio_duration <= 0:
+                    logger.warning("Invalid audio duration, using 5 seconds default")
+                    audio_duration = 5.0
+                subtitle_path = None
+                try:
+                    if template_type and dr_first_name:
+                        subtitle_path = generate_template_subtitles(
+                            fifo, template_type, dr_first_name, duration=audio_duration
+                        )
+                    else:
+                        subtitle_path = generate_subtitles_with_deepgram(audio_file, 'en')
+                except Exception as sub_err:
+                    logger.warning(f"⚠ Subtitle error for segment {part_num}: {sub_err}")
+                stages, _ = build_overlay_stream(
+                    actor_vid, audio_file, audio_duration, subtitle_path, fifo,
+                    burn_subtitles=None if burn else False
+                )
+                segment_subtitles.append(subtitle_path)
+                logger.info(f"Part {part_num} (Audio Overlay): Streaming")
+            else:
+                # CONSTANT SEGMENT
+                stages, _ = build_constant_stream(actor_vid, fifo)
+                segment_subtitles.append(None)
+                logger.info(f"Part {part_num} (Constant): Streaming")
+
+        producers.append(stages)
+        fifos.append(fifo)
+
+    if wrappers:
+        fifo = create_stream_fifo(job_temp_dir, "f_outro")
+        producers.append(build_constant_stream(final_outro_path, fifo)[0])
+        fifos.append(fifo)
+
+    # The consumer writes every segment once, so its out_time covers the whole video
+    durations = []
+    for i, actor_vid in enumerate(actor_videos):
+        doctor_vid = doctor_videos[i] if i < len(doctor_videos) else None
+        audio_file, _ = find_audio_overlay(audio_overlays, i)
+        durations.append(expected_segment_seconds(actor_vid, doctor_vid, audio_file, doctor_name, font_path))
+    if wrappers:
+        durations = [get_media_duration(final_intro_path)] + durations + [get_media_duration(final_outro_path)]
+        segment_subtitles = [None] + segment_subtitles + [None]
+    plan_progress([("stream", sum(durations))])
+
+    if subtitle_track:
+        subtitle_track = merge_segment_subtitles(list(zip(segment_subtitles, durations)), subtitle_track)
+
+    input_args = []
+    for fifo in fifos:
+        input_args.extend(stream_input_args(fifo))
+    if hls_dir:
+        prepare_hls_dir(hls_dir, hls_variants(renditions or []))
+    # The consumer's inputs are [intro] + segments + [outro]
+    input_filters = list(audio_filters or [None] * len(actor_videos))
+    if wrappers:
+        intro_filter, outro_filter = wrapper_audio_filters or [None, None]
+        input_filters = [intro_filter] + input_filters + [outro_filter]
+    consumer = build_concat_cmd(
+        input_args, len(fifos), output_path, renditions, hls_dir, previews, subtitle_track, scale,
+        audio_filters=input_filters
+    )
+
+    run_ffmpeg_fanin(producers, consumer, f"Streaming {len(fifos)} segments into final encode")
     return output_path
 
 
-# ==============================================================================
-# MAIN STITCHING PIPELINE
-# ==============================================================================
+# ==============================================================================
+# MAIN STITCHING PIPELINE
+# ==============================================================================
+
+def job_segment_urls(payload: Dict[str, Any]) -> Tuple[List[str], List[Optional[str]], set]:
+    """
+    Returns the per-segment inputs of a job.
+
+    Returns:
+        Tuple: (actor urls, doctor url or None per segment, audio overlay segment indices)
+    """
+    actor_urls = payload["assets_actor_paths"]
+    doctor_urls = [
+        payload["assets_doctor_paths"][i] if i < len(payload["assets_doctor_paths"]) else None
+        for i in range(len(actor_urls))
+    ]
+    overlay_indices = {item["segment_index"] for item in payload.get("audio_overlays", [])}
+    return actor_urls, doctor_urls, overlay_indices
+
+
+def collect_job_sources(payload: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+    """Returns (role, label, url) for every input of a job that gets decoded."""
+    actor_urls, doctor_urls, overlay_indices = job_segment_urls(payload)
+    sources = []
+    for key in ("intro_path", "outro_path", "final_intro_path", "final_outro_path"):
+        if payload.get(key):
+            sources.append(("constant", key, payload[key]))
+    sources.append(("image", "podcast_background", payload["podcast_background"]))
+    for i, url in enumerate(actor_urls):
+        if doctor_urls[i]:
+            sources.append(("nodding", f"assets_actor_paths[{i}]", url))
+            # An ingested mezzanine is what the job will decode
+            mezzanine_url, _ = mezzanine_paths(doctor_urls[i])
+            doctor_source = mezzanine_url if source_exists(mezzanine_url) else doctor_urls[i]
+            sources.append(("doctor", f"assets_doctor_paths[{i}]", doctor_source))
+        elif i in overlay_indices:
+            sources.append(("placeholder", f"assets_actor_paths[{i}]", url))
+        else:
+            sources.append(("constant", f"assets_actor_paths[{i}]", url))
+    for n, item in enumerate(payload.get("audio_overlays", [])):
+        sources.append(("audio", f"audio_overlays[{n}]", item["audio_path"]))
+    return sources
+
+
+def expected_segment_seconds(
+    actor_video: str,
+    doctor_video: Optional[str],
+    audio_file: Optional[str],
+    doctor_name: str,
+    font_path: Optional[str]
+) -> float:
+    """
+    Returns the output duration of one podcast segment, for progress planning.
+
+    Podcast segments follow the doctor video (plus transitions), audio overlay
+    segments are trimmed to the audio, constant segments play as-is.
+    """
+    try:
+        if doctor_video:
+            _, total_duration = build_podcast_filter_complex(
+                get_media_duration(doctor_video), doctor_name, font_path
+            )
+            return total_duration
+        if audio_file:
+            return get_media_duration(audio_file)
+        return get_media_duration(actor_video)
+    except Exception as e:
+        logger.debug(f"Could not plan segment duration: {e}")
+        return 0.0
+
+
+def job_preview_times(
+    actor_videos: List[str],
+    doctor_videos: List[Optional[str]],
+    audio_overlays: List[Dict[str, Any]],
+    doctor_name: str,
+    font_path: Optional[str],
+    wrapper_paths: List[str]
+) -> Dict[str, float]:
+    """Places the previews on the job's timeline (see preview_times) from the expected segment durations."""
+    seconds = []
+    for i, actor_vid in enumerate(actor_videos):
+        doctor_vid = doctor_videos[i] if i < len(doctor_videos) else None
+        audio_file, _ = find_audio_overlay(audio_overlays, i)
+        seconds.append(expected_segment_seconds(actor_vid, doctor_vid, audio_file, doctor_name, font_path))
+    first_podcast = next((i for i, doctor_vid in enumerate(doctor_videos) if doctor_vid), None)
+    wrapper_seconds = [get_media_duration(path) for path in wrapper_paths] or [0.0, 0.0]
+    return preview_times(seconds, first_podcast, *wrapper_seconds)
+
+
+def plan_file_mode_progress(
+    actor_videos: List[str],
+    doctor_videos: List[Optional[str]],
+    audio_overlays: List[Dict[str, Any]],
+    doctor_name: str,
+    font_path: Optional[str],
+    wrapper_paths: List[str],
+    burn_subtitles: bool = True
+) -> None:
+    """
+    Plans the encode steps of a file-mode job.
+
+    Podcast and overlay segments are encoded twice (composite/fit, then subtitle
+    burn-in), or once with soft subtitles (burn_subtitles=False); constant
+    segments are linked from the cache and not encoded. Concat re-encodes
+    every segment, the wrap step everything plus wrappers.
+    """
+    encodes = 2 if burn_subtitles else 1
+    steps = []
+    total = 0.0
+    for i, actor_vid in enumerate(actor_videos):
+        doctor_vid = doctor_videos[i] if i < len(doctor_videos) else None
+        audio_file, _ = find_audio_overlay(audio_overlays, i)
+        duration = expected_segment_seconds(actor_vid, doctor_vid, audio_file, doctor_name, font_path)
+        total += duration
+        if doctor_vid or audio_file:
+            steps.append((stage_key("segment", i + 1), encodes * duration))
+    steps.append(("concat", total))
+    if wrapper_paths:
+        steps.append(("wrap", total + sum(get_media_duration(path) for path in wrapper_paths)))
+    plan_progress(steps)
+
 
 def blusanta_video_stitching(payload: Dict[str, Any]) -> bool:
     """
     Main video stitching pipeline for BluSanta campaign videos.
 
     This function orchestrates the complete video creation process:
-    1. Downloads all required assets from cloud storage
+    1. Downloads all required assets from cloud storage and preflights them
     2. Creates the 9-part podcast video with zoom effects
     3. Wraps with final intro/outro
     4. Uploads to cloud storage
@@ -1511,7 +6435,18 @@ def blusanta_video_stitching(payload: Dict[str, Any]) -> bool:
         "audio_overlays": [...],           # Audio replacement configuration
         "final_upload_path": "gs://...",   # Output destination
         "webhook_url": "https://...",      # Completion notification URL
-        "additional_data": {...}           # Passthrough data for webhook
+        "progress_webhook_url": "https://...",  # Optional: periodic progress posts
+        "additional_data": {...},          # Passthrough data for webhook
+        "streaming": false,                # Optional: pipe stages instead of writing segments
+        "job_id": "...",                   # Optional: names temp/output/trace files
+        "encoder_profile": "default",      # Optional: ENCODER_PROFILES entry (see choose_job_profile)
+        "profile_choice": {...},           # Optional: choose_job_profile() result, recorded with the job
+        "renditions": ["720p", "480p"],    # Optional: RENDITION_CONFIG ladder names ([] = master only)
+        "hls": false,                      # Optional: also package as HLS (default: HLS_CONFIG["enabled"])
+        "previews": true,                  # Optional: poster/sprite/preview clip (default: PREVIEW_CONFIG["enabled"])
+        "subtitles": "burn",               # Optional: "soft" = one text track instead of burn-in
+                                           # (default: SOFT_SUBTITLE_CONFIG["enabled"])
+        "proxy": false                     # Optional: 640x360 QC proxy uploaded as <name>_proxy.mp4
     }
 
     Args:
@@ -1521,329 +6456,1676 @@ def blusanta_video_stitching(payload: Dict[str, Any]) -> bool:
         bool: True if successful, False otherwise
     """
     # Create unique temp directory for this job
-    job_id = str(int(time.time() * 1000))
+    job_id = make_job_id(payload.get("job_id"))
     job_temp_dir = os.path.join(TEMP_DIR, f"job_{job_id}")
     os.makedirs(job_temp_dir, exist_ok=True)
 
+    # Resource accounting for every process this job (and its worker threads) starts
+    metrics = JobMetrics(job_id)
+    job_token = _current_job.set(metrics)
+    metrics.profile = payload.get("encoder_profile") or VIDEO_CONFIG["profile"]
+    metrics.profile_choice = payload.get("profile_choice")
+    profile_token = _job_profile.set(metrics.profile)
+    job_status = "failed"
+    # Local files the job uploaded (deleted once it completes, see OUTPUT_CONFIG)
+    uploaded_outputs: List[str] = []
+    JOBS_IN_PROGRESS.inc()
+    register_job(metrics)
+
+    # Stall detection and optional progress webhook while the job runs
+    monitor_stop = threading.Event()
+    threading.Thread(
+        target=monitor_job_progress,
+        args=(metrics, monitor_stop, payload.get("progress_webhook_url"), payload.get("additional_data")),
+        name=f"progress-{job_id}",
+        daemon=True
+    ).start()
+
     try:
         logger.info("=" * 60)
         logger.info("STARTING BLUSANTA VIDEO STITCHING")
         logger.info("=" * 60)
         start_time = time.time()
+        metrics.mode = payload_mode(payload)
+        logger.info(f"Encoder profile: {metrics.profile} "
+                    f"({(metrics.profile_choice or {}).get('reason', 'default')})")
 
         # ---------------------------------------------------------------------
-        # STEP 1: DOWNLOAD ALL ASSETS
+        # STEP 1: FETCH ASSETS AND PRECOMPUTED ARTIFACTS
         # ---------------------------------------------------------------------
-        logger.info("STEP 1: Downloading assets...")
+        logger.info("STEP 1: Fetching assets...")
+        enter_stage("fetch")
 
-        # Define local paths for downloaded assets
-        intro_path = None
-        outro_path = None
+        # Everything comes through the asset cache, so anything /prefetch (or an
+        # earlier job) already downloaded or precomputed is reused as-is. Cached
+        # files are read-only; job outputs are written to job_temp_dir.
+        actor_urls, doctor_urls, overlay_indices = job_segment_urls(payload)
+        sources = collect_job_sources(payload)
+
+        # Download concurrently, then probe everything before the first encode
+        def download(source: Tuple[str, str, str]) -> Optional[str]:
+            try:
+                return fetch_asset(source[2])
+            except Exception as e:
+                logger.error(f"Download failed for {source[1]}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=PREFLIGHT_CONFIG["max_workers"], thread_name_prefix="download") as pool:
+            local_paths = map_with_context(pool, download, sources)
+        font_path = fetch_asset(payload["font_path"]) if payload.get("font_path") else None
+
+        logger.info("STEP 1B: Preflight checks...")
+        enter_stage("preflight")
+        preflight_inputs([(role, label, path) for (role, label, _), path in zip(sources, local_paths)])
+
+        # Expected duration from the job history (Retry-After for requests arriving meanwhile)
+        doctor_seconds = sum(entry["seconds"] or 0.0 for entry in metrics.inputs if entry["role"] == "doctor")
+        prediction = predict_job_seconds(metrics.mode, doctor_seconds or None, metrics.profile)
+        if prediction:
+            metrics.predicted_seconds = prediction["seconds"]
+            logger.info(f"Predicted duration: {prediction['seconds']:.0f}s ({prediction['basis']}, "
+                        f"{prediction['jobs']} earlier jobs)")
+
+        enter_stage("artifacts")
         final_intro_path = None
         final_outro_path = None
-        bg_path = os.path.join(job_temp_dir, "podcast_bg.jpg")
-        font_path = os.path.join(job_temp_dir, "font.ttf") if payload.get("font_path") else None
-
-        # Download main assets (skip None paths for new 8-segment format)
-        if payload.get("intro_path"):
-            intro_path = os.path.join(job_temp_dir, "intro.mp4")
-            download_file(payload["intro_path"], intro_path)
-        if payload.get("outro_path"):
-            outro_path = os.path.join(job_temp_dir, "outro.mp4")
-            download_file(payload["outro_path"], outro_path)
         if payload.get("final_intro_path"):
-            final_intro_path = os.path.join(job_temp_dir, "final_intro.mp4")
-            download_file(payload["final_intro_path"], final_intro_path)
+            final_intro_path = get_standardized_constant(payload["final_intro_path"])
         if payload.get("final_outro_path"):
-            final_outro_path = os.path.join(job_temp_dir, "final_outro.mp4")
-            download_file(payload["final_outro_path"], final_outro_path)
-        
-        download_file(payload["podcast_background"], bg_path)
+            final_outro_path = get_standardized_constant(payload["final_outro_path"])
 
-        if payload.get("font_path"):
-            download_file(payload["font_path"], font_path)
+        bg_path = fetch_asset(payload["podcast_background"])
 
-        # Download actor videos (7 videos for middle parts)
-        actor_videos = []
-        for i, url in enumerate(payload["assets_actor_paths"]):
-            local_path = os.path.join(job_temp_dir, f"actor_{i}.mp4")
-            download_file(url, local_path)
-            actor_videos.append(local_path)
+        # Audio overlays (for placeholder videos)
+        audio_overlays = []
+        for item in payload.get("audio_overlays", []):
+            audio_overlays.append({
+                "segment_index": item["segment_index"],
+                "audio_path": fetch_asset(item["audio_path"])
+            })
 
-        # Download doctor videos (only 2 are non-null, at indices 2 and 4)
+        # Each segment reads the artifact for its role:
+        # podcast -> nodding master + normalized doctor video,
+        # audio overlay -> raw placeholder (its video-only master with constant mezzanines),
+        # constant -> standardized constant
+        actor_videos = []
         doctor_videos = []
-        for i, url in enumerate(payload["assets_doctor_paths"]):
-            if url:
-                local_path = os.path.join(job_temp_dir, f"doctor_{i}.mp4")
-                download_file(url, local_path)
-                doctor_videos.append(local_path)
+        for i, url in enumerate(actor_urls):
+            if doctor_urls[i]:
+                actor_videos.append(get_nodding_master(url))
+                doctor_videos.append(get_normalized_doctor_video(doctor_urls[i]))
+            elif i in overlay_indices:
+                actor_videos.append(
+                    get_nodding_master(url) if CONSTANT_MEZZANINE_CONFIG["enabled"] else fetch_asset(url)
+                )
+                doctor_videos.append(None)
             else:
+                actor_videos.append(get_standardized_constant(url))
                 doctor_videos.append(None)
 
-        # Download audio overlays (for placeholder videos)
-        audio_overlays = []
-        for item in payload.get("audio_overlays", []):
-            idx = item["segment_index"]
-            audio_url = item["audio_path"]
-            local_path = os.path.join(job_temp_dir, f"audio_{idx}.mp3")
-            download_file(audio_url, local_path)
-            audio_overlays.append({
-                "segment_index": idx,
-                "audio_path": local_path
-            })
+        # Get doctor name for labels - use database fields directly
+        dr_first_name = payload.get("additional_data", {}).get("drFirstName", "")
+        dr_last_name = payload.get("additional_data", {}).get("drLastName", "")
+        doctor_name = f"{dr_first_name} {dr_last_name}".strip() if dr_first_name or dr_last_name else "Doctor"
+
+        logger.info(f"Fetched {len(actor_videos)} actor videos, "
+                   f"{sum(1 for v in doctor_videos if v)} doctor videos, "
+                   f"{len(audio_overlays)} audio overlays")
+
+        # Loudness correction per segment, applied where the concat encode reads it
+        segment_loudness, wrapper_loudness = job_loudness_filters(payload)
+
+        renditions = job_renditions(payload)
+        if renditions:
+            logger.info(f"Renditions: 1080p master + {', '.join(renditions)} (one decode, shared final encode)")
+        hls_dir = hls_dir_for(os.path.join(OUTPUT_DIR, f"final_video_{job_id}.mp4")) if job_hls(payload) else None
+        if hls_dir:
+            logger.info(f"HLS: packaging {', '.join(hls_variants(renditions))} during the final encode")
+        wrapper_paths = [final_intro_path, final_outro_path] if final_intro_path and final_outro_path else []
+        previews = None
+        if job_previews(payload):
+            previews = job_preview_times(
+                actor_videos, doctor_videos, audio_overlays, doctor_name, font_path, wrapper_paths
+            )
+            logger.info(f"Previews: poster at {previews['poster_seconds']:.1f}s, "
+                        f"{previews['preview_seconds']:.0f}s clip from {previews['preview_start']:.1f}s")
+        final_output = os.path.join(OUTPUT_DIR, f"final_video_{job_id}.mp4")
+        # Everything the final encode writes besides the master, from the same decode
+        proxy = job_proxy(payload)
+        final_extras = {
+            "renditions": renditions, "hls_dir": hls_dir, "previews": previews,
+            "scale": proxy_size() if proxy else None,
+        }
+        if proxy:
+            logger.info(f"Proxy render for QC: {'x'.join(map(str, proxy_size()))}, "
+                        f"'{metrics.profile}' profile, no renditions/HLS/previews")
+        # Soft subtitles: segment subtitles are merged into one track instead of being burned in
+        soft_subtitles = job_soft_subtitles(payload)
+        subtitle_track = subtitle_track_path(final_output) if soft_subtitles else None
+        if soft_subtitles:
+            logger.info("Subtitles: soft track (mov_text + WebVTT sidecar), no per-segment burn-in")
+
+        streaming = bool(payload.get("streaming", STREAMING_CONFIG["enabled"]))
+        if streaming and not streaming_supported():
+            logger.warning("Streaming mode requested but FIFOs are unavailable, using file mode")
+            streaming = False
+
+        if streaming:
+            # -----------------------------------------------------------------
+            # STEP 2-4 (STREAMING): SEGMENTS PIPED STRAIGHT INTO THE FINAL ENCODE
+            # -----------------------------------------------------------------
+            logger.info("STEP 2-4: Streaming segments into final encode (no intermediate files)...")
+            enter_stage("stream")
+            stream_podcast_video(
+                job_temp_dir, actor_videos, doctor_videos, doctor_urls, audio_overlays,
+                bg_path, font_path, doctor_name, dr_first_name, final_output,
+                final_intro_path=final_intro_path, final_outro_path=final_outro_path,
+                subtitle_track=subtitle_track, audio_filters=segment_loudness,
+                wrapper_audio_filters=wrapper_loudness, **final_extras
+            )
+        else:
+            # ---------------------------------------------------------------------
+            # STEP 2: CREATE THE 8-SEGMENT PODCAST VIDEO
+            # ---------------------------------------------------------------------
+            logger.info("STEP 2: Processing 8 video segments...")
+            plan_file_mode_progress(
+                actor_videos, doctor_videos, audio_overlays, doctor_name, font_path, wrapper_paths,
+                burn_subtitles=not soft_subtitles
+            )
+
+            segments = []
+            segment_subtitles = []
+        
+            # Determine number of segments based on whether intro/outro exist
+            num_segments = len(actor_videos)
+        
+            # Process all segments (8 segments for new format, 7 for legacy)
+            for i in range(num_segments):
+                part_num = i + 1
+                actor_vid = actor_videos[i]
+                doctor_vid = doctor_videos[i] if i < len(doctor_videos) else None
+                output_seg = os.path.join(job_temp_dir, f"p{part_num}.mp4")
+                enter_stage("segment", part_num)
+
+                # Check if this segment needs podcast zoom (has doctor video)
+                if doctor_vid:
+                    # PODCAST ZOOM SEGMENTS
+                    # These show side-by-side BluSanta and Doctor with zoom animation
+                
+                    # Create podcast zoom segment WITHOUT subtitles first
+                    podcast_temp = os.path.join(job_temp_dir, f"p{part_num}_podcast_temp.mp4")
+
+                    create_podcast_zoom_segment(
+                        bg_image=bg_path,
+                        blusanta_video=actor_vid,
+                        doctor_video=doctor_vid,  # Normalized doctor video without pre-burned subtitles
+                        output_path=podcast_temp,
+                        doctor_name=doctor_name,
+                        font_path=font_path
+                    )
+
+                    # Generate subtitles for this podcast segment (cached doctor transcript)
+                    try:
+                        logger.info(f"Generating subtitles for podcast segment {part_num}...")
+                        subtitle_path = doctor_segment_subtitles(
+                            doctor_urls[i], os.path.join(job_temp_dir, "subtitles", f"p{part_num}.ass")
+                        )
+                        if subtitle_path and os.path.exists(subtitle_path) and soft_subtitles:
+                            segment_subtitles.append(subtitle_path)
+                            shutil.move(podcast_temp, output_seg)
+                        elif subtitle_path and os.path.exists(subtitle_path):
+                            podcast_with_subs = os.path.join(job_temp_dir, f"p{part_num}_with_subs.mp4")
+                            apply_subtitles_to_video(podcast_temp, subtitle_path, podcast_with_subs)
+                            logger.info(f"✅ Applied subtitles to podcast segment {part_num}")
+                            # Move the subtitled version to final path
+                            shutil.move(podcast_with_subs, output_seg)
+                        else:
+                            logger.warning(f"⚠️ Subtitle generation failed for segment {part_num}, using without subtitles")
+                            shutil.move(podcast_temp, output_seg)
+                    except Exception as subtitle_error:
+                        logger.error(f"❌ Subtitle error for segment {part_num}: {subtitle_error}")
+                        logger.warning("⚠️ Using podcast segment without subtitles")
+                        shutil.move(podcast_temp, output_seg)
+
+                    logger.info(f"Part {part_num} (Podcast Zoom): Created")
+
+                else:
+                    # Check if this segment needs audio overlay
+                    audio_file, template_type = find_audio_overlay(audio_overlays, i)
+                
+                    if audio_file:
+                        # AUDIO OVERLAY SEGMENTS (plc_000 and plc_001)
+                        # Replace audio with ElevenLabs generated audio
+                        temp_output = output_seg.replace('.mp4', '_temp.mp4')
+                        replace_audio_and_trim(actor_vid, audio_file, temp_output)
+                        logger.info(f"Part {part_num} (Audio Overlay): Audio replaced")
+                    
+                        # Generate subtitles for audio overlay segment
+                        # Use TEMPLATE subtitles for greeting/thankyou (accurate doctor name)
+                        # instead of transcription (which may misspell the name)
+                        try:
+                            logger.info(f"Generating subtitles for audio overlay segment {part_num}...")
+                            if template_type and dr_first_name:
+                                # Use template-based subtitles for accurate doctor name
+                                logger.info(f"Using template subtitles ({template_type}) with doctor name: {dr_first_name}")
+                                subtitle_path = generate_template_subtitles(temp_output, template_type, dr_first_name)
+                            else:
+                                # Fallback to transcription if no template or name
+                                subtitle_path = generate_subtitles_with_deepgram(temp_output, 'en')
+                        
+                            if subtitle_path and os.path.exists(subtitle_path) and soft_subtitles:
+                                segment_subtitles.append(subtitle_path)
+                                shutil.move(temp_output, output_seg)
+                            elif subtitle_path and os.path.exists(subtitle_path):
+                                overlay_with_subs = temp_output.replace('.mp4', '_with_subs.mp4')
+                                apply_subtitles_to_video(temp_output, subtitle_path, overlay_with_subs)
+                                logger.info(f"✓ Applied subtitles to audio overlay segment {part_num}")
+                                shutil.move(overlay_with_subs, output_seg)
+                                if os.path.exists(temp_output):
+                                    os.remove(temp_output)
+                            else:
+                                logger.warning(f"⚠ No subtitles generated for segment {part_num}")
+                                shutil.move(temp_output, output_seg)
+                        except Exception as sub_err:
+                            logger.warning(f"⚠ Subtitle error for segment {part_num}: {sub_err}")
+                            shutil.move(temp_output, output_seg)
+                    else:
+                        # CONSTANT SEGMENTS
+                        # Already standardized (cached artifact), linked into the job dir
+                        link_or_copy(actor_vid, output_seg)
+                        logger.info(f"Part {part_num} (Constant): Standardized")
+
+                segments.append(output_seg)
+                if len(segment_subtitles) < len(segments):
+                    segment_subtitles.append(None)
+
+            logger.info(f"Total segments processed: {len(segments)}")
+
+            if soft_subtitles:
+                # One track on the final timeline (the intro wrapper shifts every cue)
+                timeline = [(path, get_media_duration(seg)) for seg, path in zip(segments, segment_subtitles)]
+                if wrapper_paths:
+                    timeline = ([(None, get_media_duration(final_intro_path))] + timeline
+                                + [(None, get_media_duration(final_outro_path))])
+                final_extras["subtitle_track"] = merge_segment_subtitles(timeline, subtitle_track)
+
+            # ---------------------------------------------------------------------
+            # STEP 3: CONCATENATE SEGMENTS INTO FINAL VIDEO
+            # ---------------------------------------------------------------------
+            logger.info(f"STEP 3: Concatenating {len(segments)} segments...")
+            enter_stage("concat")
+
+            podcast_video = os.path.join(job_temp_dir, "podcast_full.mp4")
+
+            # Guard against missing segments before invoking ffmpeg concat
+            missing_segments = [seg for seg in segments if not os.path.exists(seg)]
+            if missing_segments:
+                missing_list = ", ".join(os.path.basename(seg) for seg in missing_segments)
+                raise FileNotFoundError(f"Missing segment files before concat: {missing_list}")
+
+            # Without wrappers this is the final encode: it writes the final video and its extras
+            wrapped = bool(wrapper_paths)
+            if wrapped:
+                concatenate_videos(segments, podcast_video, audio_filters=segment_loudness)
+            else:
+                concatenate_videos(segments, final_output, audio_filters=segment_loudness, **final_extras)
+
+            # ---------------------------------------------------------------------
+            # STEP 4: FINALIZE VIDEO (with or without wrappers)
+            # ---------------------------------------------------------------------
+            # If intro/outro paths are provided (legacy format), wrap the video
+            # Otherwise, the concatenated podcast IS the final video (new 8-segment format)
+        
+            if wrapped:
+                logger.info("STEP 4: Adding final intro/outro wrappers...")
+                enter_stage("wrap")
+            
+                # Final intro/outro are standardized constants (cached artifacts)
+                f_intro = link_or_copy(final_intro_path, os.path.join(job_temp_dir, "f_intro_std.mp4"))
+                f_outro = link_or_copy(final_outro_path, os.path.join(job_temp_dir, "f_outro_std.mp4"))
+
+                # Final concatenation: intro + podcast + outro (the podcast is already leveled)
+                concatenate_videos([f_intro, podcast_video, f_outro], final_output,
+                                   audio_filters=[wrapper_loudness[0], None, wrapper_loudness[1]], **final_extras)
+            else:
+                # No wrappers needed - the concatenated segments ARE the final video
+                logger.info("STEP 4: No wrappers needed, using concatenated segments as final video")
+
+        # ---------------------------------------------------------------------
+        # STEP 4B: GENERATE AND APPLY SUBTITLES TO FINAL VIDEO
+        # ---------------------------------------------------------------------
+        # COMMENTED OUT: Subtitles are now pre-burned into const videos
+        # and generated per-segment for podcast videos
+        # logger.info("STEP 4B: Generating subtitles for final video...")
+        # try:
+        #     subtitle_path = generate_subtitles_with_deepgram(final_output, 'en')
+        #     if subtitle_path and os.path.exists(subtitle_path):
+        #         final_with_subtitles = final_output.replace('.mp4', '_with_subs.mp4')
+        #         apply_subtitles_to_video(final_output, subtitle_path, final_with_subtitles)
+        #         logger.info(f"✅ Applied subtitles to final video")
+        #         # Replace original final output with subtitled version
+        #         os.replace(final_with_subtitles, final_output)
+        #     else:
+        #         logger.warning("⚠️ Subtitle generation failed, proceeding without subtitles")
+        # except Exception as subtitle_error:
+        #     logger.error(f"❌ Subtitle generation error: {subtitle_error}")
+        #     logger.warning("⚠️ Proceeding with final video without subtitles")
+        if soft_subtitles:
+            logger.info("STEP 4B: Skipped (soft subtitle track muxed by the final encode)")
+        else:
+            logger.info("STEP 4B: Skipped (subtitles pre-burned in const videos + per-segment for podcast)")
+
+        # ---------------------------------------------------------------------
+        # STEP 5: UPLOAD TO CLOUD STORAGE
+        # ---------------------------------------------------------------------
+        logger.info("STEP 5: Uploading final video...")
+        enter_stage("upload")
+
+        metrics.output_bytes = os.path.getsize(final_output)
+        upload_path = proxy_path(payload["final_upload_path"]) if proxy else payload["final_upload_path"]
+        public_url = upload_file(final_output, upload_path)
+        uploaded_outputs.append(final_output)
+        width, height = proxy_size() if proxy else (VIDEO_CONFIG["width"], VIDEO_CONFIG["height"])
+        rendition_urls = [{
+            "name": "proxy" if proxy else "master", "width": width, "height": height,
+            "url": public_url, "bytes": metrics.output_bytes,
+        }]
+        for name in renditions:
+            local_path = rendition_path(final_output, name)
+            width, height = rendition_size(name)
+            rendition_urls.append({
+                "name": name, "width": width, "height": height,
+                "url": upload_file(local_path, rendition_path(payload["final_upload_path"], name)),
+                "bytes": os.path.getsize(local_path),
+            })
+            uploaded_outputs.append(local_path)
+            logger.info(f"Rendition {name}: {rendition_urls[-1]['url']}")
+        soft_track = subtitle_track if subtitle_track and os.path.exists(subtitle_track) else None
+        subtitles_url = None
+        if soft_track:
+            subtitles_url = upload_file(soft_track, subtitle_track_path(upload_path))
+            uploaded_outputs.append(soft_track)
+            logger.info(f"Subtitles: {subtitles_url}")
+        elif soft_subtitles:
+            logger.warning("⚠️ No segment subtitles to ship as a soft track")
+        hls_url = None
+        if hls_dir:
+            write_hls_master_playlist(hls_dir, {
+                variant: final_output if variant == "master" else rendition_path(final_output, variant)
+                for variant in hls_variants(renditions)
+            }, soft_track)
+            hls_files = upload_directory(hls_dir, hls_dir_for(payload["final_upload_path"]))
+            uploaded_outputs.append(hls_dir)
+            hls_url = next(url for url in hls_files if url.endswith("/master.m3u8"))
+            logger.info(f"HLS: {hls_url} ({len(hls_files)} files)")
+        preview_urls = None
+        if previews:
+            # The .vtt points at the sprite by file name: both are uploaded side by side
+            write_sprite_vtt(preview_path(final_output, "sprite_vtt"),
+                             os.path.basename(preview_path(payload["final_upload_path"], "sprite")), previews)
+            preview_urls = {
+                kind: upload_file(preview_path(final_output, kind), preview_path(payload["final_upload_path"], kind))
+                for kind in PREVIEW_OUTPUTS
+            }
+            uploaded_outputs += [preview_path(final_output, kind) for kind in PREVIEW_OUTPUTS]
+            logger.info(f"Poster: {preview_urls['poster']}, preview: {preview_urls['preview']}")
+        metrics.start_stage(None)
+
+        elapsed_time = time.time() - start_time
+        logger.info("=" * 60)
+        logger.info(f"STITCHING COMPLETE - Duration: {elapsed_time:.2f}s")
+        logger.info(f"Final video: {public_url}")
+        logger.info("=" * 60)
+
+        # ---------------------------------------------------------------------
+        # STEP 6: SEND WEBHOOK NOTIFICATION
+        # ---------------------------------------------------------------------
+        if payload.get("webhook_url"):
+            try:
+                webhook_data = {
+                    "status": "completed",
+                    "job_id": job_id,
+                    "final_video_url": public_url,
+                    "proxy": proxy,
+                    "renditions": rendition_urls,
+                    "hls_url": hls_url,
+                    "previews": preview_urls,
+                    "subtitles": "soft" if soft_subtitles else "burn",
+                    "subtitles_url": subtitles_url,
+                    "processing_time_seconds": elapsed_time,
+                    "encoder_profile": metrics.profile,
+                    "profile_choice": metrics.profile_choice,
+                    "resource_usage": metrics.summary(),
+                    "additional_data": payload.get("additional_data", {})
+                }
+                with trace_span("webhook", "http", status="completed"):
+                    response = requests.post(
+                        payload["webhook_url"],
+                        json=webhook_data,
+                        timeout=30
+                    )
+                logger.info(f"Webhook sent: {response.status_code}")
+            except Exception as e:
+                logger.warning(f"Webhook failed: {e}")
+
+        job_status = "completed"
+        return True
+
+    except Exception as e:
+        logger.error(f"STITCHING FAILED: {e}", exc_info=True)
+
+        # Send failure webhook
+        if payload.get("webhook_url"):
+            failure_data = {
+                "status": "failed",
+                "job_id": job_id,
+                "error": str(e),
+                "encoder_profile": metrics.profile,
+                "resource_usage": metrics.summary(),
+                "additional_data": payload.get("additional_data", {})
+            }
+            if isinstance(e, PreflightError):
+                # Structured reasons so the backend can tell the user which input to re-upload
+                failure_data["failure_stage"] = "preflight"
+                failure_data["failure_reasons"] = e.issues
+            try:
+                with trace_span("webhook", "http", status="failed"):
+                    requests.post(
+                        payload["webhook_url"],
+                        json=failure_data,
+                        timeout=30
+                    )
+            except:
+                pass
+
+        return False
+
+    finally:
+        monitor_stop.set()
+        metrics.start_stage(None)
+        metrics.status = job_status
+        metrics.add_span("stitching job", "job", metrics.started_at, time.time(), {"status": job_status})
+        metrics.log_summary()
+        try:
+            trace_path = write_job_trace(metrics)
+            if trace_path:
+                logger.info(f"Trace written: {trace_path}")
+        except Exception as e:
+            logger.warning(f"Could not write trace: {e}")
+        try:
+            record_job_history(metrics)
+        except Exception as e:
+            logger.warning(f"Could not record job history: {e}")
+        _job_profile.reset(profile_token)
+        _current_job.reset(job_token)
+        JOBS_IN_PROGRESS.dec()
+        JOBS_TOTAL.inc(status=job_status)
+        JOB_DURATION.observe(time.time() - metrics.started_at, status=job_status)
+
+        # Cleanup: Set machine status to free
+        os.environ["machine_status"] = "free"
+
+        # Cleanup temp files after processing
+        try:
+            shutil.rmtree(job_temp_dir)
+        except:
+            pass
+
+        if (job_status == "completed" and not OUTPUT_CONFIG["keep"]
+                and payload.get("final_upload_path", "").startswith("gs://")):
+            remove_job_outputs(uploaded_outputs)
+
+        try:
+            evict_cache()
+        except Exception as e:
+            logger.warning(f"Cache eviction failed: {e}")
+
+
+# ==============================================================================
+# DRY-RUN PLAN
+# ==============================================================================
+# plan_stitching_job() walks the same decisions as blusanta_video_stitching()
+# (cache lookups, transcode shortcuts, file or streaming mode) and returns the
+# processes the job would run, without downloading, writing or encoding
+# anything. Inputs are probed only when they are already local (cached
+# download or local path); anything else is planned from
+# COST_MODEL["assumed_seconds"] and reported in the plan's warnings.
+# pad_audio_to_video_duration() passes depend on the encoded segments, so they
+# are planned as conditional steps and counted (calibration runs padded every
+# concat input). Duration probes are part of the fixed cost of their steps.
+
+def estimate_cpu_seconds(operation: str, output_seconds: float) -> float:
+    """
+    Estimates the CPU-seconds (user + sys) of one process from COST_MODEL.
+
+    Args:
+        operation: Operation name (see OPERATION_PATTERNS / stream_stage_operation)
+        output_seconds: Seconds of media the process writes
+
+    Returns:
+        float: Estimated CPU-seconds (0.0 for operations the model does not know)
+    """
+    model = COST_MODEL["operations"].get(operation)
+    if not model:
+        return 0.0
+    return model.get("fixed", 0.0) + model.get("per_second", 0.0) * max(output_seconds, 0.0)
+
+
+def command_inputs(cmd: List[str]) -> List[str]:
+    """Returns the file inputs (-i, filter scripts) of an FFmpeg command."""
+    inputs = []
+    for flag, value in zip(cmd, cmd[1:]):
+        if flag in ("-i", "-filter_complex_script") and not value.startswith("pipe:"):
+            inputs.append(value)
+    return inputs
+
+
+class ExecutionPlan:
+    """
+    Execution plan of one stitching job (see plan_stitching_job()).
+
+    Steps are kept in execution order. A step depends on the steps that
+    produce its inputs; cache hits are listed (so their consumers can point at
+    them) but run nothing and cost nothing.
+    """
+
+    def __init__(self, job_id: str, mode: str, profile: Optional[str] = None):
+        self.job_id = job_id
+        self.mode = mode
+        self.profile = profile or VIDEO_CONFIG["profile"]  # For the job's own encodes
+        self.steps: List[Dict[str, Any]] = []
+        self.warnings: List[str] = []
+        self._producers: Dict[str, str] = {}
+        self._media: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def add_step(
+        self,
+        stage: str,
+        operation: str,
+        description: str,
+        commands: Optional[List[List[str]]] = None,
+        inputs: Optional[List[str]] = None,
+        outputs: Optional[List[str]] = None,
+        cache_hit: bool = False,
+        output_seconds: Optional[float] = None,
+        after: Optional[List[str]] = None,
+        conditional: bool = False,
+        cost_factor: float = 1.0
+    ) -> Dict[str, Any]:
+        """
+        Appends a step.
+
+        Args:
+            stage: Pipeline stage (same names as JobMetrics)
+            operation: Cost model operation
+            description: Human-readable description
+            commands: Commands the step runs (none for cache hits and network steps)
+            inputs: Files it reads (default: the commands' -i inputs)
+            outputs: Files it leaves behind
+            cache_hit: The output is already cached
+            output_seconds: Seconds of media written
+            after: Extra step IDs it depends on (e.g. the stage feeding its stdin)
+            conditional: Only runs if the job finds it necessary (e.g. padding)
+            cost_factor: Scales the cost model estimate (e.g. extra rendition outputs)
+
+        Returns:
+            The step dict
+        """
+        commands = [] if cache_hit else (commands or [])
+        if inputs is None:
+            inputs = [path for cmd in commands for path in command_inputs(cmd)]
+        depends_on = []
+        for step_id in [self._producers.get(path) for path in inputs] + list(after or []):
+            if step_id and step_id not in depends_on:
+                depends_on.append(step_id)
+        step = {
+            "id": f"s{len(self.steps) + 1}",
+            "stage": stage,
+            "operation": operation,
+            "description": description,
+            "commands": commands,
+            "inputs": [path for path in inputs if path],
+            "outputs": [path for path in outputs or [] if path],
+            "depends_on": depends_on,
+            "cache_hit": cache_hit,
+            "conditional": conditional,
+            "output_seconds": None if output_seconds is None else round(output_seconds, 3),
+            "estimated_cpu_seconds": 0.0 if cache_hit else round(
+                cost_factor * sum((estimate_cpu_seconds(operation, output_seconds or 0.0) for _ in commands), 0.0), 3
+            ),
+        }
+        if commands and not cache_hit and operation not in COST_MODEL["operations"]:
+            self.warn(f"No cost model entry for {operation!r}, its steps are estimated at 0 CPU-seconds")
+        self.steps.append(step)
+        for path in step["outputs"]:
+            self._producers[path] = step["id"]
+        return step
+
+    def produces(self, path: str) -> bool:
+        """Whether an earlier step already writes path (shared artifacts are planned once)."""
+        return path in self._producers
+
+    def alias(self, path: str, existing: str) -> None:
+        """Records that path is existing under another name (moved or linked, no process)."""
+        if existing in self._producers:
+            self._producers[path] = self._producers[existing]
+
+    def warn(self, message: str) -> None:
+        if message not in self.warnings:
+            self.warnings.append(message)
+
+    def media_info(self, url: str, local_path: str, role: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns probe_media() output for an input if it is available locally.
+
+        Args:
+            url: Source URL
+            local_path: Where the job will read it (cache path)
+            role: Input role, for the warning
+
+        Returns:
+            Parsed ffprobe JSON, or None (planned from assumed values)
+        """
+        if url in self._media:
+            return self._media[url]
+        info = None
+        source = url.replace("file://", "", 1) if url.startswith("file://") else url
+        for candidate in (local_path, source):
+            if candidate and "://" not in candidate and os.path.exists(candidate):
+                try:
+                    info = probe_media(candidate)
+                    break
+                except Exception as e:
+                    self.warn(f"{url}: probe failed ({e})")
+        if info is None:
+            self.warn(
+                f"{url}: not available locally, planned as a {role} input of "
+                f"{COST_MODEL['assumed_seconds'][role]:g}s needing a full re-encode"
+            )
+        self._media[url] = info
+        return info
+
+    def duration(self, url: str, local_path: str, role: str) -> float:
+        """Returns an input's duration (probed or assumed)."""
+        info = self.media_info(url, local_path, role)
+        try:
+            return float((info or {}).get("format", {}).get("duration"))
+        except (TypeError, ValueError):
+            return COST_MODEL["assumed_seconds"][role]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the plan with per-stage / per-operation CPU totals (JSON-serializable)."""
+        by_stage: Dict[str, float] = {}
+        by_operation: Dict[str, float] = {}
+        for step in self.steps:
+            by_stage[step["stage"]] = by_stage.get(step["stage"], 0.0) + step["estimated_cpu_seconds"]
+            by_operation[step["operation"]] = by_operation.get(step["operation"], 0.0) + step["estimated_cpu_seconds"]
+        profile = encoder_profile(self.profile)
+        if COST_MODEL["profile"] != self.profile:
+            self.warn(
+                f"Cost model is calibrated for encoder profile {COST_MODEL['profile']!r}, "
+                f"this job uses {self.profile!r}"
+            )
+        return {
+            "job_id": self.job_id,
+            "mode": self.mode,
+            "encoder_profile": dict(profile, name=self.profile),
+            "cost_model": {key: COST_MODEL[key] for key in ("profile", "resolution")},
+            "steps": self.steps,
+            "warnings": self.warnings,
+            "totals": {
+                "steps": len(self.steps),
+                "processes": sum(len(step["commands"]) for step in self.steps),
+                "cache_hits": sum(1 for step in self.steps if step["cache_hit"]),
+                "output_seconds": next(
+                    (step["output_seconds"] for step in reversed(self.steps)
+                     if step["operation"] in ("concat", "stream_encode")), None
+                ),
+                "estimated_cpu_seconds": round(sum(by_stage.values()), 3),
+                "by_stage": {key: round(value, 3) for key, value in by_stage.items()},
+                "by_operation": {key: round(value, 3) for key, value in by_operation.items()},
+            },
+        }
+
+
+def _plan_fingerprint(plan: ExecutionPlan, url: str) -> Optional[str]:
+    """source_fingerprint() that records a warning instead of raising."""
+    try:
+        return source_fingerprint(url)
+    except Exception as e:
+        plan.warn(f"{url}: source not found ({e})")
+        return None
+
+
+def plan_fetch(plan: ExecutionPlan, url: str) -> str:
+    """Plans fetch_asset(url); returns the path the job will read."""
+    fingerprint = _plan_fingerprint(plan, url)
+    if fingerprint is None:
+        return url
+    suffix = os.path.splitext(url.split("?")[0])[1] or ".bin"
+    path = cache_path("downloads", [url, fingerprint], suffix)
+    if not plan.produces(path):
+        plan.add_step("fetch", "download", f"Download {url}", inputs=[url], outputs=[path],
+                      cache_hit=os.path.exists(path))
+    return path
+
+
+def _plan_shortcut(
+    plan: ExecutionPlan,
+    url: str,
+    source: str,
+    role: str,
+    target: Dict[str, Any],
+    audio: bool = True
+) -> str:
+    """Returns classify_transcode()'s decision for an input ("full" if it cannot be probed)."""
+    info = plan.media_info(url, source, role)
+    return transcode_decision(info, target, audio)[0] if info else "full"
+
+
+SHORTCUT_OPERATIONS = {"copy": "remux", "audio": "audio_transcode"}
+
+
+def plan_standardized_constant(plan: ExecutionPlan, url: str) -> str:
+    """Plans get_standardized_constant(url); returns the artifact path."""
+    fingerprint = _plan_fingerprint(plan, url)
+    if fingerprint is None:
+        return url
+    path = cache_path("standardized", constant_artifact_key(url, fingerprint), ".mp4")
+    if plan.produces(path):
+        return path
+    source = plan_fetch(plan, url)
+    mezzanine = CONSTANT_MEZZANINE_CONFIG["enabled"]
+    decision = "full" if mezzanine else _plan_shortcut(plan, url, source, "constant", standard_target())
+    seconds = plan.duration(url, source, "constant")
+    with using_constant_mezzanine() if mezzanine else nullcontext():
+        if decision == "full" and parallel_encodes() > 1 and encode_chunk_count(seconds) > 1:
+            _plan_standardize_chunked(plan, url, source, path, seconds)
+        else:
+            if decision == "full":
+                operation, cmd = "standardize", standardize_cmd(source, cache_partial_path(path))
+            else:
+                operation = SHORTCUT_OPERATIONS[decision]
+                cmd = transcode_shortcut_cmd(decision, source, cache_partial_path(path))
+            plan.add_step("artifacts", operation, f"Standardize constant ({decision}): {url}", [cmd],
+                          outputs=[path], cache_hit=os.path.exists(path), output_seconds=seconds)
+    if mezzanine:
+        _plan_keyframe_index(plan, path)
+    return path
+
+
+def _plan_keyframe_index(plan: ExecutionPlan, path: str) -> None:
+    """Plans get_keyframe_index(path) for a constant mezzanine."""
+    index_path = cache_path("keyframes", [path], ".json")
+    plan.add_step("artifacts", "probe", f"Keyframe index of {os.path.basename(path)}", [keyframe_index_cmd(path)],
+                  inputs=[path], outputs=[index_path], cache_hit=os.path.exists(index_path))
+
+
+def _planned_keyframe_index(path: str) -> Dict[str, Any]:
+    """The cached keyframe index of a constant mezzanine, or the one a mezzanine built now will have."""
+    index_path = cache_path("keyframes", [path], ".json")
+    if os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            return json.load(f)
+    cfg = VIDEO_CONFIG
+    return {"width": cfg['width'], "height": cfg['height'], "fps": cfg['fps'], "has_b_frames": 0,
+            "keyframes": [0.0], "starts_with_keyframe": True}
+
+
+def _plan_standardize_chunked(plan: ExecutionPlan, url: str, source: str, path: str, seconds: float) -> None:
+    """Plans standardize_chunked() for a constant (chunks split evenly if the source is not local yet)."""
+    cache_hit = os.path.exists(path)
+    partial = cache_partial_path(path)
+    keyframes = keyframe_times(source) if os.path.exists(source) and not cache_hit else []
+    ranges = standardize_chunk_ranges(keyframes, seconds, encode_chunk_count(seconds))
+    jobs, paths, list_path = build_standardize_chunked_cmds(source, partial, seconds, ranges)
+    for k, (cmd, _, chunk_seconds) in enumerate(jobs, 1):
+        plan.add_step("artifacts", "standardize", f"Standardize constant (full, chunk {k}/{len(jobs)}): {url}",
+                      [cmd], outputs=[paths[k - 1]], cache_hit=cache_hit, output_seconds=chunk_seconds)
+    plan.add_step("artifacts", "remux", f"Standardize constant (join of {len(jobs)} chunks): {url}",
+                  [standardize_join_cmd(list_path, source, partial)], inputs=paths + [source],
+                  outputs=[path], cache_hit=cache_hit, output_seconds=seconds)
+
+
+def plan_nodding_master(plan: ExecutionPlan, url: str) -> str:
+    """Plans get_nodding_master(url); returns the artifact path."""
+    fingerprint = _plan_fingerprint(plan, url)
+    if fingerprint is None:
+        return url
+    path = cache_path("nodding", constant_artifact_key(url, fingerprint), ".mp4")
+    if plan.produces(path):
+        return path
+    source = plan_fetch(plan, url)
+    mezzanine = CONSTANT_MEZZANINE_CONFIG["enabled"]
+    decision = "full" if mezzanine else _plan_shortcut(plan, url, source, "nodding", standard_target(), audio=False)
+    if decision == "copy":
+        operation, cmd = "remux", transcode_shortcut_cmd(decision, source, cache_partial_path(path), audio=False)
+    else:
+        with using_constant_mezzanine() if mezzanine else nullcontext():
+            operation, cmd = "nodding_master", nodding_master_cmd(source, cache_partial_path(path))
+    plan.add_step("artifacts", operation, f"Nodding master ({decision}): {url}", [cmd],
+                  outputs=[path], cache_hit=os.path.exists(path),
+                  output_seconds=plan.duration(url, source, "nodding"))
+    if mezzanine:
+        _plan_keyframe_index(plan, path)
+    return path
+
+
+def plan_doctor_video(plan: ExecutionPlan, url: str) -> Tuple[str, float]:
+    """
+    Plans get_normalized_doctor_video(url).
+
+    Returns:
+        Tuple: (mezzanine path, doctor video duration)
+    """
+    mezzanine_url, _ = mezzanine_paths(url)
+    if source_exists(mezzanine_url):
+        path = plan_fetch(plan, mezzanine_url)
+        return path, plan.duration(mezzanine_url, path, "doctor")
+
+    fingerprint = _plan_fingerprint(plan, url)
+    if fingerprint is None:
+        return url, COST_MODEL["assumed_seconds"]["doctor"]
+    source = plan_fetch(plan, url)
+    duration = plan.duration(url, source, "doctor")
+    path = cache_path("mezzanine", [url, fingerprint, DOCTOR_MEZZANINE_CONFIG], ".mp4")
+    if plan.produces(path):
+        return path, duration
+    cfg = DOCTOR_MEZZANINE_CONFIG
+    target = dict(standard_target(), width=cfg['width'], height=cfg['height'], fps=cfg['fps'])
+    decision = _plan_shortcut(plan, url, source, "doctor", target)
+    if decision == "full":
+        operation, cmd = "mezzanine", mezzanine_cmd(source, cache_partial_path(path))
+    else:
+        operation = SHORTCUT_OPERATIONS[decision]
+        cmd = transcode_shortcut_cmd(decision, source, cache_partial_path(path))
+    plan.add_step("artifacts", operation, f"Doctor mezzanine ({decision}): {url}", [cmd],
+                  outputs=[path], cache_hit=os.path.exists(path), output_seconds=duration)
+    return path, duration
+
+
+def plan_transcription(
+    plan: ExecutionPlan,
+    stage: str,
+    media_path: str,
+    duration: float,
+    output_path: str,
+    work_dir: str
+) -> None:
+    """Plans transcribe_with_deepgram(media_path) (audio extraction + Deepgram request)."""
+    audio_path = os.path.join(work_dir, os.path.splitext(os.path.basename(media_path))[0] + "_audio.mp3")
+    extract = plan.add_step(stage, "transcription_audio", f"Extract audio for transcription: {media_path}",
+                            [transcription_audio_cmd(media_path, audio_path)], outputs=[audio_path],
+                            output_seconds=duration)
+    plan.add_step(stage, "transcribe", f"POST {DEEPGRAM_CONFIG['url']} ({DEEPGRAM_CONFIG['model']})",
+                  inputs=[audio_path], outputs=[output_path], output_seconds=duration, after=[extract["id"]])
+
+
+def plan_doctor_transcript(plan: ExecutionPlan, url: str, mezzanine: str, duration: float) -> Optional[str]:
+    """Plans get_doctor_transcript(url); returns the transcript path (None without a Deepgram key)."""
+    if not DEEPGRAM_CONFIG["api_key"]:
+        plan.warn("DEEPGRAM_API_KEY is not set, podcast segments will not be subtitled")
+        return None
+    fingerprint = _plan_fingerprint(plan, url)
+    if fingerprint is None:
+        return None
+    path = cache_path("transcripts", [url, fingerprint, DEEPGRAM_CONFIG["model"], "en"], ".json")
+    if plan.produces(path):
+        return path
+    if os.path.exists(path):
+        plan.add_step("artifacts", "transcribe", f"Doctor transcript: {url}", outputs=[path], cache_hit=True)
+    else:
+        # Built in a temporary directory, so the extracted audio path is illustrative
+        plan_transcription(plan, "artifacts", mezzanine, duration, path, os.path.join(TEMP_DIR, "tmp"))
+    return path
+
+
+def _planned_loudness_filter(plan: ExecutionPlan, url: str, stats: Optional[Dict[str, float]]) -> Optional[str]:
+    """loudness_filter() of already measured statistics; warns while they are not measured yet."""
+    if stats is None:
+        plan.warn(f"{url}: loudness not measured yet, the planned concat omits its gain")
+        return None
+    return loudness_filter(stats)
+
+
+def plan_loudness(plan: ExecutionPlan, url: str, seconds: float) -> Optional[str]:
+    """Plans get_loudness(url); returns the loudness filter the job will apply (see job_loudness_filters)."""
+    if not LOUDNESS_CONFIG["enabled"]:
+        return None
+    fingerprint = _plan_fingerprint(plan, url)
+    if fingerprint is None:
+        return None
+    path = cache_path("loudness", [url, fingerprint], ".json")
+    if not plan.produces(path):
+        source = plan_fetch(plan, url)
+        plan.add_step("artifacts", "loudness", f"Measure loudness: {url}", [measure_loudness_cmd(source)],
+                      inputs=[source], outputs=[path], cache_hit=os.path.exists(path), output_seconds=seconds)
+    if not os.path.exists(path):
+        return _planned_loudness_filter(plan, url, None)
+    with open(path, encoding="utf-8") as f:
+        return _planned_loudness_filter(plan, url, json.load(f) or {})
+
+
+def plan_doctor_loudness(plan: ExecutionPlan, url: str, seconds: float) -> Optional[str]:
+    """Plans get_doctor_loudness(url): the ingest sidecar's measurement if it has one, else plan_loudness()."""
+    if not LOUDNESS_CONFIG["enabled"]:
+        return None
+    _, metadata_url = mezzanine_paths(url)
+    if source_exists(metadata_url):
+        path = plan_fetch(plan, metadata_url)
+        if not os.path.exists(path):
+            return _planned_loudness_filter(plan, url, None)
+        with open(path, encoding="utf-8") as f:
+            metadata = json.load(f)
+        if "loudness" in metadata:
+            return _planned_loudness_filter(plan, url, metadata["loudness"] or {})
+    return plan_loudness(plan, url, seconds)
+
+
+def _plan_overlay_subtitles(
+    plan: ExecutionPlan,
+    stage: str,
+    template_type: Optional[str],
+    dr_first_name: str,
+    media_path: str,
+    template_path: str,
+    seconds: float
+) -> Optional[str]:
+    """Plans the subtitles of an audio overlay segment; returns the .ass path (None: not subtitled)."""
+    if template_type and dr_first_name:
+        return subtitle_path_for(template_path)  # Written from a template, no process
+    if not DEEPGRAM_CONFIG["api_key"]:
+        return None
+    subtitle_path = subtitle_path_for(media_path)
+    plan_transcription(plan, stage, media_path, seconds, subtitle_path, os.path.dirname(media_path))
+    return subtitle_path
+
+
+def _plan_file_mode(plan: ExecutionPlan, ctx: Dict[str, Any]) -> None:
+    """Plans STEP 2-4 of the file-based pipeline (segments, concat, wrappers)."""
+    job_temp_dir = ctx["job_temp_dir"]
+    segment_paths = []
+    segment_seconds = []
+    subtitle_paths = []
+    total = 0.0
+    for i, (kind, actor, info) in enumerate(ctx["segments"]):
+        part_num = i + 1
+        stage = stage_key("segment", part_num)
+        output_seg = os.path.join(job_temp_dir, f"p{part_num}.mp4")
+
+        if kind == "podcast":
+            podcast_temp = os.path.join(job_temp_dir, f"p{part_num}_podcast_temp.mp4")
+            _, seconds = build_podcast_filter_complex(info["duration"], ctx["doctor_name"], ctx["font_path"])
+            cmd = build_podcast_zoom_cmd(
+                ctx["bg_path"], ["-stream_loop", "-1", "-i", actor], info["doctor"],
+                filter_script_path_for(podcast_temp), seconds,
+                video_encode_args() + audio_encode_args() + [podcast_temp]
+            )
+            plan.add_step(stage, "composite", f"Podcast zoom composite p{part_num}", [cmd],
+                          outputs=[podcast_temp], output_seconds=seconds)
+            if info["transcript"] and ctx["subtitle_track"]:
+                subtitle_paths.append(info["transcript"])
+                plan.alias(output_seg, podcast_temp)
+            elif info["transcript"]:
+                subtitle_path = os.path.join(job_temp_dir, "subtitles", f"p{part_num}.ass")
+                with_subs = os.path.join(job_temp_dir, f"p{part_num}_with_subs.mp4")
+                plan.add_step(stage, "burn", f"Burn subtitles p{part_num}",
+                              [subtitle_burn_cmd(podcast_temp, subtitle_path, with_subs)],
+                              inputs=[podcast_temp, info["transcript"]], outputs=[with_subs, output_seg],
+                              output_seconds=seconds)
+            else:
+                plan.alias(output_seg, podcast_temp)
+
+        elif kind == "overlay":
+            audio_file, template_type = find_audio_overlay(ctx["audio_overlays"], i)
+            seconds = ctx["audio_seconds"][audio_file]
+            temp_output = output_seg.replace('.mp4', '_temp.mp4')
+            fitted = temp_output.replace('.mp4', '_fitted.mp4')
+            if fit_cuts(info["duration"], seconds):
+                cmd, copy = trim_video_cmd(actor, seconds, fitted, index=_planned_keyframe_index(actor))
+                plan.add_step(stage, "remux" if copy else "fit", f"Cut placeholder p{part_num} to audio",
+                              [cmd], outputs=[fitted], output_seconds=seconds)
+            else:
+                plan.add_step(stage, "fit", f"Fit placeholder p{part_num} to audio",
+                              [build_fit_video_cmd(actor, info["duration"], seconds, video_encode_args() + [fitted])],
+                              outputs=[fitted], output_seconds=seconds)
+            plan.add_step(stage, "mux_audio", f"Mux overlay audio p{part_num}",
+                          [mux_fitted_audio_cmd(fitted, audio_file, temp_output)],
+                          outputs=[temp_output], output_seconds=seconds)
+            subtitle_path = _plan_overlay_subtitles(
+                plan, stage, template_type, ctx["dr_first_name"], temp_output, temp_output, seconds
+            )
+            if subtitle_path and ctx["subtitle_track"]:
+                subtitle_paths.append(subtitle_path)
+                plan.alias(output_seg, temp_output)
+            elif subtitle_path:
+                with_subs = temp_output.replace('.mp4', '_with_subs.mp4')
+                plan.add_step(stage, "burn", f"Burn subtitles p{part_num}",
+                              [subtitle_burn_cmd(temp_output, subtitle_path, with_subs)],
+                              inputs=[temp_output, subtitle_path], outputs=[with_subs, output_seg],
+                              output_seconds=seconds)
+            else:
+                plan.alias(output_seg, temp_output)
+
+        else:
+            seconds = info["duration"]
+            plan.alias(output_seg, actor)
+
+        segment_paths.append(output_seg)
+        segment_seconds.append(seconds)
+        total += seconds
+
+    extras = _plan_final_extras(ctx, segment_seconds)
+    extras["subtitle_track"] = _plan_subtitle_track(plan, "concat", ctx, subtitle_paths)
+    leveled = any(ctx["segment_loudness"])
+    if ctx["wrappers"]:
+        podcast_video = os.path.join(job_temp_dir, "podcast_full.mp4")
+        if len(segment_paths) == 1 and not leveled:
+            plan.alias(podcast_video, segment_paths[0])
+        else:
+            _plan_concat(plan, "concat", list(zip(segment_paths, segment_seconds)), podcast_video,
+                         f"Concatenate {len(segment_paths)} segments", audio_filters=ctx["segment_loudness"])
+        (intro, intro_seconds), (outro, outro_seconds) = ctx["wrappers"]
+        f_intro = os.path.join(job_temp_dir, "f_intro_std.mp4")
+        f_outro = os.path.join(job_temp_dir, "f_outro_std.mp4")
+        plan.alias(f_intro, intro)
+        plan.alias(f_outro, outro)
+        intro_filter, outro_filter = ctx["wrapper_loudness"]
+        _plan_concat(plan, "wrap", [(f_intro, intro_seconds), (podcast_video, total), (f_outro, outro_seconds)],
+                     ctx["final_output"], "Add final intro/outro",
+                     audio_filters=[intro_filter, None, outro_filter], **extras)
+    elif len(segment_paths) == 1 and not any(extras.values()) and not leveled:
+        plan.alias(ctx["final_output"], segment_paths[0])
+    else:
+        # Without wrappers the segment concat is the final encode (with the extras)
+        _plan_concat(plan, "concat", list(zip(segment_paths, segment_seconds)), ctx["final_output"],
+                     f"Concatenate {len(segment_paths)} segments", audio_filters=ctx["segment_loudness"], **extras)
+
+
+def _plan_final_extras(ctx: Dict[str, Any], segment_seconds: List[float]) -> Dict[str, Any]:
+    """Returns the renditions/hls_dir/previews/scale arguments of the planned final encode."""
+    previews = None
+    if ctx["previews"]:
+        first_podcast = next((i for i, (kind, _, _) in enumerate(ctx["segments"]) if kind == "podcast"), None)
+        wrapper_seconds = [seconds for _, seconds in ctx["wrappers"]] or [0.0, 0.0]
+        previews = preview_times(segment_seconds, first_podcast, *wrapper_seconds)
+    return {"renditions": ctx["renditions"], "hls_dir": ctx["hls_dir"], "previews": previews, "scale": ctx["scale"]}
+
+
+def _plan_subtitle_track(plan: ExecutionPlan, stage: str, ctx: Dict[str, Any], subtitle_paths: List[str]) -> Optional[str]:
+    """Plans merge_segment_subtitles() for soft subtitles; returns the track (None: burned or no subtitles)."""
+    if not ctx["subtitle_track"] or not subtitle_paths:
+        return None
+    plan.add_step(stage, "subtitles", f"Merge {len(subtitle_paths)} segment subtitle files into one WebVTT track",
+                  inputs=subtitle_paths, outputs=[ctx["subtitle_track"]])
+    return ctx["subtitle_track"]
+
+
+def _plan_concat(
+    plan: ExecutionPlan,
+    stage: str,
+    inputs: List[Tuple[str, float]],
+    output_path: str,
+    description: str,
+    renditions: Optional[List[str]] = None,
+    hls_dir: Optional[str] = None,
+    previews: Optional[Dict[str, float]] = None,
+    subtitle_track: Optional[str] = None,
+    scale: Optional[Tuple[int, int]] = None,
+    audio_filters: Optional[List[Optional[str]]] = None
+) -> None:
+    """Plans concatenate_videos(): a conditional pad per input, then the concat encode (with its extras)."""
+    for path, seconds in inputs:
+        # Video padding is the expensive variant; the pad length is only known after encoding
+        pad_cmd = pad_video_cmd(path, round(1 / VIDEO_CONFIG['fps'], 3), path.replace('.mp4', '_vpad.mp4'))
+        plan.add_step(stage, "pad", f"Pad {os.path.basename(path)} (if its audio and video durations differ)",
+                      [pad_cmd], outputs=[path], output_seconds=seconds, conditional=True)
+    input_args = [arg for path, _ in inputs for arg in ("-i", path)]
+    renditions = renditions or []
+    if parallel_encodes() > 1 and _plan_chunked_concat(plan, stage, inputs, output_path, description, renditions,
+                                                       hls_dir, previews, subtitle_track, scale, audio_filters):
+        return
+    plan.add_step(stage, "concat", description,
+                  [build_concat_cmd(input_args, len(inputs), output_path, renditions, hls_dir, previews,
+                                    subtitle_track, scale, audio_filters=audio_filters)],
+                  outputs=final_encode_outputs(output_path, renditions, hls_dir, previews),
+                  output_seconds=sum(seconds for _, seconds in inputs),
+                  cost_factor=encode_cost_factor(renditions, previews, scale))
+
+
+def _plan_chunked_concat(
+    plan: ExecutionPlan,
+    stage: str,
+    inputs: List[Tuple[str, float]],
+    output_path: str,
+    description: str,
+    renditions: List[str],
+    hls_dir: Optional[str],
+    previews: Optional[Dict[str, float]],
+    subtitle_track: Optional[str],
+    scale: Optional[Tuple[int, int]],
+    audio_filters: Optional[List[Optional[str]]]
+) -> bool:
+    """Plans the chunked concat encode (see build_chunked_concat_cmds); False if it would not be split."""
+    paths = [path for path, _ in inputs]
+    chunked = build_chunked_concat_cmds(paths, [seconds for _, seconds in inputs], output_path,
+                                        renditions, hls_dir, previews, subtitle_track, scale, audio_filters)
+    if not chunked:
+        return False
+    chunks, chunk_files, join = chunked
+    for k, (cmd, _, seconds) in enumerate(chunks):
+        plan.add_step(stage, "concat", f"{description}, chunk {k + 1}/{len(chunks)}", [cmd],
+                      outputs=[files[k] for files in chunk_files.values()], output_seconds=seconds,
+                      cost_factor=encode_cost_factor(renditions, None, scale))
+    # Video is copied (the runtime counts the join as a remux, see OPERATION_PATTERNS)
+    plan.add_step(stage, "remux", f"{description}, join of {len(chunks)} chunks (copy)", [join],
+                  inputs=[path for files in chunk_files.values() for path in files] + paths
+                  + ([subtitle_track] if subtitle_track else []),
+                  outputs=final_encode_outputs(output_path, renditions, hls_dir, previews),
+                  output_seconds=sum(seconds for _, _, seconds in chunks),
+                  cost_factor=len(chunk_files))
+    return True
+
+
+def encode_cost_factor(
+    renditions: List[str],
+    previews: Optional[Dict[str, float]],
+    scale: Optional[Tuple[int, int]]
+) -> float:
+    """Cost of a planned final encode relative to a plain 1080p concat encode (pixels encoded, roughly)."""
+    master = scale[0] * scale[1] / (VIDEO_CONFIG["width"] * VIDEO_CONFIG["height"]) if scale else 1.0
+    return master + rendition_pixel_ratio(renditions) + preview_cost_ratio(previews)
+
+
+def final_encode_outputs(
+    output_path: str,
+    renditions: List[str],
+    hls_dir: Optional[str],
+    previews: Optional[Dict[str, float]] = None
+) -> List[str]:
+    """Files the final encode writes: master, renditions, HLS media playlists and previews."""
+    outputs = [output_path] + [rendition_path(output_path, name) for name in renditions]
+    if hls_dir:
+        outputs += [os.path.join(hls_dir, variant, "index.m3u8") for variant in hls_variants(renditions)]
+    if previews:
+        outputs += [preview_path(output_path, kind) for kind in ("poster", "sprite", "preview")]
+    return outputs
+
+
+def _plan_stream_mode(plan: ExecutionPlan, ctx: Dict[str, Any]) -> None:
+    """Plans stream_podcast_video(): one producer pipeline per segment into one concat encode."""
+    job_temp_dir = ctx["job_temp_dir"]
+    producers = []  # (stages, seconds, extra inputs, fifo)
+    subtitle_paths = []
+    burn = not ctx["subtitle_track"]
+
+    def wrapper_producer(name: str, path: str, seconds: float) -> None:
+        fifo = stream_fifo_path(job_temp_dir, name)
+        stages, seconds = build_constant_stream(path, fifo, duration=seconds)
+        producers.append((stages, seconds, [], fifo))
+
+    if ctx["wrappers"]:
+        wrapper_producer("f_intro", *ctx["wrappers"][0])
+
+    for i, (kind, actor, info) in enumerate(ctx["segments"]):
+        part_num = i + 1
+        fifo = stream_fifo_path(job_temp_dir, f"p{part_num}")
+        if kind == "podcast":
+            subtitle_path = os.path.join(job_temp_dir, "subtitles", f"p{part_num}.ass") if info["transcript"] else None
+            stages, seconds = build_podcast_stream(
+                ctx["bg_path"], actor, info["doctor"], ctx["doctor_name"], ctx["font_path"], subtitle_path, fifo,
+                doctor_duration=info["duration"], burn_subtitles=bool(subtitle_path) and burn, write_script=False
+            )
+            extra = [info["transcript"]] if burn else []
+            subtitle_paths += [] if burn or not subtitle_path else [info["transcript"]]
+        elif kind == "overlay":
+            audio_file, template_type = find_audio_overlay(ctx["audio_overlays"], i)
+            seconds = ctx["audio_seconds"][audio_file]
+            subtitle_path = _plan_overlay_subtitles(
+                plan, "stream", template_type, ctx["dr_first_name"], audio_file, fifo, seconds
+            )
+            stages, seconds = build_overlay_stream(
+                actor, audio_file, seconds, subtitle_path, fifo,
+                video_duration=info["duration"], burn_subtitles=bool(subtitle_path) and burn
+            )
+            extra = [subtitle_path] if burn else []
+            subtitle_paths += [] if burn or not subtitle_path else [subtitle_path]
+        else:
+            stages, seconds = build_constant_stream(actor, fifo, duration=info["duration"])
+            extra = []
+        producers.append((stages, seconds, extra, fifo))
+
+    if ctx["wrappers"]:
+        wrapper_producer("f_outro", *ctx["wrappers"][1])
+
+    for n, (stages, seconds, extra, fifo) in enumerate(producers, 1):
+        previous = None
+        for idx, cmd in enumerate(stages):
+            is_last = idx == len(stages) - 1
+            step = plan.add_step(
+                "stream", stream_stage_operation(cmd), f"Stream producer {n}, stage {idx + 1}/{len(stages)}", [cmd],
+                inputs=command_inputs(cmd) + (extra if is_last else []), outputs=[fifo] if is_last else [],
+                output_seconds=seconds, after=[previous] if previous else None
+            )
+            previous = step["id"]
+
+    fifos = [fifo for _, _, _, fifo in producers]
+    input_args = [arg for fifo in fifos for arg in stream_input_args(fifo)]
+    segment_producers = producers[1:-1] if ctx["wrappers"] else producers
+    extras = _plan_final_extras(ctx, [seconds for _, seconds, _, _ in segment_producers])
+    extras["subtitle_track"] = _plan_subtitle_track(plan, "stream", ctx, subtitle_paths)
+    audio_filters = ctx["segment_loudness"]
+    if ctx["wrappers"]:
+        audio_filters = [ctx["wrapper_loudness"][0]] + audio_filters + [ctx["wrapper_loudness"][1]]
+    plan.add_step("stream", "stream_encode", f"Concat encode of {len(fifos)} streamed segments",
+                  [build_concat_cmd(input_args, len(fifos), ctx["final_output"], audio_filters=audio_filters,
+                                    **extras)],
+                  outputs=final_encode_outputs(ctx["final_output"], extras["renditions"], extras["hls_dir"],
+                                               extras["previews"]),
+                  output_seconds=sum(seconds for _, seconds, _, _ in producers),
+                  cost_factor=encode_cost_factor(extras["renditions"], extras["previews"], extras["scale"]))
+
+
+def plan_stitching_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the execution plan of a stitching job without running it.
+
+    Mirrors blusanta_video_stitching(): every FFmpeg command (file or
+    streaming mode) with its inputs, outputs and dependencies, which
+    artifacts are cache hits, and estimated CPU-seconds per step, stage and
+    operation from COST_MODEL.
+
+    Args:
+        payload: Stitching payload (see blusanta_video_stitching)
+
+    Returns:
+        ExecutionPlan.to_dict() output plus "history_estimate" (predict_job_seconds())
+    """
+    job_id = make_job_id(payload.get("job_id"))
+    job_temp_dir = os.path.join(TEMP_DIR, f"job_{job_id}")
+    final_output = os.path.join(OUTPUT_DIR, f"final_video_{job_id}.mp4")
+    streaming = bool(payload.get("streaming", STREAMING_CONFIG["enabled"])) and streaming_supported()
+    plan = ExecutionPlan(job_id, "stream" if streaming else "file", payload.get("encoder_profile"))
+
+    # STEP 1: downloads and preflight, in the job's order
+    actor_urls, doctor_urls, overlay_indices = job_segment_urls(payload)
+    for role, label, url in collect_job_sources(payload):
+        path = plan_fetch(plan, url)
+        plan.add_step("preflight", "probe", f"Probe {label}", [probe_media_cmd(path)], inputs=[path])
+        plan.add_step("preflight", "test_decode", f"Test decode {label}", [test_decode_cmd(path, role)],
+                      output_seconds=min(PREFLIGHT_CONFIG["decode_seconds"], plan.duration(url, path, role)))
+    font_path = plan_fetch(plan, payload["font_path"]) if payload.get("font_path") else None
+    bg_path = plan_fetch(plan, payload["podcast_background"])
+
+    # Artifacts
+    final_intro = plan_standardized_constant(plan, payload["final_intro_path"]) if payload.get("final_intro_path") else None
+    final_outro = plan_standardized_constant(plan, payload["final_outro_path"]) if payload.get("final_outro_path") else None
+    wrappers = bool(final_intro and final_outro)
+    audio_overlays = []
+    audio_seconds = {}
+    for item in payload.get("audio_overlays", []):
+        path = plan_fetch(plan, item["audio_path"])
+        audio_overlays.append({"segment_index": item["segment_index"], "audio_path": path})
+        audio_seconds[path] = plan.duration(item["audio_path"], path, "audio")
+
+    segments = []  # (kind, actor path, extra) per segment
+    segment_loudness = []
+    overlay_urls = {item["segment_index"]: item["audio_path"] for item in payload.get("audio_overlays", [])}
+    for i, url in enumerate(actor_urls):
+        if doctor_urls[i]:
+            nodding = plan_nodding_master(plan, url)
+            mezzanine, duration = plan_doctor_video(plan, doctor_urls[i])
+            transcript = plan_doctor_transcript(plan, doctor_urls[i], mezzanine, duration)
+            segments.append(("podcast", nodding, {"doctor": mezzanine, "duration": duration, "transcript": transcript}))
+            segment_loudness.append(plan_doctor_loudness(plan, doctor_urls[i], duration))
+        elif i in overlay_indices:
+            raw = plan_fetch(plan, url)
+            path = plan_nodding_master(plan, url) if CONSTANT_MEZZANINE_CONFIG["enabled"] else raw
+            segments.append(("overlay", path, {"duration": plan.duration(url, raw, "placeholder")}))
+            audio_url = overlay_urls.get(i, url)
+            segment_loudness.append(plan_loudness(
+                plan, audio_url, plan.duration(audio_url, plan_fetch(plan, audio_url), "audio")
+            ))
+        else:
+            path = plan_standardized_constant(plan, url)
+            segments.append(("constant", path, {"duration": plan.duration(url, plan_fetch(plan, url), "constant")}))
+            segment_loudness.append(plan_loudness(plan, url, segments[-1][2]["duration"]))
+
+    additional = payload.get("additional_data", {})
+    dr_first_name = additional.get("drFirstName", "")
+    dr_last_name = additional.get("drLastName", "")
+    doctor_name = f"{dr_first_name} {dr_last_name}".strip() if dr_first_name or dr_last_name else "Doctor"
+
+    wrapper_seconds = [
+        plan.duration(payload[key], plan_fetch(plan, payload[key]), "constant")
+        for key in ("final_intro_path", "final_outro_path") if wrappers
+    ]
+    wrapper_loudness = [
+        plan_loudness(plan, payload[key], seconds)
+        for key, seconds in zip(("final_intro_path", "final_outro_path"), wrapper_seconds)
+    ]
+
+    context = {
+        "segments": segments, "audio_overlays": audio_overlays, "audio_seconds": audio_seconds,
+        "bg_path": bg_path, "font_path": font_path, "doctor_name": doctor_name, "dr_first_name": dr_first_name,
+        "job_temp_dir": job_temp_dir, "final_output": final_output, "renditions": job_renditions(payload),
+        "hls_dir": hls_dir_for(final_output) if job_hls(payload) else None,
+        "previews": job_previews(payload),
+        "subtitle_track": subtitle_track_path(final_output) if job_soft_subtitles(payload) else None,
+        "scale": proxy_size() if job_proxy(payload) else None,
+        "wrappers": [(final_intro, wrapper_seconds[0]), (final_outro, wrapper_seconds[1])] if wrappers else [],
+        "segment_loudness": segment_loudness, "wrapper_loudness": wrapper_loudness,
+    }
+    # Artifacts above use the base profile, the job's own encodes its chosen one
+    with using_encoder_profile(plan.profile):
+        if streaming:
+            _plan_stream_mode(plan, context)
+        else:
+            _plan_file_mode(plan, context)
+
+    upload_path = proxy_path(payload["final_upload_path"]) if context["scale"] else payload["final_upload_path"]
+    plan.add_step("upload", "upload", f"Upload to {upload_path}", inputs=[final_output], outputs=[upload_path])
+    for name in context["renditions"]:
+        destination = rendition_path(payload["final_upload_path"], name)
+        plan.add_step("upload", "upload", f"Upload {name} rendition to {destination}",
+                      inputs=[rendition_path(final_output, name)], outputs=[destination])
+    if context["hls_dir"]:
+        destination = hls_dir_for(payload["final_upload_path"])
+        playlists = [os.path.join(context["hls_dir"], variant, "index.m3u8")
+                     for variant in hls_variants(context["renditions"])]
+        plan.add_step("upload", "upload", f"Upload HLS package (master.m3u8, playlists, segments) to {destination}/",
+                      inputs=playlists, outputs=[f"{destination}/master.m3u8"])
+    if plan.produces(context["subtitle_track"]):
+        destination = subtitle_track_path(upload_path)
+        plan.add_step("upload", "upload", f"Upload subtitle track to {destination}",
+                      inputs=[context["subtitle_track"]], outputs=[destination])
+    if context["previews"]:
+        for kind in PREVIEW_OUTPUTS:
+            destination = preview_path(payload["final_upload_path"], kind)
+            plan.add_step("upload", "upload", f"Upload {kind} to {destination}",
+                          inputs=[preview_path(final_output, kind)], outputs=[destination])
+    result = plan.to_dict()
+    doctor_seconds = sum(extra["duration"] for kind, _, extra in segments if kind == "podcast")
+    result["history_estimate"] = predict_job_seconds(plan.mode, doctor_seconds or None, plan.profile)
+    return result
+
+
+# ==============================================================================
+# BACKEND PAYLOAD CONVERSION
+# ==============================================================================
+
+# Fields the backend must send for a /stitching or /prefetch request
+REQUIRED_BACKEND_FIELDS = [
+    "constant_video_paths", "placeholder_video_paths", "nodding_video_path",
+    "doctor_video_paths", "greeting_audio_path", "thank_you_audio_path",
+    "podcast_background", "final_upload_path"
+]
+
+
+def make_job_id(requested: Optional[Any] = None) -> str:
+    """
+    Returns a filesystem-safe job ID (the requested one, sanitized, or a new one).
+
+    Args:
+        requested: Job ID supplied by the caller, if any
+
+    Returns:
+        str: Job ID used for temp/output/trace file names
+    """
+    if requested:
+        return re.sub(r"[^A-Za-z0-9_-]", "_", str(requested))[:64]
+    return str(int(time.time() * 1000))
+
+
+def convert_backend_payload(backend_payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert the backend's payload into the internal stitching payload.
+
+    Args:
+        backend_payload: Request body as sent by the backend
 
-        # Get doctor name for labels - use database fields directly
-        dr_first_name = payload.get("additional_data", {}).get("drFirstName", "")
-        dr_last_name = payload.get("additional_data", {}).get("drLastName", "")
-        doctor_name = f"{dr_first_name} {dr_last_name}".strip() if dr_first_name or dr_last_name else "Doctor"
+    Returns:
+        Internal payload for blusanta_video_stitching()
 
-        logger.info(f"Downloaded {len(actor_videos)} actor videos, "
-                   f"{sum(1 for v in doctor_videos if v)} doctor videos, "
-                   f"{len(audio_overlays)} audio overlays")
+    Raises:
+        ValueError: If required fields are missing or optional fields are invalid
+    """
+    missing = [f for f in REQUIRED_BACKEND_FIELDS if f not in backend_payload]
+    if missing:
+        raise ValueError(f"Missing required fields: {missing}")
+    profile = backend_payload.get("encoder_profile")
+    if profile is not None and profile not in ENCODER_PROFILES:
+        raise ValueError(f"Unknown encoder_profile {profile!r} (known: {', '.join(ENCODER_PROFILES)})")
+    for key in ("deadline", "queue_depth"):
+        value = backend_payload.get(key)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError(f"{key} must be a number")
+    if backend_payload.get("renditions") is not None:
+        validate_renditions(backend_payload["renditions"])
+    for key in ("hls", "previews", "proxy"):
+        if backend_payload.get(key) is not None and not isinstance(backend_payload[key], bool):
+            raise ValueError(f"{key} must be true or false")
+    if backend_payload.get("subtitles") not in (None, "soft", "burn"):
+        raise ValueError("subtitles must be 'soft' or 'burn'")
+
+    # Backend sends 8-segment structure, we need to map to 9-part format
+    const_videos = backend_payload["constant_video_paths"]  # 4 videos
+    plc_videos = backend_payload["placeholder_video_paths"]  # 2 videos
+    nodding_video = backend_payload["nodding_video_path"]
+    doctor_videos = backend_payload["doctor_video_paths"]  # 2 videos
+
+    # Map to 8-segment structure (NO intro/outro wrappers):
+    # Sequence: const_000, plc_000, const_001, nodding+dr1, const_002, nodding+dr2, plc_001, const_003
+    # Intro is merged into const_000, outro is merged into const_003
+
+    # Create 8 actor videos for the complete sequence
+    actor_videos = [
+        const_videos[0],  # Segment 0: const_000 (includes intro + greeting)
+        plc_videos[0],    # Segment 1: plc_000 (will get greeting audio overlay)
+        const_videos[1],  # Segment 2: const_001
+        nodding_video,    # Segment 3: nodding (for zoom with doctor)
+        const_videos[2],  # Segment 4: const_002
+        nodding_video,    # Segment 5: nodding (for zoom with doctor)
+        plc_videos[1],    # Segment 6: plc_001 (will get thank you audio overlay)
+        const_videos[3],  # Segment 7: const_003 (includes final message + outro)
+    ]
 
-        # ---------------------------------------------------------------------
-        # STEP 2: CREATE THE 8-SEGMENT PODCAST VIDEO
-        # ---------------------------------------------------------------------
-        logger.info("STEP 2: Processing 8 video segments...")
+    # Doctor videos array: 8 slots, only indices 3 and 5 have actual videos
+    doctor_videos_array = [
+        None,                         # Segment 0: no doctor
+        None,                         # Segment 1: no doctor
+        None,                         # Segment 2: no doctor
+        doctor_videos[0],             # Segment 3: ZOOM with doctor response 1
+        None,                         # Segment 4: no doctor
+        doctor_videos[1],             # Segment 5: ZOOM with doctor response 2
+        None,                         # Segment 6: no doctor
+        None,                         # Segment 7: no doctor
+    ]
 
-        segments = []
-        
-        # Determine number of segments based on whether intro/outro exist
-        num_segments = len(actor_videos)
-        
-        # Process all segments (8 segments for new format, 7 for legacy)
-        for i in range(num_segments):
-            part_num = i + 1
-            actor_vid = actor_videos[i]
-            doctor_vid = doctor_videos[i] if i < len(doctor_videos) else None
-            output_seg = os.path.join(job_temp_dir, f"p{part_num}.mp4")
-
-            # Check if this segment needs podcast zoom (has doctor video)
-            if doctor_vid:
-                # PODCAST ZOOM SEGMENTS
-                # These show side-by-side BluSanta and Doctor with zoom animation
-                
-                # Create podcast zoom segment WITHOUT subtitles first
-                podcast_temp = os.path.join(job_temp_dir, f"p{part_num}_podcast_temp.mp4")
-
-                create_podcast_zoom_segment(
-                    bg_image=bg_path,
-                    blusanta_video=actor_vid,
-                    doctor_video=doctor_vid,  # Use original doctor video without pre-burned subtitles
-                    output_path=podcast_temp,
-                    doctor_name=doctor_name,
-                    font_path=font_path
-                )
+    # Audio overlays: indices 1 and 6 get audio replacement (plc_000 and plc_001)
+    audio_overlays = [
+        {"segment_index": 1, "audio_path": backend_payload["greeting_audio_path"]},
+        {"segment_index": 6, "audio_path": backend_payload["thank_you_audio_path"]},
+    ]
 
-                # Generate subtitles for this podcast segment
-                try:
-                    logger.info(f"Generating subtitles for podcast segment {part_num}...")
-                    subtitle_path = generate_subtitles_with_deepgram(podcast_temp, 'en')
-                    if subtitle_path and os.path.exists(subtitle_path):
-                        podcast_with_subs = os.path.join(job_temp_dir, f"p{part_num}_with_subs.mp4")
-                        apply_subtitles_to_video(podcast_temp, subtitle_path, podcast_with_subs)
-                        logger.info(f"✅ Applied subtitles to podcast segment {part_num}")
-                        # Move the subtitled version to final path
-                        shutil.move(podcast_with_subs, output_seg)
-                    else:
-                        logger.warning(f"⚠️ Subtitle generation failed for segment {part_num}, using without subtitles")
-                        shutil.move(podcast_temp, output_seg)
-                except Exception as subtitle_error:
-                    logger.error(f"❌ Subtitle error for segment {part_num}: {subtitle_error}")
-                    logger.warning("⚠️ Using podcast segment without subtitles")
-                    shutil.move(podcast_temp, output_seg)
+    # Build internal payload structure (NO intro/outro/final wrappers)
+    converted_payload = {
+        "intro_path": None,  # No separate intro - merged into const_000
+        "outro_path": None,  # No separate outro - merged into const_003
+        "final_intro_path": None,  # No final intro wrapper
+        "final_outro_path": None,  # No final outro wrapper
+        "podcast_background": backend_payload["podcast_background"],
+        # Professional font for labels (overridable, e.g. null for offline tests)
+        "font_path": backend_payload.get(
+            "font_path", "gs://blusanta-campaign-videos/blusanta/fonts/Montserrat-SemiBold.ttf"
+        ),
+        "assets_actor_paths": actor_videos,
+        "assets_doctor_paths": doctor_videos_array,
+        "audio_overlays": audio_overlays,
+        "final_upload_path": backend_payload["final_upload_path"],
+        "webhook_url": backend_payload.get("webhook_url"),
+        "progress_webhook_url": backend_payload.get("progress_webhook_url"),
+        "additional_data": backend_payload.get("additional_data", {}),
+        "streaming": backend_payload.get("streaming", STREAMING_CONFIG["enabled"]),
+        "job_id": make_job_id(backend_payload.get("job_id")),
+        # Load-adaptive encoder profile inputs (see choose_job_profile)
+        "encoder_profile": backend_payload.get("encoder_profile"),
+        "deadline": backend_payload.get("deadline"),
+        "queue_depth": backend_payload.get("queue_depth"),
+        # Smaller copies encoded next to the master (None: RENDITION_CONFIG["default"])
+        "renditions": backend_payload.get("renditions"),
+        # HLS package next to the MP4 (None: HLS_CONFIG["enabled"])
+        "hls": backend_payload.get("hls"),
+        # Poster, sprite sheet and preview clip (None: PREVIEW_CONFIG["enabled"])
+        "previews": backend_payload.get("previews"),
+        # "soft": one subtitle track (mov_text + WebVTT sidecar) instead of burn-in
+        # (None: SOFT_SUBTITLE_CONFIG["enabled"])
+        "subtitles": backend_payload.get("subtitles"),
+        # Low-resolution QC proxy (<name>_proxy.mp4), promoted by re-sending without it
+        "proxy": backend_payload.get("proxy", False),
+    }
 
-                logger.info(f"Part {part_num} (Podcast Zoom): Created")
+    logger.info(f"Converted backend payload to internal format")
+    logger.info(f"Actor videos: {len(actor_videos)}, Doctor videos: 2, Audio overlays: 2")
 
-            else:
-                # Check if this segment needs audio overlay
-                needs_audio_overlay = False
-                audio_file = None
-                template_type = None
-                for overlay in audio_overlays:
-                    if overlay["segment_index"] == i:
-                        needs_audio_overlay = True
-                        audio_file = overlay["audio_path"]
-                        # Determine template type based on segment index
-                        # Segment 1 = plc_000 (greeting), Segment 6 = plc_001 (thankyou)
-                        if i == 1:
-                            template_type = "greeting"
-                        elif i == 6:
-                            template_type = "thankyou"
-                        break
-                
-                if needs_audio_overlay and audio_file:
-                    # AUDIO OVERLAY SEGMENTS (plc_000 and plc_001)
-                    # Replace audio with ElevenLabs generated audio
-                    temp_output = output_seg.replace('.mp4', '_temp.mp4')
-                    replace_audio_and_trim(actor_vid, audio_file, temp_output)
-                    logger.info(f"Part {part_num} (Audio Overlay): Audio replaced")
-                    
-                    # Generate subtitles for audio overlay segment
-                    # Use TEMPLATE subtitles for greeting/thankyou (accurate doctor name)
-                    # instead of transcription (which may misspell the name)
-                    try:
-                        logger.info(f"Generating subtitles for audio overlay segment {part_num}...")
-                        if template_type and dr_first_name:
-                            # Use template-based subtitles for accurate doctor name
-                            logger.info(f"Using template subtitles ({template_type}) with doctor name: {dr_first_name}")
-                            subtitle_path = generate_template_subtitles(temp_output, template_type, dr_first_name)
-                        else:
-                            # Fallback to transcription if no template or name
-                            subtitle_path = generate_subtitles_with_deepgram(temp_output, 'en')
-                        
-                        if subtitle_path and os.path.exists(subtitle_path):
-                            overlay_with_subs = temp_output.replace('.mp4', '_with_subs.mp4')
-                            apply_subtitles_to_video(temp_output, subtitle_path, overlay_with_subs)
-                            logger.info(f"✓ Applied subtitles to audio overlay segment {part_num}")
-                            shutil.move(overlay_with_subs, output_seg)
-                            if os.path.exists(temp_output):
-                                os.remove(temp_output)
-                        else:
-                            logger.warning(f"⚠ No subtitles generated for segment {part_num}")
-                            shutil.move(temp_output, output_seg)
-                    except Exception as sub_err:
-                        logger.warning(f"⚠ Subtitle error for segment {part_num}: {sub_err}")
-                        shutil.move(temp_output, output_seg)
-                else:
-                    # CONSTANT SEGMENTS
-                    # Just standardize without modifications
-                    temp_output = output_seg.replace('.mp4', '_temp.mp4')
-                    standardize_video(actor_vid, temp_output)
-                    logger.info(f"Part {part_num} (Constant): Standardized")
-                    
-                    # NOTE: Subtitle generation moved to final video (STEP 4B)
-                    shutil.move(temp_output, output_seg)
+    return converted_payload
 
-            segments.append(output_seg)
 
-        logger.info(f"Total segments processed: {len(segments)}")
+# ==============================================================================
+# PREFETCH (WARM CACHE FOR UPCOMING JOBS)
+# ==============================================================================
+#
+# The backend knows which jobs are next in the queue. Posting them to /prefetch
+# downloads their inputs and builds the per-input artifacts (standardized
+# constants, nodding master, normalized doctor videos, transcripts, loudness) on a single
+# low-priority worker while the current job is still encoding. /stitching then
+# finds everything in the cache; if a prefetch build is still in flight, the
+# per-entry cache lock makes the job wait for it instead of building it twice.
+
+# Queue entries are (description, function, argument) - prefetch and ingest share the worker
+PREFETCH_QUEUE: "queue.Queue[Tuple[str, Callable[[Any], Any], Any]]" = queue.Queue()
+PREFETCH_STATE = {"worker": None, "queued": 0, "completed": 0, "last_report": None}
+_prefetch_lock = threading.Lock()
+
+
+def _warm(report: Dict[str, List[Any]], kind: str, url: Optional[str], warmer: Callable[[str], Any]) -> None:
+    """Run one warm-up step and record the outcome in the report."""
+    if not url:
+        return
+    try:
+        result = warmer(url)
+        if result is None:
+            report["skipped"].append({"kind": kind, "url": url, "reason": "not available"})
+        else:
+            report["warmed"].append({"kind": kind, "url": url})
+    except Exception as e:
+        logger.warning(f"Prefetch {kind} failed for {url}: {e}")
+        report["skipped"].append({"kind": kind, "url": url, "reason": str(e)})
 
-        # ---------------------------------------------------------------------
-        # STEP 3: CONCATENATE SEGMENTS INTO FINAL VIDEO
-        # ---------------------------------------------------------------------
-        logger.info(f"STEP 3: Concatenating {len(segments)} segments...")
 
-        podcast_video = os.path.join(job_temp_dir, "podcast_full.mp4")
+def prefetch_assets(payload: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """
+    Download and precompute everything a future job can reuse.
 
-        # Guard against missing segments before invoking ffmpeg concat
-        missing_segments = [seg for seg in segments if not os.path.exists(seg)]
-        if missing_segments:
-            missing_list = ", ".join(os.path.basename(seg) for seg in missing_segments)
-            raise FileNotFoundError(f"Missing segment files before concat: {missing_list}")
+    Mirrors the asset roles used by blusanta_video_stitching(): constants are
+    standardized, nodding videos become the video-only master, doctor videos
+    are normalized and transcribed (placeholders get a video-only master too
+    with CONSTANT_MEZZANINE_CONFIG), everything else is only downloaded.
+    Every source a segment takes its audio from has its loudness measured.
+    Failures are skipped - the job itself will retry and report them.
 
-        concatenate_videos(segments, podcast_video)
+    Args:
+        payload: Internal stitching payload (see convert_backend_payload)
 
-        # ---------------------------------------------------------------------
-        # STEP 4: FINALIZE VIDEO (with or without wrappers)
-        # ---------------------------------------------------------------------
-        # If intro/outro paths are provided (legacy format), wrap the video
-        # Otherwise, the concatenated podcast IS the final video (new 8-segment format)
-        
-        if final_intro_path and final_outro_path:
-            logger.info("STEP 4: Adding final intro/outro wrappers...")
-            
-            # Standardize final intro/outro
-            f_intro = os.path.join(job_temp_dir, "f_intro_std.mp4")
-            f_outro = os.path.join(job_temp_dir, "f_outro_std.mp4")
-            standardize_video(final_intro_path, f_intro)
-            standardize_video(final_outro_path, f_outro)
-
-            # Final concatenation: intro + podcast + outro
-            final_output = os.path.join(OUTPUT_DIR, f"final_video_{job_id}.mp4")
-            concatenate_videos([f_intro, podcast_video, f_outro], final_output)
+    Returns:
+        Report with "warmed" and "skipped" entries
+    """
+    report: Dict[str, List[Any]] = {"warmed": [], "skipped": []}
+
+    actor_paths = payload.get("assets_actor_paths", [])
+    doctor_paths = payload.get("assets_doctor_paths", [])
+    overlay_indices = {o.get("segment_index") for o in payload.get("audio_overlays", [])}
+
+    for key in ("podcast_background", "font_path"):
+        _warm(report, "download", payload.get(key), fetch_asset)
+    for overlay in payload.get("audio_overlays", []):
+        _warm(report, "download", overlay.get("audio_path"), fetch_asset)
+
+    for i, actor_url in enumerate(actor_paths):
+        doctor_url = doctor_paths[i] if i < len(doctor_paths) else None
+        if doctor_url:
+            _warm(report, "nodding_master", actor_url, get_nodding_master)
+            _warm(report, "doctor_video", doctor_url, get_normalized_doctor_video)
+            _warm(report, "doctor_transcript", doctor_url, get_doctor_transcript)
+            _warm(report, "loudness", doctor_url, lambda url: get_doctor_loudness(url) or {})
+        elif i in overlay_indices and CONSTANT_MEZZANINE_CONFIG["enabled"]:
+            _warm(report, "nodding_master", actor_url, get_nodding_master)
+        elif i in overlay_indices:
+            _warm(report, "download", actor_url, fetch_asset)
         else:
-            # No wrappers needed - podcast video IS the final video
-            logger.info("STEP 4: No wrappers needed, using concatenated segments as final video")
-            final_output = os.path.join(OUTPUT_DIR, f"final_video_{job_id}.mp4")
-            # Move podcast_full to final output
-            shutil.move(podcast_video, final_output)
-
-        # ---------------------------------------------------------------------
-        # STEP 4B: GENERATE AND APPLY SUBTITLES TO FINAL VIDEO
-        # ---------------------------------------------------------------------
-        # COMMENTED OUT: Subtitles are now pre-burned into const videos
-        # and generated per-segment for podcast videos
-        # logger.info("STEP 4B: Generating subtitles for final video...")
-        # try:
-        #     subtitle_path = generate_subtitles_with_deepgram(final_output, 'en')
-        #     if subtitle_path and os.path.exists(subtitle_path):
-        #         final_with_subtitles = final_output.replace('.mp4', '_with_subs.mp4')
-        #         apply_subtitles_to_video(final_output, subtitle_path, final_with_subtitles)
-        #         logger.info(f"✅ Applied subtitles to final video")
-        #         # Replace original final output with subtitled version
-        #         os.replace(final_with_subtitles, final_output)
-        #     else:
-        #         logger.warning("⚠️ Subtitle generation failed, proceeding without subtitles")
-        # except Exception as subtitle_error:
-        #     logger.error(f"❌ Subtitle generation error: {subtitle_error}")
-        #     logger.warning("⚠️ Proceeding with final video without subtitles")
-        logger.info("STEP 4B: Skipped (subtitles pre-burned in const videos + per-segment for podcast)")
+            _warm(report, "standardized_constant", actor_url, get_standardized_constant)
+            _warm(report, "loudness", actor_url, lambda url: get_loudness(url) or {})
 
-        # ---------------------------------------------------------------------
-        # STEP 5: UPLOAD TO CLOUD STORAGE
-        # ---------------------------------------------------------------------
-        logger.info("STEP 5: Uploading final video...")
+    for overlay in payload.get("audio_overlays", []):
+        _warm(report, "loudness", overlay.get("audio_path"), lambda url: get_loudness(url) or {})
+    for key in ("final_intro_path", "final_outro_path"):
+        _warm(report, "standardized_constant", payload.get(key), get_standardized_constant)
+        _warm(report, "loudness", payload.get(key), lambda url: get_loudness(url) or {})
 
-        public_url = upload_file(final_output, payload["final_upload_path"])
+    return report
 
-        elapsed_time = time.time() - start_time
-        logger.info("=" * 60)
-        logger.info(f"STITCHING COMPLETE - Duration: {elapsed_time:.2f}s")
-        logger.info(f"Final video: {public_url}")
-        logger.info("=" * 60)
 
-        # ---------------------------------------------------------------------
-        # STEP 6: SEND WEBHOOK NOTIFICATION
-        # ---------------------------------------------------------------------
-        if payload.get("webhook_url"):
-            try:
-                webhook_data = {
-                    "status": "completed",
-                    "final_video_url": public_url,
-                    "processing_time_seconds": elapsed_time,
-                    "additional_data": payload.get("additional_data", {})
-                }
-                response = requests.post(
-                    payload["webhook_url"],
-                    json=webhook_data,
-                    timeout=30
-                )
-                logger.info(f"Webhook sent: {response.status_code}")
-            except Exception as e:
-                logger.warning(f"Webhook failed: {e}")
+def _prefetch_worker() -> None:
+    """Drain the prefetch queue at reduced CPU priority."""
+    _worker_state.niceness = PREFETCH_CONFIG["niceness"]
+    while True:
+        description, task, argument = PREFETCH_QUEUE.get()
+        try:
+            start = time.time()
+            report = task(argument)
+            logger.info(f"🔥 {description} done in {time.time() - start:.1f}s")
+            PREFETCH_STATE["last_report"] = report
+        except Exception as e:
+            logger.error(f"{description} failed: {e}")
+        finally:
+            PREFETCH_STATE["completed"] += 1
+            PREFETCH_QUEUE.task_done()
 
-        return True
 
-    except Exception as e:
-        logger.error(f"STITCHING FAILED: {e}", exc_info=True)
+def queue_background_task(description: str, task: Callable[[Any], Any], argument: Any) -> int:
+    """
+    Queue work for the low-priority worker, starting it on first use.
 
-        # Send failure webhook
-        if payload.get("webhook_url"):
-            try:
-                requests.post(
-                    payload["webhook_url"],
-                    json={
-                        "status": "failed",
-                        "error": str(e),
-                        "additional_data": payload.get("additional_data", {})
-                    },
-                    timeout=30
-                )
-            except:
-                pass
+    Args:
+        description: Label for logging
+        task: Callable run with argument on the worker thread
+        argument: Single argument passed to task
 
-        return False
+    Returns:
+        Number of tasks waiting in the queue
+    """
+    with _prefetch_lock:
+        worker = PREFETCH_STATE["worker"]
+        if worker is None or not worker.is_alive():
+            worker = threading.Thread(target=_prefetch_worker, name="prefetch", daemon=True)
+            worker.start()
+            PREFETCH_STATE["worker"] = worker
+    PREFETCH_STATE["queued"] += 1
+    PREFETCH_QUEUE.put((description, task, argument))
+    return PREFETCH_QUEUE.qsize()
+
+
+def queue_prefetch(payload: Dict[str, Any]) -> int:
+    """
+    Queue a payload for prefetching.
 
-    finally:
-        # Cleanup: Set machine status to free
-        os.environ["machine_status"] = "free"
+    Args:
+        payload: Internal stitching payload
 
-        # Cleanup temp files after processing
-        try:
-            shutil.rmtree(job_temp_dir)
-        except:
-            pass
+    Returns:
+        Number of tasks waiting in the queue
+    """
+    return queue_background_task("Prefetch", prefetch_assets, payload)
 
 
 # ==============================================================================
@@ -1885,9 +8167,152 @@ def status():
     if not check_auth():
         return jsonify({"detail": "Not authenticated"}), 401
 
+    response = {"status": os.environ.get("machine_status", "free")}
+    running = [job for job in list(JOBS.values()) if job.status == "running"]
+    if running:
+        snapshot = job_snapshot(running[-1])
+        response.update({
+            "job_id": snapshot["job_id"],
+            "stage": snapshot["stage"],
+            "percent": snapshot["percent"],
+            "eta_seconds": remaining_job_seconds(running[-1]),
+        })
+    return jsonify(response)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """
+    Prometheus metrics in the text exposition format.
+
+    Request Headers:
+        Authorization: Bearer <token>  (Prometheus: authorization.credentials)
+
+    Returns:
+        200: text/plain; version=0.0.4
+        401: Unauthorized - invalid token
+    """
+    if not check_auth():
+        return jsonify({"detail": "Not authenticated"}), 401
+
+    return render_metrics(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status_endpoint(job_id: str):
+    """
+    Live progress of a running (or recently finished) job.
+
+    Percent complete and ETA come from ffmpeg -progress out_time against the
+    planned output duration of each encode step.
+
+    Request Headers:
+        Authorization: Bearer <token>
+
+    Returns:
+        200: {"job_id", "status", "stage", "elapsed_seconds", "percent", "eta_seconds",
+              "encoded_seconds", "planned_seconds", "running": [...], "stalled": [...]}
+             plus "resource_usage" once the job has finished
+        401: Unauthorized - invalid token
+        404: Unknown job (or forgotten after PROGRESS_CONFIG["keep_jobs"] newer jobs)
+    """
+    if not check_auth():
+        return jsonify({"detail": "Not authenticated"}), 401
+
+    metrics = JOBS.get(job_id)
+    if metrics is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+
+    snapshot = job_snapshot(metrics)
+    if metrics.status != "running":
+        snapshot["resource_usage"] = metrics.summary()
+    return jsonify(snapshot)
+
+
+@app.route("/jobs/<job_id>/trace", methods=["GET"])
+def job_trace_endpoint(job_id: str):
+    """
+    Returns a finished job's timeline as Chrome trace-event JSON.
+
+    Open the file in chrome://tracing or https://ui.perfetto.dev.
+
+    Request Headers:
+        Authorization: Bearer <token>
+
+    Returns:
+        200: Trace JSON
+        400: Bad request - invalid job id
+        401: Unauthorized - invalid token
+        404: No trace for this job (unknown, still running, or pruned)
+    """
+    if not check_auth():
+        return jsonify({"detail": "Not authenticated"}), 401
+
+    if not re.fullmatch(r"[A-Za-z0-9_-]+", job_id):
+        return jsonify({"error": "Invalid job id"}), 400
+
+    path = os.path.join(TRACE_DIR, f"{job_id}.json")
+    if not os.path.exists(path):
+        return jsonify({"error": f"No trace for job {job_id}"}), 404
+
+    return send_file(path, mimetype="application/json", download_name=f"trace_{job_id}.json")
+
+
+@app.route("/history", methods=["GET"])
+def history_endpoint():
+    """
+    Aggregates over the job history (see history_summary).
+
+    Request Headers:
+        Authorization: Bearer <token>
+
+    Query Parameters:
+        hours: Window in hours (default 168)
+        mode: "file" or "stream"
+        profile: Encoder profile name
+        host: Hostname that ran the jobs
+        recent: Also return the N most recent job records
+
+    Returns:
+        200: {"jobs", "completed", "success_rate", "elapsed_seconds", "cpu_seconds",
+              "cache_hit_ratio", "prediction", "stages", "groups", "regressions", ...}
+        400: Bad request - invalid parameter
+        401: Unauthorized - invalid token
+        404: Job history is disabled
+    """
+    if not check_auth():
+        return jsonify({"detail": "Not authenticated"}), 401
+
+    if not HISTORY_CONFIG["enabled"]:
+        return jsonify({"error": "Job history is disabled"}), 404
+
+    try:
+        hours = float(request.args.get("hours", 168))
+        recent = int(request.args.get("recent", 0))
+    except ValueError:
+        return jsonify({"error": "hours and recent must be numbers"}), 400
+
+    return jsonify(history_summary(
+        hours,
+        mode=request.args.get("mode"),
+        profile=request.args.get("profile"),
+        host=request.args.get("host"),
+        recent=recent
+    ))
+
+
+def machine_busy_response():
+    """503 response for /stitching, retrying when the running job is expected to finish."""
+    note_waiting_job((request.get_json(silent=True) or {}).get("job_id"))
+    running = [job for job in list(JOBS.values()) if job.status == "running"]
+    remaining = remaining_job_seconds(running[-1]) if running else None
+    retry_after = max(1, math.ceil(remaining)) if remaining is not None else HISTORY_CONFIG["default_retry_seconds"]
     return jsonify({
-        "status": os.environ.get("machine_status", "free")
-    })
+        "error": "Machine busy",
+        "status": "busy",
+        "message": "Please try again later or use a different server",
+        "retry_after_seconds": retry_after
+    }), 503, {"Retry-After": str(retry_after)}
 
 
 @app.route("/stitch", methods=["POST"])
@@ -1902,7 +8327,9 @@ def stitch_endpoint():
     Main stitching API endpoint - compatible with backend payload structure.
 
     Accepts POST request with JSON payload from backend and starts video stitching
-    in a background thread.
+    in a background thread. With ?dry_run=1 nothing is run: the response is the
+    job's execution plan (see plan_stitching_job) - every FFmpeg command, its
+    inputs/outputs/dependencies, cache hits and estimated CPU-seconds.
 
     Request Headers:
         Authorization: Bearer <token>
@@ -1918,110 +8345,82 @@ def stitch_endpoint():
             "podcast_background": "gs://...",  # Background image
             "final_upload_path": "gs://...",  # Output destination
             "webhook_url": "https://...",  # Completion webhook
-            "additional_data": {...}  # Passthrough data
+            "progress_webhook_url": "https://...",  # Optional: periodic progress posts
+            "additional_data": {...},  # Passthrough data
+            "streaming": false,  # Optional: stream segments into the final encode
+            "font_path": "gs://...",  # Optional: label font (null: FFmpeg's default font)
+            "job_id": "...",  # Optional: ID for /jobs/<id> and /jobs/<id>/trace (generated if omitted);
+                              # also how a 503'd job is counted as waiting when it retries
+            "deadline": 1767225600,  # Optional: unix time the video is due (faster profile if needed)
+            "queue_depth": 12,  # Optional: jobs queued behind this one at the backend
+            "encoder_profile": "quality",  # Optional: force an ENCODER_PROFILES entry (no adaptation)
+            "renditions": ["720p", "480p"],  # Optional: smaller copies uploaded next to final_upload_path
+                                             # as <name>_<rendition>.mp4 ([] = 1080p master only)
+            "hls": true,  # Optional: also package as HLS under <name>_hls/ (master.m3u8)
+            "previews": true,  # Optional: <name>_poster.jpg, _sprite.jpg/.vtt and _preview.mp4 (default on)
+            "subtitles": "soft",  # Optional: "soft" = text track in the MP4 + <name>_subtitles.vtt
+                                  # instead of burned-in subtitles ("burn", the default)
+            "proxy": true  # Optional: fast 640x360 render for QC, uploaded as <name>_proxy.mp4;
+                           # send the payload again without it to render the approved video
         }
 
     Returns:
-        202: Accepted - stitching started
+        200: Execution plan (dry run)
+        202: Accepted - stitching started (response includes job_id, the chosen
+             encoder_profile and, once there is job history, estimated_seconds /
+             estimated_completion_at)
         400: Bad request - invalid payload
         401: Unauthorized - invalid token
-        503: Service unavailable - machine busy
+        503: Service unavailable - machine busy (Retry-After: expected seconds
+             until the running job finishes)
     """
     if not check_auth():
         return jsonify({"detail": "Not authenticated"}), 401
 
-    if os.environ.get("machine_status") == "busy":
-        return jsonify({
-            "error": "Machine busy",
-            "status": "busy",
-            "message": "Please try again later or use a different server"
-        }), 503
+    # A dry run only probes cached inputs, so it is allowed while a job runs
+    dry_run = request.args.get("dry_run", "").lower() in ("1", "true", "yes")
+
+    if not dry_run and os.environ.get("machine_status") == "busy":
+        return machine_busy_response()
 
     backend_payload = request.json
     if not backend_payload:
         return jsonify({"error": "No payload provided"}), 400
 
-    # Validate required fields from backend
-    required_fields = [
-        "constant_video_paths", "placeholder_video_paths", "nodding_video_path",
-        "doctor_video_paths", "greeting_audio_path", "thank_you_audio_path",
-        "podcast_background", "final_upload_path"
-    ]
-    missing = [f for f in required_fields if f not in backend_payload]
-    if missing:
-        return jsonify({
-            "error": f"Missing required fields: {missing}"
-        }), 400
-
     try:
-        # Convert backend payload to internal format
-        # Backend sends 8-segment structure, we need to map to 9-part format
-        const_videos = backend_payload["constant_video_paths"]  # 4 videos
-        plc_videos = backend_payload["placeholder_video_paths"]  # 2 videos
-        nodding_video = backend_payload["nodding_video_path"]
-        doctor_videos = backend_payload["doctor_video_paths"]  # 2 videos
-
-        # Map to 8-segment structure (NO intro/outro wrappers):
-        # Sequence: const_000, plc_000, const_001, nodding+dr1, const_002, nodding+dr2, plc_001, const_003
-        # Intro is merged into const_000, outro is merged into const_003
-        
-        # Create 8 actor videos for the complete sequence
-        actor_videos = [
-            const_videos[0],  # Segment 0: const_000 (includes intro + greeting)
-            plc_videos[0],    # Segment 1: plc_000 (will get greeting audio overlay)
-            const_videos[1],  # Segment 2: const_001
-            nodding_video,    # Segment 3: nodding (for zoom with doctor)
-            const_videos[2],  # Segment 4: const_002
-            nodding_video,    # Segment 5: nodding (for zoom with doctor)
-            plc_videos[1],    # Segment 6: plc_001 (will get thank you audio overlay)
-            const_videos[3],  # Segment 7: const_003 (includes final message + outro)
-        ]
-
-        # Doctor videos array: 8 slots, only indices 3 and 5 have actual videos
-        doctor_videos_array = [
-            None,                         # Segment 0: no doctor
-            None,                         # Segment 1: no doctor
-            None,                         # Segment 2: no doctor
-            doctor_videos[0],             # Segment 3: ZOOM with doctor response 1
-            None,                         # Segment 4: no doctor
-            doctor_videos[1],             # Segment 5: ZOOM with doctor response 2
-            None,                         # Segment 6: no doctor
-            None,                         # Segment 7: no doctor
-        ]
-
-        # Audio overlays: indices 1 and 6 get audio replacement (plc_000 and plc_001)
-        audio_overlays = [
-            {"segment_index": 1, "audio_path": backend_payload["greeting_audio_path"]},
-            {"segment_index": 6, "audio_path": backend_payload["thank_you_audio_path"]},
-        ]
-
-        # Build internal payload structure (NO intro/outro/final wrappers)
-        converted_payload = {
-            "intro_path": None,  # No separate intro - merged into const_000
-            "outro_path": None,  # No separate outro - merged into const_003
-            "final_intro_path": None,  # No final intro wrapper
-            "final_outro_path": None,  # No final outro wrapper
-            "podcast_background": backend_payload["podcast_background"],
-            "font_path": "gs://blusanta-campaign-videos/blusanta/fonts/Montserrat-SemiBold.ttf",  # Professional font for labels
-            "assets_actor_paths": actor_videos,
-            "assets_doctor_paths": doctor_videos_array,
-            "audio_overlays": audio_overlays,
-            "final_upload_path": backend_payload["final_upload_path"],
-            "webhook_url": backend_payload.get("webhook_url"),
-            "additional_data": backend_payload.get("additional_data", {}),
-        }
-
-        logger.info(f"Converted backend payload to internal format")
-        logger.info(f"Actor videos: {len(actor_videos)}, Doctor videos: 2, Audio overlays: 2")
-        
+        converted_payload = convert_backend_payload(backend_payload)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Payload conversion error: {e}")
         return jsonify({
             "error": f"Invalid payload structure: {str(e)}"
         }), 400
 
-    # Set machine as busy BEFORE starting thread
-    os.environ["machine_status"] = "busy"
+    if dry_run:
+        try:
+            choice = choose_job_profile(converted_payload)
+            converted_payload["encoder_profile"] = choice["profile"]
+            return jsonify(dict(plan_stitching_job(converted_payload), profile_choice=choice)), 200
+        except Exception as e:
+            logger.error(f"Dry-run planning failed: {e}", exc_info=True)
+            return jsonify({"error": f"Planning failed: {str(e)}"}), 500
+
+    # Set machine as busy BEFORE starting thread (another request may have won the race since the check above)
+    with _machine_lock:
+        if os.environ.get("machine_status") == "busy":
+            return machine_busy_response()
+        os.environ["machine_status"] = "busy"
+    job_started_at = time.time()
+    forget_waiting_job(converted_payload["job_id"])
+    try:
+        choice = choose_job_profile(converted_payload)
+    except Exception as e:
+        logger.warning(f"Encoder profile choice failed, using {VIDEO_CONFIG['profile']}: {e}")
+        choice = {"profile": converted_payload.get("encoder_profile") or VIDEO_CONFIG["profile"],
+                  "reason": "error", "estimated_seconds": None}
+    converted_payload["encoder_profile"] = choice["profile"]
+    converted_payload["profile_choice"] = choice
 
     def run_stitching():
         """Background thread function for video stitching."""
@@ -2038,7 +8437,114 @@ def stitch_endpoint():
     return jsonify({
         "status": "processing",
         "message": "Video stitching started successfully",
-        "job_started_at": time.time()
+        "job_id": converted_payload["job_id"],
+        "job_started_at": job_started_at,
+        "encoder_profile": choice["profile"],
+        "estimated_seconds": choice["estimated_seconds"],
+        "estimated_completion_at": (
+            job_started_at + choice["estimated_seconds"] if choice["estimated_seconds"] is not None else None
+        )
+    }), 202
+
+
+@app.route("/ingest", methods=["POST"])
+def ingest_endpoint():
+    """
+    Build the normalized mezzanine for newly uploaded doctor videos.
+
+    Call this as soon as a doctor video is uploaded. The mezzanine
+    (<name>_mezzanine.mp4 + .json sidecar with leading/trailing silence) is
+    stored next to the original and picked up by /stitching automatically.
+
+    Request Headers:
+        Authorization: Bearer <token>
+
+    Request Body:
+        {
+            "doctor_video_paths": ["gs://...", ...],  # or "doctor_video_path": "gs://..."
+            "wait": false,  # Optional: ingest synchronously and return metadata
+            "force": false  # Optional: rebuild an existing mezzanine
+        }
+
+    Returns:
+        200: Ingested (wait=true) - metadata per video
+        202: Accepted - queued on the background worker
+        400: Bad request - no doctor video paths
+        401: Unauthorized - invalid token
+    """
+    if not check_auth():
+        return jsonify({"detail": "Not authenticated"}), 401
+
+    body = request.json or {}
+    urls = body.get("doctor_video_paths") or (
+        [body["doctor_video_path"]] if body.get("doctor_video_path") else []
+    )
+    if not urls:
+        return jsonify({"error": "Missing required fields: ['doctor_video_paths']"}), 400
+
+    force = bool(body.get("force", False))
+
+    if body.get("wait"):
+        results = []
+        for url in urls:
+            try:
+                results.append(ingest_doctor_video(url, force=force))
+            except Exception as e:
+                logger.error(f"Ingest failed for {url}: {e}")
+                results.append({"source": url, "status": "failed", "error": str(e)})
+        return jsonify({"status": "done", "videos": results}), 200
+
+    pending = 0
+    for url in urls:
+        pending = queue_background_task(
+            f"Ingest {url}", lambda u: ingest_doctor_video(u, force=force), url
+        )
+
+    return jsonify({
+        "status": "queued",
+        "videos": len(urls),
+        "pending": pending
+    }), 202
+
+
+@app.route("/prefetch", methods=["POST"])
+def prefetch_endpoint():
+    """
+    Warm the asset cache for upcoming jobs.
+
+    Accepts one backend payload (same format as /stitching) or a list of them.
+    Work runs on a low-priority background worker and is allowed while the
+    machine is busy - that is the point.
+
+    Request Headers:
+        Authorization: Bearer <token>
+
+    Returns:
+        202: Accepted - payloads queued
+        400: Bad request - invalid payload
+        401: Unauthorized - invalid token
+    """
+    if not check_auth():
+        return jsonify({"detail": "Not authenticated"}), 401
+
+    body = request.json
+    if not body:
+        return jsonify({"error": "No payload provided"}), 400
+
+    backend_payloads = body if isinstance(body, list) else [body]
+    try:
+        converted = [convert_backend_payload(p) for p in backend_payloads]
+    except Exception as e:
+        return jsonify({"error": f"Invalid payload structure: {str(e)}"}), 400
+
+    pending = 0
+    for payload in converted:
+        pending = queue_prefetch(payload)
+
+    return jsonify({
+        "status": "queued",
+        "jobs": len(converted),
+        "pending": pending
     }), 202
 
 
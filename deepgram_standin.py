@@ -0,0 +1,287 @@
+"""
+Deepgram Stand-in Server
+========================
+
+Local replacement for the Deepgram pre-recorded API (POST /v1/listen) so the
+subtitle path can be exercised offline and under load.
+
+Accepts the same request the stitching service sends (raw audio body,
+"Authorization: Token ..." header, model/language/... query params) and
+returns a Deepgram-shaped response whose word timestamps are derived
+deterministically from the audio duration. Latency, error rate and a rate
+limit are configurable, to measure how transcription latency and failures
+affect job throughput.
+
+Usage:
+    python deepgram_standin.py --port 8090 --latency 1.5 --error-rate 0.1 --rate-limit 2
+    DEEPGRAM_URL=http://127.0.0.1:8090/v1/listen python blusanta_zoom_stitch.py
+    python benchmark_stitching.py --deepgram-url http://127.0.0.1:8090/v1/listen
+
+Endpoints:
+    POST /v1/listen   Transcription
+    GET  /stats       Request counters
+    GET  /config      Current behaviour
+    POST /config      Change behaviour at runtime (JSON with any STANDIN_CONFIG keys)
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, request, jsonify
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+STANDIN_CONFIG = {
+    "latency": 0.5,              # Base seconds per request
+    "latency_per_minute": 1.0,   # Extra seconds per minute of audio
+    "jitter": 0.2,               # +/- fraction applied to the latency
+    "error_rate": 0.0,           # Fraction of requests answered with a 500
+    "rate_limit": 0.0,           # Requests per second (token bucket, burst = 1s); 0 = unlimited
+    "api_key": None,             # Required "Token <key>" when set
+    "word_seconds": 0.4,         # One word every word_seconds of audio
+    "seed": 0,
+}
+
+WORDS = [
+    "thank", "you", "for", "asking", "diabetes", "management", "starts", "with",
+    "diet", "exercise", "and", "regular", "blood", "sugar", "checks",
+]
+
+app = Flask(__name__)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("deepgram_standin")
+
+_lock = threading.Lock()
+_random = random.Random(STANDIN_CONFIG["seed"])
+_bucket = {"tokens": 0.0, "updated": time.time()}
+STATS = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0, "unauthorized": 0,
+         "bad_requests": 0, "audio_seconds": 0.0, "latency_seconds": 0.0}
+
+
+# ==============================================================================
+# TRANSCRIPT
+# ==============================================================================
+
+def audio_duration(audio: bytes) -> Optional[float]:
+    """Returns the duration of an audio payload via ffprobe, or None if undecodable."""
+    with tempfile.NamedTemporaryFile(suffix=".audio") as f:
+        f.write(audio)
+        f.flush()
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", f.name],
+            capture_output=True, text=True
+        )
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        return None
+
+
+def synthetic_words(duration: float) -> List[Dict[str, Any]]:
+    """
+    Returns Deepgram word entries covering the audio.
+
+    Sentences are eight words long: the first word is capitalized and the
+    last one carries a period in punctuated_word, like smart_format output.
+    """
+    step = STANDIN_CONFIG["word_seconds"]
+    words = []
+    start = 0.0
+    while start + step <= duration:
+        n = len(words)
+        word = WORDS[n % len(WORDS)]
+        punctuated = word.capitalize() if n % 8 == 0 else word
+        if n % 8 == 7:
+            punctuated += "."
+        words.append({
+            "word": word,
+            "start": round(start, 3),
+            "end": round(start + 0.8 * step, 3),
+            "confidence": 0.99,
+            "punctuated_word": punctuated,
+        })
+        start += step
+    return words
+
+
+def listen_response(audio: bytes, duration: float, params: Dict[str, str]) -> Dict[str, Any]:
+    """Builds a Deepgram pre-recorded response (request_id is a hash of the audio)."""
+    words = synthetic_words(duration)
+    model = params.get("model", "nova-3")
+    return {
+        "metadata": {
+            "request_id": str(uuid.UUID(hashlib.md5(audio).hexdigest())),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+            "duration": round(duration, 3),
+            "channels": 1,
+            "models": [model],
+            "model_info": {model: {"name": model, "version": "standin", "arch": "standin"}},
+        },
+        "results": {
+            "channels": [{
+                "alternatives": [{
+                    "transcript": " ".join(w["punctuated_word"] for w in words),
+                    "confidence": 0.99 if words else 0.0,
+                    "words": words,
+                }],
+                "detected_language": params.get("language", "en"),
+            }],
+        },
+    }
+
+
+def error_response(status: int, code: str, message: str):
+    return jsonify({"err_code": code, "err_msg": message, "request_id": str(uuid.uuid4())}), status
+
+
+# ==============================================================================
+# BEHAVIOUR
+# ==============================================================================
+
+def take_rate_limit_token() -> bool:
+    """Token bucket: refills at rate_limit per second, holds at most one second's worth."""
+    rate = STANDIN_CONFIG["rate_limit"]
+    if not rate:
+        return True
+    with _lock:
+        now = time.time()
+        _bucket["tokens"] = min(rate, _bucket["tokens"] + (now - _bucket["updated"]) * rate)
+        _bucket["updated"] = now
+        if _bucket["tokens"] >= 1:
+            _bucket["tokens"] -= 1
+            return True
+        return False
+
+
+def simulated_latency(duration: float) -> float:
+    base = STANDIN_CONFIG["latency"] + STANDIN_CONFIG["latency_per_minute"] * duration / 60
+    with _lock:
+        factor = 1 + _random.uniform(-STANDIN_CONFIG["jitter"], STANDIN_CONFIG["jitter"])
+    return max(0.0, base * factor)
+
+
+def should_fail() -> bool:
+    with _lock:
+        return _random.random() < STANDIN_CONFIG["error_rate"]
+
+
+def count(key: str, amount: float = 1) -> None:
+    with _lock:
+        STATS[key] += amount
+
+
+# ==============================================================================
+# ROUTES
+# ==============================================================================
+
+@app.route("/v1/listen", methods=["POST"])
+def listen():
+    """Deepgram pre-recorded transcription (raw audio body)."""
+    count("requests")
+
+    if STANDIN_CONFIG["api_key"] and request.headers.get("Authorization") != f"Token {STANDIN_CONFIG['api_key']}":
+        count("unauthorized")
+        return error_response(401, "INVALID_AUTH", "Invalid credentials.")
+
+    if not take_rate_limit_token():
+        count("rate_limited")
+        return error_response(429, "TOO_MANY_REQUESTS", "Too many requests. Please try again later.")
+
+    audio = request.get_data()
+    duration = audio_duration(audio) if audio else None
+    if duration is None:
+        count("bad_requests")
+        return error_response(400, "Bad Request", "Bad Request: failed to process audio: corrupt or unsupported data")
+
+    latency = simulated_latency(duration)
+    time.sleep(latency)
+    count("latency_seconds", latency)
+
+    if should_fail():
+        count("errors")
+        return error_response(500, "INTERNAL_SERVER_ERROR", "Simulated failure from the Deepgram stand-in.")
+
+    count("ok")
+    count("audio_seconds", duration)
+    return jsonify(listen_response(audio, duration, request.args.to_dict()))
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    """Request counters since start (or the last POST /config with reset_stats)."""
+    with _lock:
+        data = dict(STATS)
+    answered = data["ok"] + data["errors"]
+    data["mean_latency_seconds"] = round(data["latency_seconds"] / answered, 3) if answered else None
+    return jsonify(data)
+
+
+@app.route("/config", methods=["GET", "POST"])
+def config():
+    """Reads or updates STANDIN_CONFIG; {"reset_stats": true} also clears /stats."""
+    if request.method == "POST":
+        updates = request.get_json(silent=True) or {}
+        unknown = set(updates) - set(STANDIN_CONFIG) - {"reset_stats"}
+        if unknown:
+            return jsonify({"error": f"Unknown settings: {sorted(unknown)}"}), 400
+        with _lock:
+            if updates.pop("reset_stats", False):
+                for key in STATS:
+                    STATS[key] = 0 if isinstance(STATS[key], int) else 0.0
+            STANDIN_CONFIG.update(updates)
+            if "seed" in updates:
+                _random.seed(updates["seed"])
+            if "rate_limit" in updates:
+                _bucket["tokens"] = updates["rate_limit"]
+        logger.info(f"Config updated: {STANDIN_CONFIG}")
+    return jsonify(STANDIN_CONFIG)
+
+
+# ==============================================================================
+# MAIN
+# ==============================================================================
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local Deepgram stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8090")))
+    parser.add_argument("--latency", type=float, default=STANDIN_CONFIG["latency"])
+    parser.add_argument("--latency-per-minute", type=float, default=STANDIN_CONFIG["latency_per_minute"])
+    parser.add_argument("--jitter", type=float, default=STANDIN_CONFIG["jitter"])
+    parser.add_argument("--error-rate", type=float, default=STANDIN_CONFIG["error_rate"])
+    parser.add_argument("--rate-limit", type=float, default=STANDIN_CONFIG["rate_limit"])
+    parser.add_argument("--api-key", default=STANDIN_CONFIG["api_key"])
+    parser.add_argument("--seed", type=int, default=STANDIN_CONFIG["seed"])
+    args = parser.parse_args()
+
+    STANDIN_CONFIG.update({
+        "latency": args.latency,
+        "latency_per_minute": args.latency_per_minute,
+        "jitter": args.jitter,
+        "error_rate": args.error_rate,
+        "rate_limit": args.rate_limit,
+        "api_key": args.api_key,
+        "seed": args.seed,
+    })
+    _random.seed(args.seed)
+    _bucket["tokens"] = args.rate_limit
+
+    logger.info(f"Deepgram stand-in on http://{args.host}:{args.port}/v1/listen {json.dumps(STANDIN_CONFIG)}")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+BluSanta Encoder Profile Tuning
+===============================
+
+Runs the synthetic benchmark job (see benchmark_stitching.py) across a matrix
+of libx264 presets, CRF values, tune options and thread counts, and records
+wall time, CPU-seconds, output size and an objective quality score (PSNR and
+SSIM against a lossless render of the same job). Prints the Pareto frontier
+over CPU-seconds, output size and SSIM, plus ENCODER_PROFILES entries for the
+frontier points.
+
+Usage:
+    python encoder_tuning.py --presets veryfast,fast,medium --crfs 20,23,26
+    python encoder_tuning.py --profiles default,fast,quality --tunes none,film
+    STITCH_ENCODER_PROFILE=fast python blusanta_zoom_stitch.py
+
+Each matrix point is a full job, so keep the synthetic clips short
+(--doctor-seconds) when sweeping many points.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import blusanta_zoom_stitch as stitch
+import benchmark_stitching as bench
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+TUNING_CONFIG = {
+    "presets": ["ultrafast", "veryfast", "fast", "medium"],
+    "crfs": [20, 23, 26],
+    "tunes": [None],
+    "threads": [0],
+    # Lossless reference render (x264 CRF 0 is lossless for 8-bit)
+    "reference": {"preset": "ultrafast", "crf": 0, "tune": None, "threads": 0},
+    "profile_name": "tuning",  # Temporary ENCODER_PROFILES entry used for each point
+}
+
+logger = logging.getLogger("encoder_tuning")
+
+
+# ==============================================================================
+# MEASUREMENT
+# ==============================================================================
+
+def measure_quality(output_path: str, reference_path: str) -> Dict[str, Optional[float]]:
+    """
+    Returns PSNR (dB) and SSIM of a render against the reference render.
+
+    Returns:
+        {"psnr": float or None, "ssim": float or None}
+    """
+    result = subprocess.run([
+        "ffmpeg", "-hide_banner", "-nostats",
+        "-i", output_path, "-i", reference_path,
+        "-lavfi", "[0:v]split[a0][a1];[1:v]split[b0][b1];[a0][b0]psnr;[a1][b1]ssim",
+        "-f", "null", "-"
+    ], capture_output=True, text=True)
+    psnr = re.search(r"PSNR .*average:([\d.]+|inf)", result.stderr)
+    ssim = re.search(r"SSIM .*All:([\d.]+)", result.stderr)
+    return {
+        "psnr": float(psnr.group(1)) if psnr else None,
+        "ssim": float(ssim.group(1)) if ssim else None,
+    }
+
+
+def render(assets: Dict[str, str], mode: str, settings: Dict[str, Any], job_id: str, cold_cache: bool) -> Dict[str, Any]:
+    """Runs the synthetic job with one set of encoder settings, keeping the output."""
+    stitch.ENCODER_PROFILES[TUNING_CONFIG["profile_name"]] = dict(settings)
+    stitch.VIDEO_CONFIG["profile"] = TUNING_CONFIG["profile_name"]
+    if not cold_cache:
+        bench.run_once(assets, mode, f"{job_id}_warmup", cold_cache=True)
+    return bench.run_once(assets, mode, job_id, cold_cache=cold_cache, keep_output=True)
+
+
+def matrix(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Returns the encoder settings to evaluate (named profiles plus the matrix)."""
+    points = [dict(stitch.encoder_profile(name), name=name) for name in args.profiles]
+    if args.presets:
+        for preset, crf, tune, threads in itertools.product(args.presets, args.crfs, args.tunes, args.threads):
+            points.append({"preset": preset, "crf": crf, "tune": tune, "threads": threads})
+    for point in points:
+        point.setdefault("name", f"{point['preset']}_crf{point['crf']}"
+                                 f"{'_' + point['tune'] if point['tune'] else ''}"
+                                 f"{'_t' + str(point['threads']) if point['threads'] else ''}")
+    return points
+
+
+def pareto_frontier(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Returns the results no other result beats on all of CPU-seconds (lower),
+    output size (lower) and SSIM (higher).
+    """
+    def dominates(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+        no_worse = (a["cpu_seconds"] <= b["cpu_seconds"] and a["output_bytes"] <= b["output_bytes"]
+                    and a["ssim"] >= b["ssim"])
+        better = (a["cpu_seconds"] < b["cpu_seconds"] or a["output_bytes"] < b["output_bytes"]
+                  or a["ssim"] > b["ssim"])
+        return no_worse and better
+
+    scored = [r for r in results if r["ok"] and r["ssim"] is not None]
+    return [r for r in scored if not any(dominates(other, r) for other in scored)]
+
+
+# ==============================================================================
+# MAIN
+# ==============================================================================
+
+def parse_list(value: str, cast=str) -> List[Any]:
+    return [None if item in ("none", "") else cast(item) for item in value.split(",")]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Encoder profile tuning (Pareto frontier)")
+    parser.add_argument("--presets", type=parse_list, default=TUNING_CONFIG["presets"],
+                        help="Comma-separated x264 presets ('' to evaluate --profiles only)")
+    parser.add_argument("--crfs", type=lambda v: parse_list(v, int), default=TUNING_CONFIG["crfs"])
+    parser.add_argument("--tunes", type=parse_list, default=TUNING_CONFIG["tunes"],
+                        help="Comma-separated x264 tunes, 'none' for no tune (e.g. none,film)")
+    parser.add_argument("--threads", type=lambda v: parse_list(v, int), default=TUNING_CONFIG["threads"],
+                        help="Comma-separated x264 thread counts, 0 = auto")
+    parser.add_argument("--profiles", type=lambda v: [p for p in v.split(",") if p], default=[],
+                        help="Also evaluate these ENCODER_PROFILES entries")
+    parser.add_argument("--mode", choices=["file", "stream"], default="stream")
+    parser.add_argument("--cache", choices=["cold", "warm"], default="cold",
+                        help="cold: artifacts are encoded inside each measured job; "
+                             "warm: per-job cost only (one unmeasured warm-up per point)")
+    parser.add_argument("--doctor-seconds", type=float, default=10.0)
+    parser.add_argument("--constant-seconds", type=float, default=4.0)
+    parser.add_argument("--work-dir", default=os.path.join(stitch.BASE_DIR, "benchmark", "tuning"))
+    parser.add_argument("--output", help="Result JSON (default: <work-dir>/tuning_<timestamp>.json)")
+    parser.add_argument("--verbose", action="store_true", help="Show the service's INFO logs")
+    args = parser.parse_args()
+    args.presets = [p for p in args.presets if p]
+
+    stitch.logger.setLevel(logging.INFO if args.verbose else logging.WARNING)
+    work_dir = bench.BENCHMARK_CONFIG["work_dir"] = os.path.abspath(args.work_dir)
+    bench.isolate_service_dirs(work_dir)
+    assets = bench.generate_assets(os.path.join(work_dir, "inputs"), args.doctor_seconds, args.constant_seconds)
+    stitch.transcribe_with_deepgram = bench.synthetic_transcript
+    cold_cache = args.cache == "cold"
+
+    logger.info("Rendering lossless reference...")
+    reference = render(assets, args.mode, TUNING_CONFIG["reference"], "tuning_reference", cold_cache=True)
+    if not reference["ok"]:
+        logger.error("Reference render failed")
+        return 1
+
+    results = []
+    points = matrix(args)
+    for n, point in enumerate(points, 1):
+        settings = {key: point[key] for key in ("preset", "crf", "tune", "threads")}
+        logger.info(f"[{n}/{len(points)}] {point['name']}...")
+        run = render(assets, args.mode, settings, f"tuning_{n}", cold_cache)
+        quality = measure_quality(run["output_path"], reference["output_path"]) if run["ok"] else {}
+        if run["output_path"]:
+            os.remove(run["output_path"])
+        results.append({
+            "name": point["name"],
+            "settings": settings,
+            "ok": run["ok"],
+            "wall_seconds": run["total"]["wall_seconds"],
+            "cpu_seconds": run["total"]["cpu_seconds"],
+            "output_bytes": run["output_bytes"],
+            "psnr": quality.get("psnr"),
+            "ssim": quality.get("ssim"),
+        })
+    os.remove(reference["output_path"])
+
+    frontier = pareto_frontier(results)
+    frontier_names = {r["name"] for r in frontier}
+
+    print(f"\n{'':2}{'point':<28} {'wall s':>8} {'cpu s':>8} {'size MB':>8} {'PSNR':>7} {'SSIM':>7}")
+    for r in sorted(results, key=lambda r: r["cpu_seconds"]):
+        if not r["ok"]:
+            print(f"  {r['name']:<28} FAILED")
+            continue
+        print(f"{'*' if r['name'] in frontier_names else ' ':2}{r['name']:<28} {r['wall_seconds']:8.1f} "
+              f"{r['cpu_seconds']:8.1f} {r['output_bytes'] / 1e6:8.2f} "
+              f"{r['psnr'] or 0:7.2f} {r['ssim'] or 0:7.4f}")
+
+    print("\nPareto frontier (* above) as ENCODER_PROFILES entries:")
+    for r in sorted(frontier, key=lambda r: r["cpu_seconds"]):
+        print(f'    "{r["name"]}": {json.dumps(r["settings"]).replace("null", "None")},')
+
+    output = args.output or os.path.join(work_dir, f"tuning_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, "w") as f:
+        json.dump({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "parameters": {"mode": args.mode, "cache": args.cache, "doctor_seconds": args.doctor_seconds,
+                           "constant_seconds": args.constant_seconds, "ffmpeg": bench.ffmpeg_version()},
+            "results": results,
+            "frontier": [r["name"] for r in frontier],
+        }, f, indent=2)
+    print(f"\nResults: {output}")
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Final stitching shared by the zoom stitch services (zoom_stitch.py,
+zoom_stitch_server.py, bhagyashree_zoom_stitch.py): the per-segment
+intermediates are concatenated with an audio fade-out per clip and
+normalized audio in one FFmpeg encode.
+"""
+
+import json
+import subprocess
+from fractions import Fraction
+
+from utils.logging_config import logger
+
+
+def probe_clip(file_path):
+    """Returns the duration, frame size, frame rate and audio presence of a clip (for final_stitching)."""
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-show_entries', 'format=duration:stream=codec_type,width,height,r_frame_rate',
+        '-of', 'json', file_path
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+    info = json.loads(result.stdout)
+    video = next(stream for stream in info['streams'] if stream['codec_type'] == 'video')
+    return {
+        'duration': float(info['format']['duration']),
+        'width': int(video['width']),
+        'height': int(video['height']),
+        'fps': Fraction(video['r_frame_rate']),
+        'has_audio': any(stream['codec_type'] == 'audio' for stream in info['streams']),
+    }
+
+
+def final_stitching(sub_intermediate_outputs, final_output_path, fadeout_duration=1):
+    """
+    Stitch multiple video clips into a single video with audio fade-out at the end of each clip
+    and normalized audio, in a single FFmpeg encode.
+
+    Clips are laid out like MoviePy's concatenate_videoclips(method='compose'): centered on a
+    canvas of the largest clip size at the highest frame rate, each lasting its container
+    duration (last frame held, audio padded with silence).
+
+    Parameters:
+    - sub_intermediate_outputs (list of str): Paths to the input video files.
+    - final_output_path (str): Path to save the final stitched video.
+    - fadeout_duration (float): Duration of the fade-out effect in seconds.
+    """
+    logger.info("Final stitching in progress...")
+    clips = []
+
+    # Probe all video clips (unreadable clips are skipped, as before)
+    for video_path in sub_intermediate_outputs:
+        try:
+            clips.append((video_path, probe_clip(video_path)))
+        except Exception as e:
+            logger.info("Error loading or processing clip {}: {}".format(video_path, e))
+
+    if not clips:
+        logger.info("No valid clips found for stitching. Aborting.")
+        return
+
+    width = max(info['width'] for _, info in clips)
+    height = max(info['height'] for _, info in clips)
+    fps = max(info['fps'] for _, info in clips)
+
+    input_args = []
+    silent_durations = []
+    filters = []
+    for idx, (video_path, info) in enumerate(clips):
+        input_args += ['-i', video_path]
+        duration = info['duration']
+        fade = min(fadeout_duration, duration)
+        if info['has_audio']:
+            audio_input = '[{}:a]'.format(idx)
+        else:
+            # Silent clips get a generated silent track, numbered after the clips
+            audio_input = '[{}:a]'.format(len(clips) + len(silent_durations))
+            silent_durations.append(duration)
+        filters.append(
+            '[{idx}:v]pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={fps},'
+            'tpad=stop=-1:stop_mode=clone,trim=duration={d},setpts=PTS-STARTPTS[v{idx}]'.format(
+                idx=idx, w=width, h=height, fps=fps, d=duration)
+        )
+        filters.append(
+            '{src}aformat=sample_rates=44100:channel_layouts=stereo,apad,atrim=duration={d},'
+            'asetpts=PTS-STARTPTS,afade=t=out:st={st}:d={fade}[a{idx}]'.format(
+                src=audio_input, d=duration, st=duration - fade, fade=fade, idx=idx)
+        )
+
+    # Concatenate, then normalize audio in the same encode
+    concat_inputs = ''.join('[v{0}][a{0}]'.format(idx) for idx in range(len(clips)))
+    filters.append('{}concat=n={}:v=1:a=1[vout][acat]'.format(concat_inputs, len(clips)))
+    filters.append('[acat]loudnorm=I=-16:TP=-1.5:LRA=11,aresample=44100[aout]')
+    silent_args = [
+        arg for duration in silent_durations
+        for arg in ('-f', 'lavfi', '-t', str(duration), '-i', 'anullsrc=r=44100:cl=stereo')
+    ]
+
+    ffmpeg_command = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel", "error",
+    ] + input_args + silent_args + [
+        "-filter_complex", ";".join(filters),
+        "-map", "[vout]",
+        "-map", "[aout]",
+        "-c:v", "libx264",
+        "-crf", "21",
+        "-pix_fmt", "yuv420p",
+        "-c:a", "aac",
+        "-b:a", "128k",
+        "-y", final_output_path
+    ]
+
+    try:
+        subprocess.run(ffmpeg_command, check=True)
+
+    except subprocess.CalledProcessError as e:
+        logger.info("FFmpeg error: {}".format(e))
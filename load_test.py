@@ -0,0 +1,713 @@
+"""
+BluSanta Stitching Load Test
+============================
+
+Concurrency/rate load test against the Flask service (POST /stitching).
+
+Starts the service and the Deepgram stand-in (deepgram_standin.py) as local
+processes on synthetic file:// assets (see benchmark_stitching.py), submits
+backend-format jobs and waits for their completion webhooks. Each scenario is
+either closed-loop (N clients that submit, wait for completion, submit again)
+or open-loop (a fixed number of jobs per minute, whatever the service does).
+A 503 (machine busy) is retried every --retry-seconds until the job has
+waited --max-queue-seconds.
+
+Reports throughput (jobs/hour, per core), p50/p95/p99 end-to-end latency
+(first submit attempt -> completion webhook), 503 rates and a CPU utilization
+time series (whole machine and the service process tree), as JSON that can
+be compared against an earlier report.
+
+Usage:
+    python load_test.py --concurrency 1,2,4 --duration 900
+    python load_test.py --rates 2,4,6 --duration 1200 --mode stream
+    python load_test.py --concurrency 1 --jobs 5 --baseline load_baseline.json
+    python load_test.py --url http://10.0.0.5:8080 --concurrency 2   # existing service
+    python load_test.py --concurrency 4 --no-adaptive   # fixed encoder profile, for comparison
+
+Needs ffmpeg/ffprobe and the service's Python dependencies - no network, no GCS.
+CPU sampling reads /proc (Linux).
+
+Exit status is 1 when a job fails or a regression against the baseline is found.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import blusanta_zoom_stitch as stitch
+import benchmark_stitching as bench
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+LOAD_CONFIG = {
+    "work_dir": os.path.join(stitch.BASE_DIR, "benchmark", "load"),
+    "service_port": 18080,
+    "standin_port": 18090,
+    "webhook_port": 18070,
+    "auth_token": "load-test-token",
+    "doctor_seconds": 10.0,
+    "constant_seconds": 4.0,
+    "retry_seconds": 5.0,        # Wait between submits after a 503
+    "max_queue_seconds": 600.0,  # Give up on a job that got 503s for this long
+    "job_timeout": 3600.0,       # Accepted job without a completion webhook = lost
+    "sample_seconds": 1.0,       # CPU sampling interval
+    "startup_timeout": 60.0,
+    "tolerance": 0.15,           # Relative change that counts as a regression
+    "max_503_rate_increase": 0.05,
+}
+
+logger = logging.getLogger("load_test")
+
+
+# ==============================================================================
+# LOCAL SERVICES
+# ==============================================================================
+
+def serve(port: int, work_dir: str) -> None:
+    """Runs the stitching service with its directories inside work_dir (--serve)."""
+    bench.isolate_service_dirs(work_dir)
+    stitch.app.run(host="127.0.0.1", port=port, threaded=True)
+
+
+def start_process(cmd: List[str], env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen(cmd, env=dict(os.environ, **env), stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_for(url: str, timeout: float) -> None:
+    """Polls url until it answers 200."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def start_services(args: argparse.Namespace, work_dir: str) -> List[subprocess.Popen]:
+    """Starts the Deepgram stand-in (unless --deepgram-url) and the service."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    processes = []
+    deepgram_url = args.deepgram_url
+    if not deepgram_url:
+        port = LOAD_CONFIG["standin_port"]
+        processes.append(start_process(
+            [sys.executable, os.path.join(here, "deepgram_standin.py"), "--port", str(port),
+             "--latency", str(args.standin_latency)],
+            {}, os.path.join(work_dir, "standin.log")
+        ))
+        wait_for(f"http://127.0.0.1:{port}/stats", LOAD_CONFIG["startup_timeout"])
+        deepgram_url = f"http://127.0.0.1:{port}/v1/listen"
+
+    port = LOAD_CONFIG["service_port"]
+    env = {
+        "AI_SERVICE_AUTH_TOKEN": LOAD_CONFIG["auth_token"],
+        "DEEPGRAM_URL": deepgram_url,
+        "STITCH_ENCODER_PROFILE": args.profile,
+        "STITCH_ADAPTIVE_PROFILE": "false" if args.no_adaptive else "true",
+        "PYTHONUNBUFFERED": "1",
+    }
+    processes.append(start_process(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(port), "--work-dir", work_dir],
+        env, os.path.join(work_dir, "service.log")
+    ))
+    wait_for(f"http://127.0.0.1:{port}/health", LOAD_CONFIG["startup_timeout"])
+    return processes
+
+
+def stop_services(processes: List[subprocess.Popen]) -> None:
+    for proc in processes:
+        proc.terminate()
+    for proc in processes:
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# ==============================================================================
+# WEBHOOK RECEIVER
+# ==============================================================================
+
+class Completions:
+    """Completion webhooks received, by job ID."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events: Dict[str, threading.Event] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def expect(self, job_id: str) -> threading.Event:
+        with self._lock:
+            return self._events.setdefault(job_id, threading.Event())
+
+    def deliver(self, data: Dict[str, Any]) -> None:
+        job_id = str(data.get("job_id"))
+        with self._lock:
+            self.results[job_id] = {"status": data.get("status"), "received_at": time.time(),
+                                    "processing_seconds": data.get("processing_time_seconds")}
+            event = self._events.setdefault(job_id, threading.Event())
+        event.set()
+
+
+def start_webhook_server(completions: Completions, port: int) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            try:
+                data = json.loads(body or b"{}")
+            except ValueError:
+                data = {}
+            if data.get("status") in ("completed", "failed"):
+                completions.deliver(data)
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="webhooks").start()
+    return server
+
+
+# ==============================================================================
+# CPU SAMPLING
+# ==============================================================================
+
+def _system_cpu() -> Optional[List[int]]:
+    """Returns (busy, total) jiffies from /proc/stat."""
+    try:
+        with open("/proc/stat") as f:
+            values = [int(v) for v in f.readline().split()[1:]]
+    except (OSError, ValueError):
+        return None
+    idle = values[3] + (values[4] if len(values) > 4 else 0)
+    return [sum(values) - idle, sum(values)]
+
+
+def _proc_stat(pid: int) -> Optional[List[str]]:
+    """Returns the /proc/<pid>/stat fields after the command name (field 3 onwards)."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+
+
+def _process_tree_cpu(pid: Optional[int]) -> Optional[float]:
+    """
+    Returns CPU jiffies used by a process tree so far.
+
+    Counts the process itself plus its reaped children (utime+stime+cutime+cstime)
+    and the running descendants (utime+stime), so long ffmpeg encodes are
+    accounted while they run instead of when they exit.
+    """
+    if not pid:
+        return None
+    root = _proc_stat(pid)
+    if root is None:
+        return None
+    total = float(sum(int(v) for v in root[11:15]))
+
+    children: Dict[int, List[int]] = {}
+    stats: Dict[int, List[str]] = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            fields = _proc_stat(int(entry))
+            if fields:
+                stats[int(entry)] = fields
+                children.setdefault(int(fields[1]), []).append(int(entry))
+    pending = list(children.get(pid, []))
+    while pending:
+        child = pending.pop()
+        total += sum(int(v) for v in stats[child][11:13])
+        pending.extend(children.get(child, []))
+    return total
+
+
+class CpuSampler(threading.Thread):
+    """
+    Samples machine and service CPU utilization (percent of all cores).
+
+    Service CPU covers the service process and its ffmpeg/ffprobe children.
+    """
+
+    def __init__(self, service_pid: Optional[int], in_flight: Dict[str, int], interval: float):
+        super().__init__(daemon=True, name="cpu-sampler")
+        self.service_pid = service_pid
+        self.in_flight = in_flight
+        self.interval = interval
+        self.samples: List[Dict[str, Any]] = []
+        self.stop_event = threading.Event()
+        self.started_at = time.time()
+
+    def run(self) -> None:
+        cores = os.cpu_count() or 1
+        ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        last_system, last_service, last_time = _system_cpu(), _process_tree_cpu(self.service_pid), time.time()
+        while not self.stop_event.wait(self.interval):
+            system, service, now = _system_cpu(), _process_tree_cpu(self.service_pid), time.time()
+            sample = {"t": round(now - self.started_at, 1), "in_flight": self.in_flight["jobs"],
+                      "system_pct": None, "service_pct": None}
+            if system and last_system and system[1] > last_system[1]:
+                sample["system_pct"] = round(100.0 * (system[0] - last_system[0]) / (system[1] - last_system[1]), 1)
+            if service is not None and last_service is not None:
+                sample["service_pct"] = round(100.0 * (service - last_service) / ticks / (now - last_time) / cores, 1)
+            self.samples.append(sample)
+            last_system, last_service, last_time = system, service, now
+
+
+# ==============================================================================
+# LOAD GENERATION
+# ==============================================================================
+
+def backend_payload(assets: Dict[str, str], job_id: str, mode: str, webhook_url: str,
+                    unique_doctor: bool, work_dir: str) -> Dict[str, Any]:
+    """
+    Returns a /stitching request body on file:// URLs.
+
+    With unique_doctor each job gets its own doctor video URLs (symlinks), so
+    mezzanines and transcripts are built per job as in production, while the
+    shared constants stay cached.
+    """
+    doctors = [assets["doctor_0"], assets["doctor_1"]]
+    if unique_doctor:
+        link_dir = os.path.join(work_dir, "inputs", "jobs")
+        os.makedirs(link_dir, exist_ok=True)
+        links = []
+        for n, path in enumerate(doctors):
+            link = os.path.join(link_dir, f"{job_id}_doctor_{n}.mp4")
+            if not os.path.lexists(link):
+                os.symlink(path, link)
+            links.append(link)
+        doctors = links
+
+    url = lambda path: "file://" + os.path.abspath(path)
+    return {
+        "constant_video_paths": [url(assets[f"const_{i}"]) for i in range(4)],
+        "placeholder_video_paths": [url(assets["placeholder_0"]), url(assets["placeholder_1"])],
+        "nodding_video_path": url(assets["nodding"]),
+        "doctor_video_paths": [url(path) for path in doctors],
+        "greeting_audio_path": url(assets["greeting"]),
+        "thank_you_audio_path": url(assets["thank_you"]),
+        "podcast_background": url(assets["background"]),
+        "font_path": None,
+        "final_upload_path": f"file://{work_dir}/uploads/{job_id}.mp4",
+        "webhook_url": webhook_url,
+        "additional_data": {"drFirstName": "Load", "drLastName": "Test"},
+        "streaming": mode == "stream",
+        "job_id": job_id,
+    }
+
+
+class Scenario:
+    """One load level: submits jobs and records what happened to each."""
+
+    def __init__(self, name: str, args: argparse.Namespace, assets: Dict[str, str],
+                 completions: Completions, service_url: str, webhook_url: str, work_dir: str):
+        self.name = name
+        self.args = args
+        self.assets = assets
+        self.completions = completions
+        self.service_url = service_url
+        self.webhook_url = webhook_url
+        self.work_dir = work_dir
+        self.jobs: List[Dict[str, Any]] = []
+        self.in_flight = {"jobs": 0}
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def next_job_id(self) -> Optional[str]:
+        """Returns the next job ID, or None once --jobs have been started."""
+        with self._lock:
+            if self.args.jobs and self._counter >= self.args.jobs:
+                return None
+            self._counter += 1
+            return f"{self.name}_{self._counter}"
+
+    def submit_and_wait(self, job_id: str) -> None:
+        """Submits one job (retrying 503s) and waits for its completion webhook."""
+        job = {"job_id": job_id, "first_attempt": time.time(), "attempts": 0, "http_503": 0,
+               "accepted_at": None, "completed_at": None, "status": None}
+        with self._lock:
+            self.jobs.append(job)
+            self.in_flight["jobs"] += 1
+        done = self.completions.expect(job_id)
+        body = backend_payload(self.assets, job_id, self.args.mode, self.webhook_url,
+                               not self.args.shared_doctor, self.work_dir)
+        if self.args.deadline_seconds:
+            body["deadline"] = job["first_attempt"] + self.args.deadline_seconds
+        headers = {"Authorization": f"Bearer {self.args.token or LOAD_CONFIG['auth_token']}"}
+        try:
+            while True:
+                job["attempts"] += 1
+                try:
+                    response = requests.post(f"{self.service_url}/stitching", json=body, headers=headers, timeout=30)
+                    status_code = response.status_code
+                except requests.RequestException as e:
+                    logger.warning(f"{job_id}: submit failed ({e})")
+                    status_code = None
+                if status_code == 202:
+                    job["accepted_at"] = time.time()
+                    job["encoder_profile"] = response.json().get("encoder_profile")
+                    break
+                if status_code == 503:
+                    job["http_503"] += 1
+                else:
+                    job["status"] = f"http_{status_code}"
+                    return
+                if time.time() - job["first_attempt"] + self.args.retry_seconds > self.args.max_queue_seconds:
+                    job["status"] = "gave_up"
+                    return
+                time.sleep(self.args.retry_seconds)
+
+            if not done.wait(LOAD_CONFIG["job_timeout"]):
+                job["status"] = "lost"
+                return
+            result = self.completions.results[job_id]
+            job["completed_at"] = result["received_at"]
+            job["status"] = result["status"]
+            job["processing_seconds"] = result["processing_seconds"]
+            logger.info(f"{job_id}: {job['status']} after {job['completed_at'] - job['first_attempt']:.1f}s "
+                        f"({job['http_503']} x 503)")
+        finally:
+            with self._lock:
+                self.in_flight["jobs"] -= 1
+            output = os.path.join(self.work_dir, "output", f"final_video_{job_id}.mp4")
+            extras = [stitch.rendition_path(output, name) for name in stitch.RENDITION_CONFIG["ladder"]]
+            extras += [stitch.preview_path(output, kind) for kind in stitch.PREVIEW_OUTPUTS]
+            extras.append(stitch.subtitle_track_path(output))
+            for path in [output] + extras:
+                if os.path.exists(path):
+                    os.remove(path)
+            shutil.rmtree(stitch.hls_dir_for(output), ignore_errors=True)
+
+    def run_closed_loop(self, clients: int, deadline: float) -> None:
+        """`clients` clients, each submitting its next job when the previous one finishes."""
+        def client() -> None:
+            while time.time() < deadline:
+                job_id = self.next_job_id()
+                if job_id is None:
+                    return
+                self.submit_and_wait(job_id)
+
+        threads = [threading.Thread(target=client, name=f"client-{n}") for n in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run_open_loop(self, jobs_per_minute: float, deadline: float) -> None:
+        """Starts jobs at a fixed rate (Poisson arrivals with --poisson)."""
+        threads = []
+        interval = 60.0 / jobs_per_minute
+        rng = random.Random(self.args.seed)
+        next_at = time.time()
+        while next_at < deadline:
+            time.sleep(max(0.0, next_at - time.time()))
+            job_id = self.next_job_id()
+            if job_id is None:
+                break
+            thread = threading.Thread(target=self.submit_and_wait, args=(job_id,), name=job_id)
+            thread.start()
+            threads.append(thread)
+            next_at += rng.expovariate(1.0 / interval) if self.args.poisson else interval
+        for thread in threads:
+            thread.join()
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (None for no values)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(q / 100.0 * len(ordered) + 0.5)))
+    return round(ordered[min(rank, len(ordered)) - 1], 2)
+
+
+def latency_summary(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": round(sum(values) / len(values), 2) if values else None,
+        "max": round(max(values), 2) if values else None,
+    }
+
+
+def summarize_scenario(scenario: Scenario, kind: str, level: float, started: float,
+                       finished: float, cpu: List[Dict[str, Any]]) -> Dict[str, Any]:
+    jobs = scenario.jobs
+    completed = [job for job in jobs if job["status"] == "completed"]
+    attempts = sum(job["attempts"] for job in jobs)
+    http_503 = sum(job["http_503"] for job in jobs)
+    elapsed = max(finished - started, 1e-6)
+    cores = os.cpu_count() or 1
+
+    def mean(key: str) -> Optional[float]:
+        values = [sample[key] for sample in cpu if sample[key] is not None]
+        return round(sum(values) / len(values), 1) if values else None
+
+    return {
+        "name": scenario.name,
+        "kind": kind,
+        "level": level,
+        "elapsed_seconds": round(elapsed, 1),
+        "submitted": len(jobs),
+        "accepted": sum(1 for job in jobs if job["accepted_at"]),
+        "completed": len(completed),
+        "failed": sum(1 for job in jobs if job["status"] == "failed"),
+        "gave_up": sum(1 for job in jobs if job["status"] == "gave_up"),
+        "lost": sum(1 for job in jobs if job["status"] == "lost"),
+        "requests": attempts,
+        "http_503": http_503,
+        "http_503_rate": round(http_503 / attempts, 3) if attempts else 0.0,
+        "jobs_rejected_at_least_once": sum(1 for job in jobs if job["http_503"]),
+        # Encoder profiles the service chose (load-adaptive)
+        "profiles": {profile: sum(1 for job in completed if job.get("encoder_profile") == profile)
+                     for profile in sorted({job.get("encoder_profile") or "-" for job in completed})},
+        "throughput_per_hour": round(3600.0 * len(completed) / elapsed, 2),
+        "throughput_per_core_hour": round(3600.0 * len(completed) / elapsed / cores, 2),
+        # First submit attempt -> completion webhook (includes time spent retrying 503s)
+        "latency_seconds": latency_summary([job["completed_at"] - job["first_attempt"] for job in completed]),
+        # Accepted -> completion webhook
+        "service_latency_seconds": latency_summary([job["completed_at"] - job["accepted_at"] for job in completed]),
+        "cpu": {"mean_system_pct": mean("system_pct"), "mean_service_pct": mean("service_pct"), "samples": cpu},
+        "jobs": jobs,
+    }
+
+
+def run_scenario(kind: str, level: float, args: argparse.Namespace, assets: Dict[str, str],
+                 completions: Completions, service_url: str, webhook_url: str, work_dir: str,
+                 service_pid: Optional[int]) -> Dict[str, Any]:
+    name = f"{kind}_{level:g}_{time.strftime('%H%M%S')}"
+    scenario = Scenario(name, args, assets, completions, service_url, webhook_url, work_dir)
+    sampler = CpuSampler(service_pid, scenario.in_flight, args.sample_seconds)
+    logger.info(f"Scenario {name}: {'concurrency' if kind == 'closed' else 'jobs/min'} {level:g}")
+    sampler.start()
+    started = time.time()
+    deadline = started + args.duration if args.duration else float("inf")
+    if kind == "closed":
+        scenario.run_closed_loop(int(level), deadline)
+    else:
+        scenario.run_open_loop(level, deadline)
+    finished = time.time()
+    sampler.stop_event.set()
+    sampler.join()
+    return summarize_scenario(scenario, kind, level, started, finished, sampler.samples)
+
+
+# ==============================================================================
+# REPORT
+# ==============================================================================
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Compares scenarios with the same kind and level against a baseline report.
+
+    Regressions: throughput down or p95 latency up by more than `tolerance`
+    (relative), or the 503 rate up by more than LOAD_CONFIG["max_503_rate_increase"].
+    """
+    if report["parameters"] != baseline.get("parameters"):
+        logger.warning(f"Baseline parameters differ: {baseline.get('parameters')} vs {report['parameters']}")
+    base = {(s["kind"], s["level"]): s for s in baseline.get("scenarios", [])}
+    rows = []
+    for scenario in report["scenarios"]:
+        old = base.get((scenario["kind"], scenario["level"]))
+        if not old:
+            continue
+        checks = [
+            ("throughput_per_hour", old["throughput_per_hour"], scenario["throughput_per_hour"], -1),
+            ("latency_p95", old["latency_seconds"]["p95"], scenario["latency_seconds"]["p95"], 1),
+        ]
+        for metric, before, after, direction in checks:
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else 0.0
+            rows.append({"kind": scenario["kind"], "level": scenario["level"], "metric": metric,
+                         "baseline": before, "current": after, "change": round(change, 3),
+                         "regression": direction * change > tolerance})
+        change = scenario["http_503_rate"] - old["http_503_rate"]
+        rows.append({"kind": scenario["kind"], "level": scenario["level"], "metric": "http_503_rate",
+                     "baseline": old["http_503_rate"], "current": scenario["http_503_rate"],
+                     "change": round(change, 3), "regression": change > LOAD_CONFIG["max_503_rate_increase"]})
+    return rows
+
+
+def print_report(report: Dict[str, Any], comparison: Optional[List[Dict[str, Any]]]) -> None:
+    print(f"\n{'scenario':<14} {'done':>5} {'fail':>5} {'jobs/h':>8} {'/core':>7} "
+          f"{'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'503%':>6} {'cpu%':>6}  profiles")
+    for s in report["scenarios"]:
+        label = f"{'c' if s['kind'] == 'closed' else 'r'}={s['level']:g}"
+        lat = s["latency_seconds"]
+        fmt = lambda v: f"{v:8.1f}" if v is not None else f"{'-':>8}"
+        print(f"{label:<14} {s['completed']:5d} {s['failed'] + s['gave_up'] + s['lost']:5d} "
+              f"{s['throughput_per_hour']:8.2f} {s['throughput_per_core_hour']:7.2f} "
+              f"{fmt(lat['p50'])} {fmt(lat['p95'])} {fmt(lat['p99'])} "
+              f"{100 * s['http_503_rate']:6.1f} {s['cpu']['mean_system_pct'] or 0:6.1f}  "
+              f"{' '.join(f'{name}:{count}' for name, count in s['profiles'].items())}")
+
+    if comparison is not None:
+        regressions = [row for row in comparison if row["regression"]]
+        print(f"\nBaseline comparison: {len(regressions)} regression(s)")
+        for row in comparison:
+            if row["regression"] or abs(row["change"]) > 0.05:
+                # The 503 rate change is absolute, the others relative
+                change = f"{100 * row['change']:+.1f} pts" if row["metric"] == "http_503_rate" else f"{row['change']:+.0%}"
+                print(f"  {row['kind']:<6} {row['level']:<6g} {row['metric']:<20} "
+                      f"{row['baseline']:9.2f} -> {row['current']:9.2f} ({change}) "
+                      f"{'REGRESSION' if row['regression'] else ''}")
+
+
+# ==============================================================================
+# MAIN
+# ==============================================================================
+
+def parse_levels(value: str) -> List[float]:
+    return [float(v) for v in value.split(",") if v]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Stitching service load test")
+    parser.add_argument("--concurrency", type=parse_levels, default=[],
+                        help="Closed-loop client counts, e.g. 1,2,4")
+    parser.add_argument("--rates", type=parse_levels, default=[],
+                        help="Open-loop arrival rates in jobs per minute, e.g. 1,2,4")
+    parser.add_argument("--duration", type=float, default=600.0,
+                        help="Seconds to keep submitting per scenario (0: until --jobs are submitted)")
+    parser.add_argument("--jobs", type=int, default=0, help="Max jobs per scenario (0: no limit)")
+    parser.add_argument("--poisson", action="store_true", help="Poisson arrivals for --rates")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mode", choices=["file", "stream"], default="file")
+    parser.add_argument("--profile", choices=sorted(stitch.ENCODER_PROFILES), default=stitch.VIDEO_CONFIG["profile"])
+    parser.add_argument("--no-adaptive", action="store_true",
+                        help="Disable the service's load-adaptive encoder profile (every job uses --profile)")
+    parser.add_argument("--deadline-seconds", type=float, default=0.0,
+                        help="Give each job a deadline this many seconds after its first submit attempt")
+    parser.add_argument("--shared-doctor", action="store_true",
+                        help="Reuse the same doctor URLs for every job (mezzanines/transcripts cached after job 1)")
+    parser.add_argument("--doctor-seconds", type=float, default=LOAD_CONFIG["doctor_seconds"])
+    parser.add_argument("--constant-seconds", type=float, default=LOAD_CONFIG["constant_seconds"])
+    parser.add_argument("--retry-seconds", type=float, default=LOAD_CONFIG["retry_seconds"])
+    parser.add_argument("--max-queue-seconds", type=float, default=LOAD_CONFIG["max_queue_seconds"],
+                        help="Stop retrying 503s after this long (0: a 503 drops the job)")
+    parser.add_argument("--sample-seconds", type=float, default=LOAD_CONFIG["sample_seconds"])
+    parser.add_argument("--standin-latency", type=float, default=0.5, help="Deepgram stand-in base latency")
+    parser.add_argument("--deepgram-url", help="Use this transcription endpoint instead of starting the stand-in")
+    parser.add_argument("--url", help="Load an already running service instead of starting one "
+                                      "(its assets must be readable at the same file:// paths)")
+    parser.add_argument("--token", help="Bearer token for --url")
+    parser.add_argument("--work-dir", default=LOAD_CONFIG["work_dir"])
+    parser.add_argument("--output", help="Report JSON (default: <work-dir>/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--save-baseline", help="Also write the report here as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=LOAD_CONFIG["tolerance"])
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=LOAD_CONFIG["service_port"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    work_dir = os.path.abspath(args.work_dir)
+    if args.serve:
+        serve(args.port, work_dir)
+        return 0
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if not args.concurrency and not args.rates:
+        args.concurrency = [1]
+    if not args.duration and not args.jobs:
+        parser.error("--duration 0 needs --jobs")
+
+    os.makedirs(work_dir, exist_ok=True)
+    assets = bench.generate_assets(os.path.join(work_dir, "inputs"), args.doctor_seconds, args.constant_seconds)
+
+    processes = []
+    completions = Completions()
+    webhook_server = start_webhook_server(completions, LOAD_CONFIG["webhook_port"])
+    webhook_url = f"http://127.0.0.1:{LOAD_CONFIG['webhook_port']}/webhook"
+    try:
+        if args.url:
+            service_url, service_pid = args.url.rstrip("/"), None
+        else:
+            processes = start_services(args, work_dir)
+            service_url, service_pid = f"http://127.0.0.1:{LOAD_CONFIG['service_port']}", processes[-1].pid
+
+        scenarios = []
+        for kind, levels in (("closed", args.concurrency), ("open", args.rates)):
+            for level in levels:
+                scenarios.append(run_scenario(kind, level, args, assets, completions, service_url,
+                                              webhook_url, work_dir, service_pid))
+    finally:
+        webhook_server.shutdown()
+        stop_services(processes)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "ffmpeg": bench.ffmpeg_version(),
+            "service": args.url or "local",
+        },
+        "parameters": {
+            "mode": args.mode,
+            "profile": args.profile,
+            "doctor_seconds": args.doctor_seconds,
+            "constant_seconds": args.constant_seconds,
+            "duration": args.duration,
+            "jobs": args.jobs,
+            "poisson": args.poisson,
+            "shared_doctor": args.shared_doctor,
+            "retry_seconds": args.retry_seconds,
+            "max_queue_seconds": args.max_queue_seconds,
+            "transcriber": args.deepgram_url or f"standin (latency {args.standin_latency}s)",
+            "adaptive_profile": not args.no_adaptive,
+            "deadline_seconds": args.deadline_seconds,
+        },
+        "scenarios": scenarios,
+    }
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            comparison = compare_to_baseline(report, json.load(f), args.tolerance)
+        report["comparison"] = comparison
+
+    output = args.output or os.path.join(work_dir, "results", time.strftime("%Y%m%d_%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({key: value for key, value in report.items() if key != "comparison"}, f, indent=2)
+
+    print_report(report, comparison)
+    print(f"\nReport: {output}")
+
+    failed = any(s["failed"] or s["lost"] for s in scenarios)
+    regressed = any(row["regression"] for row in comparison or [])
+    return 1 if failed or regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
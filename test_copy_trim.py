@@ -0,0 +1,124 @@
+"""
+Tests for the constant mezzanine stream-copy trims (keyframe index, copy_trim_args, placeholder cuts)
+
+Run with: python -m pytest -q test_copy_trim.py
+The keyframe indexes are built in-process; only the last test runs ffmpeg.
+"""
+
+import shutil
+import subprocess
+
+import pytest
+
+import blusanta_zoom_stitch as stitch
+
+
+@pytest.fixture
+def mezzanine(monkeypatch):
+    """Enabled constant mezzanines that cut shorter placeholders."""
+    monkeypatch.setitem(stitch.CONSTANT_MEZZANINE_CONFIG, "enabled", True)
+    monkeypatch.setitem(stitch.CONSTANT_MEZZANINE_CONFIG, "cut_shorter", True)
+
+
+def keyframe_index(**overrides):
+    """A conforming keyframe index: VIDEO_CONFIG format, no B-frames, an IDR every 0.2s over 4s."""
+    cfg = stitch.VIDEO_CONFIG
+    index = {
+        "width": cfg["width"],
+        "height": cfg["height"],
+        "fps": cfg["fps"],
+        "has_b_frames": 0,
+        "frames": 4 * cfg["fps"],
+        "keyframes": [k * 0.2 for k in range(20)],
+        "starts_with_keyframe": True,
+    }
+    index.update(overrides)
+    return index
+
+
+def frames(seconds):
+    return str(round(seconds * stitch.VIDEO_CONFIG["fps"]))
+
+
+# ==============================================================================
+# copy_trim_args / trim_video_cmd
+# ==============================================================================
+
+def test_trim_on_keyframe_is_copy(mezzanine):
+    cmd, copy = stitch.trim_video_cmd("in.mp4", 2.0, "out.mp4", start=0.4, index=keyframe_index())
+    assert copy
+    assert cmd[cmd.index("-c:v") + 1] == "copy"
+    assert cmd[cmd.index("-frames:v") + 1] == frames(2.0)
+    assert cmd[cmd.index("-ss") + 1] == "0.400"
+    assert "-vf" not in cmd and cmd[-1] == "out.mp4"
+
+
+def test_trim_from_start_is_copy(mezzanine):
+    cmd, copy = stitch.trim_video_cmd("in.mp4", 2.04, "out.mp4", index=keyframe_index())
+    assert copy
+    assert "-ss" not in cmd
+    assert stitch.copy_trim_args("in.mp4", 2.04, index=keyframe_index()) == ["-c:v", "copy", "-frames:v", frames(2.04)]
+
+
+def test_trim_off_keyframe_reencodes(mezzanine):
+    assert stitch.copy_trim_args("in.mp4", 2.0, start=0.28, index=keyframe_index()) is None
+    cmd, copy = stitch.trim_video_cmd("in.mp4", 2.0, "out.mp4", start=0.28, index=keyframe_index())
+    assert not copy
+    assert "copy" not in cmd
+    assert cmd[cmd.index("-frames:v") + 1] == frames(2.0)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"has_b_frames": 2},
+    {"starts_with_keyframe": False},
+    {"width": 640, "height": 360},
+    {"fps": 30},
+])
+def test_nonconforming_index_reencodes(mezzanine, overrides):
+    assert stitch.copy_trim_args("in.mp4", 2.0, index=keyframe_index(**overrides)) is None
+
+
+def test_mezzanine_disabled_reencodes(mezzanine, monkeypatch):
+    monkeypatch.setitem(stitch.CONSTANT_MEZZANINE_CONFIG, "enabled", False)
+    assert stitch.copy_trim_args("in.mp4", 2.0, index=keyframe_index()) is None
+
+
+# ==============================================================================
+# plan_video_fit
+# ==============================================================================
+
+def test_fit_cuts_shorter_audio(mezzanine):
+    assert stitch.fit_cuts(3.0, 2.04)
+    assert stitch.plan_video_fit(3.0, 2.04) == (1.0, 0)
+
+
+def test_fit_longer_audio_still_slows_down(mezzanine):
+    assert not stitch.fit_cuts(3.0, 3.53)
+    assert stitch.plan_video_fit(3.0, 3.53)[0] > 1.0
+
+
+def test_fit_speeds_up_without_cut_shorter(mezzanine, monkeypatch):
+    monkeypatch.setitem(stitch.CONSTANT_MEZZANINE_CONFIG, "cut_shorter", False)
+    assert stitch.plan_video_fit(3.0, 2.04) == (0.75, 0)
+
+
+# ==============================================================================
+# get_keyframe_index on a real mezzanine
+# ==============================================================================
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg/ffprobe")
+def test_keyframe_index_of_mezzanine(mezzanine, tmp_path, monkeypatch):
+    monkeypatch.setattr(stitch, "CACHE_DIR", str(tmp_path / "cache"))
+    cfg = stitch.VIDEO_CONFIG
+    path = str(tmp_path / "mezzanine.mp4")
+    subprocess.run([
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc=size={cfg['width']}x{cfg['height']}:rate={cfg['fps']}:duration=2",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", "-bf", "0",
+        "-g", str(stitch.CONSTANT_MEZZANINE_CONFIG["gop_frames"]), path
+    ], check=True)
+
+    index = stitch.get_keyframe_index(path)
+    assert index["frames"] == 2 * cfg["fps"]
+    assert index["has_b_frames"] == 0 and index["starts_with_keyframe"]
+    assert stitch.copy_trim_args(path, 1.0, start=index["keyframes"][1]) == ["-c:v", "copy", "-frames:v", frames(1.0)]
@@ -0,0 +1,256 @@
+"""
+Tests for the BluSanta job history (predictions, stage regressions, adaptive profile)
+
+Run with: python -m pytest -q test_job_history.py
+Each test gets an empty history database in a temporary HISTORY_DIR.
+"""
+
+import time
+
+import pytest
+
+import blusanta_zoom_stitch as stitch
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    """Empty, enabled job history in tmp_path; yields an open connection."""
+    monkeypatch.setattr(stitch, "HISTORY_DIR", str(tmp_path))
+    monkeypatch.setitem(stitch.HISTORY_CONFIG, "enabled", True)
+    connection = stitch.history_db()
+    yield connection
+    connection.close()
+
+
+def add_job(connection, elapsed_seconds, doctor_seconds=None, stages=None,
+            mode="file", profile=None, status="completed"):
+    """Inserts a finished job (and its stage wall times) into the history."""
+    with connection:
+        cursor = connection.execute(
+            "INSERT INTO jobs (job_id, finished_at, status, mode, profile, elapsed_seconds, doctor_seconds) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (f"job-{time.time_ns()}", time.time(), status, mode,
+             profile or stitch.VIDEO_CONFIG["profile"], elapsed_seconds, doctor_seconds)
+        )
+        connection.executemany(
+            "INSERT INTO job_stages (job_row, stage, wall_seconds, cpu_seconds, processes) VALUES (?, ?, ?, 0, 1)",
+            [(cursor.lastrowid, stage, seconds) for stage, seconds in (stages or {}).items()]
+        )
+
+
+def job_record(doctor_seconds, stages, mode="file", profile=None):
+    """The subset of job_history_record() that find_stage_regressions() reads."""
+    return {
+        "mode": mode,
+        "profile": profile or stitch.VIDEO_CONFIG["profile"],
+        "doctor_seconds": doctor_seconds,
+        "stages": {stage: {"wall_seconds": seconds} for stage, seconds in stages.items()},
+    }
+
+
+# ==============================================================================
+# _stats
+# ==============================================================================
+
+def test_stats_empty():
+    assert stitch._stats([]) == {"p50": None, "p95": None, "mean": None, "max": None}
+
+
+def test_stats_single_value():
+    assert stitch._stats([4.0]) == {"p50": 4.0, "p95": 4.0, "mean": 4.0, "max": 4.0}
+
+
+def test_stats_nearest_rank_unsorted():
+    values = [10, 3, 7, 1, 9, 2, 8, 4, 6, 5]
+    assert stitch._stats(values) == {"p50": 5, "p95": 10, "mean": 5.5, "max": 10}
+
+
+def test_stats_even_count_takes_lower_median():
+    assert stitch._stats([1.0, 2.0])["p50"] == 1.0
+
+
+def test_nearest_rank_clamps_to_list():
+    assert stitch._nearest_rank([1.0, 2.0, 3.0], 0) == 1.0
+    assert stitch._nearest_rank([1.0, 2.0, 3.0], 100) == 3.0
+
+
+# ==============================================================================
+# predict_job_seconds
+# ==============================================================================
+
+def test_predict_empty_history(history):
+    assert stitch.predict_job_seconds("file", 120.0) is None
+
+
+def test_predict_needs_min_jobs(history):
+    for _ in range(stitch.HISTORY_CONFIG["min_jobs"] - 1):
+        add_job(history, 100.0, 60.0)
+    assert stitch.predict_job_seconds("file", 60.0) is None
+
+
+def test_predict_disabled(history, monkeypatch):
+    for seconds in (60.0, 120.0, 180.0):
+        add_job(history, seconds, seconds)
+    monkeypatch.setitem(stitch.HISTORY_CONFIG, "enabled", False)
+    assert stitch.predict_job_seconds("file", 60.0) is None
+
+
+def test_predict_linear_fit(history):
+    # elapsed = 40 + 1.0 * doctor_seconds
+    for doctor_seconds in (60.0, 120.0, 180.0):
+        add_job(history, 40.0 + doctor_seconds, doctor_seconds)
+    assert stitch.predict_job_seconds("file", 240.0) == {"seconds": 280.0, "basis": "doctor_seconds", "jobs": 3}
+
+
+def test_predict_negative_slope_falls_back_to_median(history):
+    for doctor_seconds, elapsed in ((60.0, 300.0), (120.0, 200.0), (180.0, 100.0)):
+        add_job(history, elapsed, doctor_seconds)
+    assert stitch.predict_job_seconds("file", 240.0) == {"seconds": 200.0, "basis": "median", "jobs": 3}
+
+
+def test_predict_same_doctor_length_falls_back_to_median(history):
+    for elapsed in (90.0, 100.0, 110.0):
+        add_job(history, elapsed, 60.0)
+    assert stitch.predict_job_seconds("file", 60.0)["basis"] == "median"
+
+
+def test_predict_without_doctor_seconds_uses_median(history):
+    for doctor_seconds in (60.0, 120.0, 180.0):
+        add_job(history, 40.0 + doctor_seconds, doctor_seconds)
+    assert stitch.predict_job_seconds("file") == {"seconds": 160.0, "basis": "median", "jobs": 3}
+
+
+def test_predict_ignores_other_mode_profile_and_failures(history):
+    for _ in range(3):
+        add_job(history, 100.0, 60.0)
+        add_job(history, 500.0, 60.0, mode="stream")
+        add_job(history, 500.0, 60.0, profile="draft")
+        add_job(history, 500.0, 60.0, status="failed")
+    prediction = stitch.predict_job_seconds("file", 60.0)
+    assert prediction["seconds"] == 100.0
+    assert prediction["jobs"] == 3
+
+
+# ==============================================================================
+# find_stage_regressions
+# ==============================================================================
+
+def test_regressions_empty_history(history):
+    assert stitch.find_stage_regressions(history, job_record(60.0, {"encode": 100.0})) == []
+
+
+def test_regressions_flags_slow_stage(history):
+    for _ in range(3):
+        add_job(history, 60.0, 60.0, {"encode": 20.0, "upload": 5.0})
+    regressions = stitch.find_stage_regressions(history, job_record(60.0, {"encode": 40.0, "upload": 5.0}))
+    assert regressions == [{"stage": "encode", "wall_seconds": 40.0, "baseline_seconds": 20.0, "baseline_jobs": 3}]
+
+
+def test_regressions_needs_factor_and_min_seconds(history):
+    for _ in range(3):
+        add_job(history, 60.0, 60.0, {"encode": 20.0, "upload": 2.0})
+    # encode: 1.4x baseline; upload: 3x baseline but only 4s slower
+    assert stitch.find_stage_regressions(history, job_record(60.0, {"encode": 28.0, "upload": 6.0})) == []
+
+
+def test_regressions_compare_similar_doctor_length_only(history):
+    for _ in range(3):
+        add_job(history, 60.0, 60.0, {"encode": 20.0})
+    # 120s of doctor video is outside +/-25% of 60s: no baseline
+    assert stitch.find_stage_regressions(history, job_record(120.0, {"encode": 40.0})) == []
+
+
+def test_regressions_skip_stage_without_baseline(history):
+    for _ in range(3):
+        add_job(history, 60.0, 60.0, {"encode": 20.0})
+    assert stitch.find_stage_regressions(history, job_record(60.0, {"transcribe": 100.0})) == []
+
+
+# ==============================================================================
+# choose_job_profile
+# ==============================================================================
+
+@pytest.fixture
+def profiles(history, monkeypatch):
+    """Base profile "default", floor "fast", no waiting jobs; yields the history connection."""
+    monkeypatch.setitem(stitch.VIDEO_CONFIG, "profile", "default")
+    monkeypatch.setitem(stitch.ADAPTIVE_PROFILE_CONFIG, "enabled", True)
+    monkeypatch.setitem(stitch.ADAPTIVE_PROFILE_CONFIG, "ladder", ["quality", "default", "fast", "draft"])
+    monkeypatch.setitem(stitch.ADAPTIVE_PROFILE_CONFIG, "floor", "fast")
+    monkeypatch.setitem(stitch.ADAPTIVE_PROFILE_CONFIG, "jobs_per_step", 2)
+    monkeypatch.setattr(stitch, "WAITING_JOBS", {})
+    yield history
+
+
+def add_base_jobs(connection, elapsed_seconds=100.0):
+    """Adds enough completed base-profile jobs for a median prediction."""
+    for _ in range(stitch.HISTORY_CONFIG["min_jobs"]):
+        add_job(connection, elapsed_seconds, mode=stitch.payload_mode({}))
+
+
+def test_profile_empty_history_idle(profiles):
+    choice = stitch.choose_job_profile({})
+    assert (choice["profile"], choice["reason"]) == ("default", "idle")
+    assert choice["estimated_seconds"] is None
+
+
+def test_profile_requested_and_proxy(profiles):
+    assert stitch.choose_job_profile({"encoder_profile": "quality", "queue_depth": 10})["reason"] == "requested"
+    choice = stitch.choose_job_profile({"proxy": True})
+    assert (choice["profile"], choice["reason"]) == (stitch.PROXY_CONFIG["profile"], "proxy")
+
+
+def test_profile_disabled_or_unknown_floor(profiles, monkeypatch):
+    monkeypatch.setitem(stitch.ADAPTIVE_PROFILE_CONFIG, "floor", "ultrafast")
+    choice = stitch.choose_job_profile({"queue_depth": 10})
+    assert (choice["profile"], choice["reason"]) == ("default", "disabled")
+
+
+def test_profile_steps_down_with_queue(profiles):
+    choice = stitch.choose_job_profile({"queue_depth": 2})
+    assert (choice["profile"], choice["reason"]) == ("fast", "queue")
+
+
+def test_profile_counts_waiting_jobs(profiles):
+    now = time.time()
+    stitch.WAITING_JOBS.update({"a": now, "b": now, "self": now})
+    assert stitch.choose_job_profile({"job_id": "self"})["profile"] == "fast"
+    assert stitch.choose_job_profile({"job_id": "other"})["profile"] == "fast"
+
+
+def test_profile_clamped_to_floor(profiles):
+    assert stitch.choose_job_profile({"queue_depth": 100})["profile"] == "fast"
+
+
+def test_profile_floor_above_base_never_steps_down(profiles, monkeypatch):
+    monkeypatch.setitem(stitch.ADAPTIVE_PROFILE_CONFIG, "floor", "quality")
+    choice = stitch.choose_job_profile({"queue_depth": 100})
+    assert (choice["profile"], choice["reason"]) == ("default", "idle")
+
+
+def test_profile_deadline_met_keeps_base(profiles):
+    add_base_jobs(profiles, 100.0)
+    choice = stitch.choose_job_profile({"deadline": time.time() + 1000})
+    assert (choice["profile"], choice["reason"]) == ("default", "idle")
+    assert choice["estimated_seconds"] == 100.0
+
+
+def test_profile_tight_deadline_steps_down(profiles):
+    # fast is estimated at 0.75 x default (no fast history)
+    add_base_jobs(profiles, 100.0)
+    choice = stitch.choose_job_profile({"deadline": time.time() + 80})
+    assert (choice["profile"], choice["reason"]) == ("fast", "deadline")
+    assert choice["estimated_seconds"] == 75.0
+
+
+def test_profile_past_deadline_goes_to_floor(profiles):
+    add_base_jobs(profiles, 100.0)
+    choice = stitch.choose_job_profile({"deadline": time.time() - 60})
+    assert (choice["profile"], choice["reason"]) == ("fast", "deadline")
+    assert choice["budget_seconds"] < 0
+
+
+def test_profile_past_deadline_without_history_keeps_rung(profiles):
+    choice = stitch.choose_job_profile({"deadline": time.time() - 60})
+    assert (choice["profile"], choice["reason"]) == ("default", "idle")
+    assert choice["budget_seconds"] < 0